@@ -18,8 +18,8 @@ print("""
 print("\n🔧 Nuevos campos agregados al modelo Productos:")
 print("   - descripcion_corta (CharField)")
 print("   - descripcion_larga (TextField)")
-print("   - palabras_clave (CharField)")
-print("   - beneficios (TextField)")
+print("   - palabras_clave (JSONField, lista de keywords)")
+print("   - beneficios (JSONField, lista)")
 print("   - descripcion_generada_fecha (DateTimeField)")
 
 print("\n📋 PASOS:")
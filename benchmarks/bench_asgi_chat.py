@@ -0,0 +1,85 @@
+"""
+Benchmark de /api/ia/chat/ con gunicorn WSGI (workers síncronos) vs ASGI (workers uvicorn)
+Ejecutar: python benchmarks/bench_asgi_chat.py [--workers 2] [--concurrencia 10 50 100] [--latencia-ms 500]
+
+Levanta benchmarks/stub_groq.py en un hilo y, para cada modo, un gunicorn real con la misma
+cantidad de workers apuntando al servidor falso. Envía ráfagas de chats simultáneos (preguntas
+distintas, sin cache semántico ni single-flight para que todas lleguen a Groq) y muestra:
+- throughput (requests/s) y latencias p50/p95 por nivel de concurrencia
+- memoria RSS total (master + workers) al terminar
+
+Con workers síncronos cada worker atiende un chat a la vez y el resto espera en la cola;
+con uvicorn las vistas async esperan a Groq en el event loop y cada worker atiende muchos.
+Usa la BD configurada en DATABASE_URL.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import stub_groq  # noqa: E402
+from servidor_local import APLICACIONES, detener, iniciar_gunicorn, rss_kb  # noqa: E402
+
+
+async def rafaga(url, concurrencia, ronda):
+    """Envía `concurrencia` chats a la vez; devuelve (duración total, latencias ms, errores)"""
+    async with httpx.AsyncClient(timeout=300, limits=httpx.Limits(max_connections=concurrencia)) as cliente:
+        async def chat(i):
+            inicio = time.perf_counter()
+            respuesta = await cliente.post(
+                f'{url}/api/ia/chat/',
+                json={'mensaje': f'¿Qué productos me sirven para un regalo {ronda}-{i}?'}
+            )
+            ok = respuesta.status_code == 200 and not respuesta.json().get('respaldo')
+            return (time.perf_counter() - inicio) * 1000, ok
+
+        inicio = time.perf_counter()
+        resultados = await asyncio.gather(*(chat(i) for i in range(concurrencia)))
+        return time.perf_counter() - inicio, [r[0] for r in resultados], sum(1 for r in resultados if not r[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=2, help='Workers de gunicorn en ambos modos')
+    parser.add_argument('--concurrencia', type=int, nargs='+', default=[10, 50, 100], help='Chats simultáneos por ráfaga')
+    parser.add_argument('--latencia-ms', type=float, default=500, help='Latencia del servidor falso')
+    parser.add_argument('--modos', nargs='+', default=list(APLICACIONES), choices=list(APLICACIONES))
+    args = parser.parse_args()
+
+    servidor, url_groq, _ = stub_groq.iniciar(puerto=0, latencia_ms=args.latencia_ms, en_hilo=True, semilla=1)
+    print(f"⚡ {args.workers} workers por modo, Groq falso con {args.latencia_ms:.0f} ms de latencia ({url_groq})")
+
+    entorno = {
+        'GROQ_BASE_URL': url_groq,
+        'GROQ_API_KEY': os.environ.get('GROQ_API_KEY', 'stub'),
+        'GROQ_MAX_CONEXIONES': '200',
+        'CHATBOT_CACHE_UMBRAL': '1.01',
+        'SINGLE_FLIGHT_ACTIVO': 'False',
+    }
+    for modo in args.modos:
+        proceso, url = iniciar_gunicorn(modo, args.workers, entorno, ruta_prueba='/api/ia/stats/')
+        try:
+            print(f"  ▶ {modo}")
+            for ronda, concurrencia in enumerate(args.concurrencia):
+                duracion, tiempos, errores = asyncio.run(rafaga(url, concurrencia, f'{modo}{ronda}'))
+                tiempos.sort()
+                p95 = tiempos[max(int(len(tiempos) * 0.95) - 1, 0)]
+                print(
+                    f"    {concurrencia:>4} simultáneos | {concurrencia / duracion:7.1f} req/s | "
+                    f"p50 {statistics.median(tiempos):8.1f} ms | p95 {p95:8.1f} ms | errores {errores}"
+                )
+            print(f"    memoria (master + workers): {rss_kb(proceso.pid) / 1024:.1f} MB")
+        finally:
+            detener(proceso)
+
+    print(f"📊 Servidor falso: {dict(servidor.estado.contadores)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+Prueba de caos de los endpoints de IA contra el servidor falso de Groq (sin gastar cuota)
+Ejecutar: python benchmarks/bench_caos_ia.py [--llamadas 30] [--latencia-ms 300]
+
+Levanta benchmarks/stub_groq.py en un hilo y recorre escenarios en orden, cambiando la
+inyección de errores del servidor falso entre uno y otro:
+- normal:        latencia lognormal, sin errores
+- rate_limit:    30% de respuestas 429
+- caida:         100% de respuestas 503 (el circuit breaker debe abrirse)
+- colgado:       Groq no responde; la llamada de prueba del circuito se corta por el plazo
+                 del endpoint (IA_DEADLINE_*) y el resto responde al instante con el respaldo
+- recuperacion:  sin errores (el circuito prueba y vuelve a cerrarse)
+
+Para cada escenario muestra latencias de /api/ia/chat/ y /api/ia/productos/recomendar/,
+cuántas respuestas fueron de respaldo y el estado del circuito. Usa la BD configurada en
+DATABASE_URL (necesita al menos un cliente y productos con stock).
+GROQ_CIRCUITO_ESPERA se acorta a 5s (si no está definido) para ver la recuperación.
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import stub_groq  # noqa: E402
+
+# (nombre, opciones del servidor falso, esperar a que el circuito pase a semiabierto)
+ESCENARIOS = [
+    ('normal', {}, False),
+    ('rate_limit', {'error_429': 0.3, 'retry_after': 0.2}, False),
+    ('caida', {'error_503': 1.0}, False),
+    ('colgado', {'colgar': 1.0, 'colgar_s': 60}, True),
+    ('recuperacion', {}, True),
+]
+
+SIN_ERRORES = {'error_429': 0.0, 'error_500': 0.0, 'error_503': 0.0, 'colgar': 0.0, 'cortar': 0.0, 'json_invalido': 0.0}
+
+
+def resumen(nombre, tiempos, resultados):
+    tiempos = sorted(tiempos)
+    p95 = tiempos[max(int(len(tiempos) * 0.95) - 1, 0)]
+    estados = ', '.join(f"{clave}: {total}" for clave, total in sorted(resultados.items()))
+    print(
+        f"    {nombre:<14} p50 {statistics.median(tiempos):8.1f} ms | p95 {p95:8.1f} ms | "
+        f"max {tiempos[-1]:8.1f} ms | {estados}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--llamadas', type=int, default=30, help='Llamadas por endpoint y escenario')
+    parser.add_argument('--latencia-ms', type=float, default=300, help='Latencia mediana del servidor falso')
+    parser.add_argument('--semilla', type=int, default=42)
+    args = parser.parse_args()
+
+    servidor, url, _ = stub_groq.iniciar(
+        puerto=0, latencia_ms=args.latencia_ms, en_hilo=True, semilla=args.semilla,
+        distribucion='lognormal', sigma=0.5
+    )
+    os.environ['GROQ_BASE_URL'] = url
+    os.environ.setdefault('GROQ_API_KEY', 'stub')
+    os.environ.setdefault('GROQ_CIRCUITO_ESPERA', '5')
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ventasbasico.settings')
+
+    import django
+    django.setup()
+    for nombre in ('httpx', 'ventasbasico', 'django'):
+        logging.getLogger(nombre).setLevel(logging.CRITICAL)
+
+    from django.conf import settings
+    from django.test import Client
+    from clientes.models import Cliente
+    from ventasbasico.cache_chatbot import obtener_cache_chatbot
+    from ventasbasico.circuito import obtener_circuito_groq
+
+    settings.ALLOWED_HOSTS.append('testserver')
+    rut = Cliente.objects.values_list('rut', flat=True).first()
+    if not rut:
+        print("❌ No hay clientes en la BD")
+        return
+    cliente = Client()
+    circuito = obtener_circuito_groq()
+
+    def llamar(ruta, cuerpo):
+        inicio = time.perf_counter()
+        respuesta = cliente.post(ruta, cuerpo, content_type='application/json')
+        duracion = (time.perf_counter() - inicio) * 1000
+        datos = respuesta.json()
+        if respuesta.status_code != 200:
+            return duracion, f"http_{respuesta.status_code}"
+        return duracion, 'respaldo' if datos.get('respaldo') else 'ia'
+
+    print(f"🌪️  {args.llamadas} llamadas por endpoint y escenario contra {url}")
+    for escenario, opciones, esperar in ESCENARIOS:
+        servidor.estado.actualizar({**SIN_ERRORES, **opciones})
+        if esperar and circuito.metricas()['estado'] != 'cerrado':
+            time.sleep(circuito.espera)
+        print(f"  ▶ {escenario}")
+        for nombre, ruta, cuerpo in (
+            ('chat', '/api/ia/chat/', lambda i: {'mensaje': f'¿Qué productos me sirven para un regalo {i}?'}),
+            ('recomendar', '/api/ia/productos/recomendar/', lambda i: {'rut_cliente': rut}),
+        ):
+            tiempos, resultados = [], Counter()
+            for i in range(args.llamadas):
+                obtener_cache_chatbot().limpiar()  # cada pregunta debe llegar a Groq
+                duracion, resultado = llamar(ruta, cuerpo(i))
+                tiempos.append(duracion)
+                resultados[resultado] += 1
+            resumen(nombre, tiempos, resultados)
+        metricas = circuito.metricas()
+        print(f"    circuito: {metricas['estado']} (aperturas: {metricas['aperturas']}, rechazadas: {metricas['rechazadas']})")
+
+    print(f"📊 Servidor falso: {dict(servidor.estado.contadores)}")
+
+
+if __name__ == '__main__':
+    main()
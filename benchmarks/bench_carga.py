@@ -0,0 +1,356 @@
+"""
+Pruebas de carga de los flujos principales contra un servidor local con datos sembrados
+Ejecutar: python benchmarks/bench_carga.py [--operaciones 200] [--concurrencia 8] [--servidor asgi]
+                                           [--escenarios catalogo checkout_api] [--comparar base.json]
+
+- Crea una BD SQLite nueva en el directorio temporal (o usa --bd postgresql://..., que solo se
+  siembra si está vacía), aplica las migraciones y siembra datos reproducibles (--semilla) con
+  python manage.py generar_datos
+- Levanta gunicorn con esa BD y recorre los escenarios uno por uno, con --concurrencia
+  clientes en paralelo:
+    catalogo          GET / (página con todos los productos)
+    catalogo_api      GET /api/productos/?page=N
+    producto_detalle  GET /api/productos/{codigo}/ (con la foto en base64)
+    checkout_sesion   flujo web completo: GET /, 2 productos al carrito y POST /venta/
+    checkout_api      POST /api/venta/
+    historial         GET /historial/
+    historial_api     GET /api/venta/ (JWT)
+    exportar_csv      exportación CSV de ventas del admin (sesión staff)
+- Por escenario informa throughput (operaciones/s), latencia p50/p95/p99/max, errores y, desde el
+  header Server-Timing, tiempo en BD y consultas SQL por operación
+- El resultado se guarda como JSON (por defecto benchmarks/resultados/carga-<commit>.json);
+  --comparar otro.json muestra la diferencia contra una corrida anterior
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import httpx
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from servidor_local import detener, iniciar_gunicorn  # noqa: E402
+
+USUARIO = 'bench_carga'
+CLAVE = 'bench_carga'
+PAGINA_API = 12  # REST_FRAMEWORK['PAGE_SIZE']
+
+SERVER_TIMING_DB = re.compile(r'db;dur=([\d.]+);desc="(\d+) consultas')
+
+ESCENARIOS = {}
+
+
+def escenario(nombre, preparar=None):
+    """Registra una operación del escenario: async (sesion, i) -> True si salió bien"""
+    def registrar(funcion):
+        ESCENARIOS[nombre] = (funcion, preparar)
+        return funcion
+    return registrar
+
+
+# ============================================
+# DATOS
+# ============================================
+
+def preparar_bd(args):
+    """Migra y siembra la BD; devuelve los datos que usan los escenarios"""
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+    from django.contrib.auth.models import User
+    from django.db import connections
+    from clientes.models import Cliente
+    from ventasbasico.models import Productos
+
+    call_command('migrate', verbosity=0)
+    if Productos.objects.exists():
+        print("📦 La BD ya tiene productos: se usan los datos existentes")
+    else:
+        print("🌱 Sembrando la BD (manage.py generar_datos)...")
+        # Stock alto para que los checkouts no fallen por falta de stock durante la prueba
+        call_command(
+            'generar_datos', semilla=args.semilla, productos=args.productos, clientes=args.clientes,
+            ventas=args.ventas, imagenes=True, stock=1_000_000
+        )
+
+    usuario, _ = User.objects.get_or_create(username=USUARIO, defaults={'is_staff': True, 'is_superuser': True})
+    usuario.set_password(CLAVE)
+    usuario.save()
+
+    datos = {
+        'productos': list(Productos.objects.filter(stock__gt=100).order_by('id').values_list('id', 'codigo')),
+        'ruts': list(Cliente.objects.order_by('rut').values_list('rut', flat=True)[:1000]),
+        'total_productos': Productos.objects.count(),
+    }
+    connections.close_all()
+    if not datos['productos'] or not datos['ruts']:
+        raise SystemExit("❌ La BD no tiene productos con stock o clientes")
+    return datos
+
+
+# ============================================
+# SESIONES Y ESCENARIOS
+# ============================================
+
+class Sesion:
+    """Un cliente HTTP con cookies propias; acumula el tiempo de BD informado por Server-Timing"""
+
+    def __init__(self, url, datos, numero):
+        self.datos = datos
+        self.numero = numero
+        self.db_ms = 0.0
+        self.consultas = 0
+        self.cliente = httpx.AsyncClient(
+            base_url=url, timeout=120, follow_redirects=False, event_hooks={'response': [self._medir]}
+        )
+
+    async def _medir(self, respuesta):
+        coincidencia = SERVER_TIMING_DB.search(respuesta.headers.get('server-timing', ''))
+        if coincidencia:
+            self.db_ms += float(coincidencia.group(1))
+            self.consultas += int(coincidencia.group(2))
+
+    async def enviar_formulario(self, ruta, campos):
+        token = self.cliente.cookies.get('csrftoken', '')
+        return await self.cliente.post(ruta, data={**campos, 'csrfmiddlewaretoken': token}, headers={'X-CSRFToken': token})
+
+    def producto(self, i, salto=0):
+        productos = self.datos['productos']
+        return productos[(i * 7 + salto) % len(productos)]
+
+    def rut(self, i):
+        return self.datos['ruts'][i % len(self.datos['ruts'])]
+
+
+async def iniciar_sesion_admin(sesion):
+    await sesion.cliente.get('/admin/login/')
+    respuesta = await sesion.enviar_formulario('/admin/login/?next=/admin/', {'username': USUARIO, 'password': CLAVE})
+    if respuesta.status_code != 302:
+        raise RuntimeError(f"No se pudo iniciar sesión en el admin (HTTP {respuesta.status_code})")
+
+
+@escenario('catalogo')
+async def catalogo(sesion, i):
+    return (await sesion.cliente.get('/')).status_code == 200
+
+
+@escenario('catalogo_api')
+async def catalogo_api(sesion, i):
+    paginas = max(1, math.ceil(sesion.datos['total_productos'] / PAGINA_API))
+    return (await sesion.cliente.get(f'/api/productos/?page={i % paginas + 1}')).status_code == 200
+
+
+@escenario('producto_detalle')
+async def producto_detalle(sesion, i):
+    _, codigo = sesion.producto(i)
+    respuesta = await sesion.cliente.get(f'/api/productos/{codigo}/')
+    return respuesta.status_code == 200 and bool(respuesta.json().get('foto_url'))
+
+
+@escenario('checkout_sesion')
+async def checkout_sesion(sesion, i):
+    sesion.cliente.cookies.clear()
+    if (await sesion.cliente.get('/')).status_code != 200:
+        return False
+    for salto in (0, 1):
+        producto_id, _ = sesion.producto(i, salto)
+        respuesta = await sesion.enviar_formulario('/agregar-carrito/', {'producto_id': producto_id, 'cantidad': 1})
+        if respuesta.status_code != 302:
+            return False
+    respuesta = await sesion.enviar_formulario('/venta/', {'rut_cliente': sesion.rut(i), 'es_cliente_habitual': 'on'})
+    # La venta exitosa redirige al home; con error se vuelve a mostrar el formulario
+    return respuesta.status_code == 302
+
+
+@escenario('checkout_api')
+async def checkout_api(sesion, i):
+    producto_id, _ = sesion.producto(i)
+    respuesta = await sesion.cliente.post('/api/venta/', json={
+        'numero': f"CARGA-{sesion.datos['corrida']}-{sesion.numero}-{i}",
+        'rut_cliente': sesion.rut(i),
+        'detalles': [{'producto_id': producto_id, 'cantidad': 1, 'precio_unitario': 1000}]
+    })
+    return respuesta.status_code == 201
+
+
+@escenario('historial')
+async def historial(sesion, i):
+    return (await sesion.cliente.get('/historial/')).status_code == 200
+
+
+@escenario('historial_api')
+async def historial_api(sesion, i):
+    respuesta = await sesion.cliente.get(
+        f'/api/venta/?page={i % 5 + 1}', headers={'Authorization': f"Bearer {sesion.datos['token']}"}
+    )
+    return respuesta.status_code == 200
+
+
+@escenario('exportar_csv', preparar=iniciar_sesion_admin)
+async def exportar_csv(sesion, i):
+    respuesta = await sesion.cliente.get('/admin/ventasbasico/venta/exportar-ventas-csv/')
+    return respuesta.status_code == 200 and respuesta.headers.get('content-type', '').startswith('text/csv')
+
+
+# ============================================
+# EJECUCIÓN
+# ============================================
+
+def percentil(valores, q):
+    ordenados = sorted(valores)
+    return round(ordenados[max(math.ceil(q * len(ordenados)) - 1, 0)], 1)
+
+
+async def correr_escenario(url, nombre, datos, args):
+    funcion, preparar = ESCENARIOS[nombre]
+    sesiones = [Sesion(url, datos, numero) for numero in range(args.concurrencia)]
+    try:
+        if preparar:
+            await asyncio.gather(*(preparar(sesion) for sesion in sesiones))
+
+        resultados = []
+        pendientes = iter(range(-args.calentamiento, args.operaciones))
+
+        async def trabajador(sesion):
+            for i in pendientes:
+                sesion.db_ms, sesion.consultas = 0.0, 0
+                inicio = time.perf_counter()
+                try:
+                    ok = await funcion(sesion, i)
+                except (httpx.HTTPError, ValueError):
+                    ok = False
+                if i >= 0:  # las primeras operaciones (negativas) son de calentamiento
+                    resultados.append(((time.perf_counter() - inicio) * 1000, ok, sesion.db_ms, sesion.consultas))
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(trabajador(sesion) for sesion in sesiones))
+        duracion = time.perf_counter() - inicio
+    finally:
+        await asyncio.gather(*(sesion.cliente.aclose() for sesion in sesiones))
+
+    latencias = [r[0] for r in resultados]
+    n = len(resultados)
+    return {
+        'operaciones': n,
+        'errores': sum(1 for r in resultados if not r[1]),
+        'duracion_s': round(duracion, 2),
+        'throughput_ops': round(n / duracion, 1),
+        'p50_ms': percentil(latencias, 0.50),
+        'p95_ms': percentil(latencias, 0.95),
+        'p99_ms': percentil(latencias, 0.99),
+        'max_ms': round(max(latencias), 1),
+        'db_media_ms': round(sum(r[2] for r in resultados) / n, 1),
+        'consultas_media': round(sum(r[3] for r in resultados) / n, 1),
+    }
+
+
+def commit_actual():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        cambios = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=RAIZ, capture_output=True, text=True).stdout
+        return f"{commit}-modificado" if cambios.strip() else commit
+    except (OSError, subprocess.CalledProcessError):
+        return 'desconocido'
+
+
+def comparar(resultado, ruta_base):
+    with open(ruta_base, encoding='utf-8') as f:
+        base = json.load(f)
+    print(f"\n🔍 Comparación contra {base.get('commit')} ({ruta_base})")
+    for nombre, actual in resultado['escenarios'].items():
+        anterior = base.get('escenarios', {}).get(nombre)
+        if not anterior:
+            continue
+        cambios = []
+        for campo in ('throughput_ops', 'p50_ms', 'p95_ms', 'p99_ms', 'consultas_media'):
+            if anterior.get(campo):
+                cambios.append(f"{campo} {(actual[campo] - anterior[campo]) / anterior[campo] * 100:+.0f}%")
+        print(f"    {nombre:<17} {' | '.join(cambios)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--operaciones', type=int, default=200, help='Operaciones medidas por escenario')
+    parser.add_argument('--calentamiento', type=int, default=10, help='Operaciones previas sin medir')
+    parser.add_argument('--concurrencia', type=int, default=8, help='Clientes en paralelo')
+    parser.add_argument('--servidor', choices=['asgi', 'wsgi'], default='asgi')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--escenarios', nargs='+', choices=list(ESCENARIOS), default=list(ESCENARIOS))
+    parser.add_argument('--bd', help='DATABASE_URL a usar (por defecto una SQLite nueva en el directorio temporal)')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--productos', type=int, default=200)
+    parser.add_argument('--clientes', type=int, default=500)
+    parser.add_argument('--ventas', type=int, default=2000)
+    parser.add_argument('--salida', help='Archivo JSON del resultado (por defecto benchmarks/resultados/carga-<commit>.json)')
+    parser.add_argument('--comparar', help='JSON de una corrida anterior para comparar')
+    args = parser.parse_args()
+
+    if args.bd:
+        bd = args.bd
+    else:
+        ruta = os.path.join(tempfile.gettempdir(), 'bench_carga.sqlite3')
+        if os.path.exists(ruta):
+            os.remove(ruta)
+        bd = f'sqlite:///{ruta}'
+    os.environ['DATABASE_URL'] = bd
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ventasbasico.settings')
+
+    datos = preparar_bd(args)
+    datos['corrida'] = datetime.now().strftime('%H%M%S')
+    proceso, url = iniciar_gunicorn(args.servidor, args.workers, {'DATABASE_URL': bd})
+    try:
+        datos['token'] = httpx.post(f'{url}/api/token/', json={'username': USUARIO, 'password': CLAVE}).json()['access']
+        print(
+            f"🏋️  {args.operaciones} operaciones por escenario, {args.concurrencia} en paralelo, "
+            f"{args.servidor} con {args.workers} workers"
+        )
+        escenarios = {}
+        for nombre in args.escenarios:
+            metricas = asyncio.run(correr_escenario(url, nombre, datos, args))
+            escenarios[nombre] = metricas
+            print(
+                f"    {nombre:<17} {metricas['throughput_ops']:7.1f} op/s | p50 {metricas['p50_ms']:8.1f} ms | "
+                f"p95 {metricas['p95_ms']:8.1f} ms | p99 {metricas['p99_ms']:8.1f} ms | "
+                f"{metricas['consultas_media']:6.1f} consultas | errores {metricas['errores']}"
+            )
+    finally:
+        detener(proceso)
+
+    commit = commit_actual()
+    resultado = {
+        'commit': commit,
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'configuracion': {
+            'servidor': args.servidor, 'workers': args.workers, 'concurrencia': args.concurrencia,
+            'operaciones': args.operaciones, 'semilla': args.semilla, 'bd': bd.split(':', 1)[0],
+            'productos': args.productos, 'clientes': args.clientes, 'ventas': args.ventas,
+        },
+        'escenarios': escenarios,
+    }
+    salida = args.salida or os.path.join(RAIZ, 'benchmarks', 'resultados', f'carga-{commit}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    with open(salida, 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False)
+    print(f"💾 Resultado en {salida}")
+
+    if args.comparar:
+        comparar(resultado, args.comparar)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark: cliente Groq nuevo por request vs. cliente compartido con pool keep-alive
+Ejecutar: python benchmarks/bench_pool_groq.py [--llamadas 200] [--latencia-ms 20] [--tls]
+
+Levanta el servidor stub (benchmarks/stub_groq.py) en un hilo y mide la latencia de
+chatbot_atencion en tres modos:
+- nuevo:    GroqService() en cada llamada (comportamiento anterior de las vistas)
+- pool:     obtener_groq_service() (un cliente por proceso, conexiones reutilizadas)
+- async:    achatbot_atencion con el cliente AsyncGroq del event loop
+Con --tls la diferencia incluye el handshake TLS que el pool evita.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import stub_groq  # noqa: E402
+
+
+def resumen(nombre, tiempos):
+    tiempos = sorted(tiempos)
+    p95 = tiempos[int(len(tiempos) * 0.95) - 1]
+    print(
+        f"  {nombre:<8} p50 {statistics.median(tiempos):7.2f} ms | p95 {p95:7.2f} ms | "
+        f"media {statistics.mean(tiempos):7.2f} ms"
+    )
+
+
+def medir(funcion, llamadas):
+    tiempos = []
+    for _ in range(llamadas):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return tiempos
+
+
+async def medir_async(servicio, llamadas):
+    tiempos = []
+    for _ in range(llamadas):
+        inicio = time.perf_counter()
+        await servicio.achatbot_atencion('¿Cuál es el horario?')
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return tiempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--llamadas', type=int, default=200)
+    parser.add_argument('--latencia-ms', type=float, default=20)
+    parser.add_argument('--tls', action='store_true')
+    args = parser.parse_args()
+
+    _, url, cert = stub_groq.iniciar(puerto=0, latencia_ms=args.latencia_ms, tls=args.tls, en_hilo=True)
+    if cert:
+        os.environ['SSL_CERT_FILE'] = cert
+    os.environ['GROQ_BASE_URL'] = url
+    os.environ.setdefault('GROQ_API_KEY', 'stub')
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ventasbasico.settings')
+
+    import django
+    django.setup()
+    for nombre in ('httpx', 'ventasbasico'):
+        logging.getLogger(nombre).setLevel(logging.WARNING)
+    from ventasbasico.groq_service import GroqService, obtener_groq_service
+
+    print(f"📊 {args.llamadas} llamadas contra {url} (latencia del stub {args.latencia_ms:.0f} ms)")
+    resumen('nuevo', medir(lambda: GroqService().chatbot_atencion('¿Cuál es el horario?'), args.llamadas))
+    resumen('pool', medir(lambda: obtener_groq_service().chatbot_atencion('¿Cuál es el horario?'), args.llamadas))
+    resumen('async', asyncio.run(medir_async(obtener_groq_service(), args.llamadas)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Gunicorn local para los benchmarks (bench_asgi_chat.py, bench_carga.py)
+Levanta el proyecto en un puerto libre con la configuración indicada y espera a que responda.
+"""
+import os
+import socket
+import subprocess
+import time
+
+import httpx
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+APLICACIONES = {
+    'wsgi': ['ventasbasico.wsgi:application'],
+    'asgi': ['ventasbasico.asgi:application', '--worker-class', 'uvicorn_worker.UvicornWorker'],
+}
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def rss_kb(pid):
+    """RSS del proceso y sus hijos (gunicorn master + workers), en KB"""
+    total = 0
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for linea in f:
+                if linea.startswith('VmRSS:'):
+                    total += int(linea.split()[1])
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            hijos = f.read().split()
+    except OSError:
+        return total
+    return total + sum(rss_kb(int(hijo)) for hijo in hijos)
+
+
+def iniciar_gunicorn(modo, workers, entorno=None, ruta_prueba='/api/productos/', espera=30):
+    """
+    Inicia gunicorn en modo 'wsgi' o 'asgi' y espera a que ruta_prueba responda
+
+    Args:
+        modo: Clave de APLICACIONES
+        workers: Cantidad de workers
+        entorno: Variables de entorno adicionales (GROQ_BASE_URL, DATABASE_URL, ...)
+
+    Returns:
+        tuple: (proceso, url_base)
+    """
+    puerto = puerto_libre()
+    proceso = subprocess.Popen(
+        ['gunicorn', *APLICACIONES[modo], '--bind', f'127.0.0.1:{puerto}', '--workers', str(workers),
+         '--timeout', '300', '--log-level', 'warning'],
+        cwd=RAIZ, env={**os.environ, **(entorno or {})},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f'http://127.0.0.1:{puerto}'
+    limite = time.monotonic() + espera
+    while time.monotonic() < limite:
+        if proceso.poll() is not None:
+            raise RuntimeError(f"gunicorn ({modo}) terminó al iniciar (código {proceso.returncode})")
+        try:
+            httpx.get(f'{url}{ruta_prueba}', timeout=2)
+            return proceso, url
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proceso.kill()
+    raise RuntimeError(f"gunicorn ({modo}) no respondió en {espera}s")
+
+
+def detener(proceso):
+    proceso.terminate()
+    try:
+        proceso.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        proceso.kill()
@@ -0,0 +1,426 @@
+"""
+Servidor falso compatible con la API de chat de Groq/OpenAI (benchmarks y pruebas de caos)
+Ejecutar: python benchmarks/stub_groq.py [--puerto 8800] [--latencia-ms 300] [opciones]
+Apuntar la app con GROQ_BASE_URL=http://127.0.0.1:8800 (GROQ_API_KEY puede ser cualquier valor)
+
+Responde a POST .../chat/completions sin gastar cuota de Groq:
+- Respuestas con el esquema JSON de cada prompt de GroqService: recomendaciones (elige
+  productos de la tabla de candidatos del prompt), descripción de producto y chatbot.
+  El chatbot en streaming recibe texto plano.
+- Latencia hasta el primer token según una distribución (--distribucion fija, uniforme,
+  normal o lognormal) más el tiempo de generación (--tokens-por-segundo)
+- "stream": true con server-sent events token a token y el uso en x_groq.usage (como Groq)
+- Inyección de errores por probabilidad: 429 con retry-after, 500, 503, requests colgados,
+  JSON inválido y conexiones cortadas a mitad de la respuesta
+- GET /_stats devuelve los contadores por resultado y POST /_config cambia las opciones
+  en caliente (ej: {"error_503": 0.5} para simular una caída durante una prueba de carga)
+
+Ejemplos:
+  python benchmarks/stub_groq.py --distribucion lognormal --latencia-ms 400 --sigma 0.8
+  python benchmarks/stub_groq.py --error-429 0.1 --error-503 0.05 --colgar 0.02
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import random
+import re
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DISTRIBUCIONES = ('fija', 'uniforme', 'normal', 'lognormal')
+
+# Opciones que se pueden cambiar con POST /_config (probabilidades entre 0 y 1)
+OPCIONES = {
+    'latencia_ms': 20.0,         # latencia hasta el primer token (mediana)
+    'distribucion': 'fija',
+    'jitter_ms': 0.0,            # dispersión de uniforme (±) y normal (desviación estándar)
+    'sigma': 0.6,                # dispersión de lognormal (p99 ≈ mediana * e^(2.33 * sigma))
+    'tokens_por_segundo': 0.0,   # velocidad de generación (0 = instantánea)
+    'error_429': 0.0,
+    'error_500': 0.0,
+    'error_503': 0.0,
+    'colgar': 0.0,               # no responde durante colgar_s segundos (provoca timeouts)
+    'colgar_s': 120.0,
+    'json_invalido': 0.0,        # el modelo responde texto que no es JSON
+    'cortar': 0.0,               # cierra la conexión a mitad de la respuesta
+    'retry_after': 1.0,          # header retry-after de los 429 (segundos)
+}
+
+
+class Estado:
+    """Opciones vigentes, generador aleatorio y contadores del servidor"""
+
+    def __init__(self, semilla=None, **opciones):
+        self.opciones = dict(OPCIONES)
+        self.random = random.Random(semilla)
+        self.contadores = Counter()
+        self.lock = threading.Lock()
+        self.actualizar(opciones)
+
+    def actualizar(self, cambios):
+        with self.lock:
+            desconocidas = set(cambios) - set(OPCIONES)
+            if desconocidas:
+                raise ValueError(f"Opciones desconocidas: {', '.join(sorted(desconocidas))}")
+            if cambios.get('distribucion', 'fija') not in DISTRIBUCIONES:
+                raise ValueError(f"distribucion debe ser una de: {', '.join(DISTRIBUCIONES)}")
+            self.opciones.update(cambios)
+
+    def contar(self, clave):
+        with self.lock:
+            self.contadores[clave] += 1
+
+    def latencia(self):
+        """Segundos hasta el primer token según la distribución configurada"""
+        op = self.opciones
+        media = op['latencia_ms']
+        with self.lock:
+            if op['distribucion'] == 'uniforme':
+                valor = self.random.uniform(media - op['jitter_ms'], media + op['jitter_ms'])
+            elif op['distribucion'] == 'normal':
+                valor = self.random.gauss(media, op['jitter_ms'])
+            elif op['distribucion'] == 'lognormal':
+                valor = media * math.exp(self.random.gauss(0, op['sigma']))
+            else:
+                valor = media
+        return max(valor, 0) / 1000
+
+    def sortear_falla(self):
+        """Devuelve la falla a inyectar en este request (o None)"""
+        with self.lock:
+            dado = self.random.random()
+        acumulado = 0.0
+        for falla in ('error_429', 'error_500', 'error_503', 'colgar', 'cortar', 'json_invalido'):
+            acumulado += self.opciones[falla]
+            if dado < acumulado:
+                return falla
+        return None
+
+
+# ============================================
+# RESPUESTAS SEGÚN EL PROMPT
+# ============================================
+
+def contar_tokens(texto):
+    return max(1, math.ceil(len(texto) / 4))
+
+
+def tipo_prompt(messages):
+    """Identifica qué método de GroqService hizo la llamada (por el mensaje de sistema)"""
+    sistema = ' '.join(m.get('content', '') for m in messages if m.get('role') == 'system').lower()
+    if 'recomienda productos' in sistema:
+        return 'recomendacion'
+    if 'descripciones' in sistema:
+        return 'descripcion'
+    if 'texto plano' in sistema:
+        return 'chatbot_texto'
+    if 'atención al cliente' in sistema:
+        return 'chatbot'
+    return 'otro'
+
+
+def _candidatos(prompt):
+    """Filas de la tabla CSV de candidatos del prompt del recomendador"""
+    lineas = prompt.splitlines()
+    for i, linea in enumerate(lineas):
+        if linea.startswith('PRODUCTOS CANDIDATOS'):
+            tabla = []
+            for fila in lineas[i + 1:]:
+                if not fila.strip():
+                    break
+                tabla.append(fila)
+            return list(csv.DictReader(tabla))
+    return []
+
+
+def contenido_respuesta(messages):
+    """Texto que "genera" el modelo, con el formato que espera cada método de GroqService"""
+    prompt = ' '.join(m.get('content', '') for m in messages if m.get('role') == 'user')
+    tipo = tipo_prompt(messages)
+
+    if tipo == 'recomendacion':
+        limite = re.search(r'recomienda (\d+) productos', prompt)
+        limite = int(limite.group(1)) if limite else 3
+        confianzas = ('alta', 'media', 'baja')
+        return json.dumps({
+            'recomendaciones': [
+                {
+                    'producto_id': int(p['id']),
+                    'nombre': p['nombre'],
+                    'razon': f"Complementa tus compras anteriores ({p['nombre']})",
+                    'confianza': confianzas[min(i, 2)]
+                }
+                for i, p in enumerate(_candidatos(prompt)[:limite])
+            ],
+            'mensaje': 'Estos productos podrían interesarte según tus compras anteriores'
+        }, ensure_ascii=False)
+
+    if tipo == 'descripcion':
+        nombre = re.search(r'NOMBRE DEL PRODUCTO: (.+)', prompt)
+        nombre = nombre.group(1).strip() if nombre else 'Producto'
+        return json.dumps({
+            'descripcion_corta': f"{nombre}: calidad y buen precio en un solo producto.",
+            'descripcion_larga': (
+                f"{nombre} es ideal para el uso diario. Fabricado con materiales de calidad, "
+                f"ofrece durabilidad y una excelente relación precio-calidad."
+            ),
+            'palabras_clave': [nombre.lower(), 'calidad', 'oferta', 'envio rapido', 'garantia'],
+            'beneficios': ['Alta durabilidad', 'Excelente relación precio-calidad', 'Despacho en 24-48 horas']
+        }, ensure_ascii=False)
+
+    if tipo == 'chatbot':
+        return json.dumps({
+            'respuesta': (
+                'Nuestro horario de atención es de lunes a viernes de 9:00 a 18:00 y los sábados '
+                'de 10:00 a 14:00. Aceptamos Webpay, transferencia y efectivo.'
+            ),
+            'tipo': 'informacion',
+            'requiere_humano': False,
+            'sugerencias': ['¿Cuánto demora el despacho?', '¿Cómo puedo devolver un producto?']
+        }, ensure_ascii=False)
+
+    if tipo == 'chatbot_texto':
+        return (
+            'Hola, gracias por escribirnos. Nuestro horario de atención es de lunes a viernes de '
+            '9:00 a 18:00 y los sábados de 10:00 a 14:00. El despacho demora 24-48 horas en Santiago.'
+        )
+
+    return 'Respuesta del servidor falso de Groq.'
+
+
+def trozos(texto):
+    """Divide el texto en "tokens" para el streaming (palabras con su espacio)"""
+    return re.findall(r'\S+\s*', texto) or [texto]
+
+
+# ============================================
+# SERVIDOR HTTP
+# ============================================
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Mantiene la conexión abierta entre requests
+    disable_nagle_algorithm = True  # Headers y body van en writes separados (evita esperar el ACK)
+    estado = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == '/_stats':
+            with self.estado.lock:
+                self._enviar_json(200, {'contadores': dict(self.estado.contadores), 'opciones': self.estado.opciones})
+        elif self.path.endswith('/models'):
+            self._enviar_json(200, {'object': 'list', 'data': [{'id': 'llama-3.3-70b-versatile', 'object': 'model'}]})
+        else:
+            self._enviar_json(404, {'error': {'message': f'Ruta no encontrada: {self.path}'}})
+
+    def do_POST(self):
+        largo = int(self.headers.get('Content-Length', 0))
+        try:
+            datos = json.loads(self.rfile.read(largo) or b'{}')
+        except json.JSONDecodeError:
+            self._enviar_json(400, {'error': {'message': 'JSON inválido', 'type': 'invalid_request_error'}})
+            return
+
+        if self.path == '/_config':
+            try:
+                self.estado.actualizar(datos)
+            except ValueError as e:
+                self._enviar_json(400, {'error': {'message': str(e)}})
+                return
+            self._enviar_json(200, {'opciones': self.estado.opciones})
+            return
+        if not self.path.endswith('/chat/completions'):
+            self._enviar_json(404, {'error': {'message': f'Ruta no encontrada: {self.path}'}})
+            return
+
+        falla = self.estado.sortear_falla()
+        self.estado.contar(falla or 'ok')
+        if falla == 'colgar':
+            time.sleep(self.estado.opciones['colgar_s'])
+            self.close_connection = True
+            return
+
+        time.sleep(self.estado.latencia())
+        if falla == 'error_429':
+            self._enviar_json(429, {'error': {
+                'message': 'Rate limit reached for model (servidor falso)',
+                'type': 'tokens',
+                'code': 'rate_limit_exceeded'
+            }}, {'retry-after': str(self.estado.opciones['retry_after'])})
+            return
+        if falla in ('error_500', 'error_503'):
+            codigo = int(falla[-3:])
+            self._enviar_json(codigo, {'error': {'message': f'Error {codigo} simulado', 'type': 'internal_server_error'}})
+            return
+
+        messages = datos.get('messages', [])
+        if falla == 'json_invalido':
+            contenido = 'Lo siento, no puedo responder en ese formato ahora mismo.'
+        else:
+            contenido = contenido_respuesta(messages)
+        uso = {
+            'prompt_tokens': sum(contar_tokens(m.get('content', '')) for m in messages),
+            'completion_tokens': contar_tokens(contenido),
+        }
+        uso['total_tokens'] = uso['prompt_tokens'] + uso['completion_tokens']
+
+        if datos.get('stream'):
+            self._enviar_stream(datos, contenido, uso, cortar=falla == 'cortar')
+            return
+
+        tps = self.estado.opciones['tokens_por_segundo']
+        if tps:
+            time.sleep(uso['completion_tokens'] / tps)
+        if falla == 'cortar':
+            # Headers y la mitad del body: el cliente recibe una respuesta incompleta
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', '4096')
+            self.end_headers()
+            self.wfile.write(b'{"id": "chatcmpl-stub", "choices": [')
+            self.close_connection = True
+            return
+        self._enviar_json(200, {
+            'id': 'chatcmpl-stub',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': datos.get('model', 'stub'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': contenido},
+                'finish_reason': 'stop'
+            }],
+            'usage': uso
+        })
+
+    def _enviar_json(self, estado, cuerpo, headers=None):
+        contenido = json.dumps(cuerpo, ensure_ascii=False).encode('utf-8')
+        self.send_response(estado)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(contenido)))
+        for nombre, valor in (headers or {}).items():
+            self.send_header(nombre, valor)
+        self.end_headers()
+        self.wfile.write(contenido)
+
+    def _chunk(self, datos, delta, finish_reason=None, uso=None):
+        chunk = {
+            'id': 'chatcmpl-stub',
+            'object': 'chat.completion.chunk',
+            'created': int(time.time()),
+            'model': datos.get('model', 'stub'),
+            'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}]
+        }
+        if uso:
+            chunk['x_groq'] = {'id': 'req-stub', 'usage': uso}
+        self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8'))
+        self.wfile.flush()
+
+    def _enviar_stream(self, datos, contenido, uso, cortar=False):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        partes = trozos(contenido)
+        tps = self.estado.opciones['tokens_por_segundo']
+        pausa = (uso['completion_tokens'] / tps / len(partes)) if tps else 0
+        self._chunk(datos, {'role': 'assistant', 'content': ''})
+        for i, parte in enumerate(partes):
+            if cortar and i == len(partes) // 2:
+                return
+            self._chunk(datos, {'content': parte})
+            if pausa:
+                time.sleep(pausa)
+        self._chunk(datos, {}, finish_reason='stop', uso=uso)
+        self.wfile.write(b"data: [DONE]\n\n")
+
+
+def generar_certificado():
+    """Certificado autofirmado para 127.0.0.1 (requiere el comando openssl)"""
+    directorio = tempfile.mkdtemp(prefix='stub_groq_')
+    cert, clave = os.path.join(directorio, 'cert.pem'), os.path.join(directorio, 'key.pem')
+    subprocess.run([
+        'openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+        '-keyout', clave, '-out', cert, '-subj', '/CN=127.0.0.1',
+        '-addext', 'subjectAltName=IP:127.0.0.1'
+    ], check=True, capture_output=True)
+    return cert, clave
+
+
+def iniciar(puerto=8800, latencia_ms=20, tls=False, en_hilo=False, semilla=None, **opciones):
+    """
+    Inicia el servidor falso
+
+    Args:
+        puerto: Puerto (0 = uno libre)
+        latencia_ms: Latencia mediana hasta el primer token
+        tls: HTTPS con certificado autofirmado
+        en_hilo: Atender en un hilo daemon (para usarlo desde un benchmark)
+        semilla: Semilla del generador aleatorio (latencias y errores reproducibles)
+        **opciones: Resto de OPCIONES (distribucion, error_429, tokens_por_segundo, ...)
+
+    Returns:
+        tuple: (servidor, url_base, ruta_certificado o None); servidor.estado tiene las
+        opciones y los contadores
+    """
+    estado = Estado(semilla, latencia_ms=latencia_ms, **opciones)
+    handler = type('Handler', (StubHandler,), {'estado': estado})
+    servidor = ThreadingHTTPServer(('127.0.0.1', puerto), handler)
+    servidor.daemon_threads = True
+    servidor.estado = estado
+    cert = None
+    if tls:
+        cert, clave = generar_certificado()
+        contexto = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        contexto.load_cert_chain(cert, clave)
+        servidor.socket = contexto.wrap_socket(servidor.socket, server_side=True)
+    url = f"{'https' if tls else 'http'}://127.0.0.1:{servidor.server_address[1]}"
+
+    if en_hilo:
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, url, cert
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--puerto', type=int, default=8800)
+    parser.add_argument('--latencia-ms', type=float, default=20, help='Latencia mediana hasta el primer token')
+    parser.add_argument('--distribucion', choices=DISTRIBUCIONES, default='fija')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='Dispersión de uniforme/normal')
+    parser.add_argument('--sigma', type=float, default=0.6, help='Dispersión de lognormal')
+    parser.add_argument('--tokens-por-segundo', type=float, default=0, help='Velocidad de generación (0 = instantánea)')
+    parser.add_argument('--error-429', type=float, default=0, help='Probabilidad de responder 429')
+    parser.add_argument('--error-500', type=float, default=0, help='Probabilidad de responder 500')
+    parser.add_argument('--error-503', type=float, default=0, help='Probabilidad de responder 503')
+    parser.add_argument('--colgar', type=float, default=0, help='Probabilidad de no responder (timeout)')
+    parser.add_argument('--colgar-s', type=float, default=120, help='Segundos que dura un request colgado')
+    parser.add_argument('--json-invalido', type=float, default=0, help='Probabilidad de responder texto no JSON')
+    parser.add_argument('--cortar', type=float, default=0, help='Probabilidad de cortar la conexión a mitad de respuesta')
+    parser.add_argument('--retry-after', type=float, default=1, help='Header retry-after de los 429')
+    parser.add_argument('--semilla', type=int, default=None)
+    parser.add_argument('--tls', action='store_true', help='HTTPS con certificado autofirmado')
+    args = parser.parse_args()
+
+    opciones = {clave: getattr(args, clave) for clave in OPCIONES if clave != 'latencia_ms'}
+    servidor, url, cert = iniciar(args.puerto, args.latencia_ms, args.tls, semilla=args.semilla, **opciones)
+    print(f"🚀 Groq falso escuchando en {url} (latencia {args.latencia_ms:.0f} ms, {args.distribucion})")
+    fallas = {clave: valor for clave, valor in opciones.items() if clave in ('error_429', 'error_500', 'error_503', 'colgar', 'json_invalido', 'cortar') and valor}
+    if fallas:
+        print(f"   Errores inyectados: {', '.join(f'{k}={v:.0%}' for k, v in fallas.items())}")
+    if cert:
+        print(f"   Certificado: {cert} (usar SSL_CERT_FILE={cert} en el cliente)")
+    print(f"   Contadores: GET {url}/_stats | cambiar opciones: POST {url}/_config")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,27 @@
+"""
+Configuración de gunicorn (la carga sola al arrancar desde la raíz del proyecto)
+Los parámetros de cada despliegue (bind, workers, worker-class) siguen en start.sh / Procfile.
+
+Métricas Prometheus multiproceso: cada worker guarda sus contadores en archivos de
+PROMETHEUS_MULTIPROC_DIR y GET /metrics los suma. La variable se define acá, en el master,
+antes de que los workers importen prometheus_client.
+"""
+import os
+import shutil
+import tempfile
+
+directorio_metricas = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'prometheus_ventas')
+)
+
+
+def on_starting(server):
+    # Los archivos de una ejecución anterior tienen contadores que ya no corresponden
+    shutil.rmtree(directorio_metricas, ignore_errors=True)
+    os.makedirs(directorio_metricas, exist_ok=True)
+
+
+def child_exit(server, worker):
+    # Los gauges "livesum" dejan de contar al worker que terminó (reinicio, timeout, etc.)
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
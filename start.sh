@@ -3,13 +3,29 @@
 
 # Obtener el puerto de Railway o usar 8000 por defecto
 PORT="${PORT:-8000}"
+WORKERS="${WEB_CONCURRENCY:-2}"
 
-echo "🚀 Iniciando Gunicorn en puerto $PORT"
+# SERVIDOR=asgi (default): workers uvicorn bajo gunicorn; las vistas de IA y los streams
+# SSE son async y un worker atiende muchas esperas a Groq a la vez.
+# SERVIDOR=wsgi: workers síncronos clásicos (un request por worker).
+if [ "${SERVIDOR:-asgi}" = "wsgi" ]; then
+    echo "🚀 Iniciando Gunicorn (WSGI) en puerto $PORT"
+    exec gunicorn ventasbasico.wsgi:application \
+        --bind 0.0.0.0:$PORT \
+        --workers $WORKERS \
+        --timeout 120 \
+        --access-logfile - \
+        --error-logfile - \
+        --log-level info
+fi
 
-# Iniciar Gunicorn
-exec gunicorn ventasbasico.wsgi:application \
+echo "🚀 Iniciando Gunicorn + Uvicorn (ASGI) en puerto $PORT"
+
+# Iniciar Gunicorn con workers ASGI
+exec gunicorn ventasbasico.asgi:application \
+    --worker-class uvicorn_worker.UvicornWorker \
     --bind 0.0.0.0:$PORT \
-    --workers 2 \
+    --workers $WORKERS \
     --timeout 120 \
     --access-logfile - \
     --error-logfile - \
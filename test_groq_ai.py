@@ -1,6 +1,9 @@
 """
 Script de prueba para las funcionalidades de IA con Groq Cloud
 Ejecutar: python test_groq_ai.py
+
+Sin gastar cuota: levantar el Groq falso (python benchmarks/stub_groq.py) y correr el
+servidor con GROQ_BASE_URL=http://127.0.0.1:8800
 """
 import requests
 import json
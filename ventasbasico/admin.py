@@ -7,6 +7,8 @@ from django.http import HttpResponse
 from datetime import datetime, timedelta
 import csv
 from .models import Productos, Venta, DetalleVenta
+from .busqueda import buscar_productos
+from .tareas_ia import encolar_descripcion
 
 @admin.register(Productos)
 class ProductosAdmin(admin.ModelAdmin):
@@ -33,6 +35,12 @@ class ProductosAdmin(admin.ModelAdmin):
     )
     
     readonly_fields = ('codigo', 'descripcion_generada_fecha')  # Código es readonly
+    actions = ['generar_descripcion_segundo_plano']
+    
+    def get_search_results(self, request, queryset, search_term):
+        # Usar el índice de texto completo en vez de ILIKE '%x%' sobre cada columna
+        # (el producto con ese código exacto entra en la misma consulta)
+        return buscar_productos(queryset, search_term, incluir_codigo=True), False
     
     def estado_stock(self, obj):
         if obj.stock == 0:
@@ -48,6 +56,15 @@ class ProductosAdmin(admin.ModelAdmin):
             return format_html('<span style="color: green;">✓ IA</span>')
         return format_html('<span style="color: gray;">Sin IA</span>')
     tiene_descripcion_ia.short_description = 'Descripción IA'
+    
+    @admin.action(description='Generar descripción IA en segundo plano')
+    def generar_descripcion_segundo_plano(self, request, queryset):
+        # Solo encola: el worker (python manage.py procesar_tareas_ia) llama a Groq
+        nuevas = sum(1 for producto in queryset.only('id') if encolar_descripcion(producto, forzar=True)[1])
+        self.message_user(
+            request,
+            f"{nuevas} descripciones encoladas ({queryset.count() - nuevas} ya estaban en la cola)"
+        )
 
 class DetalleVentaInline(admin.TabularInline):
     model = DetalleVenta
@@ -55,6 +72,18 @@ class DetalleVentaInline(admin.TabularInline):
     readonly_fields = ('subtotal',)
     fields = ('producto', 'cantidad', 'precio_unitario', 'subtotal')
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('producto')
+    
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        campo = super().formfield_for_foreignkey(db_field, request, **kwargs)
+        if db_field.name == 'producto':
+            # Cada fila del inline listaba los productos con su propia consulta: se cargan una vez por request
+            if not hasattr(request, '_opciones_producto'):
+                request._opciones_producto = list(campo.choices)
+            campo.choices = request._opciones_producto
+        return campo
+    
     def subtotal(self, obj):
         if obj.id:
             return f"${ obj.subtotal:,.2f}"
@@ -75,10 +104,14 @@ class VentaAdmin(admin.ModelAdmin):
     total_formateado.short_description = 'Total'
     total_formateado.admin_order_field = 'total'
     
+    def get_queryset(self, request):
+        # Items de cada venta en la misma consulta del listado (antes, un SUM por fila)
+        return super().get_queryset(request).annotate(cantidad_items=Sum('detalles__cantidad'))
+    
     def cantidad_items(self, obj):
-        cantidad = obj.detalles.aggregate(total=Sum('cantidad'))['total'] or 0
-        return cantidad
+        return obj.cantidad_items or 0
     cantidad_items.short_description = 'Items'
+    cantidad_items.admin_order_field = 'cantidad_items'
     
     def calcular_total_detalles(self, obj):
         if obj.id:
@@ -126,9 +159,10 @@ class VentaAdmin(admin.ModelAdmin):
         # Encabezados
         writer.writerow(['Número Venta', 'Fecha', 'Cliente (RUT)', 'Cliente (Nombre)', 'Total', 'Cantidad Items'])
         
-        # Datos
-        for venta in ventas:
-            cantidad_items = venta.detalles.aggregate(total=Sum('cantidad'))['total'] or 0
+        # Datos (cliente e items de cada venta en la misma consulta)
+        filas = ventas.select_related('rut_cliente').annotate(cantidad_items=Sum('detalles__cantidad'))
+        for venta in filas:
+            cantidad_items = venta.cantidad_items or 0
             cliente_nombre = f"{venta.rut_cliente.nombre} {venta.rut_cliente.apellido}" if venta.rut_cliente else "Sin cliente"
             
             writer.writerow([
@@ -171,7 +205,7 @@ class VentaAdmin(admin.ModelAdmin):
         )
         
         context = {
-            'ventas': ventas,
+            'ventas': ventas.select_related('rut_cliente'),
             'fecha_inicio': fecha_inicio,
             'fecha_fin': fecha_fin,
             'total_ventas': total_ventas['total'] or 0,
@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class VentasbasicoConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'ventasbasico'
+
+    def ready(self):
+        # Registrar señales (eventos de stock, índices en memoria, etc.)
+        from . import signals  # noqa: F401
+        # Contador de consultas por request: se instala en cada conexión al crearse
+        from . import rendimiento  # noqa: F401
@@ -12,5 +12,8 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ventasbasico.settings')
+# Bajo ASGI el código síncrono corre en un hilo distinto por request: una conexión persistente
+# nunca se reutiliza y queda abierta hasta que se recolecta el hilo. Se cierran al terminar.
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
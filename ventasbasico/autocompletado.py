@@ -0,0 +1,230 @@
+"""
+Índice de prefijos en memoria para el autocompletado de productos
+Cada worker mantiene su propio índice (arreglo ordenado + bisect) sobre nombres y códigos,
+normalizados sin tildes. Se actualiza incrementalmente al guardar Productos y compara una
+versión compartida en el cache de Django para detectar cambios hechos por otros workers.
+"""
+import bisect
+import heapq
+import logging
+import threading
+import time
+import unicodedata
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum
+
+from .models import Productos, DetalleVenta
+
+logger = logging.getLogger(__name__)
+
+CLAVE_VERSION = 'autocompletado:version'
+
+
+def normalizar(texto):
+    """Minúsculas, sin tildes y con espacios simples ("Café  Orgánico" -> "cafe organico")"""
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(texto.lower().split())
+
+
+class IndicePrefijos:
+    """
+    Arreglo ordenado de (clave, producto_id)
+    Las claves son el código y el nombre desde cada palabra, para que "leche" encuentre
+    "Yogur de leche" además de "Leche entera".
+    """
+
+    def __init__(self):
+        self._claves = []
+        self._claves_por_producto = {}
+        self._productos = {}
+        self._popularidad = {}
+        self._lock = threading.RLock()
+        self.version = None
+        self.construido_en = 0.0
+        self.ultimo_chequeo = 0.0
+
+    @staticmethod
+    def _generar_claves(nombre, codigo):
+        palabras = normalizar(nombre).split()
+        claves = {' '.join(palabras[i:]) for i in range(len(palabras))}
+        if codigo:
+            claves.add(normalizar(codigo))
+        return claves
+
+    def construir(self):
+        """Reconstruye el índice completo desde la BD (2 consultas)"""
+        popularidad = dict(
+            DetalleVenta.objects.values_list('producto').annotate(total=Sum('cantidad'))
+        )
+        productos = Productos.objects.values('id', 'nombre', 'codigo', 'precio', 'stock')
+
+        claves = []
+        claves_por_producto = {}
+        datos = {}
+        for producto in productos:
+            producto_claves = self._generar_claves(producto['nombre'], producto['codigo'])
+            claves_por_producto[producto['id']] = producto_claves
+            claves.extend((clave, producto['id']) for clave in producto_claves)
+            datos[producto['id']] = self._datos_producto(producto)
+        claves.sort()
+
+        with self._lock:
+            self._claves = claves
+            self._claves_por_producto = claves_por_producto
+            self._productos = datos
+            self._popularidad = popularidad
+            self.construido_en = time.monotonic()
+
+        logger.info(f"Índice de autocompletado construido: {len(datos)} productos, {len(claves)} claves")
+
+    @staticmethod
+    def _datos_producto(producto):
+        return {
+            'id': producto['id'],
+            'nombre': producto['nombre'],
+            'codigo': producto['codigo'],
+            'precio': float(producto['precio']),
+            'stock': producto['stock'],
+        }
+
+    def _quitar_claves(self, producto_id):
+        for clave in self._claves_por_producto.pop(producto_id, ()):
+            posicion = bisect.bisect_left(self._claves, (clave, producto_id))
+            if posicion < len(self._claves) and self._claves[posicion] == (clave, producto_id):
+                del self._claves[posicion]
+
+    def actualizar(self, producto):
+        """Inserta o reemplaza las claves de un producto sin reconstruir todo el índice"""
+        datos = {
+            'id': producto.id,
+            'nombre': producto.nombre,
+            'codigo': producto.codigo,
+            'precio': producto.precio,
+            'stock': producto.stock,
+        }
+        with self._lock:
+            self._quitar_claves(producto.id)
+            claves = self._generar_claves(producto.nombre, producto.codigo)
+            for clave in claves:
+                bisect.insort(self._claves, (clave, producto.id))
+            self._claves_por_producto[producto.id] = claves
+            self._productos[producto.id] = self._datos_producto(datos)
+
+    def eliminar(self, producto_id):
+        with self._lock:
+            self._quitar_claves(producto_id)
+            self._productos.pop(producto_id, None)
+            self._popularidad.pop(producto_id, None)
+
+    def productos(self):
+        """Copia de los datos de todos los productos del índice"""
+        with self._lock:
+            return list(self._productos.values())
+
+    def populares(self, limite=10):
+        """Productos con stock más vendidos (según la popularidad del último build)"""
+        with self._lock:
+            con_stock = (pid for pid, p in self._productos.items() if p['stock'] > 0)
+            mejores = heapq.nsmallest(
+                limite,
+                con_stock,
+                key=lambda pid: (-self._popularidad.get(pid, 0), self._productos[pid]['nombre'])
+            )
+            return [self._productos[pid] for pid in mejores]
+
+    def buscar(self, prefijo, limite=10):
+        """Devuelve hasta `limite` productos cuyo nombre/código empieza con el prefijo, por popularidad"""
+        prefijo = normalizar(prefijo)
+        if not prefijo:
+            return []
+
+        with self._lock:
+            encontrados = set()
+            posicion = bisect.bisect_left(self._claves, (prefijo,))
+            while posicion < len(self._claves) and self._claves[posicion][0].startswith(prefijo):
+                encontrados.add(self._claves[posicion][1])
+                posicion += 1
+
+            mejores = heapq.nsmallest(
+                limite,
+                encontrados,
+                key=lambda pid: (-self._popularidad.get(pid, 0), self._productos[pid]['nombre'])
+            )
+            return [self._productos[pid] for pid in mejores]
+
+
+_indice = IndicePrefijos()
+
+
+def _version_compartida():
+    return cache.get(CLAVE_VERSION, 0)
+
+
+def version_catalogo():
+    """Versión compartida del catálogo: cambia al crear, eliminar o editar nombre, código o precio"""
+    return _version_compartida()
+
+
+def obtener_indice():
+    """
+    Devuelve el índice del worker, reconstruyéndolo si:
+    - aún no se ha construido
+    - otro worker cambió productos (versión compartida distinta)
+    - pasó AUTOCOMPLETADO_TTL (refresca la popularidad por ventas)
+    """
+    ahora = time.monotonic()
+    reconstruir = _indice.version is None or ahora - _indice.construido_en > settings.AUTOCOMPLETADO_TTL
+
+    if not reconstruir and ahora - _indice.ultimo_chequeo > settings.AUTOCOMPLETADO_CHEQUEO_VERSION:
+        _indice.ultimo_chequeo = ahora
+        reconstruir = _version_compartida() != _indice.version
+
+    if reconstruir:
+        with _indice._lock:
+            version = _version_compartida()
+            _indice.construir()
+            _indice.version = version
+            _indice.ultimo_chequeo = ahora
+    return _indice
+
+
+def _incrementar_version():
+    """Incrementa la versión compartida; si otro worker también cambió algo, fuerza reconstrucción"""
+    cache.add(CLAVE_VERSION, 0, timeout=None)
+    try:
+        nueva = cache.incr(CLAVE_VERSION)
+    except ValueError:
+        nueva = None
+
+    if _indice.version is not None and nueva == _indice.version + 1:
+        _indice.version = nueva
+    else:
+        _indice.version = None
+
+
+def producto_guardado(producto, compartir=True):
+    """
+    Llamado (on_commit) al guardar un producto
+    Los cambios solo de stock se aplican localmente sin versionar, para no forzar
+    una reconstrucción en los demás workers con cada venta
+    """
+    if _indice.version is not None:
+        _indice.actualizar(producto)
+    if compartir:
+        _incrementar_version()
+
+
+def producto_eliminado(producto_id):
+    """Llamado (on_commit) al eliminar un producto"""
+    if _indice.version is not None:
+        _indice.eliminar(producto_id)
+    _incrementar_version()
+
+
+def productos_importados():
+    """Llamado tras cargas masivas (bulk_create no dispara señales): todos los workers reconstruyen"""
+    _indice.version = None
+    _incrementar_version()
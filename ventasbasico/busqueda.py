@@ -0,0 +1,92 @@
+"""
+Búsqueda de texto completo de productos
+Usa el índice nativo de la base de datos (migraciones 0005 y 0007):
+- PostgreSQL: columna tsvector "busqueda" (config spanish) con índice GIN
+- SQLite: tabla virtual FTS5 "ventasbasico_productos_fts" (desarrollo local)
+Otros motores caen a un icontains simple.
+
+La búsqueda es parte de la misma consulta del queryset: los filtros del llamador (stock,
+precio, filtros del admin) se aplican sobre todas las coincidencias, no sobre un top-N.
+"""
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, Case, FloatField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+TABLA_FTS = 'ventasbasico_productos_fts'
+
+# Relevancia del producto cuyo código es exactamente el texto buscado (queda primero)
+RELEVANCIA_CODIGO_EXACTO = 1e9
+
+
+def buscar_productos(queryset, texto, incluir_codigo=False):
+    """
+    Filtra el queryset de Productos por el texto buscado y lo ordena por relevancia
+
+    Args:
+        queryset: QuerySet de Productos (puede venir ya filtrado)
+        texto: Texto ingresado por el usuario
+        incluir_codigo: Incluir también el producto con código igual al texto (admin)
+
+    Returns:
+        QuerySet anotado con "relevancia" (mayor = más relevante)
+    """
+    texto = (texto or '').strip()
+    if not texto:
+        return queryset
+
+    tabla = connection.ops.quote_name(queryset.model._meta.db_table)
+    if connection.vendor == 'postgresql':
+        condicion, relevancia = _condicion_postgres(tabla, texto)
+    elif connection.vendor == 'sqlite':
+        condicion, relevancia = _condicion_sqlite(tabla, texto)
+    else:
+        condicion, relevancia = _condicion_icontains(texto)
+
+    if incluir_codigo:
+        condicion = Q(condicion) | Q(codigo=texto)
+        relevancia = Case(
+            When(codigo=texto, then=Value(RELEVANCIA_CODIGO_EXACTO)),
+            default=relevancia,
+            output_field=FloatField()
+        )
+    return queryset.filter(condicion).annotate(relevancia=relevancia).order_by('-relevancia', 'nombre')
+
+
+def _condicion_postgres(tabla, texto):
+    columna = f"{tabla}.busqueda"
+    consulta = "websearch_to_tsquery('spanish', %s)"
+    return (
+        RawSQL(f"{columna} @@ {consulta}", [texto], output_field=BooleanField()),
+        RawSQL(f"ts_rank_cd({columna}, {consulta})", [texto], output_field=FloatField()),
+    )
+
+
+def _condicion_sqlite(tabla, texto):
+    terminos = re.findall(r'\w+', texto)
+    if not terminos:
+        return Q(pk__in=[]), Value(0.0)
+
+    # Cada término como prefijo entre comillas (evita inyectar sintaxis FTS5)
+    match = ' '.join(f'"{termino}"*' for termino in terminos)
+    return (
+        RawSQL(
+            f"{tabla}.id IN (SELECT rowid FROM {TABLA_FTS} WHERE {TABLA_FTS} MATCH %s)",
+            [match], output_field=BooleanField()
+        ),
+        # bm25 por rowid (búsqueda directa en la tabla FTS); devuelve valores negativos
+        # (menor = mejor), se invierte el signo
+        RawSQL(
+            f"SELECT -bm25({TABLA_FTS}, 10.0, 5.0, 2.0, 1.0) FROM {TABLA_FTS} "
+            f"WHERE {TABLA_FTS} MATCH %s AND rowid = {tabla}.id",
+            [match], output_field=FloatField()
+        ),
+    )
+
+
+def _condicion_icontains(texto):
+    filtro = Q()
+    for campo in ('nombre', 'palabras_clave', 'descripcion_corta', 'descripcion_larga'):
+        filtro |= Q(**{f'{campo}__icontains': texto})
+    return filtro, Value(0.0)
@@ -0,0 +1,206 @@
+"""
+Cache semántico de respuestas del chatbot
+La mayoría de las consultas son las mismas preguntas frecuentes (horario, pagos, despacho)
+escritas de distintas formas. Antes de llamar a la IA se busca una respuesta guardada para
+una pregunta parecida:
+
+- La pregunta se normaliza (minúsculas, sin tildes, sin stopwords, plurales simples) y se
+  representa como vector TF-IDF; se compara por similitud coseno con las guardadas
+- Solo se reutilizan respuestas generadas con el mismo contexto (firma del contexto: versión
+  del catálogo y la venta, producto o cliente consultados; no los productos elegidos según
+  la redacción de cada pregunta)
+- LRU con tamaño máximo (CHATBOT_CACHE_MAX) y vencimiento (CHATBOT_CACHE_TTL)
+
+El cache es por proceso; las métricas se ven en GET /api/ia/stats/.
+"""
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+
+from .autocompletado import normalizar, version_catalogo
+from .metricas import registrar_cache
+
+STOPWORDS = frozenset("""
+a al algo algun alguna algunas alguno algunos ante antes asi aun bien cada como con contra
+cual cuales cuando de del desde donde dos el ella ellas ellos en entre era eres es esa esas
+ese eso esos esta estan estas este esto estos estoy fue ha hay hola la las le les lo los mas
+me mi mis mucho muy nada ni no nos nosotros o os otra otro para pero poco por porque puede
+puedo que quien se sea ser si sin sobre son su sus tambien te tengo ti tiene tienen tu tus
+un una unas uno unos usted ustedes vosotros y ya yo buenas buenos dias tardes noches favor
+gracias quiero quisiera saber necesito consulta pregunta
+""".split())
+
+
+def tokenizar(texto):
+    """Términos relevantes de la pregunta ("¿Cuáles son los horarios?" -> ["horario"])"""
+    terminos = []
+    for palabra in re.findall(r'\w+', normalizar(texto)):
+        if palabra in STOPWORDS or palabra.isdigit():
+            continue
+        # Plural simple: "regiones" -> "region", "envios" -> "envio"
+        if len(palabra) > 5 and palabra.endswith('es') and palabra[-3] in 'nrldjz':
+            palabra = palabra[:-2]
+        elif len(palabra) > 4 and palabra.endswith('s'):
+            palabra = palabra[:-1]
+        terminos.append(palabra)
+    return terminos
+
+
+# Partes del contexto que no dependen de la redacción de la pregunta
+CONTEXTO_FIRMADO = ('venta', 'producto', 'cliente')
+
+
+def firma_contexto(contexto):
+    """
+    Hash de la parte del contexto que no depende de la pregunta
+    Los productos relevantes (y el total con stock) se eligen según las palabras de cada
+    pregunta: firmarlos haría que una pregunta parafraseada nunca encuentre la respuesta
+    guardada. En su lugar se firma la versión del catálogo (cambia al crear, eliminar o
+    editar nombre, código o precio de un producto).
+    El stock exacto del producto consultado se reduce a disponible/no disponible,
+    así una venta cualquiera no invalida las respuestas.
+    """
+    def simplificar(valor):
+        if isinstance(valor, dict):
+            return {
+                clave: (v > 0 if clave == 'stock' and isinstance(v, (int, float)) else simplificar(v))
+                for clave, v in valor.items()
+            }
+        if isinstance(valor, list):
+            return [simplificar(v) for v in valor]
+        return valor
+
+    contexto = contexto or {}
+    firmado = {clave: contexto[clave] for clave in CONTEXTO_FIRMADO if clave in contexto}
+    firmado['catalogo'] = version_catalogo()
+    contenido = json.dumps(simplificar(firmado), sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+class CacheSemantico:
+    """LRU de respuestas del chatbot con búsqueda por similitud TF-IDF"""
+
+    def __init__(self, maximo=None, ttl=None, umbral=None):
+        self.maximo = maximo or settings.CHATBOT_CACHE_MAX
+        self.ttl = ttl or settings.CHATBOT_CACHE_TTL
+        self.umbral = umbral or settings.CHATBOT_CACHE_UMBRAL
+        # id -> (terminos Counter, firma, respuesta, creada)
+        self._entradas = OrderedDict()
+        # Frecuencia de documentos de cada término (para el IDF)
+        self._df = Counter()
+        self._siguiente_id = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self.vencidas = 0
+
+    def _idf(self, termino, memo):
+        if termino not in memo:
+            memo[termino] = math.log((1 + len(self._entradas)) / (1 + self._df[termino])) + 1
+        return memo[termino]
+
+    def _norma(self, terminos, memo):
+        return math.sqrt(sum((frecuencia * self._idf(t, memo)) ** 2 for t, frecuencia in terminos.items()))
+
+    def _quitar(self, entrada_id):
+        terminos = self._entradas.pop(entrada_id)[0]
+        for termino in terminos:
+            self._df[termino] -= 1
+            if self._df[termino] <= 0:
+                del self._df[termino]
+
+    def buscar(self, pregunta, contexto=None):
+        """
+        Devuelve la respuesta guardada más parecida o None
+
+        Returns:
+            dict | None: Respuesta del chatbot (mismo formato que GroqService.chatbot_atencion)
+        """
+        terminos = Counter(tokenizar(pregunta))
+        firma = firma_contexto(contexto)
+        ahora = time.monotonic()
+
+        with self._lock:
+            mejor_id, mejor_similitud = None, 0.0
+            if terminos:
+                idf = {}  # IDF calculado una sola vez por término en esta búsqueda
+                norma_pregunta = self._norma(terminos, idf)
+                for entrada_id, (terminos_entrada, firma_entrada, _, creada) in list(self._entradas.items()):
+                    if ahora - creada > self.ttl:
+                        self._quitar(entrada_id)
+                        self.vencidas += 1
+                        continue
+                    if firma_entrada != firma:
+                        continue
+                    producto = sum(
+                        frecuencia * terminos_entrada[t] * self._idf(t, idf) ** 2
+                        for t, frecuencia in terminos.items() if t in terminos_entrada
+                    )
+                    if not producto:
+                        continue
+                    similitud = producto / (norma_pregunta * self._norma(terminos_entrada, idf))
+                    if similitud > mejor_similitud:
+                        mejor_id, mejor_similitud = entrada_id, similitud
+
+            if mejor_id is None or mejor_similitud < self.umbral:
+                self.fallos += 1
+                registrar_cache('chatbot', False)
+                return None
+
+            self._entradas.move_to_end(mejor_id)
+            self.aciertos += 1
+            registrar_cache('chatbot', True)
+            return self._entradas[mejor_id][2]
+
+    def guardar(self, pregunta, contexto, respuesta):
+        """Guarda la respuesta (no se guardan las que requieren atención humana)"""
+        terminos = Counter(tokenizar(pregunta))
+        if not terminos or respuesta.get('requiere_humano'):
+            return
+
+        with self._lock:
+            self._entradas[self._siguiente_id] = (terminos, firma_contexto(contexto), respuesta, time.monotonic())
+            self._siguiente_id += 1
+            self._df.update(terminos.keys())
+            while len(self._entradas) > self.maximo:
+                self._quitar(next(iter(self._entradas)))
+                self.desalojos += 1
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._df.clear()
+
+    def metricas(self):
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'entradas': len(self._entradas),
+                'maximo': self.maximo,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_aciertos': round(self.aciertos / consultas, 3) if consultas else 0.0,
+                'desalojos': self.desalojos,
+                'vencidas': self.vencidas
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def obtener_cache_chatbot():
+    """Cache semántico del proceso (se crea al primer uso)"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = CacheSemantico()
+    return _cache
@@ -0,0 +1,131 @@
+"""
+Circuit breaker para las llamadas a Groq
+Cuando Groq se degrada, cada request de IA ocupaba un worker hasta el timeout de gunicorn
+y dejaba sin workers al checkout. El circuito corta las llamadas mientras la tasa de
+fallos es alta y las vistas responden al instante con su respuesta de respaldo.
+
+- cerrado:    las llamadas pasan; se registra el resultado en una ventana de tiempo
+- abierto:    la tasa de fallos de la ventana superó el umbral; las llamadas fallan sin
+              salir del proceso (CircuitoAbiertoError) durante GROQ_CIRCUITO_ESPERA segundos
+- semiabierto: pasada la espera se deja pasar una sola llamada de prueba; si funciona el
+              circuito se cierra, si falla vuelve a abrirse
+
+El estado es por proceso; se ve en GET /api/ia/stats/.
+"""
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+CERRADO = 'cerrado'
+ABIERTO = 'abierto'
+SEMIABIERTO = 'semiabierto'
+
+
+class CircuitoAbiertoError(Exception):
+    """La llamada no se hizo porque el circuito está abierto"""
+
+    def __init__(self, reintentar_en):
+        self.reintentar_en = reintentar_en
+        super().__init__(f"Groq no disponible (circuito abierto), reintentar en {reintentar_en:.0f}s")
+
+
+class CircuitBreaker:
+    """Circuit breaker con ventana de tasa de fallos y llamada de prueba (semiabierto)"""
+
+    def __init__(self, ventana=None, minimo=None, umbral=None, espera=None):
+        self.ventana = ventana or settings.GROQ_CIRCUITO_VENTANA
+        self.minimo = minimo or settings.GROQ_CIRCUITO_MINIMO
+        self.umbral = umbral or settings.GROQ_CIRCUITO_UMBRAL
+        self.espera = espera or settings.GROQ_CIRCUITO_ESPERA
+        self.estado = CERRADO
+        # (time.monotonic, exito) de las llamadas recientes
+        self._resultados = deque()
+        self._abierto_desde = 0.0
+        self._prueba_en_curso = False
+        self._prueba_desde = 0.0
+        self._lock = threading.Lock()
+        self.aperturas = 0
+        self.rechazadas = 0
+
+    def _descartar_antiguos(self, ahora):
+        while self._resultados and ahora - self._resultados[0][0] > self.ventana:
+            self._resultados.popleft()
+
+    def _abrir(self, ahora):
+        self.estado = ABIERTO
+        self._abierto_desde = ahora
+        self._prueba_en_curso = False
+        self._resultados.clear()
+        self.aperturas += 1
+
+    def permitir(self):
+        """Lanza CircuitoAbiertoError si la llamada no debe hacerse"""
+        with self._lock:
+            if self.estado == CERRADO:
+                return
+            ahora = time.monotonic()
+            restante = self._abierto_desde + self.espera - ahora
+            if self.estado == ABIERTO and restante <= 0:
+                self.estado = SEMIABIERTO
+            # Una prueba que nunca registró su resultado (ej: request cancelado) no bloquea el circuito
+            if self.estado == SEMIABIERTO and (not self._prueba_en_curso or ahora - self._prueba_desde > self.espera):
+                self._prueba_en_curso = True
+                self._prueba_desde = ahora
+                return
+            self.rechazadas += 1
+            raise CircuitoAbiertoError(max(restante, 1.0))
+
+    def registrar_exito(self):
+        with self._lock:
+            if self.estado != CERRADO:
+                self.estado = CERRADO
+                self._prueba_en_curso = False
+                self._resultados.clear()
+                return
+            ahora = time.monotonic()
+            self._resultados.append((ahora, True))
+            self._descartar_antiguos(ahora)
+
+    def registrar_fallo(self):
+        with self._lock:
+            ahora = time.monotonic()
+            if self.estado != CERRADO:
+                self._abrir(ahora)
+                return
+            self._resultados.append((ahora, False))
+            self._descartar_antiguos(ahora)
+            fallos = sum(1 for _, exito in self._resultados if not exito)
+            if len(self._resultados) >= self.minimo and fallos / len(self._resultados) >= self.umbral:
+                self._abrir(ahora)
+
+    def metricas(self):
+        with self._lock:
+            ahora = time.monotonic()
+            self._descartar_antiguos(ahora)
+            fallos = sum(1 for _, exito in self._resultados if not exito)
+            return {
+                'estado': self.estado,
+                'llamadas_ventana': len(self._resultados),
+                'fallos_ventana': fallos,
+                'aperturas': self.aperturas,
+                'rechazadas': self.rechazadas,
+                'reintentar_en': (
+                    round(max(self._abierto_desde + self.espera - ahora, 0), 1) if self.estado == ABIERTO else 0
+                )
+            }
+
+
+_circuito = None
+_circuito_lock = threading.Lock()
+
+
+def obtener_circuito_groq():
+    """Circuit breaker de Groq del proceso (compartido por todas las llamadas)"""
+    global _circuito
+    if _circuito is None:
+        with _circuito_lock:
+            if _circuito is None:
+                _circuito = CircuitBreaker()
+    return _circuito
@@ -0,0 +1,204 @@
+"""
+Coalescencia de requests idénticos simultáneos (single-flight)
+Cuando una promoción sale al aire muchos usuarios envían a la vez el mismo body a
+/api/ia/chat/ o /api/ia/productos/recomendar/, y cada request hacía su propia consulta
+a la BD y su propia llamada a Groq. Con single-flight el primer request de una clave
+(hash del body normalizado) calcula la respuesta y los que llegan mientras tanto esperan
+y reciben el mismo resultado.
+
+- Por proceso: los requests del mismo worker (vistas async, mismo event loop) esperan el
+  asyncio.Future del primero
+- Entre workers (SINGLE_FLIGHT_CACHE=True, requiere un cache compartido como Redis): el
+  primer worker toma un lock en el cache y publica el resultado ahí por
+  SINGLE_FLIGHT_RESULTADO_TTL segundos; los demás consultan hasta que aparece
+- Si la espera supera SINGLE_FLIGHT_ESPERA o el worker que calculaba falla sin publicar,
+  el request calcula su propia respuesta
+- El lock guarda un token propio de cada cálculo: si vence mientras el líder sigue
+  calculando y otro worker lo toma, el primero no lo borra al terminar
+- No es un cache: terminado el cálculo, el siguiente request vuelve a calcular
+
+Las métricas (por proceso) se ven en GET /api/ia/stats/.
+"""
+import asyncio
+import hashlib
+import json
+import threading
+import time
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+
+from .autocompletado import normalizar
+from .metricas import registrar_cache
+
+# Borra la clave solo si todavía guarda el token (GET + DEL atómico en Redis)
+_LIBERAR_LOCK_REDIS = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def clave_coalescencia(operacion, payload):
+    """Hash del body normalizado (textos en minúsculas, sin tildes ni espacios extra)"""
+    def normalizado(valor):
+        if isinstance(valor, dict):
+            return {str(clave): normalizado(v) for clave, v in valor.items()}
+        if isinstance(valor, (list, tuple)):
+            return [normalizado(v) for v in valor]
+        if isinstance(valor, str):
+            return normalizar(valor)
+        return valor
+
+    contenido = json.dumps(normalizado(payload), sort_keys=True, ensure_ascii=False, default=str)
+    return f"{operacion}:{hashlib.sha256(contenido.encode('utf-8')).hexdigest()}"
+
+
+class SingleFlight:
+    """Ejecuta una sola vez los cálculos simultáneos con la misma clave (vistas async)"""
+
+    def __init__(self, espera=None, usar_cache=None, resultado_ttl=None, intervalo=0.05):
+        self.espera = espera or settings.SINGLE_FLIGHT_ESPERA
+        self.usar_cache = settings.SINGLE_FLIGHT_CACHE if usar_cache is None else usar_cache
+        self.resultado_ttl = resultado_ttl or settings.SINGLE_FLIGHT_RESULTADO_TTL
+        self.intervalo = intervalo
+        # (event loop, clave) -> asyncio.Future del cálculo en curso
+        self._vuelos = {}
+        self._lock = threading.Lock()
+        self.calculadas = 0
+        self.compartidas = 0
+        self.compartidas_cache = 0
+        self.esperas_vencidas = 0
+
+    async def ejecutar(self, clave, funcion):
+        """
+        Devuelve await funcion() o el resultado del cálculo en curso con la misma clave
+
+        Returns:
+            tuple: (resultado, compartido)
+        """
+        # Un Future solo se puede esperar desde su propio event loop
+        loop = asyncio.get_running_loop()
+        id_vuelo = (id(loop), clave)
+        vuelo = self._vuelos.get(id_vuelo)
+        if vuelo is not None:
+            try:
+                resultado = await asyncio.wait_for(asyncio.shield(vuelo), self.espera)
+            except asyncio.TimeoutError:
+                self._sumar('esperas_vencidas')
+                return await self._calcular(clave, funcion)
+            except asyncio.CancelledError:
+                # Se canceló el request que calculaba (ej: el cliente cerró la conexión), no este
+                if not vuelo.cancelled():
+                    raise
+                return await self._calcular(clave, funcion)
+            self._sumar('compartidas')
+            return resultado, True
+
+        vuelo = self._vuelos[id_vuelo] = loop.create_future()
+        try:
+            resultado, compartido = await self._calcular(clave, funcion)
+            vuelo.set_result(resultado)
+            return resultado, compartido
+        except asyncio.CancelledError:
+            vuelo.cancel()
+            raise
+        except Exception as e:
+            vuelo.set_exception(e)
+            # Evita el aviso "exception was never retrieved" si nadie esperaba
+            vuelo.exception()
+            raise
+        finally:
+            self._vuelos.pop(id_vuelo, None)
+
+    async def _calcular(self, clave, funcion):
+        if not self.usar_cache:
+            return await self._contar(funcion), False
+
+        clave_lock = f"single_flight:lock:{clave}"
+        clave_resultado = f"single_flight:resultado:{clave}"
+        token = uuid.uuid4().hex
+        limite = time.monotonic() + self.espera
+        while True:
+            if await cache.aadd(clave_lock, token, timeout=self.espera):
+                try:
+                    resultado = await self._contar(funcion)
+                    # El token identifica este cálculo: no se entrega el resultado de uno anterior
+                    await cache.aset(clave_resultado, (token, resultado), timeout=self.resultado_ttl)
+                    return resultado, False
+                finally:
+                    await self._liberar_lock(clave_lock, token)
+
+            # Otro worker está calculando: esperar su resultado
+            token_lider = await cache.aget(clave_lock)
+            while token_lider is not None and time.monotonic() < limite:
+                await asyncio.sleep(self.intervalo)
+                # El lock se lee antes que el resultado: el líder publica y después libera
+                siguiente = await cache.aget(clave_lock)
+                publicado = await cache.aget(clave_resultado)
+                if publicado is not None and publicado[0] == token_lider:
+                    self._sumar('compartidas_cache')
+                    return publicado[1], True
+                token_lider = siguiente
+
+            if time.monotonic() >= limite:
+                self._sumar('esperas_vencidas')
+                return await self._contar(funcion), False
+            # El lock se liberó sin resultado (el otro worker falló): intentar tomarlo
+
+    async def _liberar_lock(self, clave_lock, token):
+        """Borra el lock solo si sigue siendo de este cálculo (pudo vencer y tomarlo otro worker)"""
+        backend = caches['default']
+        if isinstance(backend, RedisCache):
+            await sync_to_async(_liberar_lock_redis)(backend, clave_lock, token)
+        elif await cache.aget(clave_lock) == token:
+            # Sin compare-and-delete en el backend: queda una ventana mínima entre ambas llamadas
+            await cache.adelete(clave_lock)
+
+    def _sumar(self, contador):
+        with self._lock:
+            setattr(self, contador, getattr(self, contador) + 1)
+        if contador != 'esperas_vencidas':
+            # Acierto: el resultado vino de otro request (del proceso o de otro worker)
+            registrar_cache('single_flight', contador != 'calculadas')
+
+    async def _contar(self, funcion):
+        resultado = await funcion()
+        self._sumar('calculadas')
+        return resultado
+
+    def metricas(self):
+        with self._lock:
+            return {
+                'en_curso': len(self._vuelos),
+                'calculadas': self.calculadas,
+                'compartidas': self.compartidas,
+                'compartidas_entre_workers': self.compartidas_cache,
+                'esperas_vencidas': self.esperas_vencidas,
+                'entre_workers': self.usar_cache
+            }
+
+
+def _liberar_lock_redis(backend, clave_lock, token):
+    clave = backend.make_and_validate_key(clave_lock)
+    cliente = backend._cache.get_client(clave, write=True)
+    # El valor se compara tal como lo guardó el backend (serializado)
+    cliente.eval(_LIBERAR_LOCK_REDIS, 1, clave, backend._cache._serializer.dumps(token))
+
+
+_single_flight = None
+_single_flight_lock = threading.Lock()
+
+
+def obtener_single_flight():
+    """Single-flight del proceso (compartido por todos los endpoints)"""
+    global _single_flight
+    if _single_flight is None:
+        with _single_flight_lock:
+            if _single_flight is None:
+                _single_flight = SingleFlight()
+    return _single_flight
@@ -0,0 +1,114 @@
+"""
+Generación de descripciones de productos con cache por hash de contenido
+La descripción se asocia a un hash de los datos que van en el prompt (nombre, código,
+precio, stock, modelo y versión del prompt). Si el hash no cambió, se reutiliza la
+descripción guardada en vez de volver a llamar a Groq.
+"""
+import hashlib
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.utils import timezone
+
+from .groq_service import GroqService, obtener_groq_service
+from .metricas import registrar_cache
+
+logger = logging.getLogger(__name__)
+
+# Incrementar si cambia el prompt de GroqService.generar_descripcion_producto
+VERSION_PROMPT = 2
+
+
+def caracteristicas_producto(producto):
+    """Características adicionales que se envían en el prompt"""
+    return {
+        'codigo': producto.codigo,
+        'precio': float(producto.precio),
+        'stock': producto.stock
+    }
+
+
+def calcular_hash(producto):
+    """Hash SHA-256 de todo lo que influye en la descripción generada"""
+    entradas = {
+        'version': VERSION_PROMPT,
+        'modelo': GroqService.MODELO,
+        'nombre': producto.nombre,
+        'caracteristicas': caracteristicas_producto(producto),
+    }
+    contenido = json.dumps(entradas, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+def descripcion_vigente(producto):
+    """True si el producto ya tiene una descripción generada con los datos actuales"""
+    return bool(producto.descripcion_corta) and producto.descripcion_hash == calcular_hash(producto)
+
+
+def _desde_cache(producto):
+    vigente = descripcion_vigente(producto)
+    registrar_cache('descripciones', vigente)
+    return vigente
+
+
+def generar_descripcion(producto, groq=None, forzar=False, antes_de_guardar=None):
+    """
+    Devuelve la descripción del producto, llamando a Groq solo si los datos cambiaron
+
+    Args:
+        producto: Instancia de Productos
+        groq: GroqService a reutilizar (opcional)
+        forzar: Regenerar aunque el hash coincida
+        antes_de_guardar: Función que se llama en la transacción del guardado, después de
+            Groq (opcional); si lanza una excepción la descripción no se guarda
+
+    Returns:
+        tuple: (producto actualizado, desde_cache)
+    """
+    if not forzar and _desde_cache(producto):
+        return producto, True
+
+    hash_entradas = calcular_hash(producto)
+    groq = groq or obtener_groq_service()
+    resultado = groq.generar_descripcion_producto(
+        nombre_producto=producto.nombre,
+        caracteristicas=caracteristicas_producto(producto)
+    )
+    with transaction.atomic():
+        if antes_de_guardar is not None:
+            antes_de_guardar()
+        _guardar_descripcion(producto, resultado, hash_entradas)
+    return producto, False
+
+
+async def agenerar_descripcion(producto, groq=None, forzar=False):
+    """Versión asíncrona de generar_descripcion (vistas ASGI); solo el guardado pasa por un hilo"""
+    if not forzar and _desde_cache(producto):
+        return producto, True
+
+    hash_entradas = calcular_hash(producto)
+    groq = groq or obtener_groq_service()
+    resultado = await groq.agenerar_descripcion_producto(
+        nombre_producto=producto.nombre,
+        caracteristicas=caracteristicas_producto(producto)
+    )
+    await sync_to_async(_guardar_descripcion)(producto, resultado, hash_entradas)
+    return producto, False
+
+
+def _guardar_descripcion(producto, resultado, hash_entradas):
+    producto.descripcion_corta = resultado.get('descripcion_corta', '')
+    producto.descripcion_larga = resultado.get('descripcion_larga', '')
+    producto.palabras_clave = resultado.get('palabras_clave', [])
+    producto.beneficios = resultado.get('beneficios', [])
+    producto.descripcion_generada_fecha = timezone.now()
+    # Una respuesta de respaldo (JSON inválido) se guarda, pero se reintentará la próxima vez
+    producto.descripcion_hash = None if resultado.get('fallback') else hash_entradas
+    producto.save(update_fields=[
+        'descripcion_corta', 'descripcion_larga', 'palabras_clave', 'beneficios',
+        'descripcion_generada_fecha', 'descripcion_hash'
+    ])
+
+    logger.info(f"Descripción IA guardada para producto {producto.id}: {producto.nombre}")
@@ -0,0 +1,151 @@
+"""
+Broker de eventos de stock para el stream SSE
+Los cambios se publican como deltas compactos {id, stock} y se agrupan por producto
+dentro de una ventana corta antes de enviarse a cada cliente conectado.
+
+Backends disponibles (setting STOCK_BROKER_BACKEND):
+- BrokerLocal: en memoria del proceso, para un solo nodo/worker
+- BrokerRedis: pub/sub de Redis, para varios workers (paquete redis, en requirements.txt)
+"""
+import asyncio
+import json
+import logging
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class BrokerStockBase:
+    """
+    Interfaz común de los brokers
+    - publicar(): se llama desde código síncrono (vistas, señales)
+    - suscribir(): generador asíncrono que entrega lotes [{id, stock}, ...]
+      Un lote vacío indica que no hubo cambios durante el keepalive
+    """
+
+    def __init__(self, ventana=None, keepalive=None):
+        self.ventana = ventana if ventana is not None else settings.STOCK_EVENTOS_VENTANA
+        self.keepalive = keepalive if keepalive is not None else settings.STOCK_EVENTOS_KEEPALIVE
+
+    def publicar(self, producto_id, stock):
+        raise NotImplementedError
+
+    async def suscribir(self):
+        raise NotImplementedError
+        yield  # pragma: no cover
+
+    async def _agrupar(self, cola):
+        """Agrupa los eventos de la cola por producto (último stock gana) dentro de la ventana"""
+        while True:
+            try:
+                producto_id, stock = await asyncio.wait_for(cola.get(), timeout=self.keepalive)
+            except asyncio.TimeoutError:
+                yield []
+                continue
+
+            pendientes = {producto_id: stock}
+            await asyncio.sleep(self.ventana)
+            while not cola.empty():
+                producto_id, stock = cola.get_nowait()
+                pendientes[producto_id] = stock
+
+            yield [{'id': pid, 'stock': s} for pid, s in pendientes.items()]
+
+
+class BrokerLocal(BrokerStockBase):
+    """Broker en memoria: cada suscriptor tiene su propia cola en su event loop"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._suscriptores = set()
+        self._lock = threading.Lock()
+
+    def publicar(self, producto_id, stock):
+        with self._lock:
+            suscriptores = list(self._suscriptores)
+
+        for loop, cola in suscriptores:
+            try:
+                loop.call_soon_threadsafe(cola.put_nowait, (producto_id, stock))
+            except RuntimeError:
+                # El event loop del suscriptor ya se cerró
+                with self._lock:
+                    self._suscriptores.discard((loop, cola))
+
+    async def suscribir(self):
+        suscriptor = (asyncio.get_running_loop(), asyncio.Queue())
+        with self._lock:
+            self._suscriptores.add(suscriptor)
+        try:
+            async for lote in self._agrupar(suscriptor[1]):
+                yield lote
+        finally:
+            with self._lock:
+                self._suscriptores.discard(suscriptor)
+
+
+class BrokerRedis(BrokerStockBase):
+    """Broker sobre pub/sub de Redis para compartir eventos entre workers/nodos"""
+
+    canal = 'ventasbasico:stock'
+
+    def __init__(self, url=None, **kwargs):
+        super().__init__(**kwargs)
+        try:
+            import redis
+        except ImportError:
+            raise ValueError(
+                "El backend BrokerRedis requiere el paquete redis. "
+                "Instálalo con: pip install redis"
+            )
+        self.url = url or settings.REDIS_URL
+        if not self.url:
+            raise ValueError("REDIS_URL no está configurada para BrokerRedis")
+        self._redis = redis.Redis.from_url(self.url)
+
+    def publicar(self, producto_id, stock):
+        try:
+            self._redis.publish(self.canal, json.dumps([producto_id, stock]))
+        except Exception as e:
+            # Un fallo de Redis no debe romper el checkout
+            logger.error(f"Error publicando evento de stock en Redis: {str(e)}")
+
+    async def suscribir(self):
+        import redis.asyncio as aioredis
+
+        cliente = aioredis.Redis.from_url(self.url)
+        pubsub = cliente.pubsub()
+        await pubsub.subscribe(self.canal)
+        cola = asyncio.Queue()
+
+        async def leer():
+            async for mensaje in pubsub.listen():
+                if mensaje.get('type') == 'message':
+                    producto_id, stock = json.loads(mensaje['data'])
+                    cola.put_nowait((producto_id, stock))
+
+        lector = asyncio.create_task(leer())
+        try:
+            async for lote in self._agrupar(cola):
+                yield lote
+        finally:
+            lector.cancel()
+            await pubsub.unsubscribe(self.canal)
+            await cliente.aclose()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def obtener_broker():
+    """Devuelve el broker configurado (uno por proceso, creado de forma perezosa)"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.STOCK_BROKER_BACKEND)()
+    return _broker
@@ -0,0 +1,226 @@
+"""
+Recomendador local por filtrado colaborativo item-to-item
+No depende de Groq: sirve como modo "local" del endpoint de recomendaciones.
+
+- recalcular_vecinos(): construye la matriz dispersa ventas x productos desde DetalleVenta,
+  calcula la co-ocurrencia (X^T X) y la similitud coseno con SciPy, guarda la matriz en
+  CoocurrenciaProducto y los N mejores vecinos de cada producto en VecinoProducto
+- registrar_venta(): incrementa los pares de una venta nueva en CoocurrenciaProducto y
+  recalcula los vecinos de sus productos (costo según los pares de esos productos, no
+  según el historial de ventas)
+- recomendar_local(): suma los puntajes de los vecinos de lo último que compró el cliente
+  (los últimos productos de su PerfilCliente, sin recorrer sus ventas)
+"""
+import logging
+import math
+from collections import defaultdict
+
+import numpy as np
+from scipy import sparse
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Subquery, Sum
+
+from .models import Productos, DetalleVenta, VecinoProducto, CoocurrenciaProducto
+from .perfiles import obtener_perfil
+
+logger = logging.getLogger(__name__)
+
+TAMANO_LOTE = 5000
+
+
+def _matriz_coocurrencia():
+    """
+    Devuelve (ids_productos, coocurrencias CSR, frecuencias)
+    frecuencias[i] = cantidad de ventas que incluyen el producto i
+    """
+    pares = DetalleVenta.objects.values_list('venta_id', 'producto_id').distinct().order_by()
+    datos = np.fromiter(pares.iterator(chunk_size=TAMANO_LOTE), dtype=[('venta', 'i8'), ('producto', 'i8')])
+    if not len(datos):
+        return np.array([], dtype='i8'), sparse.csr_matrix((0, 0)), np.array([])
+
+    ids_ventas, filas = np.unique(datos['venta'], return_inverse=True)
+    ids_productos, columnas = np.unique(datos['producto'], return_inverse=True)
+
+    # X: ventas x productos (binaria)
+    x = sparse.csr_matrix(
+        (np.ones(len(datos), dtype=np.float32), (filas, columnas)),
+        shape=(len(ids_ventas), len(ids_productos))
+    )
+    x.data[:] = 1
+
+    coocurrencias = (x.T @ x).tocsr()
+    frecuencias = coocurrencias.diagonal()
+    coocurrencias.setdiag(0)
+    coocurrencias.eliminate_zeros()
+    return ids_productos, coocurrencias, frecuencias
+
+
+def recalcular_vecinos(top_n=None):
+    """Reconstruye por completo la tabla de vecinos. Devuelve la cantidad de filas creadas"""
+    top_n = top_n or settings.IA_VECINOS_TOP_N
+    ids_productos, coocurrencias, frecuencias = _matriz_coocurrencia()
+
+    # Similitud coseno: C_ij / sqrt(f_i * f_j), calculada sobre los datos de la matriz dispersa
+    filas = np.repeat(np.arange(coocurrencias.shape[0]), np.diff(coocurrencias.indptr))
+    similitud = coocurrencias.data / np.sqrt(frecuencias[filas] * frecuencias[coocurrencias.indices])
+
+    vecinos = []
+    for fila in range(coocurrencias.shape[0]):
+        inicio, fin = coocurrencias.indptr[fila], coocurrencias.indptr[fila + 1]
+        if inicio == fin:
+            continue
+        mejores = inicio + np.argsort(-similitud[inicio:fin], kind='stable')[:top_n]
+        producto_id = int(ids_productos[fila])
+        vecinos.extend(
+            VecinoProducto(
+                producto_id=producto_id,
+                vecino_id=int(ids_productos[coocurrencias.indices[posicion]]),
+                coocurrencias=int(coocurrencias.data[posicion]),
+                puntaje=float(similitud[posicion])
+            )
+            for posicion in mejores
+        )
+
+    # Matriz completa (pares y diagonal) para las actualizaciones incrementales
+    matriz = coocurrencias.tocoo()
+    pares = [
+        CoocurrenciaProducto(producto_id=int(ids_productos[i]), otro_id=int(ids_productos[j]), ventas=int(v))
+        for i, j, v in zip(matriz.row, matriz.col, matriz.data)
+    ]
+    pares.extend(
+        CoocurrenciaProducto(producto_id=int(producto_id), otro_id=int(producto_id), ventas=int(ventas))
+        for producto_id, ventas in zip(ids_productos, frecuencias)
+    )
+
+    with transaction.atomic():
+        CoocurrenciaProducto.objects.all().delete()
+        CoocurrenciaProducto.objects.bulk_create(pares, batch_size=TAMANO_LOTE)
+        VecinoProducto.objects.all().delete()
+        VecinoProducto.objects.bulk_create(vecinos, batch_size=TAMANO_LOTE)
+
+    logger.info(f"Vecinos recalculados: {len(ids_productos)} productos, {len(vecinos)} pares")
+    return len(vecinos)
+
+
+def registrar_venta(venta_id):
+    """
+    Suma una venta recién confirmada a la matriz de co-ocurrencia y recalcula los vecinos
+    de sus productos
+    Los puntajes que otros productos tienen hacia estos (su frecuencia cambió) se corrigen
+    en el próximo recalcular_vecinos (ej: cron con manage.py recalcular_vecinos)
+    """
+    try:
+        productos = sorted(
+            DetalleVenta.objects.filter(venta_id=venta_id)
+            .values_list('producto_id', flat=True).distinct().order_by()
+        )
+        if not productos:
+            return
+
+        with transaction.atomic():
+            # Todos los pares de la venta, incluida la diagonal (frecuencia de cada producto)
+            CoocurrenciaProducto.objects.bulk_create(
+                [CoocurrenciaProducto(producto_id=p, otro_id=o) for p in productos for o in productos],
+                ignore_conflicts=True
+            )
+            pares = CoocurrenciaProducto.objects.filter(producto_id__in=productos, otro_id__in=productos)
+            # Bloquear en un orden fijo evita deadlocks entre ventas simultáneas con productos en común;
+            # el incremento es atómico en la BD (no se pierden ventas concurrentes)
+            list(pares.select_for_update().order_by('producto_id', 'otro_id').values_list('id', flat=True))
+            pares.update(ventas=F('ventas') + 1)
+            _actualizar_vecinos(productos)
+    except Exception as e:
+        # Nunca romper el checkout por el recomendador
+        logger.error(f"Error actualizando vecinos para la venta {venta_id}: {str(e)}")
+
+
+def _actualizar_vecinos(productos, top_n=None):
+    """Reemplaza los N mejores vecinos de los productos indicados, desde CoocurrenciaProducto"""
+    top_n = top_n or settings.IA_VECINOS_TOP_N
+    filas = CoocurrenciaProducto.objects.filter(producto_id__in=productos)
+    pares = list(filas.exclude(otro_id=F('producto_id')).values_list('producto_id', 'otro_id', 'ventas'))
+    # Frecuencia (diagonal) de los productos y de todos sus pares, en una consulta
+    frecuencias = dict(
+        CoocurrenciaProducto.objects
+        .filter(otro_id=F('producto_id'), producto_id__in=Subquery(filas.values('otro_id')))
+        .values_list('producto_id', 'ventas')
+    )
+
+    candidatos = defaultdict(list)
+    for producto_id, otro_id, ventas in pares:
+        puntaje = ventas / math.sqrt(max(frecuencias.get(producto_id, 1), 1) * max(frecuencias.get(otro_id, 1), 1))
+        candidatos[producto_id].append((-puntaje, otro_id, ventas))
+
+    vecinos = [
+        VecinoProducto(producto_id=producto_id, vecino_id=otro_id, coocurrencias=ventas, puntaje=-puntaje)
+        for producto_id, lista in candidatos.items()
+        for puntaje, otro_id, ventas in sorted(lista)[:top_n]
+    ]
+    VecinoProducto.objects.filter(producto_id__in=productos).delete()
+    VecinoProducto.objects.bulk_create(vecinos)
+
+
+def _confianza(puntaje):
+    if puntaje >= 0.5:
+        return 'alta'
+    if puntaje >= 0.2:
+        return 'media'
+    return 'baja'
+
+
+def recomendar_local(cliente, limite=3, perfil=None):
+    """
+    Recomendaciones sin IA a partir de los vecinos de los últimos productos comprados
+    Devuelve el mismo formato que GroqService.recomendar_productos (ya enriquecido)
+    """
+    perfil = perfil or obtener_perfil(cliente)
+    recientes = [p['id'] for p in (perfil.ultimos_productos or [])[:settings.IA_RECOMENDADOR_HISTORIAL]]
+
+    puntajes = {}
+    if recientes:
+        puntajes = dict(
+            VecinoProducto.objects
+            .filter(producto_id__in=recientes, vecino__stock__gt=0)
+            .exclude(vecino_id__in=recientes)
+            .values_list('vecino_id')
+            .annotate(total=Sum('puntaje'))
+            .order_by('-total')[:limite]
+        )
+        razon = 'Clientes que compraron lo mismo que tú también compraron este producto'
+
+    if not puntajes:
+        # Sin historial o sin vecinos: productos más vendidos con stock
+        puntajes = dict(
+            DetalleVenta.objects
+            .filter(producto__stock__gt=0)
+            .exclude(producto_id__in=recientes)
+            .values_list('producto_id')
+            .annotate(total=Sum('cantidad'))
+            .order_by('-total')[:limite]
+        )
+        maximo = max(puntajes.values(), default=1)
+        puntajes = {pid: 0.2 * total / maximo for pid, total in puntajes.items()}
+        razon = 'Uno de los productos más vendidos de la tienda'
+
+    productos = Productos.objects.filter(id__in=puntajes).values('id', 'nombre', 'codigo', 'precio', 'stock')
+
+    recomendaciones = [
+        {
+            'producto_id': p['id'],
+            'nombre': p['nombre'],
+            'codigo': p['codigo'],
+            'precio': float(p['precio']),
+            'stock': p['stock'],
+            'razon': razon,
+            'confianza': _confianza(puntajes[p['id']])
+        }
+        for p in productos
+    ]
+    recomendaciones.sort(key=lambda r: puntajes[r['producto_id']], reverse=True)
+
+    return {
+        'recomendaciones': recomendaciones,
+        'mensaje': 'Productos recomendados para ti según las compras de otros clientes'
+    }
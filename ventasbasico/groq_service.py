@@ -1,34 +1,170 @@
 """
 Servicio centralizado para interactuar con Groq Cloud API
 Proporciona funcionalidades de IA para el sistema de ventas
+
+Usar obtener_groq_service() en vez de GroqService(): la instancia es única por proceso
+y reutiliza un pool de conexiones HTTP keep-alive (evita pagar TLS en cada llamada).
+
+Cada llamada tiene un plazo total por operación (IA_DEADLINES) que incluye los reintentos,
+y pasa por el circuit breaker del proceso (circuito.py). Si Groq falla se lanza ErrorGroq;
+las vistas responden entonces con su respaldo (descripción guardada, recomendación local
+o respuesta fija del chatbot).
+
+La latencia total, los tokens, los reintentos y los errores de cada llamada se agregan en
+telemetria.py (p50/p95/p99 por operación en GET /api/ia/stats/).
 """
-from groq import Groq
+import asyncio
+import random
+import threading
+import weakref
+from types import SimpleNamespace
+
+import httpx
+from groq import APIConnectionError, APIStatusError, AsyncGroq, Groq, RateLimitError
 from django.conf import settings
 import logging
 import json
+import time
+
+from .circuito import CERRADO, CircuitoAbiertoError, obtener_circuito_groq
+from .prompts import contar_tokens, pares_clave_valor, tabla_con_titulo, tabla_csv
+from .telemetria import obtener_telemetria
 
 logger = logging.getLogger(__name__)
 
 
+class ErrorGroq(Exception):
+    """Groq no respondió (error, plazo agotado o circuito abierto); la causa queda en __cause__"""
+
+
+def es_error_transitorio(error):
+    """Errores que indican que Groq está degradado: conexión, timeout, 429 y 5xx"""
+    if isinstance(error, (APIConnectionError, RateLimitError, asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    return isinstance(error, APIStatusError) and error.status_code >= 500
+
+
 class GroqService:
     """
     Cliente para interactuar con Groq Cloud API
     Utiliza el modelo Llama 3.3 70B para análisis y generación de texto
+    Los métodos con prefijo "a" (ej: achatbot_atencion) son la versión asíncrona
     """
     
+    # Usar Llama 3.3 70B - modelo más reciente (reemplaza a 3.1-70b-versatile)
+    MODELO = "llama-3.3-70b-versatile"
+    
     def __init__(self):
-        """Inicializa el cliente de Groq con la API key desde settings"""
+        """Inicializa el cliente de Groq con la API key y el pool de conexiones desde settings"""
         api_key = getattr(settings, 'GROQ_API_KEY', None)
         if not api_key:
             raise ValueError(
                 "GROQ_API_KEY no está configurada. "
                 "Agrega GROQ_API_KEY=tu_clave en el archivo .env"
             )
-        self.client = Groq(api_key=api_key)
-        # Usar Llama 3.3 70B - modelo más reciente (reemplaza a 3.1-70b-versatile)
-        self.model = "llama-3.3-70b-versatile"
+        self.api_key = api_key
+        self.base_url = settings.GROQ_BASE_URL
+        self.timeout = httpx.Timeout(settings.GROQ_TIMEOUT, connect=settings.GROQ_CONNECT_TIMEOUT)
+        self.limites = httpx.Limits(
+            max_connections=settings.GROQ_MAX_CONEXIONES,
+            max_keepalive_connections=settings.GROQ_MAX_CONEXIONES,
+            keepalive_expiry=settings.GROQ_KEEPALIVE
+        )
+        # Los reintentos los hace _call_groq (con jitter y dentro del plazo), no el SDK
+        self.client = Groq(
+            api_key=api_key,
+            base_url=self.base_url,
+            timeout=self.timeout,
+            max_retries=0,
+            http_client=httpx.Client(limits=self.limites, timeout=self.timeout, follow_redirects=True)
+        )
+        # Un cliente asíncrono por event loop (sus conexiones quedan ligadas al loop que las creó)
+        self._async_clients = weakref.WeakKeyDictionary()
+        self.circuito = obtener_circuito_groq()
+        self.model = self.MODELO
+    
+    @property
+    def async_client(self):
+        """Cliente asíncrono de Groq del event loop actual (se crea al primer uso)"""
+        loop = asyncio.get_running_loop()
+        cliente = self._async_clients.get(loop)
+        if cliente is None:
+            cliente = AsyncGroq(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                timeout=self.timeout,
+                max_retries=0,
+                http_client=httpx.AsyncClient(limits=self.limites, timeout=self.timeout, follow_redirects=True)
+            )
+            self._async_clients[loop] = cliente
+        return cliente
+    
+    # Operaciones que se pueden reintentar: sin efectos en Groq y el cliente aún no recibió nada
+    # (el streaming no se reintenta: los tokens ya enviados no se pueden retirar)
+    IDEMPOTENTES = frozenset({'recomendacion', 'descripcion', 'chatbot'})
+    
+    @staticmethod
+    def _plazo(operacion, timeout=None):
+        """Momento (time.monotonic) en que vence el plazo total de la operación"""
+        return time.monotonic() + (timeout or settings.IA_DEADLINES.get(operacion, settings.GROQ_TIMEOUT))
+    
+    @staticmethod
+    def _timeout_intento(limite):
+        """Timeout del intento: lo que queda del plazo (sin superar GROQ_TIMEOUT)"""
+        restante = limite - time.monotonic()
+        if restante <= 0:
+            raise TimeoutError("plazo agotado")
+        return httpx.Timeout(min(restante, settings.GROQ_TIMEOUT), connect=min(restante, settings.GROQ_CONNECT_TIMEOUT))
+    
+    def _antes_del_intento(self, operacion, inicio_total, intento):
+        try:
+            self.circuito.permitir()
+        except CircuitoAbiertoError as e:
+            logger.warning(f"Groq {operacion} - {str(e)}")
+            # Sin reintentos previos la llamada nunca salió del proceso
+            obtener_telemetria().registrar(operacion, inicio_total, reintentos=intento, error=True, rechazada=not intento)
+            raise ErrorGroq(f"Error en Groq API: {str(e)}") from e
+    
+    def _espera_reintento(self, error, operacion, intento, limite, inicio_total):
+        """
+        Registra el fallo en el circuito y devuelve los segundos a esperar antes de reintentar
+        Lanza ErrorGroq si no corresponde reintentar (error no transitorio, operación no
+        idempotente, sin reintentos disponibles o sin plazo suficiente)
+        """
+        transitorio = es_error_transitorio(error)
+        if transitorio:
+            self.circuito.registrar_fallo()
+        else:
+            # Un 400/401 no indica que Groq esté caído
+            self.circuito.registrar_exito()
+        detalle = str(error) or type(error).__name__
+        
+        espera = None
+        if isinstance(error, RateLimitError):
+            try:
+                espera = float(error.response.headers.get('retry-after'))
+            except (AttributeError, TypeError, ValueError):
+                pass
+        if espera is None:
+            # Backoff exponencial con jitter completo
+            espera = random.uniform(0, settings.GROQ_REINTENTO_BASE * 2 ** intento)
+        
+        if (
+            not transitorio
+            or operacion not in self.IDEMPOTENTES
+            or intento >= settings.GROQ_MAX_REINTENTOS
+            or self.circuito.estado != CERRADO
+            or time.monotonic() + espera >= limite
+        ):
+            logger.error(f"Error llamando a Groq API ({operacion}, intento {intento + 1}): {detalle}")
+            obtener_telemetria().registrar(operacion, inicio_total, reintentos=intento, error=True)
+            # Conservar el error original (ej: RateLimitError) en __cause__
+            raise ErrorGroq(f"Error en Groq API: {detalle}") from error
+        
+        logger.warning(f"Groq {operacion} - reintento {intento + 1} en {espera:.2f}s: {detalle}")
+        return espera
     
-    def _call_groq(self, messages, temperature=0.7, max_tokens=1024):
+    def _call_groq(self, messages, temperature=0.7, max_tokens=1024, timeout=None, operacion='general'):
         """
         Método interno para realizar llamadas a Groq API
         
@@ -36,23 +172,105 @@ class GroqService:
             messages: Lista de mensajes en formato ChatML
             temperature: Controla la aleatoriedad (0-2)
             max_tokens: Máximo de tokens en la respuesta
+            timeout: Plazo total en segundos incluyendo reintentos (opcional, default IA_DEADLINES[operacion])
+            operacion: Nombre de la funcionalidad (plazo, reintentos y log de tokens)
         
         Returns:
             str: Respuesta generada por el modelo
+        
+        Raises:
+            ErrorGroq: Si Groq falla, se agota el plazo o el circuito está abierto
         """
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_tokens,
-                top_p=1,
-                stream=False
-            )
+        limite = self._plazo(operacion, timeout)
+        inicio_total = time.perf_counter()
+        intento = 0
+        while True:
+            self._antes_del_intento(operacion, inicio_total, intento)
+            inicio = time.perf_counter()
+            try:
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    top_p=1,
+                    stream=False,
+                    timeout=self._timeout_intento(limite)
+                )
+            except Exception as e:
+                time.sleep(self._espera_reintento(e, operacion, intento, limite, inicio_total))
+                intento += 1
+                continue
+            self.circuito.registrar_exito()
+            self._registrar_uso(operacion, messages, response, inicio)
+            obtener_telemetria().registrar(operacion, inicio_total, getattr(response, 'usage', None), intento)
             return response.choices[0].message.content
-        except Exception as e:
-            logger.error(f"Error llamando a Groq API: {str(e)}")
-            raise Exception(f"Error en Groq API: {str(e)}")
+    
+    async def _acall_groq(self, messages, temperature=0.7, max_tokens=1024, timeout=None, operacion='general'):
+        """Versión asíncrona de _call_groq (el plazo además se corta con asyncio.wait_for)"""
+        limite = self._plazo(operacion, timeout)
+        inicio_total = time.perf_counter()
+        intento = 0
+        while True:
+            self._antes_del_intento(operacion, inicio_total, intento)
+            inicio = time.perf_counter()
+            try:
+                response = await asyncio.wait_for(
+                    self.async_client.chat.completions.create(
+                        model=self.model,
+                        messages=messages,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        top_p=1,
+                        stream=False,
+                        timeout=self._timeout_intento(limite)
+                    ),
+                    timeout=max(limite - time.monotonic(), 0)
+                )
+            except Exception as e:
+                await asyncio.sleep(self._espera_reintento(e, operacion, intento, limite, inicio_total))
+                intento += 1
+                continue
+            self.circuito.registrar_exito()
+            self._registrar_uso(operacion, messages, response, inicio)
+            obtener_telemetria().registrar(operacion, inicio_total, getattr(response, 'usage', None), intento)
+            return response.choices[0].message.content
+    
+    @staticmethod
+    def _registrar_uso(operacion, messages, response, inicio):
+        """Registra en el log los tokens usados (reales y estimados) y la duración de la llamada"""
+        uso = getattr(response, 'usage', None)
+        estimados = sum(contar_tokens(m['content']) for m in messages)
+        if uso is None:
+            logger.info(f"Groq {operacion} - tokens estimados del prompt: {estimados}")
+            return
+        logger.info(
+            f"Groq {operacion} - tokens prompt: {uso.prompt_tokens} (estimados: {estimados}), "
+            f"respuesta: {uso.completion_tokens}, total: {uso.total_tokens}, "
+            f"{(time.perf_counter() - inicio) * 1000:.0f} ms"
+        )
+    
+    @staticmethod
+    def _parsear_json(response, respaldo):
+        """
+        Parsea la respuesta JSON del modelo (quitando los bloques ```json si vienen)
+        Si no es JSON válido devuelve la respuesta de respaldo
+        """
+        try:
+            # Limpiar respuesta y parsear JSON
+            response_clean = response.strip()
+            if response_clean.startswith("```json"):
+                response_clean = response_clean[7:]
+            if response_clean.startswith("```"):
+                response_clean = response_clean[3:]
+            if response_clean.endswith("```"):
+                response_clean = response_clean[:-3]
+            
+            return json.loads(response_clean.strip())
+        except json.JSONDecodeError as e:
+            logger.error(f"Error parseando respuesta JSON: {str(e)}")
+            logger.error(f"Respuesta recibida: {response}")
+            return respaldo
     
     def recomendar_productos(self, historial_cliente, productos_disponibles, limite=3):
         """
@@ -60,7 +278,7 @@ class GroqService:
         
         Args:
             historial_cliente: Dict con información de compras previas
-            productos_disponibles: Lista de productos disponibles en tienda
+            productos_disponibles: Lista de productos candidatos (preseleccionados localmente)
             limite: Número máximo de productos a recomendar
         
         Returns:
@@ -76,22 +294,46 @@ class GroqService:
                 "mensaje": str
             }
         """
-        # Construir prompt con contexto - optimizado para listas grandes
-        total_productos = len(productos_disponibles)
+        messages = self._mensajes_recomendacion(historial_cliente, productos_disponibles, limite)
+        response = self._call_groq(messages, temperature=0.3, max_tokens=1024, operacion='recomendacion')
+        return self._parsear_json(response, self._respaldo_recomendacion())
+    
+    async def arecomendar_productos(self, historial_cliente, productos_disponibles, limite=3):
+        """Versión asíncrona de recomendar_productos (vistas ASGI)"""
+        messages = self._mensajes_recomendacion(historial_cliente, productos_disponibles, limite)
+        response = await self._acall_groq(messages, temperature=0.3, max_tokens=1024, operacion='recomendacion')
+        return self._parsear_json(response, self._respaldo_recomendacion())
+    
+    def _mensajes_recomendacion(self, historial_cliente, productos_disponibles, limite):
+        """Construye los mensajes del recomendador"""
+        # Construir prompt con contexto - los candidatos ya vienen preseleccionados (top-K)
+        # Tablas CSV compactas: un tercio del presupuesto de tokens para el historial y el resto para candidatos
+        presupuesto = settings.IA_PROMPT_PRESUPUESTO_TOKENS
+        compras = historial_cliente.get('compras') or []
+        historial_texto = f"Cliente: {historial_cliente.get('cliente', '')}\n"
+        if (historial_cliente.get('perfil') or {}).get('compras'):
+            historial_texto += f"Perfil: {pares_clave_valor(historial_cliente['perfil'])}\n"
+        if compras:
+            historial_texto += tabla_csv(compras, ['producto', 'cantidad', 'fecha'], presupuesto // 3)[0]
+        else:
+            historial_texto += "Sin compras previas"
+        candidatos_texto, total_productos = tabla_csv(
+            productos_disponibles, ['id', 'nombre', 'codigo', 'precio', 'stock'], presupuesto - presupuesto // 3
+        )
         
         prompt = f"""Eres un asistente de ventas experto. Analiza el historial de compras del cliente y recomienda {limite} productos que podrían interesarle.
 
-HISTORIAL DE COMPRAS DEL CLIENTE:
-{json.dumps(historial_cliente, indent=2, ensure_ascii=False)}
+HISTORIAL DE COMPRAS DEL CLIENTE (CSV):
+{historial_texto}
 
-CATÁLOGO COMPLETO DE PRODUCTOS DISPONIBLES ({total_productos} productos en total):
-{json.dumps(productos_disponibles, indent=2, ensure_ascii=False)}
+PRODUCTOS CANDIDATOS ({total_productos} productos preseleccionados según el historial y la popularidad, CSV; "id" es el producto_id):
+{candidatos_texto}
 
 INSTRUCCIONES IMPORTANTES:
-1. Tienes acceso a TODOS los {total_productos} productos del catálogo
+1. Elige entre los {total_productos} productos candidatos (están ordenados de más a menos afín)
 2. Recomienda EXACTAMENTE {limite} productos diferentes
-3. Usa SOLO productos que existen en el catálogo proporcionado
-4. Verifica que los producto_id coincidan exactamente con los del catálogo
+3. Usa SOLO productos que existen en la lista de candidatos
+4. Verifica que los producto_id coincidan exactamente con los de la lista
 5. Basa tus recomendaciones en patrones de compra del cliente
 6. Si el cliente no tiene historial, recomienda productos populares o variados
 7. Para cada producto, explica brevemente por qué lo recomiendas
@@ -121,28 +363,14 @@ FORMATO DE RESPUESTA (JSON):
                 "content": prompt
             }
         ]
-        
-        try:
-            response = self._call_groq(messages, temperature=0.3, max_tokens=1024)
-            
-            # Limpiar respuesta y parsear JSON
-            response_clean = response.strip()
-            if response_clean.startswith("```json"):
-                response_clean = response_clean[7:]
-            if response_clean.startswith("```"):
-                response_clean = response_clean[3:]
-            if response_clean.endswith("```"):
-                response_clean = response_clean[:-3]
-            
-            resultado = json.loads(response_clean.strip())
-            return resultado
-        except json.JSONDecodeError as e:
-            logger.error(f"Error parseando respuesta JSON: {str(e)}")
-            logger.error(f"Respuesta recibida: {response}")
-            return {
-                "recomendaciones": [],
-                "mensaje": "No se pudieron generar recomendaciones en este momento."
-            }
+        return messages
+    
+    @staticmethod
+    def _respaldo_recomendacion():
+        return {
+            "recomendaciones": [],
+            "mensaje": "No se pudieron generar recomendaciones en este momento."
+        }
     
     def generar_descripcion_producto(self, nombre_producto, caracteristicas=None):
         """
@@ -161,9 +389,21 @@ FORMATO DE RESPUESTA (JSON):
                 "beneficios": [str]        # Lista de beneficios
             }
         """
+        messages = self._mensajes_descripcion(nombre_producto, caracteristicas)
+        response = self._call_groq(messages, temperature=0.7, max_tokens=800, operacion='descripcion')
+        return self._parsear_json(response, self._respaldo_descripcion(nombre_producto))
+    
+    async def agenerar_descripcion_producto(self, nombre_producto, caracteristicas=None):
+        """Versión asíncrona de generar_descripcion_producto (vistas ASGI)"""
+        messages = self._mensajes_descripcion(nombre_producto, caracteristicas)
+        response = await self._acall_groq(messages, temperature=0.7, max_tokens=800, operacion='descripcion')
+        return self._parsear_json(response, self._respaldo_descripcion(nombre_producto))
+    
+    def _mensajes_descripcion(self, nombre_producto, caracteristicas=None):
+        """Construye los mensajes del generador de descripciones"""
         caract_text = ""
         if caracteristicas:
-            caract_text = f"\n\nCARACTERÍSTICAS ADICIONALES:\n{json.dumps(caracteristicas, indent=2, ensure_ascii=False)}"
+            caract_text = f"\n\nCARACTERÍSTICAS ADICIONALES: {pares_clave_valor(caracteristicas)}"
         
         prompt = f"""Eres un experto en marketing y copywriting. Genera una descripción atractiva y profesional para este producto:
 
@@ -200,49 +440,58 @@ FORMATO DE RESPUESTA (JSON):
                 "content": prompt
             }
         ]
-        
-        try:
-            response = self._call_groq(messages, temperature=0.7, max_tokens=800)
-            
-            # Limpiar y parsear JSON
-            response_clean = response.strip()
-            if response_clean.startswith("```json"):
-                response_clean = response_clean[7:]
-            if response_clean.startswith("```"):
-                response_clean = response_clean[3:]
-            if response_clean.endswith("```"):
-                response_clean = response_clean[:-3]
-            
-            resultado = json.loads(response_clean.strip())
-            return resultado
-        except json.JSONDecodeError as e:
-            logger.error(f"Error parseando respuesta JSON: {str(e)}")
-            logger.error(f"Respuesta recibida: {response}")
-            return {
-                "descripcion_corta": f"Producto de calidad: {nombre_producto}",
-                "descripcion_larga": f"{nombre_producto} - Descripción no disponible temporalmente.",
-                "palabras_clave": [nombre_producto.lower()],
-                "beneficios": ["Producto de calidad", "Entrega rápida", "Garantía incluida"]
-            }
+        return messages
     
-    def chatbot_atencion(self, mensaje_usuario, contexto=None):
+    @staticmethod
+    def _respaldo_descripcion(nombre_producto):
+        return {
+            "descripcion_corta": f"Producto de calidad: {nombre_producto}",
+            "descripcion_larga": f"{nombre_producto} - Descripción no disponible temporalmente.",
+            "palabras_clave": [nombre_producto.lower()],
+            "beneficios": ["Producto de calidad", "Entrega rápida", "Garantía incluida"],
+            "fallback": True  # No es una respuesta real del modelo (no se debe cachear)
+        }
+    
+    # Instrucciones finales del prompt del chatbot según el formato de salida
+    INSTRUCCIONES_CHATBOT_JSON = """6. Sugiere 2-3 preguntas de follow-up que el cliente podría hacer
+7. Clasifica el tipo de consulta
+8. Responde SOLO en formato JSON válido
+
+FORMATO DE RESPUESTA (JSON):
+{
+    "respuesta": "Tu respuesta completa al cliente",
+    "tipo": "informacion|consulta_venta|consulta_producto|politicas|otro",
+    "requiere_humano": false,
+    "sugerencias": [
+        "¿Pregunta relacionada 1?",
+        "¿Pregunta relacionada 2?"
+    ]
+}
+"""
+    
+    INSTRUCCIONES_CHATBOT_TEXTO = """6. Responde directamente en texto plano, sin JSON ni markdown
+7. Sé breve: máximo 3 párrafos cortos
+"""
+    
+    def _mensajes_chatbot(self, mensaje_usuario, contexto=None, streaming=False):
         """
-        Chatbot para atención al cliente
-        Responde preguntas sobre productos, ventas, políticas, etc.
+        Construye los mensajes del chatbot (compartido por la versión JSON y la de streaming)
         
         Args:
             mensaje_usuario: Pregunta o mensaje del usuario
             contexto: Dict opcional con información relevante
-                     (ej: {"productos": [...], "venta": {...}})
+            streaming: Si es True se pide texto plano (se envía al cliente token a token)
         
         Returns:
-            dict: {
-                "respuesta": str,
-                "tipo": "informacion|consulta_venta|consulta_producto|otro",
-                "requiere_humano": bool,
-                "sugerencias": [str]  # Sugerencias de follow-up
-            }
+            list: Mensajes en formato ChatML
         """
+        if streaming:
+            instrucciones = self.INSTRUCCIONES_CHATBOT_TEXTO
+            sistema = "Eres un asistente virtual de atención al cliente amable, profesional y servicial. Respondes en texto plano y en español."
+        else:
+            instrucciones = self.INSTRUCCIONES_CHATBOT_JSON
+            sistema = "Eres un asistente virtual de atención al cliente amable, profesional y servicial. Siempre respondes en formato JSON válido y en español."
+        
         contexto_text = ""
         total_productos_info = ""
         
@@ -251,7 +500,7 @@ FORMATO DE RESPUESTA (JSON):
             if 'total_productos' in contexto:
                 total_productos_info = f"\n- Tenemos {contexto['total_productos']} productos diferentes en catálogo"
             
-            contexto_text = f"\n\nCONTEXTO DISPONIBLE:\n{json.dumps(contexto, indent=2, ensure_ascii=False)}"
+            contexto_text = f"\n\nCONTEXTO DISPONIBLE:\n{self._texto_contexto_chatbot(contexto)}"
         
         prompt = f"""Eres un asistente virtual de atención al cliente para una tienda de ventas. Tu objetivo es ayudar a los clientes de manera amable y profesional.
 
@@ -267,56 +516,158 @@ INFORMACIÓN DE LA TIENDA:
 INSTRUCCIONES IMPORTANTES:
 1. Responde de manera clara, amable y profesional
 2. Si tienes información en el CONTEXTO (productos, ventas), úsala para respuestas precisas
-3. Si preguntan por productos disponibles, usa la lista completa del CONTEXTO
+3. Si preguntan por productos disponibles, usa la lista del CONTEXTO (si está recortada, menciona que hay más productos)
 4. Puedes mencionar productos específicos del catálogo si es relevante
 5. Si no puedes responder, indica que se requiere atención humana
-6. Sugiere 2-3 preguntas de follow-up que el cliente podría hacer
-7. Clasifica el tipo de consulta
-8. Responde SOLO en formato JSON válido
-
-FORMATO DE RESPUESTA (JSON):
-{{
-    "respuesta": "Tu respuesta completa al cliente",
-    "tipo": "informacion|consulta_venta|consulta_producto|politicas|otro",
-    "requiere_humano": false,
-    "sugerencias": [
-        "¿Pregunta relacionada 1?",
-        "¿Pregunta relacionada 2?"
-    ]
-}}
-"""
+{instrucciones}"""
         
         messages = [
             {
                 "role": "system",
-                "content": "Eres un asistente virtual de atención al cliente amable, profesional y servicial. Siempre respondes en formato JSON válido y en español."
+                "content": sistema
             },
             {
                 "role": "user",
                 "content": prompt
             }
         ]
+        return messages
+    
+    @staticmethod
+    def _texto_contexto_chatbot(contexto):
+        """Contexto del chatbot en formato compacto (datos clave: valor y tablas CSV)"""
+        partes = []
+        venta = contexto.get('venta')
+        if venta:
+            partes.append("VENTA: " + pares_clave_valor({k: v for k, v in venta.items() if k != 'productos'}))
+            partes.append(tabla_csv(venta.get('productos', []), ['nombre', 'cantidad', 'precio'])[0])
+        if contexto.get('producto'):
+            partes.append("PRODUCTO CONSULTADO: " + pares_clave_valor(contexto['producto']))
+        cliente = contexto.get('cliente')
+        if cliente:
+            partes.append("CLIENTE: " + pares_clave_valor({k: v for k, v in cliente.items() if k != 'ultimos_productos'}))
+            if cliente.get('ultimos_productos'):
+                partes.append(tabla_csv(cliente['ultimos_productos'], ['producto', 'cantidad', 'fecha'])[0])
+        if 'productos_disponibles' in contexto:
+            partes.append(tabla_con_titulo(
+                "PRODUCTOS DISPONIBLES",
+                contexto['productos_disponibles'],
+                ['id', 'nombre', 'codigo', 'precio', 'stock'],
+                total=contexto.get('total_productos')
+            )[0])
+        otros = {k: v for k, v in contexto.items() if k not in ('venta', 'producto', 'cliente', 'productos_disponibles', 'total_productos')}
+        if otros:
+            partes.append(json.dumps(otros, ensure_ascii=False, separators=(',', ':'), default=str))
+        return '\n'.join(partes)
+    
+    def chatbot_atencion(self, mensaje_usuario, contexto=None):
+        """
+        Chatbot para atención al cliente
+        Responde preguntas sobre productos, ventas, políticas, etc.
         
-        try:
-            response = self._call_groq(messages, temperature=0.5, max_tokens=1024)
-            
-            # Limpiar y parsear JSON
-            response_clean = response.strip()
-            if response_clean.startswith("```json"):
-                response_clean = response_clean[7:]
-            if response_clean.startswith("```"):
-                response_clean = response_clean[3:]
-            if response_clean.endswith("```"):
-                response_clean = response_clean[:-3]
-            
-            resultado = json.loads(response_clean.strip())
-            return resultado
-        except json.JSONDecodeError as e:
-            logger.error(f"Error parseando respuesta JSON: {str(e)}")
-            logger.error(f"Respuesta recibida: {response}")
-            return {
-                "respuesta": "Disculpa, estoy teniendo problemas técnicos. Por favor, contacta a nuestro equipo directamente en ventas@tienda.cl o llama al +56 9 1234 5678.",
-                "tipo": "otro",
-                "requiere_humano": True,
-                "sugerencias": []
+        Args:
+            mensaje_usuario: Pregunta o mensaje del usuario
+            contexto: Dict opcional con información relevante
+                     (ej: {"productos": [...], "venta": {...}})
+        
+        Returns:
+            dict: {
+                "respuesta": str,
+                "tipo": "informacion|consulta_venta|consulta_producto|otro",
+                "requiere_humano": bool,
+                "sugerencias": [str]  # Sugerencias de follow-up
             }
+        """
+        messages = self._mensajes_chatbot(mensaje_usuario, contexto)
+        response = self._call_groq(messages, temperature=0.5, max_tokens=1024, operacion='chatbot')
+        return self._parsear_json(response, self._respaldo_chatbot())
+    
+    async def achatbot_atencion(self, mensaje_usuario, contexto=None):
+        """Versión asíncrona de chatbot_atencion (vistas ASGI)"""
+        messages = self._mensajes_chatbot(mensaje_usuario, contexto)
+        response = await self._acall_groq(messages, temperature=0.5, max_tokens=1024, operacion='chatbot')
+        return self._parsear_json(response, self._respaldo_chatbot())
+    
+    @staticmethod
+    def _respaldo_chatbot():
+        return {
+            "respuesta": "Disculpa, estoy teniendo problemas técnicos. Por favor, contacta a nuestro equipo directamente en ventas@tienda.cl o llama al +56 9 1234 5678.",
+            "tipo": "otro",
+            "requiere_humano": True,
+            "sugerencias": []
+        }
+    
+    async def chatbot_atencion_stream(self, mensaje_usuario, contexto=None, timeout=None):
+        """
+        Versión en streaming del chatbot: entrega la respuesta a medida que el modelo la genera
+        No se reintenta; el plazo (default IA_DEADLINES['chatbot_stream']) cubre todo el stream.
+        
+        Args:
+            mensaje_usuario: Pregunta o mensaje del usuario
+            contexto: Dict opcional con información relevante
+            timeout: Plazo total en segundos (opcional)
+        
+        Yields:
+            str: Fragmentos de texto de la respuesta
+        
+        Raises:
+            ErrorGroq: Si Groq falla, se agota el plazo o el circuito está abierto
+        """
+        messages = self._mensajes_chatbot(mensaje_usuario, contexto, streaming=True)
+        limite = self._plazo('chatbot_stream', timeout)
+        
+        inicio = time.perf_counter()
+        self._antes_del_intento('chatbot_stream', inicio, 0)
+        try:
+            stream = await asyncio.wait_for(
+                self.async_client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=0.5,
+                    max_tokens=1024,
+                    top_p=1,
+                    stream=True,
+                    timeout=self._timeout_intento(limite)
+                ),
+                timeout=max(limite - time.monotonic(), 0)
+            )
+            uso = None
+            terminado = False
+            chunks = aiter(stream)
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(anext(chunks), timeout=max(limite - time.monotonic(), 0))
+                except StopAsyncIteration:
+                    break
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+                if chunk.choices and chunk.choices[0].finish_reason:
+                    terminado = True
+                # Groq envía el uso de tokens en el último chunk (x_groq.usage)
+                uso = getattr(getattr(chunk, 'x_groq', None), 'usage', None) or uso
+            if not terminado:
+                # El SDK termina sin error si la conexión se corta a mitad del stream
+                raise ConnectionError("el stream terminó sin finish_reason (conexión cortada)")
+        except Exception as e:
+            # chatbot_stream no es idempotente: registra el fallo y lanza ErrorGroq
+            self._espera_reintento(e, 'chatbot_stream', 0, limite, inicio)
+        self.circuito.registrar_exito()
+        self._registrar_uso('chatbot_stream', messages, SimpleNamespace(usage=uso) if uso else None, inicio)
+        obtener_telemetria().registrar('chatbot_stream', inicio, uso)
+
+
+_servicio = None
+_servicio_lock = threading.Lock()
+
+
+def obtener_groq_service():
+    """
+    Devuelve el GroqService del proceso (se crea al primer uso y se reutiliza)
+    Así todas las vistas comparten el pool de conexiones keep-alive hacia Groq
+    """
+    global _servicio
+    if _servicio is None:
+        with _servicio_lock:
+            if _servicio is None:
+                _servicio = GroqService()
+    return _servicio
@@ -0,0 +1,251 @@
+"""
+Router local de intenciones del chatbot
+Las preguntas de precio, stock o estado de una compra se responden con una consulta a la
+BD, sin llamar a la IA ni enviarle el catálogo completo. Solo las preguntas abiertas
+siguen hacia Groq.
+
+- La intención se detecta con expresiones regulares sobre el texto normalizado
+- El producto se resuelve con el índice de autocompletado (prefijos) y, si hay errores
+  de tipeo, con difflib sobre las palabras de los nombres
+- La respuesta tiene el mismo formato que GroqService.chatbot_atencion
+- El estado de una compra solo se informa si el request trae el RUT del cliente que la
+  hizo (contexto "rut_cliente"): los números de venta son correlativos y el chat no
+  requiere login
+"""
+import difflib
+import logging
+import re
+import threading
+from collections import Counter
+
+from .autocompletado import normalizar, obtener_indice
+from .cache_chatbot import STOPWORDS, tokenizar
+from .models import Productos, Venta, DetalleVenta
+
+logger = logging.getLogger(__name__)
+
+PRECIO = re.compile(r'\b(cuanto (cuesta|cuestan|vale|valen|sale|salen)|precios?|valor(es)?|costos?|cuesta|cuestan|vale|valen)\b')
+STOCK = re.compile(r'\b(stock|quedan?|disponibles?|disponibilidad|existencias?|agotados?)\b')
+# Demasiado genéricas ("¿tienen envío gratis?"): solo cuentan si nombran un producto del catálogo
+STOCK_GENERICA = re.compile(r'\b(hay|tienen|tiene)\b')
+VENTA = re.compile(r'\b(pedidos?|compras?|boletas?|ventas?|orden(es)?|estado|llega|despachad[oa])\b')
+NUMERO_VENTA = re.compile(r'\b\d{8}-\d{4}\b')
+
+# Preguntas que piden opinión o comparación: siempre van a la IA
+ABIERTA = re.compile(r'\b(recomienda\w*|recomendar|mejor(es)?|diferencias?|compar\w*|sirven?|opinion|conviene|regalo)\b')
+
+# Palabras de las intenciones que no forman parte del nombre del producto
+PALABRAS_INTENCION = frozenset("""
+cuanto cuesta cuestan vale valen sale salen precio precios valor valores costo costos
+stock hay tienen tiene queda quedan disponible disponibles disponibilidad existencia
+existencias agotado agotados unidades producto productos
+""".split())
+
+MAX_PALABRAS = 12
+MAX_PRODUCTOS = 3
+
+SUGERENCIAS_PRODUCTO = ["¿Cuánto demora el despacho?", "¿Qué métodos de pago aceptan?"]
+SUGERENCIAS_VENTA = ["¿Cuánto demora el despacho?", "¿Cómo puedo devolver un producto?"]
+SUGERENCIAS_IDENTIFICACION = ["¿Cuánto demora el despacho?", "¿Qué métodos de pago aceptan?"]
+
+_metricas = Counter()
+_metricas_lock = threading.Lock()
+
+
+def _contar(clave):
+    with _metricas_lock:
+        _metricas[clave] += 1
+
+
+def metricas():
+    """Respuestas resueltas localmente por intención y derivadas a la IA (por proceso)"""
+    with _metricas_lock:
+        return dict(_metricas)
+
+
+def _pesos(valor):
+    """Formato chileno: 12990 -> "$12.990" """
+    return '$' + f"{valor:,.0f}".replace(',', '.')
+
+
+def _respuesta(texto, tipo, sugerencias):
+    return {
+        'respuesta': texto,
+        'tipo': tipo,
+        'requiere_humano': False,
+        'sugerencias': sugerencias
+    }
+
+
+def _frase_producto(texto):
+    """Quita las palabras de la intención y los stopwords de los extremos ("el cafe de grano")"""
+    palabras = [p for p in re.findall(r'\w+', texto) if p not in PALABRAS_INTENCION]
+    while palabras and palabras[0] in STOPWORDS:
+        palabras.pop(0)
+    while palabras and palabras[-1] in STOPWORDS:
+        palabras.pop()
+    return palabras
+
+
+def resolver_productos(palabras, limite=MAX_PRODUCTOS, exacto=False):
+    """
+    Devuelve los IDs de los productos mencionados, de más a menos probable
+
+    1. La frase completa como prefijo ("cafe de grano")
+    2. Cada palabra como prefijo; ganan los productos que coinciden con más palabras
+    3. Palabras sin resultados se corrigen con difflib contra el vocabulario de nombres
+
+    Con exacto=True solo se usa el paso 1 (sin coincidencias parciales ni corrección)
+    """
+    if not palabras:
+        return []
+
+    indice = obtener_indice()
+    encontrados = indice.buscar(' '.join(palabras), limite=limite)
+    if encontrados or exacto:
+        return [p['id'] for p in encontrados]
+
+    vocabulario = None
+    coincidencias = Counter()
+    orden = {}
+    for palabra in palabras:
+        if palabra in STOPWORDS or len(palabra) < 3:
+            continue
+        resultados = indice.buscar(palabra, limite=50)
+        if not resultados:
+            if vocabulario is None:
+                vocabulario = {w for p in indice.productos() for w in normalizar(p['nombre']).split()}
+            corregida = difflib.get_close_matches(palabra, vocabulario, n=1, cutoff=0.75)
+            if corregida:
+                resultados = indice.buscar(corregida[0], limite=50)
+        for posicion, producto in enumerate(resultados):
+            coincidencias[producto['id']] += 1
+            orden.setdefault(producto['id'], posicion)
+
+    if not coincidencias:
+        return []
+    maximo = max(coincidencias.values())
+    mejores = [pid for pid, total in coincidencias.items() if total == maximo]
+    return sorted(mejores, key=orden.get)[:limite]
+
+
+def productos_relevantes(mensaje, limite):
+    """
+    IDs de productos para el contexto de preguntas abiertas, de más a menos relevante:
+    primero los que coinciden con palabras de la pregunta y luego los más vendidos con stock
+    """
+    indice = obtener_indice()
+    coincidencias = Counter()
+    for termino in dict.fromkeys(tokenizar(mensaje)):
+        if len(termino) >= 3:
+            coincidencias.update(p['id'] for p in indice.buscar(termino, limite=limite))
+    # Counter.most_common mantiene el orden de inserción (popularidad) entre empates
+    ids = [pid for pid, _ in coincidencias.most_common()]
+    ids.extend(p['id'] for p in indice.populares(limite) if p['id'] not in coincidencias)
+    return ids[:limite]
+
+
+def _responder_producto(intenciones, producto_ids):
+    productos = {
+        p['id']: p
+        for p in Productos.objects.filter(id__in=producto_ids).values('id', 'nombre', 'codigo', 'precio', 'stock')
+    }
+    productos = [productos[pid] for pid in producto_ids if pid in productos]
+    if not productos:
+        return None
+
+    lineas = []
+    for p in productos:
+        partes = []
+        if 'precio' in intenciones:
+            partes.append(f"precio {_pesos(p['precio'])}")
+        if 'stock' in intenciones:
+            partes.append(f"{p['stock']} unidades disponibles" if p['stock'] > 0 else "sin stock por ahora")
+        lineas.append(f"{p['nombre']} (código {p['codigo']}): {' y '.join(partes)}.")
+
+    if len(lineas) == 1:
+        texto = lineas[0]
+    else:
+        texto = "Encontré estos productos:\n" + '\n'.join(f"- {linea}" for linea in lineas)
+    return _respuesta(texto, 'consulta_producto', SUGERENCIAS_PRODUCTO)
+
+
+def _responder_venta(numero, rut_cliente):
+    venta = None
+    if rut_cliente:
+        venta = Venta.objects.filter(numero=numero, rut_cliente_id=rut_cliente).values('numero', 'fecha', 'total').first()
+    if venta is None:
+        # Misma respuesta si la compra no existe o es de otro cliente: no confirma qué números existen
+        return _respuesta(
+            f"Para consultar la compra {numero} necesitamos identificarte: indícanos el RUT con que la "
+            f"hiciste y revisa el número que aparece en tu boleta.",
+            'consulta_venta',
+            SUGERENCIAS_IDENTIFICACION
+        )
+
+    items = ', '.join(
+        f"{d['cantidad']} x {d['producto__nombre']}"
+        for d in DetalleVenta.objects.filter(venta__numero=numero).values('cantidad', 'producto__nombre')
+    )
+    texto = (
+        f"Tu compra {venta['numero']} del {venta['fecha'].strftime('%d-%m-%Y')} por {_pesos(venta['total'])} "
+        f"está registrada e incluye: {items}. El despacho demora 24-48 horas en Santiago y 3-5 días en regiones."
+    )
+    return _respuesta(texto, 'consulta_venta', SUGERENCIAS_VENTA)
+
+
+def responder_localmente(mensaje, contexto_extra=None):
+    """
+    Responde la pregunta sin IA si es de precio, stock o estado de una compra
+
+    Args:
+        mensaje: Pregunta del usuario
+        contexto_extra: Dict opcional del request con "venta_numero", "producto_id" y/o
+            "rut_cliente" (el estado de una compra solo se informa a su cliente)
+
+    Returns:
+        dict | None: Respuesta del chatbot, o None si la pregunta debe ir a la IA
+    """
+    contexto_extra = contexto_extra if isinstance(contexto_extra, dict) else {}
+    texto = normalizar(str(mensaje))
+    if not texto or len(texto.split()) > MAX_PALABRAS or ABIERTA.search(texto):
+        _contar('derivadas_ia')
+        return None
+
+    # Estado de una compra: número en el mensaje o en el contexto
+    numero = NUMERO_VENTA.search(texto)
+    if numero or (contexto_extra.get('venta_numero') and VENTA.search(texto)):
+        _contar('estado_venta')
+        return _responder_venta(
+            numero.group() if numero else str(contexto_extra['venta_numero']),
+            contexto_extra.get('rut_cliente')
+        )
+
+    intenciones = set()
+    if PRECIO.search(texto):
+        intenciones.add('precio')
+    if STOCK.search(texto) or STOCK_GENERICA.search(texto):
+        intenciones.add('stock')
+    if not intenciones:
+        _contar('derivadas_ia')
+        return None
+
+    if contexto_extra.get('producto_id'):
+        try:
+            producto_ids = [int(contexto_extra['producto_id'])]
+        except (TypeError, ValueError):
+            producto_ids = []
+    else:
+        # Con solo "hay/tienen" la frase debe nombrar un producto, sin corrección de tipeo
+        generica = intenciones == {'stock'} and not STOCK.search(texto)
+        producto_ids = resolver_productos(_frase_producto(texto), exacto=generica)
+
+    resultado = _responder_producto(intenciones, producto_ids) if producto_ids else None
+    if resultado is None:
+        # Intención clara pero sin producto identificable ("¿qué productos hay?")
+        _contar('derivadas_ia')
+        return None
+
+    _contar('+'.join(sorted(intenciones)))
+    logger.info(f"Chatbot - respuesta local ({', '.join(sorted(intenciones))}) para: {mensaje}")
+    return resultado
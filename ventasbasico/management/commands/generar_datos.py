@@ -0,0 +1,400 @@
+"""
+Genera datos sintéticos (clientes, productos y ventas) para desarrollo y pruebas de carga
+Ejecutar: python manage.py generar_datos [--clientes 1000] [--productos 200] [--ventas 20000]
+                                         [--semilla 42] [--dias 365] [--imagenes]
+
+- Clientes con RUT válido (dígito verificador módulo 11), distintos de los ya existentes
+- Productos con nombre, precio en pesos, stock y palabras clave; con --imagenes, foto PNG.
+  Los códigos siguen al mayor código numérico existente, asignados en una sola consulta
+  (no se pasa por Productos.save(), que recorre todos los códigos por cada producto)
+- Ventas repartidas en los últimos --dias días con estacionalidad (diciembre, fiestas
+  patrias, fines de semana), entre 1 y --max-items productos por venta, con productos y
+  clientes de popularidad desigual (pocos concentran muchas ventas, como en la realidad).
+  Se venden los productos y clientes de toda la BD, no solo los recién generados
+- Con la misma semilla y la misma BD inicial genera exactamente los mismos datos
+
+Las filas se insertan por lotes con bulk_create (en PostgreSQL con COPY, varias veces más
+rápido: 10 millones de DetalleVenta en pocos minutos). Como no se pasa por save() ni por las
+señales, el stock no se descuenta y al terminar se invalida el índice de autocompletado y los
+perfiles de los clientes con ventas nuevas (se recalculan al consultarlos, o de inmediato con
+--perfiles). Los vecinos del recomendador se recalculan aparte: python manage.py recalcular_vecinos
+
+Pensado para BD de desarrollo o de benchmarks, no para una BD con ventas reales en curso.
+"""
+import csv
+import io
+import time
+import unicodedata
+from contextlib import contextmanager
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Count, Max
+
+from clientes.models import Cliente
+from ventasbasico import autocompletado
+from ventasbasico.models import DetalleVenta, PerfilCliente, Productos, Venta
+from ventasbasico.perfiles import reconstruir_perfiles
+
+# Ventas generadas por tanda (fijo: si dependiera de --lote, la semilla no alcanzaría
+# para reproducir los mismos datos)
+VENTAS_POR_TANDA = 50_000
+
+NOMBRES = [
+    'Sofía', 'Martín', 'Valentina', 'Benjamín', 'Isidora', 'Vicente', 'Florencia', 'Matías',
+    'Agustina', 'Tomás', 'Josefa', 'Joaquín', 'Emilia', 'Lucas', 'Catalina', 'Diego', 'Antonia',
+    'Sebastián', 'Fernanda', 'Cristóbal', 'Javiera', 'Felipe', 'Constanza', 'Nicolás', 'Camila',
+    'Ignacio', 'Francisca', 'José', 'María', 'Juan', 'Carolina', 'Pedro', 'Daniela', 'Pablo',
+]
+APELLIDOS = [
+    'González', 'Muñoz', 'Rojas', 'Díaz', 'Pérez', 'Soto', 'Contreras', 'Silva', 'Martínez',
+    'Sepúlveda', 'Morales', 'Rodríguez', 'López', 'Fuentes', 'Hernández', 'Torres', 'Araya',
+    'Flores', 'Espinoza', 'Valenzuela', 'Castillo', 'Tapia', 'Reyes', 'Gutiérrez', 'Castro',
+    'Pizarro', 'Álvarez', 'Vásquez', 'Sánchez', 'Fernández', 'Ramírez', 'Carrasco', 'Gómez',
+]
+COMUNAS = [
+    'Santiago', 'Puente Alto', 'Maipú', 'La Florida', 'Las Condes', 'Providencia', 'Ñuñoa',
+    'San Bernardo', 'Peñalolén', 'Pudahuel', 'Valparaíso', 'Viña del Mar', 'Concepción',
+    'Temuco', 'Antofagasta', 'La Serena', 'Rancagua', 'Talca', 'Puerto Montt', 'Iquique',
+]
+# (nombre, palabras clave, precio mínimo, precio máximo)
+BASES = [
+    ('Arroz', ['arroz', 'despensa'], 900, 3500), ('Fideos', ['fideos', 'pasta', 'despensa'], 700, 2500),
+    ('Aceite', ['aceite', 'despensa'], 2000, 9000), ('Café', ['café', 'desayuno'], 2500, 12000),
+    ('Té', ['té', 'desayuno'], 900, 5000), ('Leche', ['leche', 'lácteos'], 900, 2500),
+    ('Yogur', ['yogur', 'lácteos'], 300, 3000), ('Queso', ['queso', 'lácteos'], 2500, 12000),
+    ('Pan', ['pan', 'panadería'], 800, 3500), ('Galletas', ['galletas', 'snacks'], 600, 3000),
+    ('Chocolate', ['chocolate', 'snacks'], 700, 6000), ('Papas fritas', ['papas fritas', 'snacks'], 1000, 4000),
+    ('Jugo', ['jugo', 'bebidas'], 700, 3500), ('Bebida', ['bebida', 'bebidas'], 800, 3500),
+    ('Agua mineral', ['agua', 'bebidas'], 500, 2500), ('Cerveza', ['cerveza', 'alcohol'], 900, 15000),
+    ('Vino', ['vino', 'alcohol'], 3000, 25000), ('Detergente', ['detergente', 'limpieza'], 2500, 15000),
+    ('Lavalozas', ['lavalozas', 'limpieza'], 1200, 5000), ('Cloro', ['cloro', 'limpieza'], 800, 3000),
+    ('Shampoo', ['shampoo', 'cuidado personal'], 2000, 9000), ('Jabón', ['jabón', 'cuidado personal'], 500, 4000),
+    ('Pasta dental', ['pasta dental', 'cuidado personal'], 1200, 5000),
+    ('Papel higiénico', ['papel higiénico', 'hogar'], 2500, 12000), ('Atún', ['atún', 'conservas'], 1200, 4000),
+    ('Mermelada', ['mermelada', 'desayuno'], 1500, 4500), ('Cereal', ['cereal', 'desayuno'], 2000, 6500),
+    ('Harina', ['harina', 'despensa'], 900, 2500), ('Azúcar', ['azúcar', 'despensa'], 900, 2500),
+    ('Alimento para perros', ['perros', 'mascotas'], 4000, 40000),
+]
+VARIANTES = [
+    'Clásico', 'Light', 'Premium', 'Integral', 'Orgánico', 'Familiar', 'Sin azúcar', 'Artesanal',
+    'Original', 'Extra', 'Natural', 'Económico',
+]
+FORMATOS = ['', '500 g', '1 kg', '1 L', '2 L', 'pack 6', 'pack 12', '250 g', '3 kg', 'x3']
+
+# Peso relativo de las ventas por mes (diciembre, septiembre y noviembre altos; verano bajo)
+PESO_MES = {1: 0.85, 2: 0.8, 3: 1.0, 4: 0.95, 5: 1.0, 6: 0.95, 7: 1.0, 8: 0.95, 9: 1.15, 10: 1.0, 11: 1.2, 12: 1.6}
+# Lunes a domingo
+PESO_DIA_SEMANA = [0.85, 0.85, 0.9, 0.95, 1.15, 1.3, 1.0]
+# Unidades por línea: 1 a 5
+PROBABILIDAD_CANTIDAD = [0.7, 0.18, 0.06, 0.04, 0.02]
+
+
+def calcular_dv(numero):
+    """Dígito verificador de un RUT (módulo 11)"""
+    suma, factor = 0, 2
+    for digito in reversed(str(numero)):
+        suma += int(digito) * factor
+        factor = 2 if factor == 7 else factor + 1
+    resto = 11 - suma % 11
+    return {11: '0', 10: 'K'}.get(resto, str(resto))
+
+
+def sin_tildes(texto):
+    return unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode()
+
+
+def pesos_popularidad(rng, cantidad, exponente):
+    """Probabilidades tipo Zipf (1/rango^exponente) asignadas en un orden aleatorio"""
+    pesos = 1.0 / np.arange(1, cantidad + 1) ** exponente
+    pesos = pesos[rng.permutation(cantidad)]
+    return pesos / pesos.sum()
+
+
+def imagen_png(rng):
+    from PIL import Image, ImageDraw
+    fondo = tuple(int(c) for c in rng.integers(0, 256, 3))
+    imagen = Image.new('RGB', (200, 200), color=fondo)
+    dibujo = ImageDraw.Draw(imagen)
+    x, y = (int(c) for c in rng.integers(20, 100, 2))
+    dibujo.ellipse((x, y, x + 80, y + 80), fill=tuple(255 - c for c in fondo))
+    buffer = io.BytesIO()
+    imagen.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+@contextmanager
+def fecha_manual():
+    """bulk_create respeta la fecha de cada venta en vez de poner la de hoy (auto_now_add)"""
+    campo = Venta._meta.get_field('fecha')
+    campo.auto_now_add = False
+    try:
+        yield
+    finally:
+        campo.auto_now_add = True
+
+
+def copiar(tabla, columnas, filas):
+    """Inserta filas con COPY ... FROM STDIN (PostgreSQL, psycopg2 o psycopg 3)"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(filas)
+    buffer.seek(0)
+    nombre = connection.ops.quote_name
+    sql = f"COPY {nombre(tabla)} ({', '.join(nombre(c) for c in columnas)}) FROM STDIN WITH (FORMAT csv)"
+    with connection.cursor() as cursor:
+        crudo = cursor.cursor
+        if hasattr(crudo, 'copy_expert'):
+            crudo.copy_expert(sql, buffer)
+        else:
+            with crudo.copy(sql) as copia:
+                copia.write(buffer.getvalue())
+
+
+class Command(BaseCommand):
+    help = 'Genera clientes, productos y ventas sintéticos (reproducibles con --semilla)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clientes', type=int, default=1000, help='Clientes nuevos')
+        parser.add_argument('--productos', type=int, default=200, help='Productos nuevos')
+        parser.add_argument('--ventas', type=int, default=20000, help='Ventas nuevas')
+        parser.add_argument('--semilla', type=int, default=42, help='Semilla del generador')
+        parser.add_argument('--dias', type=int, default=365, help='Días hacia atrás en que se reparten las ventas')
+        parser.add_argument(
+            '--hasta', type=date.fromisoformat, default=None, help='Última fecha con ventas (AAAA-MM-DD, por defecto ayer)'
+        )
+        parser.add_argument('--max-items', type=int, default=10, help='Máximo de productos distintos por venta')
+        parser.add_argument('--stock', type=int, default=None, help='Stock de los productos nuevos (por defecto aleatorio)')
+        parser.add_argument('--imagenes', action='store_true', help='Genera una foto PNG para cada producto nuevo')
+        parser.add_argument('--lote', type=int, default=5000, help='Filas por INSERT (bulk_create)')
+        parser.add_argument('--sin-copy', action='store_true', help='En PostgreSQL usar bulk_create en vez de COPY')
+        parser.add_argument(
+            '--perfiles', action='store_true',
+            help='Reconstruir ya los perfiles de los clientes (si no, se recalculan al consultarlos)'
+        )
+
+    def handle(self, *args, **options):
+        if options['max_items'] < 1 or options['dias'] < 1 or options['lote'] < 1:
+            raise CommandError('--max-items, --dias y --lote deben ser mayores que 0')
+        self.rng = np.random.default_rng(options['semilla'])
+        self.lote = options['lote']
+        self.usar_copy = connection.vendor == 'postgresql' and not options['sin_copy']
+        inicio = time.perf_counter()
+
+        if options['clientes']:
+            self.generar_clientes(options['clientes'])
+        if options['productos']:
+            self.generar_productos(options['productos'], options['imagenes'], options['stock'])
+        if options['ventas']:
+            hasta = options['hasta'] or date.today() - timedelta(days=1)
+            ruts = self.generar_ventas(options['ventas'], hasta, options['dias'], options['max_items'])
+            if options['perfiles']:
+                self.stdout.write("👤 Reconstruyendo perfiles...")
+                reconstruir_perfiles()
+            else:
+                for i in range(0, len(ruts), 500):
+                    PerfilCliente.objects.filter(cliente_id__in=ruts[i:i + 500]).delete()
+            self.stdout.write("💡 Para actualizar el recomendador: python manage.py recalcular_vecinos")
+
+        if options['productos'] or options['ventas']:
+            autocompletado.productos_importados()
+        duracion = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(f"✅ Datos generados en {duracion:.1f}s"))
+
+    def insertar(self, modelo, campos, filas):
+        """Inserta las filas (tuplas con los valores de campos) con COPY o con bulk_create"""
+        if self.usar_copy:
+            copiar(modelo._meta.db_table, [modelo._meta.get_field(campo).column for campo in campos], filas)
+        else:
+            modelo.objects.bulk_create(
+                [modelo(**dict(zip(campos, fila))) for fila in filas], batch_size=self.lote
+            )
+
+    # ============================================
+    # CLIENTES
+    # ============================================
+
+    def generar_clientes(self, cantidad):
+        inicio = time.perf_counter()
+        existentes = set()
+        for rut in Cliente.objects.values_list('rut', flat=True).iterator(chunk_size=10000):
+            try:
+                existentes.add(int(rut.split('-')[0].replace('.', '')))
+            except ValueError:
+                pass
+
+        # Números de RUT de personas (5 a 25 millones), sin repetir y en el orden en que salieron
+        numeros = []
+        vistos = set(existentes)
+        while len(numeros) < cantidad:
+            for numero in self.rng.integers(5_000_000, 25_000_000, size=cantidad - len(numeros) + 100).tolist():
+                if numero not in vistos:
+                    vistos.add(numero)
+                    numeros.append(numero)
+        numeros = numeros[:cantidad]
+
+        nombres = self.rng.integers(0, len(NOMBRES), size=cantidad).tolist()
+        apellidos = self.rng.integers(0, len(APELLIDOS), size=cantidad).tolist()
+        comunas = self.rng.choice(len(COMUNAS), size=cantidad, p=self._pesos_comunas()).tolist()
+        sin_email = (self.rng.random(cantidad) < 0.15).tolist()
+        clientes = [
+            (
+                f"{numero}-{calcular_dv(numero)}", NOMBRES[n], APELLIDOS[a],
+                None if sin_email[i] else f"{sin_tildes(NOMBRES[n]).lower()}.{sin_tildes(APELLIDOS[a]).lower()}{numero % 10000}@example.com",
+                COMUNAS[comunas[i]],
+            )
+            for i, (numero, n, a) in enumerate(zip(numeros, nombres, apellidos))
+        ]
+        with transaction.atomic():
+            self.insertar(Cliente, ['rut', 'nombre', 'apellido', 'email', 'comuna'], clientes)
+        self._informar('👥', cantidad, 'clientes', inicio)
+
+    @staticmethod
+    def _pesos_comunas():
+        # Las primeras comunas (Santiago y alrededores) concentran más clientes
+        pesos = 1.0 / np.arange(1, len(COMUNAS) + 1) ** 0.6
+        return pesos / pesos.sum()
+
+    # ============================================
+    # PRODUCTOS
+    # ============================================
+
+    def generar_productos(self, cantidad, imagenes, stock):
+        inicio = time.perf_counter()
+        # Mismo formato que Productos._generar_codigo_automatico, a continuación del mayor código numérico
+        siguiente = 1
+        for codigo in Productos.objects.values_list('codigo', flat=True).iterator(chunk_size=10000):
+            if codigo.isdigit():
+                siguiente = max(siguiente, int(codigo) + 1)
+
+        bases = self.rng.integers(0, len(BASES), size=cantidad).tolist()
+        variantes = self.rng.integers(0, len(VARIANTES), size=cantidad).tolist()
+        formatos = self.rng.integers(0, len(FORMATOS), size=cantidad).tolist()
+        proporciones = self.rng.random(cantidad).tolist()
+        stocks = [stock] * cantidad if stock is not None else self.rng.integers(0, 500, size=cantidad).tolist()
+        productos = []
+        for i in range(cantidad):
+            base, palabras, minimo, maximo = BASES[bases[i]]
+            variante, formato = VARIANTES[variantes[i]], FORMATOS[formatos[i]]
+            # Precios en pesos terminados en 90 (ej: 2.490)
+            precio = int(minimo + (maximo - minimo) * proporciones[i]) // 100 * 100 + 90
+            productos.append(Productos(
+                nombre=' '.join(parte for parte in (base, variante, formato) if parte),
+                codigo=str(siguiente + i).zfill(4),
+                stock=stocks[i],
+                precio=Decimal(precio),
+                foto=imagen_png(self.rng) if imagenes else None,
+                palabras_clave=Productos.normalizar_palabras_clave(palabras + [variante]),
+            ))
+        with transaction.atomic():
+            # Siempre con bulk_create (son pocos comparados con las ventas): Django convierte la foto y el JSON
+            Productos.objects.bulk_create(productos, batch_size=min(self.lote, 200) if imagenes else self.lote)
+        self._informar('📦', cantidad, 'productos', inicio)
+
+    # ============================================
+    # VENTAS
+    # ============================================
+
+    def pesos_por_dia(self, desde, dias):
+        """Probabilidad de que una venta caiga en cada día (mes, día de la semana y crecimiento del negocio)"""
+        pesos = np.array([
+            PESO_MES[dia.month] * PESO_DIA_SEMANA[dia.weekday()] * (1 + 0.3 * i / dias)
+            for i, dia in enumerate(desde + timedelta(days=i) for i in range(dias))
+        ])
+        # Ruido diario, para que dos días iguales no tengan siempre las mismas ventas
+        pesos *= self.rng.lognormal(0, 0.15, size=dias)
+        return pesos / pesos.sum()
+
+    def generar_ventas(self, cantidad, hasta, dias, max_items):
+        """Genera las ventas y sus detalles; devuelve los RUT de los clientes que compraron"""
+        inicio = time.perf_counter()
+        productos = list(Productos.objects.order_by('id').values_list('id', 'precio'))
+        ruts = list(Cliente.objects.order_by('rut').values_list('rut', flat=True))
+        if not productos or not ruts:
+            raise CommandError('Se necesitan productos y clientes para generar ventas')
+
+        ids_productos = [producto_id for producto_id, _ in productos]
+        precios = [Decimal(precio) for _, precio in productos]
+        # Precios en centavos: los totales se suman en enteros, sin errores de redondeo
+        centavos = np.array([int(precio * 100) for _, precio in productos], dtype=np.int64)
+        popularidad_productos = pesos_popularidad(self.rng, len(productos), 1.0)
+        actividad_clientes = pesos_popularidad(self.rng, len(ruts), 0.8)
+
+        desde = hasta - timedelta(days=dias - 1)
+        # Ventas de cada día, en orden cronológico (la numeración sigue ese orden)
+        por_dia = self.rng.multinomial(cantidad, self.pesos_por_dia(desde, dias))
+        dia_de_venta = np.repeat(np.arange(dias), por_dia)
+
+        # Numeración YYYYMMDD-NNNN a continuación de las ventas ya existentes de cada día
+        existentes = Venta.objects.filter(fecha__range=(desde, hasta))
+        contador = dict(existentes.values_list('fecha').annotate(n=Count('id')))
+        numeros_usados = set()
+        if contador:
+            numeros_usados = set(existentes.values_list('numero', flat=True))
+        id_venta = (Venta.objects.aggregate(maximo=Max('id'))['maximo'] or 0) + 1
+
+        compradores = set()
+        detalles_total = 0
+        with fecha_manual():
+            for tanda in range(0, cantidad, VENTAS_POR_TANDA):
+                dias_tanda = dia_de_venta[tanda:tanda + VENTAS_POR_TANDA]
+                n = len(dias_tanda)
+
+                # Productos por venta: 1 + Poisson (mayoría de 1 a 3, algunas canastas grandes)
+                items = np.minimum(1 + self.rng.poisson(1.6, size=n), max_items)
+                venta_de_linea = np.repeat(np.arange(n), items)
+                producto_de_linea = self.rng.choice(len(productos), size=len(venta_de_linea), p=popularidad_productos)
+                cantidad_de_linea = self.rng.choice(
+                    len(PROBABILIDAD_CANTIDAD), size=len(venta_de_linea), p=PROBABILIDAD_CANTIDAD
+                ) + 1
+                # El mismo producto dos veces en una venta se junta en una línea
+                claves, posicion = np.unique(venta_de_linea * len(productos) + producto_de_linea, return_inverse=True)
+                venta_de_linea = claves // len(productos)
+                producto_de_linea = claves % len(productos)
+                cantidad_de_linea = np.bincount(posicion, weights=cantidad_de_linea).astype(np.int64)
+                totales = np.bincount(
+                    venta_de_linea, weights=cantidad_de_linea * centavos[producto_de_linea], minlength=n
+                ).astype(np.int64)
+                clientes = self.rng.choice(len(ruts), size=n, p=actividad_clientes)
+
+                ventas = []
+                for i, (dia, cliente, total) in enumerate(zip(dias_tanda.tolist(), clientes.tolist(), totales.tolist())):
+                    fecha = desde + timedelta(days=dia)
+                    numero = None
+                    while numero is None or numero in numeros_usados:
+                        contador[fecha] = contador.get(fecha, 0) + 1
+                        numero = f"{fecha:%Y%m%d}-{contador[fecha]:04d}"
+                    ventas.append((id_venta + i, numero, fecha, ruts[cliente], Decimal(total).scaleb(-2)))
+                    compradores.add(ruts[cliente])
+                detalles = [
+                    (id_venta + venta, ids_productos[producto], unidades, precios[producto])
+                    for venta, producto, unidades in zip(
+                        venta_de_linea.tolist(), producto_de_linea.tolist(), cantidad_de_linea.tolist()
+                    )
+                ]
+
+                with transaction.atomic():
+                    self.insertar(Venta, ['id', 'numero', 'fecha', 'rut_cliente_id', 'total'], ventas)
+                    self.insertar(DetalleVenta, ['venta_id', 'producto_id', 'cantidad', 'precio_unitario'], detalles)
+                id_venta += n
+                detalles_total += len(detalles)
+                hechas = tanda + n
+                duracion = time.perf_counter() - inicio
+                self.stdout.write(
+                    f"   🧾 {hechas}/{cantidad} ventas, {detalles_total} detalles "
+                    f"({(hechas + detalles_total) / duracion:,.0f} filas/s)"
+                )
+
+        # Los id de las ventas se asignaron acá: la secuencia de PostgreSQL debe seguir desde el mayor
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [Venta]):
+                cursor.execute(sql)
+        self._informar('🧾', cantidad, f'ventas con {detalles_total} detalles', inicio)
+        return sorted(compradores)
+
+    def _informar(self, emoji, cantidad, que, inicio):
+        duracion = time.perf_counter() - inicio
+        self.stdout.write(f"{emoji} {cantidad} {que} en {duracion:.1f}s")
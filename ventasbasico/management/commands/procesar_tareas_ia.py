@@ -0,0 +1,98 @@
+"""
+Worker de la cola de tareas de IA (modelo TareaIA)
+Ejecutar: python manage.py procesar_tareas_ia [--concurrencia 4] [--una-vez]
+
+- Toma las tareas pendientes de la BD y las ejecuta en hilos (una llamada a Groq por hilo)
+- Se pueden levantar varios procesos worker: cada tarea la toma uno solo (SKIP LOCKED)
+- Con --una-vez procesa lo que haya en la cola y termina (útil para cron o pruebas)
+- Ctrl+C / SIGTERM deja de tomar tareas y espera a que terminen las que están en curso
+"""
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from ventasbasico.models import TareaIA
+from ventasbasico.tareas_ia import ejecutar_tarea, liberar_colgadas, reclamar_tareas
+
+ICONOS = {TareaIA.COMPLETADA: '✓', TareaIA.PENDIENTE: '↻', TareaIA.ERROR: '✗'}
+
+
+class Command(BaseCommand):
+    help = 'Procesa la cola de tareas de IA (descripciones en segundo plano)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrencia', type=int, default=settings.TAREAS_IA_CONCURRENCIA,
+            help='Tareas simultáneas de este worker'
+        )
+        parser.add_argument('--intervalo', type=float, default=2.0, help='Segundos entre consultas con la cola vacía')
+        parser.add_argument('--una-vez', action='store_true', help='Procesa las tareas disponibles y termina')
+
+    def handle(self, *args, **options):
+        concurrencia = max(1, options['concurrencia'])
+        self.detener = False
+        signal.signal(signal.SIGTERM, self._detener)
+
+        self.stdout.write(f"🤖 Worker de tareas IA iniciado (concurrencia {concurrencia})")
+        totales = {TareaIA.COMPLETADA: 0, TareaIA.PENDIENTE: 0, TareaIA.ERROR: 0}
+        activas = {}
+        ultima_revision = 0.0
+
+        with ThreadPoolExecutor(max_workers=concurrencia) as executor:
+            try:
+                while not self.detener:
+                    close_old_connections()
+                    if time.monotonic() - ultima_revision > 60:
+                        ultima_revision = time.monotonic()
+                        liberar_colgadas()
+
+                    for tarea in reclamar_tareas(concurrencia - len(activas)):
+                        activas[executor.submit(self._ejecutar, tarea)] = tarea
+
+                    if not activas:
+                        if options['una_vez']:
+                            break
+                        time.sleep(options['intervalo'])
+                        continue
+
+                    listas, _ = wait(activas, timeout=options['intervalo'], return_when=FIRST_COMPLETED)
+                    for futuro in listas:
+                        self._informar(activas.pop(futuro), futuro.result(), totales)
+            except KeyboardInterrupt:
+                self.detener = True
+
+            if activas:
+                self.stdout.write(f"⏳ Esperando {len(activas)} tareas en curso...")
+                for futuro in list(activas):
+                    self._informar(activas.pop(futuro), futuro.result(), totales)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {totales[TareaIA.COMPLETADA]} completadas, {totales[TareaIA.PENDIENTE]} reencoladas, "
+            f"{totales[TareaIA.ERROR]} con error"
+        ))
+
+    def _detener(self, *args):
+        self.detener = True
+
+    def _ejecutar(self, tarea):
+        try:
+            return ejecutar_tarea(tarea)
+        except Exception as e:
+            # Falla al guardar el estado (ej: BD caída): la tarea se libera tras TAREAS_IA_TIMEOUT
+            self.stderr.write(f"❌ Tarea {tarea.id}: {str(e)}")
+            return TareaIA.ERROR
+        finally:
+            # Cada hilo abre su propia conexión a la BD
+            connections.close_all()
+
+    def _informar(self, tarea, estado, totales):
+        totales[estado] += 1
+        mensaje = f"  {ICONOS[estado]} Tarea {tarea.id} [{tarea.producto_id}] {tarea.producto.nombre}: {estado}"
+        if estado == TareaIA.ERROR:
+            self.stderr.write(mensaje)
+        else:
+            self.stdout.write(mensaje)
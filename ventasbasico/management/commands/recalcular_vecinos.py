@@ -0,0 +1,24 @@
+"""
+Recalcula la tabla de vecinos del recomendador local (filtrado colaborativo)
+Ejecutar: python manage.py recalcular_vecinos [--top-n 20]
+Conviene programarlo periódicamente (ej: cron diario); entre ejecuciones la tabla
+se actualiza incrementalmente con cada venta.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from ventasbasico.filtrado_colaborativo import recalcular_vecinos
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los vecinos (item-to-item) del recomendador local desde DetalleVenta'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-n', type=int, default=None, help='Vecinos guardados por producto')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        total = recalcular_vecinos(top_n=options['top_n'])
+        duracion = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(f"✅ {total} pares de vecinos guardados en {duracion:.2f}s"))
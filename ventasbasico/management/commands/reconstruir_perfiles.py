@@ -0,0 +1,29 @@
+"""
+Reconstruye los perfiles de compra de los clientes desde las ventas
+Ejecutar: python manage.py reconstruir_perfiles [--rut 12345678-9 ...]
+
+Las ventas nuevas actualizan el perfil en su propia transacción; este comando sirve para
+cargar los perfiles la primera vez (ventas anteriores a la tabla PerfilCliente) o para
+recalcularlos después de importar ventas o cambiar PERFIL_ULTIMOS_PRODUCTOS/PERFIL_MAX_PALABRAS.
+Recorre las ventas una sola vez, ordenadas por cliente, y guarda los perfiles por lotes.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from ventasbasico.perfiles import reconstruir_perfiles
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los perfiles de compra (RFM, intereses, últimos productos) desde las ventas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rut', nargs='+', default=None, help='Solo los clientes indicados')
+        parser.add_argument('--lote', type=int, default=500, help='Perfiles guardados por consulta')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        self.stdout.write("👤 Reconstruyendo perfiles de clientes...")
+        total = reconstruir_perfiles(options['rut'], lote=options['lote'])
+        duracion = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(f"✅ {total} perfiles reconstruidos en {duracion:.2f}s"))
@@ -0,0 +1,130 @@
+"""
+Regenera en lote las descripciones IA de los productos
+Ejecutar: python manage.py regenerar_descripciones [--concurrencia 4] [--dry-run]
+
+- Solo llama a Groq para los productos cuyo hash de contenido cambió (o que nunca
+  tuvieron descripción), por lo que se puede interrumpir y volver a ejecutar
+- Las llamadas se hacen en paralelo; ante un RateLimitError todos los hilos esperan
+  (respetando el header retry-after si viene) y se reintenta con backoff exponencial
+- Si el circuit breaker de Groq se abre, los hilos esperan a que vuelva a probar
+"""
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from groq import RateLimitError
+
+from ventasbasico.circuito import CircuitoAbiertoError
+from ventasbasico.descripciones import descripcion_vigente, generar_descripcion
+from ventasbasico.groq_service import obtener_groq_service
+from ventasbasico.models import Productos
+
+# Solo lo necesario para el prompt y el hash (evita cargar la foto)
+CAMPOS = ('id', 'nombre', 'codigo', 'precio', 'stock', 'descripcion_corta', 'descripcion_hash')
+
+ESPERA_BASE = 2.0
+ESPERA_MAXIMA = 60.0
+
+
+class Command(BaseCommand):
+    help = 'Regenera las descripciones IA de los productos cuyos datos cambiaron'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrencia', type=int, default=4, help='Llamadas simultáneas a Groq')
+        parser.add_argument('--dry-run', action='store_true', help='Solo informa cuántas llamadas se harían')
+        parser.add_argument('--forzar', action='store_true', help='Regenera aunque la descripción esté vigente')
+        parser.add_argument('--desde-id', type=int, default=None, help='Empieza desde este ID de producto')
+        parser.add_argument('--limite', type=int, default=None, help='Máximo de productos a regenerar')
+        parser.add_argument('--max-reintentos', type=int, default=5, help='Reintentos por producto ante rate limit')
+
+    def handle(self, *args, **options):
+        productos = Productos.objects.only(*CAMPOS).order_by('id')
+        if options['desde_id']:
+            productos = productos.filter(id__gte=options['desde_id'])
+
+        total = 0
+        pendientes = []
+        for producto in productos.iterator(chunk_size=500):
+            total += 1
+            if options['forzar'] or not descripcion_vigente(producto):
+                pendientes.append(producto)
+        if options['limite']:
+            pendientes = pendientes[:options['limite']]
+
+        self.stdout.write(f"📦 {total} productos revisados, {len(pendientes)} requieren llamar a la IA")
+        if options['dry_run'] or not pendientes:
+            return
+
+        self.groq = obtener_groq_service()
+        self.max_reintentos = options['max_reintentos']
+        self.forzar = options['forzar']
+        # Momento (time.monotonic) hasta el que todos los hilos deben esperar por rate limit
+        self.pausa_hasta = 0.0
+        self.lock = threading.Lock()
+
+        inicio = time.perf_counter()
+        generados, errores = 0, 0
+        with ThreadPoolExecutor(max_workers=max(1, options['concurrencia'])) as executor:
+            futuros = {executor.submit(self._procesar, producto): producto for producto in pendientes}
+            for futuro in as_completed(futuros):
+                producto = futuros[futuro]
+                try:
+                    futuro.result()
+                    generados += 1
+                    self.stdout.write(f"  ✓ [{producto.id}] {producto.nombre}")
+                except Exception as e:
+                    errores += 1
+                    self.stderr.write(f"  ✗ [{producto.id}] {producto.nombre}: {str(e)}")
+
+        duracion = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {generados} descripciones generadas, {errores} errores en {duracion:.2f}s"
+        ))
+        if errores:
+            self.stdout.write("Vuelve a ejecutar el comando para reintentar los pendientes")
+
+    def _procesar(self, producto):
+        try:
+            for intento in range(self.max_reintentos + 1):
+                self._esperar_pausa()
+                try:
+                    return generar_descripcion(producto, groq=self.groq, forzar=self.forzar)
+                except Exception as e:
+                    if not isinstance(e.__cause__, (RateLimitError, CircuitoAbiertoError)) or intento == self.max_reintentos:
+                        raise
+                    self._pausar(e.__cause__, intento)
+        finally:
+            # Cada hilo abre su propia conexión a la BD
+            connections.close_all()
+
+    def _esperar_pausa(self):
+        while True:
+            with self.lock:
+                restante = self.pausa_hasta - time.monotonic()
+            if restante <= 0:
+                return
+            time.sleep(restante)
+
+    def _pausar(self, error, intento):
+        if isinstance(error, CircuitoAbiertoError):
+            with self.lock:
+                self.pausa_hasta = max(self.pausa_hasta, time.monotonic() + error.reintentar_en)
+            self.stderr.write(f"⏳ Circuito de Groq abierto, esperando {error.reintentar_en:.1f}s")
+            return
+
+        espera = None
+        try:
+            espera = float(error.response.headers.get('retry-after'))
+        except (AttributeError, TypeError, ValueError):
+            pass
+        if espera is None:
+            espera = min(ESPERA_MAXIMA, ESPERA_BASE * 2 ** intento)
+        # Jitter para que los hilos no reintenten todos al mismo tiempo
+        espera += random.uniform(0, espera * 0.25)
+
+        with self.lock:
+            self.pausa_hasta = max(self.pausa_hasta, time.monotonic() + espera)
+        self.stderr.write(f"⏳ Rate limit de Groq, esperando {espera:.1f}s")
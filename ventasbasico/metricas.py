@@ -0,0 +1,108 @@
+"""
+Métricas en formato Prometheus (GET /metrics)
+- ventas_http_request_duracion_segundos: latencia de los requests por método, ruta y código
+  (la registra RendimientoMiddleware)
+- ventas_checkout_total: checkouts por canal (api, web), resultado (exitoso, fallido) y motivo
+  (stock_insuficiente, cliente_inexistente, producto_inexistente, ...)
+- ventas_db_conexiones / ventas_db_conexiones_creadas_total: conexiones a la BD abiertas por
+  los workers y cuántas se abrieron (si crece al ritmo de los requests, no se reutilizan)
+- ventas_cache_consultas_total: aciertos y fallos por cache (chatbot, descripciones, single_flight)
+- ventas_groq_duracion_segundos / ventas_groq_rechazadas_total: llamadas a Groq por operación
+
+Con gunicorn cada worker es un proceso: gunicorn.conf.py define PROMETHEUS_MULTIPROC_DIR y los
+contadores se guardan en archivos de ese directorio, así /metrics suma los de todos los workers
+sin importar cuál atienda el scrape. Sin esa variable (runserver) se usan los del proceso.
+"""
+import os
+import threading
+import weakref
+
+from django.db.backends.signals import connection_created
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+
+REQUEST_DURACION = Histogram(
+    'ventas_http_request_duracion_segundos', 'Duración de los requests por ruta',
+    ['metodo', 'ruta', 'codigo'],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+CHECKOUTS = Counter(
+    'ventas_checkout_total', 'Checkouts por canal, resultado y motivo de falla',
+    ['canal', 'resultado', 'motivo']
+)
+DB_CONEXIONES = Gauge(
+    'ventas_db_conexiones', 'Conexiones a la BD abiertas por los workers',
+    multiprocess_mode='livesum'
+)
+DB_CONEXIONES_CREADAS = Counter('ventas_db_conexiones_creadas_total', 'Conexiones a la BD abiertas')
+CACHE_CONSULTAS = Counter(
+    'ventas_cache_consultas_total', 'Consultas a los caches por resultado (acierto o fallo)',
+    ['cache', 'resultado']
+)
+GROQ_DURACION = Histogram(
+    'ventas_groq_duracion_segundos', 'Duración de las llamadas a Groq (con reintentos)',
+    ['operacion', 'resultado'],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 3, 5, 10, 20, 30)
+)
+GROQ_RECHAZADAS = Counter(
+    'ventas_groq_rechazadas_total', 'Llamadas a Groq no realizadas por el circuit breaker', ['operacion']
+)
+
+# Conexiones del proceso (una por hilo); se cuentan las que siguen abiertas
+_conexiones = weakref.WeakSet()
+_conexiones_lock = threading.Lock()
+
+
+def _conexion_creada(sender, connection, **kwargs):
+    DB_CONEXIONES_CREADAS.inc()
+    with _conexiones_lock:
+        _conexiones.add(connection)
+
+
+connection_created.connect(_conexion_creada, dispatch_uid='metricas_conexion_creada')
+
+
+def actualizar_conexiones():
+    """Publica cuántas conexiones del proceso están abiertas (se llama al terminar cada request)"""
+    with _conexiones_lock:
+        abiertas = sum(1 for conexion in _conexiones if conexion.connection is not None)
+    DB_CONEXIONES.set(abiertas)
+
+
+def observar_request(metodo, ruta, codigo, segundos):
+    REQUEST_DURACION.labels(metodo, ruta, str(codigo)).observe(segundos)
+
+
+def registrar_checkout(canal, motivo=None):
+    """Suma un checkout; motivo=None si terminó en venta"""
+    if motivo is None:
+        CHECKOUTS.labels(canal, 'exitoso', '').inc()
+    else:
+        CHECKOUTS.labels(canal, 'fallido', motivo).inc()
+
+
+def registrar_cache(cache, acierto):
+    CACHE_CONSULTAS.labels(cache, 'acierto' if acierto else 'fallo').inc()
+
+
+def observar_groq(operacion, segundos, error=False, rechazada=False):
+    if rechazada:
+        GROQ_RECHAZADAS.labels(operacion).inc()
+    else:
+        GROQ_DURACION.labels(operacion, 'error' if error else 'ok').observe(segundos)
+
+
+def exportar():
+    """
+    Métricas de todos los workers en el formato de texto de Prometheus
+
+    Returns:
+        tuple: (contenido, content_type)
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+    else:
+        registro = REGISTRY
+    return generate_latest(registro), CONTENT_TYPE_LATEST
@@ -0,0 +1,80 @@
+"""
+Middlewares propios del proyecto
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .rendimiento import finalizar_request, iniciar_medicion, terminar_medicion
+
+
+class RendimientoMiddleware:
+    """
+    Mide cada request (tiempo total, BD, consultas, duplicadas, tamaño) y agrega Server-Timing
+    Va primero en MIDDLEWARE para medir también al resto de los middlewares.
+    Ver ventasbasico/rendimiento.py; se desactiva con RENDIMIENTO_ACTIVO=False.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.RENDIMIENTO_ACTIVO:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.es_async:
+            return self.__acall__(request)
+        medicion, token = iniciar_medicion()
+        try:
+            response = self.get_response(request)
+        finally:
+            terminar_medicion(token)
+        finalizar_request(request, response, medicion)
+        return response
+
+    async def __acall__(self, request):
+        medicion, token = iniciar_medicion()
+        try:
+            response = await self.get_response(request)
+        finally:
+            terminar_medicion(token)
+        finalizar_request(request, response, medicion)
+        return response
+
+
+class WhiteNoiseAsyncMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise compatible con vistas async
+    WhiteNoiseMiddleware es solo síncrono: con él en la cadena, Django bajo ASGI ejecuta cada
+    request (incluidas las vistas async) en un hilo propio y se pierde la ventaja de esperar
+    a Groq en el event loop. Esta versión sirve los estáticos igual y deja pasar el resto
+    sin salir del event loop.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.es_async:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            # En desarrollo busca el archivo en disco en cada request
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
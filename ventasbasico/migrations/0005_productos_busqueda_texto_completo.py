@@ -0,0 +1,92 @@
+# Índice de búsqueda de texto completo para Productos
+# - PostgreSQL: columna tsvector generada (config spanish) + índice GIN
+# - SQLite: tabla virtual FTS5 con triggers de mantenimiento (desarrollo local)
+
+from django.db import migrations
+
+
+POSTGRES_CREAR = [
+    """
+    ALTER TABLE ventasbasico_productos ADD COLUMN busqueda tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('spanish', coalesce(nombre, '')), 'A') ||
+        setweight(to_tsvector('spanish', coalesce(palabras_clave, '')), 'B') ||
+        setweight(to_tsvector('spanish', coalesce(descripcion_corta, '')), 'C') ||
+        setweight(to_tsvector('spanish', coalesce(descripcion_larga, '')), 'D')
+    ) STORED
+    """,
+    "CREATE INDEX productos_busqueda_gin ON ventasbasico_productos USING GIN (busqueda)",
+]
+
+POSTGRES_ELIMINAR = [
+    "DROP INDEX IF EXISTS productos_busqueda_gin",
+    "ALTER TABLE ventasbasico_productos DROP COLUMN IF EXISTS busqueda",
+]
+
+SQLITE_CREAR = [
+    """
+    CREATE VIRTUAL TABLE ventasbasico_productos_fts USING fts5(
+        nombre, palabras_clave, descripcion_corta, descripcion_larga,
+        content='ventasbasico_productos', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER ventasbasico_productos_fts_ai AFTER INSERT ON ventasbasico_productos BEGIN
+        INSERT INTO ventasbasico_productos_fts(rowid, nombre, palabras_clave, descripcion_corta, descripcion_larga)
+        VALUES (new.id, new.nombre, new.palabras_clave, new.descripcion_corta, new.descripcion_larga);
+    END
+    """,
+    """
+    CREATE TRIGGER ventasbasico_productos_fts_ad AFTER DELETE ON ventasbasico_productos BEGIN
+        INSERT INTO ventasbasico_productos_fts(ventasbasico_productos_fts, rowid, nombre, palabras_clave, descripcion_corta, descripcion_larga)
+        VALUES ('delete', old.id, old.nombre, old.palabras_clave, old.descripcion_corta, old.descripcion_larga);
+    END
+    """,
+    """
+    CREATE TRIGGER ventasbasico_productos_fts_au AFTER UPDATE ON ventasbasico_productos
+    WHEN old.nombre IS NOT new.nombre
+        OR old.palabras_clave IS NOT new.palabras_clave
+        OR old.descripcion_corta IS NOT new.descripcion_corta
+        OR old.descripcion_larga IS NOT new.descripcion_larga
+    BEGIN
+        INSERT INTO ventasbasico_productos_fts(ventasbasico_productos_fts, rowid, nombre, palabras_clave, descripcion_corta, descripcion_larga)
+        VALUES ('delete', old.id, old.nombre, old.palabras_clave, old.descripcion_corta, old.descripcion_larga);
+        INSERT INTO ventasbasico_productos_fts(rowid, nombre, palabras_clave, descripcion_corta, descripcion_larga)
+        VALUES (new.id, new.nombre, new.palabras_clave, new.descripcion_corta, new.descripcion_larga);
+    END
+    """,
+    "INSERT INTO ventasbasico_productos_fts(ventasbasico_productos_fts) VALUES ('rebuild')",
+]
+
+SQLITE_ELIMINAR = [
+    "DROP TRIGGER IF EXISTS ventasbasico_productos_fts_ai",
+    "DROP TRIGGER IF EXISTS ventasbasico_productos_fts_ad",
+    "DROP TRIGGER IF EXISTS ventasbasico_productos_fts_au",
+    "DROP TABLE IF EXISTS ventasbasico_productos_fts",
+]
+
+
+def _ejecutar(schema_editor, sentencias_por_motor):
+    sentencias = sentencias_por_motor.get(schema_editor.connection.vendor, [])
+    for sql in sentencias:
+        schema_editor.execute(sql)
+
+
+def crear_indice_busqueda(apps, schema_editor):
+    _ejecutar(schema_editor, {'postgresql': POSTGRES_CREAR, 'sqlite': SQLITE_CREAR})
+
+
+def eliminar_indice_busqueda(apps, schema_editor):
+    _ejecutar(schema_editor, {'postgresql': POSTGRES_ELIMINAR, 'sqlite': SQLITE_ELIMINAR})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventasbasico', '0004_alter_productos_codigo'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice_busqueda, eliminar_indice_busqueda),
+    ]
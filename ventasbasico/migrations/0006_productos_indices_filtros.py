@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventasbasico', '0005_productos_busqueda_texto_completo'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='productos',
+            index=models.Index(fields=['nombre'], name='productos_nombre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productos',
+            index=models.Index(fields=['precio', 'nombre'], name='productos_precio_nombre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productos',
+            index=models.Index(condition=models.Q(('stock__gt', 0)), fields=['nombre'], name='productos_en_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productos',
+            index=models.Index(condition=models.Q(('descripcion_generada_fecha__isnull', False)), fields=['nombre'], name='productos_con_ia_idx'),
+        ),
+    ]
@@ -0,0 +1,254 @@
+# Convierte palabras_clave (texto separado por comas) y beneficios (JSON en texto)
+# a columnas JSON con listas, y agrega un índice GIN sobre palabras_clave en PostgreSQL.
+# El índice de texto completo de la migración 0005 depende de palabras_clave, por lo que
+# se elimina antes del cambio de tipo y se vuelve a crear después.
+
+import json
+
+from django.db import migrations, models
+
+
+POSTGRES_ELIMINAR_BUSQUEDA = [
+    "DROP INDEX IF EXISTS productos_busqueda_gin",
+    "ALTER TABLE ventasbasico_productos DROP COLUMN IF EXISTS busqueda",
+]
+
+POSTGRES_CREAR_BUSQUEDA = [
+    """
+    ALTER TABLE ventasbasico_productos ADD COLUMN busqueda tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('spanish', coalesce(nombre, '')), 'A') ||
+        setweight(jsonb_to_tsvector('spanish', coalesce(palabras_clave, '[]'::jsonb), '["string"]'), 'B') ||
+        setweight(to_tsvector('spanish', coalesce(descripcion_corta, '')), 'C') ||
+        setweight(to_tsvector('spanish', coalesce(descripcion_larga, '')), 'D')
+    ) STORED
+    """,
+    "CREATE INDEX productos_busqueda_gin ON ventasbasico_productos USING GIN (busqueda)",
+    "CREATE INDEX productos_palabras_clave_gin ON ventasbasico_productos USING GIN (palabras_clave jsonb_path_ops)",
+]
+
+POSTGRES_ELIMINAR_INDICES_JSON = [
+    "DROP INDEX IF EXISTS productos_palabras_clave_gin",
+] + POSTGRES_ELIMINAR_BUSQUEDA
+
+# Versión anterior (texto) de la columna generada, para revertir
+POSTGRES_CREAR_BUSQUEDA_TEXTO = [
+    """
+    ALTER TABLE ventasbasico_productos ADD COLUMN busqueda tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('spanish', coalesce(nombre, '')), 'A') ||
+        setweight(to_tsvector('spanish', coalesce(palabras_clave, '')), 'B') ||
+        setweight(to_tsvector('spanish', coalesce(descripcion_corta, '')), 'C') ||
+        setweight(to_tsvector('spanish', coalesce(descripcion_larga, '')), 'D')
+    ) STORED
+    """,
+    "CREATE INDEX productos_busqueda_gin ON ventasbasico_productos USING GIN (busqueda)",
+]
+
+# En SQLite Django recrea la tabla al cambiar columnas, lo que borra los triggers de FTS5
+SQLITE_ELIMINAR_BUSQUEDA = [
+    "DROP TRIGGER IF EXISTS ventasbasico_productos_fts_ai",
+    "DROP TRIGGER IF EXISTS ventasbasico_productos_fts_ad",
+    "DROP TRIGGER IF EXISTS ventasbasico_productos_fts_au",
+    "DROP TABLE IF EXISTS ventasbasico_productos_fts",
+]
+
+# Tabla FTS5 con contenido propio: las keywords se indexan ya decodificadas desde el JSON
+# (json_each), así "orgánico" no queda indexado como "org\u00e1nico"
+SQLITE_KEYWORDS_NEW = "(SELECT group_concat(value, ' ') FROM json_each(new.palabras_clave))"
+
+SQLITE_CREAR_BUSQUEDA = [
+    """
+    CREATE VIRTUAL TABLE ventasbasico_productos_fts USING fts5(
+        nombre, palabras_clave, descripcion_corta, descripcion_larga,
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER ventasbasico_productos_fts_ai AFTER INSERT ON ventasbasico_productos BEGIN
+        INSERT INTO ventasbasico_productos_fts(rowid, nombre, palabras_clave, descripcion_corta, descripcion_larga)
+        VALUES (new.id, new.nombre, {SQLITE_KEYWORDS_NEW}, new.descripcion_corta, new.descripcion_larga);
+    END
+    """,
+    """
+    CREATE TRIGGER ventasbasico_productos_fts_ad AFTER DELETE ON ventasbasico_productos BEGIN
+        DELETE FROM ventasbasico_productos_fts WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER ventasbasico_productos_fts_au AFTER UPDATE ON ventasbasico_productos
+    WHEN old.nombre IS NOT new.nombre
+        OR old.palabras_clave IS NOT new.palabras_clave
+        OR old.descripcion_corta IS NOT new.descripcion_corta
+        OR old.descripcion_larga IS NOT new.descripcion_larga
+    BEGIN
+        DELETE FROM ventasbasico_productos_fts WHERE rowid = old.id;
+        INSERT INTO ventasbasico_productos_fts(rowid, nombre, palabras_clave, descripcion_corta, descripcion_larga)
+        VALUES (new.id, new.nombre, {SQLITE_KEYWORDS_NEW}, new.descripcion_corta, new.descripcion_larga);
+    END
+    """,
+    """
+    INSERT INTO ventasbasico_productos_fts(rowid, nombre, palabras_clave, descripcion_corta, descripcion_larga)
+    SELECT p.id, p.nombre, (SELECT group_concat(value, ' ') FROM json_each(p.palabras_clave)),
+           p.descripcion_corta, p.descripcion_larga
+    FROM ventasbasico_productos p
+    """,
+]
+
+# Versión anterior (external content sobre texto), para revertir
+SQLITE_CREAR_BUSQUEDA_TEXTO = [
+    """
+    CREATE VIRTUAL TABLE ventasbasico_productos_fts USING fts5(
+        nombre, palabras_clave, descripcion_corta, descripcion_larga,
+        content='ventasbasico_productos', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER ventasbasico_productos_fts_ai AFTER INSERT ON ventasbasico_productos BEGIN
+        INSERT INTO ventasbasico_productos_fts(rowid, nombre, palabras_clave, descripcion_corta, descripcion_larga)
+        VALUES (new.id, new.nombre, new.palabras_clave, new.descripcion_corta, new.descripcion_larga);
+    END
+    """,
+    """
+    CREATE TRIGGER ventasbasico_productos_fts_ad AFTER DELETE ON ventasbasico_productos BEGIN
+        INSERT INTO ventasbasico_productos_fts(ventasbasico_productos_fts, rowid, nombre, palabras_clave, descripcion_corta, descripcion_larga)
+        VALUES ('delete', old.id, old.nombre, old.palabras_clave, old.descripcion_corta, old.descripcion_larga);
+    END
+    """,
+    """
+    CREATE TRIGGER ventasbasico_productos_fts_au AFTER UPDATE ON ventasbasico_productos
+    WHEN old.nombre IS NOT new.nombre
+        OR old.palabras_clave IS NOT new.palabras_clave
+        OR old.descripcion_corta IS NOT new.descripcion_corta
+        OR old.descripcion_larga IS NOT new.descripcion_larga
+    BEGIN
+        INSERT INTO ventasbasico_productos_fts(ventasbasico_productos_fts, rowid, nombre, palabras_clave, descripcion_corta, descripcion_larga)
+        VALUES ('delete', old.id, old.nombre, old.palabras_clave, old.descripcion_corta, old.descripcion_larga);
+        INSERT INTO ventasbasico_productos_fts(rowid, nombre, palabras_clave, descripcion_corta, descripcion_larga)
+        VALUES (new.id, new.nombre, new.palabras_clave, new.descripcion_corta, new.descripcion_larga);
+    END
+    """,
+    "INSERT INTO ventasbasico_productos_fts(ventasbasico_productos_fts) VALUES ('rebuild')",
+]
+
+
+def _ejecutar(schema_editor, sentencias_por_motor):
+    for sql in sentencias_por_motor.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def eliminar_busqueda(apps, schema_editor):
+    _ejecutar(schema_editor, {'postgresql': POSTGRES_ELIMINAR_BUSQUEDA, 'sqlite': SQLITE_ELIMINAR_BUSQUEDA})
+
+
+def crear_busqueda_json(apps, schema_editor):
+    _ejecutar(schema_editor, {'postgresql': POSTGRES_CREAR_BUSQUEDA, 'sqlite': SQLITE_CREAR_BUSQUEDA})
+
+
+def eliminar_busqueda_json(apps, schema_editor):
+    _ejecutar(schema_editor, {'postgresql': POSTGRES_ELIMINAR_INDICES_JSON, 'sqlite': SQLITE_ELIMINAR_BUSQUEDA})
+
+
+def crear_busqueda_texto(apps, schema_editor):
+    _ejecutar(schema_editor, {'postgresql': POSTGRES_CREAR_BUSQUEDA_TEXTO, 'sqlite': SQLITE_CREAR_BUSQUEDA_TEXTO})
+
+
+def _normalizar_palabras(texto):
+    palabras = []
+    for palabra in (texto or '').split(','):
+        palabra = ' '.join(palabra.lower().split())
+        if palabra and palabra not in palabras:
+            palabras.append(palabra)
+    return palabras
+
+
+def _parsear_beneficios(texto):
+    if not texto:
+        return []
+    try:
+        beneficios = json.loads(texto)
+    except (TypeError, ValueError):
+        return [texto]
+    if isinstance(beneficios, list):
+        return [str(b) for b in beneficios]
+    return [str(beneficios)]
+
+
+def texto_a_json(apps, schema_editor):
+    Productos = apps.get_model('ventasbasico', 'Productos')
+    lote = []
+    for producto in Productos.objects.only('id', 'palabras_clave', 'beneficios').iterator(chunk_size=500):
+        producto.palabras_clave_lista = _normalizar_palabras(producto.palabras_clave)
+        producto.beneficios_lista = _parsear_beneficios(producto.beneficios)
+        lote.append(producto)
+        if len(lote) >= 500:
+            Productos.objects.bulk_update(lote, ['palabras_clave_lista', 'beneficios_lista'])
+            lote = []
+    if lote:
+        Productos.objects.bulk_update(lote, ['palabras_clave_lista', 'beneficios_lista'])
+
+
+def json_a_texto(apps, schema_editor):
+    Productos = apps.get_model('ventasbasico', 'Productos')
+    lote = []
+    for producto in Productos.objects.only('id', 'palabras_clave_lista', 'beneficios_lista').iterator(chunk_size=500):
+        producto.palabras_clave = ', '.join(producto.palabras_clave_lista or []) or None
+        producto.beneficios = json.dumps(producto.beneficios_lista, ensure_ascii=False) if producto.beneficios_lista else None
+        lote.append(producto)
+        if len(lote) >= 500:
+            Productos.objects.bulk_update(lote, ['palabras_clave', 'beneficios'])
+            lote = []
+    if lote:
+        Productos.objects.bulk_update(lote, ['palabras_clave', 'beneficios'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventasbasico', '0006_productos_indices_filtros'),
+    ]
+
+    operations = [
+        migrations.RunPython(eliminar_busqueda, crear_busqueda_texto),
+        migrations.AddField(
+            model_name='productos',
+            name='palabras_clave_lista',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='productos',
+            name='beneficios_lista',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(texto_a_json, json_a_texto),
+        migrations.RemoveField(
+            model_name='productos',
+            name='palabras_clave',
+        ),
+        migrations.RemoveField(
+            model_name='productos',
+            name='beneficios',
+        ),
+        migrations.RenameField(
+            model_name='productos',
+            old_name='palabras_clave_lista',
+            new_name='palabras_clave',
+        ),
+        migrations.RenameField(
+            model_name='productos',
+            old_name='beneficios_lista',
+            new_name='beneficios',
+        ),
+        migrations.AlterField(
+            model_name='productos',
+            name='palabras_clave',
+            field=models.JSONField(blank=True, default=list, help_text='Keywords SEO generadas por IA (lista, en minúsculas)'),
+        ),
+        migrations.AlterField(
+            model_name='productos',
+            name='beneficios',
+            field=models.JSONField(blank=True, default=list, help_text='Lista de beneficios generados por IA'),
+        ),
+        migrations.RunPython(crear_busqueda_json, eliminar_busqueda_json),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventasbasico', '0007_productos_palabras_clave_beneficios_json'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VecinoProducto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('coocurrencias', models.PositiveIntegerField(help_text='Ventas en que ambos productos aparecen juntos')),
+                ('puntaje', models.FloatField(help_text='Similitud coseno entre ambos productos')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vecinos', to='ventasbasico.productos')),
+                ('vecino', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='ventasbasico.productos')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['producto', '-puntaje'], name='vecinos_producto_puntaje_idx')],
+                'constraints': [models.UniqueConstraint(fields=('producto', 'vecino'), name='vecino_producto_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventasbasico', '0008_vecinoproducto'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productos',
+            name='descripcion_hash',
+            field=models.CharField(blank=True, editable=False, help_text='Hash de los datos usados en el prompt (si no cambian, se reutiliza la descripción)', max_length=64, null=True),
+        ),
+    ]
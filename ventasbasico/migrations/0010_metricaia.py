@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventasbasico', '0009_productos_descripcion_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetricaIA',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('operacion', models.CharField(max_length=30)),
+                ('inicio', models.DateTimeField(help_text='Inicio del intervalo agregado')),
+                ('llamadas', models.PositiveIntegerField(default=0)),
+                ('errores', models.PositiveIntegerField(default=0)),
+                ('rechazadas', models.PositiveIntegerField(default=0, help_text='No llamadas por circuito abierto')),
+                ('reintentos', models.PositiveIntegerField(default=0)),
+                ('tokens_prompt', models.PositiveIntegerField(default=0)),
+                ('tokens_respuesta', models.PositiveIntegerField(default=0)),
+                ('duracion_total_ms', models.FloatField(default=0)),
+                ('histograma', models.JSONField(default=list)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['inicio', 'operacion'], name='metricas_ia_inicio_idx')],
+            },
+        ),
+    ]
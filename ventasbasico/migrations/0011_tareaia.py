@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventasbasico', '0010_metricaia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TareaIA',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('descripcion', 'Descripción de producto')], default='descripcion', max_length=30)),
+                ('parametros', models.JSONField(blank=True, default=dict)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_proceso', 'En proceso'), ('completada', 'Completada'), ('error', 'Error')], default='pendiente', max_length=20)),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('disponible_desde', models.DateTimeField(help_text='No se procesa antes de esta fecha (reintentos con espera)')),
+                ('creada', models.DateTimeField(auto_now_add=True)),
+                ('iniciada', models.DateTimeField(blank=True, null=True)),
+                ('terminada', models.DateTimeField(blank=True, null=True)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tareas_ia', to='ventasbasico.productos')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('estado', 'pendiente')), fields=['disponible_desde', 'id'], name='tareas_ia_pendientes_idx'), models.Index(fields=['producto', 'estado'], name='tareas_ia_producto_idx')],
+            },
+        ),
+    ]
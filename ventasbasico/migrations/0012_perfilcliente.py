@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0002_rename_apellido_cliente_apellido_and_more'),
+        ('ventasbasico', '0011_tareaia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PerfilCliente',
+            fields=[
+                ('cliente', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='perfil', serialize=False, to='clientes.cliente')),
+                ('primera_compra', models.DateField(blank=True, null=True)),
+                ('ultima_compra', models.DateField(blank=True, null=True)),
+                ('compras', models.PositiveIntegerField(default=0)),
+                ('unidades', models.PositiveIntegerField(default=0)),
+                ('total_gastado', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('palabras_clave', models.JSONField(blank=True, default=list, help_text='Keywords más frecuentes de los productos comprados ([[palabra, veces], ...] de mayor a menor)')),
+                ('ultimos_productos', models.JSONField(blank=True, default=list, help_text='Últimos productos distintos comprados, del más reciente al más antiguo')),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Perfil de cliente',
+                'verbose_name_plural': 'Perfiles de clientes',
+            },
+        ),
+    ]
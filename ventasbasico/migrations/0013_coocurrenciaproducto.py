@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:24
+# Matriz de co-ocurrencia completa del recomendador local, cargada desde las ventas existentes
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def cargar_coocurrencias(apps, schema_editor):
+    # Pares (incluida la diagonal) de los productos de cada venta, contando ventas distintas
+    schema_editor.execute("""
+        INSERT INTO ventasbasico_coocurrenciaproducto (producto_id, otro_id, ventas)
+        SELECT a.producto_id, b.producto_id, COUNT(DISTINCT a.venta_id)
+        FROM ventasbasico_detalleventa a
+        JOIN ventasbasico_detalleventa b ON b.venta_id = a.venta_id
+        GROUP BY a.producto_id, b.producto_id
+    """)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventasbasico', '0012_perfilcliente'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CoocurrenciaProducto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ventas', models.PositiveIntegerField(default=0, help_text='Ventas en que ambos productos aparecen juntos')),
+                ('otro', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='ventasbasico.productos')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='ventasbasico.productos')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('producto', 'otro'), name='coocurrencia_producto_unica')],
+            },
+        ),
+        migrations.RunPython(cargar_coocurrencias, migrations.RunPython.noop),
+    ]
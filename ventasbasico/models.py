@@ -21,29 +21,82 @@ class Productos(models.Model):
         null=True,
         help_text="Descripción detallada generada por IA"
     )
-    palabras_clave = models.CharField(
-        max_length=500,
+    palabras_clave = models.JSONField(
+        default=list,
         blank=True,
-        null=True,
-        help_text="Keywords SEO generadas por IA (separadas por comas)"
+        help_text="Keywords SEO generadas por IA (lista, en minúsculas)"
     )
-    beneficios = models.TextField(
+    beneficios = models.JSONField(
+        default=list,
         blank=True,
-        null=True,
-        help_text="Lista de beneficios generados por IA (formato JSON)"
+        help_text="Lista de beneficios generados por IA"
     )
     descripcion_generada_fecha = models.DateTimeField(
         blank=True,
         null=True,
         help_text="Fecha en que se generó la descripción con IA"
     )
+    descripcion_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        null=True,
+        editable=False,
+        help_text="Hash de los datos usados en el prompt (si no cambian, se reutiliza la descripción)"
+    )
+
+    class Meta:
+        indexes = [
+            # Listado por defecto (ORDER BY nombre)
+            models.Index(fields=['nombre'], name='productos_nombre_idx'),
+            # Rango de precio, y ordering=precio (desempate por nombre) sin sort aparte
+            models.Index(fields=['precio', 'nombre'], name='productos_precio_nombre_idx'),
+            # Parcial: solo productos en stock, ordenados por nombre
+            models.Index(fields=['nombre'], condition=models.Q(stock__gt=0), name='productos_en_stock_idx'),
+            # Parcial: productos con descripción IA
+            models.Index(
+                fields=['nombre'],
+                condition=models.Q(descripcion_generada_fecha__isnull=False),
+                name='productos_con_ia_idx'
+            ),
+            # En PostgreSQL además existe un índice GIN (jsonb_path_ops) sobre palabras_clave,
+            # creado en la migración 0007 porque no es portable a SQLite
+        ]
 
     def save(self, *args, **kwargs):
         # Si no tiene código asignado (nuevo producto), generar uno automático
         if not self.codigo:
             self.codigo = self._generar_codigo_automatico()
+        # Keywords normalizadas para que la búsqueda por contención (@>) sea exacta
+        self.palabras_clave = self.normalizar_palabras_clave(self.palabras_clave)
         super().save(*args, **kwargs)
     
+    @classmethod
+    def guardar_stock(cls, productos):
+        """
+        Guarda el stock de varios productos con un solo UPDATE (checkout)
+        bulk_update no envía post_save: quien llama publica el cambio con signals.stock_guardado()
+
+        Returns:
+            list: Productos guardados (sin repetidos)
+        """
+        productos = list({producto.pk: producto for producto in productos}.values())
+        cls.objects.bulk_update(productos, ['stock'])
+        return productos
+
+    @staticmethod
+    def normalizar_palabras_clave(palabras):
+        """Convierte las keywords a una lista sin duplicados, en minúsculas y sin espacios extra"""
+        if not palabras:
+            return []
+        if isinstance(palabras, str):
+            palabras = palabras.split(',')
+        normalizadas = []
+        for palabra in palabras:
+            palabra = ' '.join(str(palabra).lower().split())
+            if palabra and palabra not in normalizadas:
+                normalizadas.append(palabra)
+        return normalizadas
+    
     def _generar_codigo_automatico(self):
         """
         Genera un código automático siguiendo el orden numérico.
@@ -100,4 +153,150 @@ class DetalleVenta(models.Model):
         return self.cantidad * self.precio_unitario
     
     def __str__(self):
-        return f"{self.cantidad} x {self.producto.nombre}"
\ No newline at end of file
+        return f"{self.cantidad} x {self.producto.nombre}"
+
+
+class VecinoProducto(models.Model):
+    """
+    Vecinos precalculados (filtrado colaborativo item-to-item)
+    Para cada producto guarda sus N productos más co-comprados, con similitud coseno
+    """
+    producto = models.ForeignKey(Productos, on_delete=models.CASCADE, related_name='vecinos')
+    vecino = models.ForeignKey(Productos, on_delete=models.CASCADE, related_name='+')
+    coocurrencias = models.PositiveIntegerField(help_text="Ventas en que ambos productos aparecen juntos")
+    puntaje = models.FloatField(help_text="Similitud coseno entre ambos productos")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['producto', 'vecino'], name='vecino_producto_unico'),
+        ]
+        indexes = [
+            models.Index(fields=['producto', '-puntaje'], name='vecinos_producto_puntaje_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.producto_id} -> {self.vecino_id} ({self.puntaje:.3f})"
+
+
+class CoocurrenciaProducto(models.Model):
+    """
+    Matriz de co-ocurrencia completa (X^T X, dispersa) del filtrado colaborativo
+    Cada venta incrementa sus pares; en la diagonal (producto == otro) queda la cantidad de
+    ventas que incluyen el producto. Los puntajes de VecinoProducto se calculan desde acá,
+    así un par que sale del top-N no pierde su cuenta.
+    """
+    producto = models.ForeignKey(Productos, on_delete=models.CASCADE, related_name='+')
+    otro = models.ForeignKey(Productos, on_delete=models.CASCADE, related_name='+')
+    ventas = models.PositiveIntegerField(default=0, help_text="Ventas en que ambos productos aparecen juntos")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['producto', 'otro'], name='coocurrencia_producto_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.producto_id} x {self.otro_id}: {self.ventas}"
+
+
+class MetricaIA(models.Model):
+    """
+    Telemetría agregada de las llamadas a Groq (una fila por proceso, operación e intervalo)
+    El histograma guarda cuántas llamadas cayeron en cada tramo de telemetria.TRAMOS_MS
+    """
+    operacion = models.CharField(max_length=30)
+    inicio = models.DateTimeField(help_text="Inicio del intervalo agregado")
+    llamadas = models.PositiveIntegerField(default=0)
+    errores = models.PositiveIntegerField(default=0)
+    rechazadas = models.PositiveIntegerField(default=0, help_text="No llamadas por circuito abierto")
+    reintentos = models.PositiveIntegerField(default=0)
+    tokens_prompt = models.PositiveIntegerField(default=0)
+    tokens_respuesta = models.PositiveIntegerField(default=0)
+    duracion_total_ms = models.FloatField(default=0)
+    histograma = models.JSONField(default=list)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['inicio', 'operacion'], name='metricas_ia_inicio_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.operacion} {self.inicio:%Y-%m-%d %H:%M} ({self.llamadas} llamadas)"
+
+
+class TareaIA(models.Model):
+    """
+    Cola de tareas de IA en la BD (ej: generar la descripción de un producto en segundo plano)
+    Las procesa el comando procesar_tareas_ia; el estado se consulta en /api/ia/tareas/<id>/
+    """
+    PENDIENTE = 'pendiente'
+    EN_PROCESO = 'en_proceso'
+    COMPLETADA = 'completada'
+    ERROR = 'error'
+    ESTADOS = [
+        (PENDIENTE, 'Pendiente'),
+        (EN_PROCESO, 'En proceso'),
+        (COMPLETADA, 'Completada'),
+        (ERROR, 'Error'),
+    ]
+
+    DESCRIPCION = 'descripcion'
+    TIPOS = [
+        (DESCRIPCION, 'Descripción de producto'),
+    ]
+
+    tipo = models.CharField(max_length=30, choices=TIPOS, default=DESCRIPCION)
+    producto = models.ForeignKey(Productos, on_delete=models.CASCADE, related_name='tareas_ia')
+    parametros = models.JSONField(default=dict, blank=True)
+    estado = models.CharField(max_length=20, choices=ESTADOS, default=PENDIENTE)
+    intentos = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    disponible_desde = models.DateTimeField(help_text="No se procesa antes de esta fecha (reintentos con espera)")
+    creada = models.DateTimeField(auto_now_add=True)
+    iniciada = models.DateTimeField(null=True, blank=True)
+    terminada = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Lo que consulta el worker: pendientes listas para procesar, en orden de llegada
+            models.Index(
+                fields=['disponible_desde', 'id'],
+                condition=models.Q(estado='pendiente'),
+                name='tareas_ia_pendientes_idx'
+            ),
+            models.Index(fields=['producto', 'estado'], name='tareas_ia_producto_idx'),
+        ]
+
+    def __str__(self):
+        return f"Tarea {self.id} ({self.tipo}, producto {self.producto_id}): {self.estado}"
+
+
+class PerfilCliente(models.Model):
+    """
+    Resumen de compras del cliente, actualizado al confirmarse cada venta (signals.py)
+    Reemplaza el recorrido del historial completo en el recomendador y el chatbot: todos
+    los campos tienen tamaño acotado sin importar cuántas compras haga el cliente.
+    Se reconstruye desde las ventas con python manage.py reconstruir_perfiles.
+    """
+    cliente = models.OneToOneField(Cliente, on_delete=models.CASCADE, primary_key=True, related_name='perfil')
+    # RFM: recencia (última compra), frecuencia (compras) y monto (total gastado = LTV)
+    primera_compra = models.DateField(null=True, blank=True)
+    ultima_compra = models.DateField(null=True, blank=True)
+    compras = models.PositiveIntegerField(default=0)
+    unidades = models.PositiveIntegerField(default=0)
+    total_gastado = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    palabras_clave = models.JSONField(
+        default=list, blank=True,
+        help_text="Keywords más frecuentes de los productos comprados ([[palabra, veces], ...] de mayor a menor)"
+    )
+    ultimos_productos = models.JSONField(
+        default=list, blank=True,
+        help_text="Últimos productos distintos comprados, del más reciente al más antiguo"
+    )
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Perfil de cliente'
+        verbose_name_plural = 'Perfiles de clientes'
+
+    def __str__(self):
+        return f"Perfil de {self.cliente_id} ({self.compras} compras)"
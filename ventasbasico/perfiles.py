@@ -0,0 +1,199 @@
+"""
+Perfiles de compra de los clientes (modelo PerfilCliente)
+El recomendador recorría todas las ventas del cliente en cada llamada, así que los mejores
+clientes eran los más lentos. El perfil guarda un resumen de tamaño fijo que se actualiza
+al confirmarse cada venta (señal post_save de Venta, sin importar si viene del checkout, la
+API o el admin):
+
+- RFM: primera/última compra, cantidad de compras y total gastado (LTV)
+- Keywords más frecuentes de los productos comprados (hasta PERFIL_MAX_PALABRAS)
+- Últimos productos distintos comprados (hasta PERFIL_ULTIMOS_PRODUCTOS)
+
+Si un cliente con compras no tiene perfil (ej: ventas anteriores a esta tabla) se
+reconstruye desde sus ventas la primera vez que se necesita. Una venta editada o eliminada
+reconstruye el perfil de su cliente, porque sus cambios no se pueden restar.
+"""
+import logging
+from decimal import Decimal
+from itertools import groupby
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import DetalleVenta, PerfilCliente, Venta
+
+logger = logging.getLogger(__name__)
+
+CAMPOS_PERFIL = (
+    'primera_compra', 'ultima_compra', 'compras', 'unidades', 'total_gastado',
+    'palabras_clave', 'ultimos_productos', 'actualizado'
+)
+
+
+def aplicar_compra(perfil, fecha, total, items):
+    """
+    Suma una compra al perfil (en memoria, sin guardar)
+
+    Args:
+        perfil: PerfilCliente
+        fecha: Fecha de la venta
+        total: Total de la venta
+        items: [{"id", "nombre", "palabras_clave", "cantidad"}] de la venta
+    """
+    perfil.primera_compra = min(perfil.primera_compra or fecha, fecha)
+    perfil.ultima_compra = max(perfil.ultima_compra or fecha, fecha)
+    perfil.compras += 1
+    perfil.unidades += sum(item['cantidad'] for item in items)
+    perfil.total_gastado = Decimal(perfil.total_gastado or 0) + Decimal(str(total))
+
+    # Las keywords de esta compra quedan primero: ante empates se conservan las más recientes
+    palabras = dict(perfil.palabras_clave or [])
+    recientes = {}
+    for item in items:
+        for palabra in item['palabras_clave'] or []:
+            recientes[palabra] = recientes.get(palabra, palabras.pop(palabra, 0)) + 1
+    palabras = {**recientes, **palabras}
+    perfil.palabras_clave = [
+        [palabra, veces]
+        for palabra, veces in sorted(palabras.items(), key=lambda par: -par[1])[:settings.PERFIL_MAX_PALABRAS]
+    ]
+
+    nuevos = {}
+    for item in items:
+        if item['id'] in nuevos:
+            nuevos[item['id']]['cantidad'] += item['cantidad']
+        else:
+            nuevos[item['id']] = {
+                'id': item['id'], 'nombre': item['nombre'], 'cantidad': item['cantidad'],
+                'fecha': fecha.strftime('%Y-%m-%d')
+            }
+    anteriores = [p for p in perfil.ultimos_productos or [] if p['id'] not in nuevos]
+    perfil.ultimos_productos = (list(nuevos.values()) + anteriores)[:settings.PERFIL_ULTIMOS_PRODUCTOS]
+
+
+def registrar_compra(venta_id):
+    """
+    Suma una venta recién creada al perfil de su cliente
+    Se llama al confirmarse la transacción que creó la venta (ver signals.py), cuando sus
+    detalles ya están guardados.
+
+    Args:
+        venta_id: ID de la venta creada
+    """
+    try:
+        venta = Venta.objects.filter(pk=venta_id).values('rut_cliente_id', 'fecha', 'total').first()
+        items = [
+            {
+                'id': detalle['producto_id'],
+                'nombre': detalle['producto__nombre'],
+                'palabras_clave': detalle['producto__palabras_clave'],
+                'cantidad': detalle['cantidad']
+            }
+            for detalle in DetalleVenta.objects.filter(venta_id=venta_id).order_by('id').values(
+                'producto_id', 'producto__nombre', 'producto__palabras_clave', 'cantidad'
+            )
+        ]
+        if venta is None or not items:
+            # Venta eliminada antes de confirmarse o sin productos (reconstruir_perfiles tampoco la cuenta)
+            return
+        # Transacción propia: la venta ya está confirmada
+        with transaction.atomic():
+            perfil = PerfilCliente.objects.select_for_update().filter(cliente_id=venta['rut_cliente_id']).first()
+            if perfil is None:
+                # Primer perfil del cliente: se arma desde todas sus ventas (incluida esta)
+                reconstruir_perfiles([venta['rut_cliente_id']])
+                return
+            aplicar_compra(perfil, venta['fecha'], venta['total'], items)
+            perfil.save(update_fields=CAMPOS_PERFIL)
+    except Exception as e:
+        logger.error(f"Error actualizando el perfil con la venta {venta_id}: {str(e)}")
+
+
+def recalcular_perfiles(ruts):
+    """
+    Reconstruye los perfiles de los RUT indicados (venta editada o eliminada); el de un
+    cliente que se quedó sin compras se elimina
+    Un error no se propaga: el perfil se corrige con python manage.py reconstruir_perfiles.
+    """
+    try:
+        with transaction.atomic():
+            PerfilCliente.objects.filter(cliente_id__in=ruts).delete()
+            reconstruir_perfiles(ruts)
+    except Exception as e:
+        logger.error(f"Error reconstruyendo los perfiles de {', '.join(ruts)}: {str(e)}")
+
+
+def reconstruir_perfiles(ruts=None, lote=500):
+    """
+    Recalcula los perfiles desde las ventas (todos los clientes o los RUT indicados)
+
+    Returns:
+        int: Perfiles guardados
+    """
+    detalles = DetalleVenta.objects.order_by('venta__rut_cliente_id', 'venta__fecha', 'venta_id', 'id').values(
+        'venta_id', 'venta__rut_cliente_id', 'venta__fecha', 'venta__total', 'cantidad',
+        'producto_id', 'producto__nombre', 'producto__palabras_clave'
+    )
+    if ruts is not None:
+        detalles = detalles.filter(venta__rut_cliente_id__in=ruts)
+
+    perfiles, guardados = [], 0
+    for rut, filas_cliente in groupby(detalles.iterator(chunk_size=2000), key=lambda d: d['venta__rut_cliente_id']):
+        perfil = PerfilCliente(cliente_id=rut, total_gastado=Decimal(0), palabras_clave=[], ultimos_productos=[])
+        for _, filas in groupby(filas_cliente, key=lambda d: d['venta_id']):
+            filas = list(filas)
+            aplicar_compra(perfil, filas[0]['venta__fecha'], filas[0]['venta__total'], [
+                {
+                    'id': fila['producto_id'],
+                    'nombre': fila['producto__nombre'],
+                    'palabras_clave': fila['producto__palabras_clave'],
+                    'cantidad': fila['cantidad']
+                }
+                for fila in filas
+            ])
+        perfiles.append(perfil)
+        if len(perfiles) >= lote:
+            guardados += _guardar(perfiles)
+            perfiles = []
+    if perfiles:
+        guardados += _guardar(perfiles)
+    return guardados
+
+
+def _guardar(perfiles):
+    PerfilCliente.objects.bulk_create(
+        perfiles, update_conflicts=True, unique_fields=['cliente'], update_fields=CAMPOS_PERFIL
+    )
+    return len(perfiles)
+
+
+def obtener_perfil(cliente):
+    """Perfil del cliente (lo reconstruye si falta; sin compras devuelve uno vacío sin guardar)"""
+    perfil = PerfilCliente.objects.filter(cliente=cliente).first()
+    if perfil is None and reconstruir_perfiles([cliente.rut]):
+        perfil = PerfilCliente.objects.filter(cliente=cliente).first()
+    return perfil or PerfilCliente(cliente=cliente)
+
+
+def historial_perfil(perfil, limite=None):
+    """Últimos productos del perfil en el formato del historial del prompt"""
+    limite = limite or settings.IA_RECOMENDADOR_HISTORIAL
+    return [
+        {'producto': p['nombre'], 'cantidad': p['cantidad'], 'fecha': p['fecha']}
+        for p in (perfil.ultimos_productos or [])[:limite]
+    ]
+
+
+def resumen_perfil(perfil, palabras=5):
+    """Métricas RFM e intereses del cliente en pocos campos (contexto para la IA)"""
+    if not perfil.compras:
+        return {'compras': 0}
+    return {
+        'compras': perfil.compras,
+        'cliente_desde': perfil.primera_compra.strftime('%Y-%m-%d'),
+        'dias_desde_ultima_compra': (timezone.localdate() - perfil.ultima_compra).days,
+        'total_gastado': float(perfil.total_gastado),
+        'ticket_promedio': round(float(perfil.total_gastado) / perfil.compras, 2),
+        'intereses': ', '.join(palabra for palabra, _ in (perfil.palabras_clave or [])[:palabras])
+    }
@@ -0,0 +1,79 @@
+"""
+Codificación compacta del contexto de los prompts
+En vez de json.dumps(indent=2) (espacios y claves repetidas en cada fila) las listas se
+envían como tablas CSV con una sola cabecera, y se recortan por relevancia hasta un
+presupuesto de tokens (IA_PROMPT_PRESUPUESTO_TOKENS).
+
+Los tokens se estiman sin el tokenizador del modelo (palabras de ~4 caracteres + signos);
+el conteo real de cada llamada se registra en el log desde response.usage.
+"""
+import csv
+import io
+import math
+import re
+
+from django.conf import settings
+
+_PIEZAS = re.compile(r'\w+|[^\w\s]')
+
+
+def contar_tokens(texto):
+    """Estimación de tokens de un texto (cada palabra ~4 caracteres por token, cada signo 1)"""
+    return sum(math.ceil(len(pieza) / 4) for pieza in _PIEZAS.findall(texto or ''))
+
+
+def _valor(valor):
+    """Números sin decimales innecesarios (12990.0 -> 12990, 2.5 -> 2.5)"""
+    if valor is None:
+        return ''
+    if isinstance(valor, float):
+        return int(valor) if valor.is_integer() else round(valor, 2)
+    return valor
+
+
+def _fila_csv(valores):
+    salida = io.StringIO()
+    csv.writer(salida, lineterminator='\n').writerow(_valor(valor) for valor in valores)
+    return salida.getvalue()
+
+
+def tabla_csv(filas, columnas, presupuesto=None):
+    """
+    Codifica una lista de dicts como CSV, cortando cuando se agota el presupuesto de tokens
+    Las filas deben venir ordenadas de más a menos relevante.
+
+    Args:
+        filas: Lista de dicts
+        columnas: Claves a incluir (en orden)
+        presupuesto: Máximo de tokens (default IA_PROMPT_PRESUPUESTO_TOKENS)
+
+    Returns:
+        tuple: (texto CSV, filas incluidas)
+    """
+    presupuesto = presupuesto or settings.IA_PROMPT_PRESUPUESTO_TOKENS
+    lineas = [_fila_csv(columnas)]
+    usados = contar_tokens(lineas[0])
+    for fila in filas:
+        linea = _fila_csv(fila.get(columna) for columna in columnas)
+        tokens = contar_tokens(linea)
+        if usados + tokens > presupuesto:
+            break
+        lineas.append(linea)
+        usados += tokens
+    return ''.join(lineas).rstrip('\n'), len(lineas) - 1
+
+
+def pares_clave_valor(datos):
+    """{"codigo": "A1", "precio": 990} -> "codigo: A1 | precio: 990" """
+    return ' | '.join(f"{clave}: {_valor(valor)}" for clave, valor in datos.items() if valor not in (None, '', []))
+
+
+def tabla_con_titulo(titulo, filas, columnas, presupuesto=None, total=None):
+    """Tabla CSV precedida por un título que indica si se recortó ("PRODUCTOS (30 de 120, ...)")"""
+    texto, incluidas = tabla_csv(filas, columnas, presupuesto)
+    total = len(filas) if total is None else total
+    if incluidas < total:
+        encabezado = f"{titulo} ({incluidas} de {total}, los más relevantes, CSV):"
+    else:
+        encabezado = f"{titulo} (CSV):"
+    return f"{encabezado}\n{texto}", incluidas
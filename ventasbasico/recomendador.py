@@ -0,0 +1,141 @@
+"""
+Recuperación local de candidatos para el recomendador
+Antes de llamar a la IA se preseleccionan los K productos más prometedores para el cliente,
+de modo que el prompt tenga un tamaño acotado sin importar el tamaño del catálogo.
+
+Señales usadas (normalizadas a 0-1 y ponderadas):
+- Co-compra: ventas de otros clientes que incluyen productos que el cliente compró hace poco
+- Palabras clave: keywords en común con los intereses del cliente
+- Popularidad: unidades vendidas en total
+
+Los productos e intereses del cliente salen de su PerfilCliente (tamaño acotado), no de
+recorrer todas sus ventas.
+"""
+import logging
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Q, Sum
+
+from .models import Productos, DetalleVenta
+from .perfiles import obtener_perfil
+
+logger = logging.getLogger(__name__)
+
+PESO_COCOMPRA = 3.0
+PESO_PALABRAS_CLAVE = 2.0
+PESO_POPULARIDAD = 1.0
+
+# Máximo de keywords del perfil que se usan para buscar coincidencias
+MAX_PALABRAS_CLAVE = 20
+
+
+def _normalizar(puntajes):
+    maximo = max(puntajes.values(), default=0)
+    if not maximo:
+        return {}
+    return {producto_id: valor / maximo for producto_id, valor in puntajes.items()}
+
+
+def _puntajes_palabras_clave(palabras):
+    """Cantidad de keywords en común de cada producto en stock con las del historial"""
+    palabras = set(palabras)
+    if not palabras:
+        return {}
+
+    productos = Productos.objects.filter(stock__gt=0)
+    if connection.features.supports_json_field_contains:
+        # Contención JSON (@>) por cada keyword, usa el índice GIN
+        filtro = Q()
+        for palabra in palabras:
+            filtro |= Q(palabras_clave__contains=[palabra])
+        productos = productos.filter(filtro)
+    else:
+        productos = productos.exclude(palabras_clave=[])
+
+    puntajes = {}
+    for producto_id, palabras_producto in productos.values_list('id', 'palabras_clave'):
+        comunes = len(palabras.intersection(palabras_producto or []))
+        if comunes:
+            puntajes[producto_id] = comunes
+    return puntajes
+
+
+def preseleccionar_candidatos(cliente, limite=None, perfil=None):
+    """
+    Devuelve los K productos en stock con mayor puntaje para el cliente
+
+    Args:
+        cliente: Cliente
+        limite: Cantidad de candidatos (default IA_RECOMENDADOR_CANDIDATOS)
+        perfil: PerfilCliente ya cargado (opcional)
+
+    Returns:
+        list: [{"id", "nombre", "codigo", "precio", "stock"}] ordenada por puntaje
+    """
+    limite = limite or settings.IA_RECOMENDADOR_CANDIDATOS
+
+    perfil = perfil or obtener_perfil(cliente)
+    comprados = [p['id'] for p in perfil.ultimos_productos or []]
+
+    cocompra = {}
+    palabras = {}
+    if comprados:
+        cocompra = dict(
+            DetalleVenta.objects
+            .filter(venta__detalles__producto__in=comprados)
+            .exclude(venta__rut_cliente=cliente)
+            .values_list('producto')
+            .annotate(ventas=Count('venta', distinct=True))
+        )
+
+        palabras = _puntajes_palabras_clave(
+            [palabra for palabra, _ in (perfil.palabras_clave or [])[:MAX_PALABRAS_CLAVE]]
+        )
+
+    popularidad = dict(
+        DetalleVenta.objects
+        .filter(producto__stock__gt=0)
+        .values_list('producto')
+        .annotate(unidades=Sum('cantidad'))
+        .order_by('-unidades')[:limite * 2]
+    )
+
+    puntajes = {}
+    for senal, peso in ((cocompra, PESO_COCOMPRA), (palabras, PESO_PALABRAS_CLAVE), (popularidad, PESO_POPULARIDAD)):
+        for producto_id, valor in _normalizar(senal).items():
+            puntajes[producto_id] = puntajes.get(producto_id, 0) + peso * valor
+
+    mejores = sorted(puntajes, key=puntajes.get, reverse=True)[:limite * 2]
+    productos = {
+        p['id']: p
+        for p in Productos.objects.filter(id__in=mejores, stock__gt=0).values('id', 'nombre', 'codigo', 'precio', 'stock')
+    }
+    candidatos = [productos[pid] for pid in mejores if pid in productos][:limite]
+
+    # Sin historial ni ventas (tienda nueva): completar con los productos más recientes
+    if len(candidatos) < limite:
+        ya_incluidos = [p['id'] for p in candidatos]
+        candidatos.extend(
+            Productos.objects
+            .filter(stock__gt=0)
+            .exclude(id__in=ya_incluidos)
+            .order_by('-id')
+            .values('id', 'nombre', 'codigo', 'precio', 'stock')[:limite - len(candidatos)]
+        )
+
+    logger.info(
+        f"Recomendador - {len(candidatos)} candidatos para {cliente.rut} "
+        f"(co-compra: {len(cocompra)}, keywords: {len(palabras)}, populares: {len(popularidad)})"
+    )
+
+    return [
+        {
+            'id': p['id'],
+            'nombre': p['nombre'],
+            'codigo': p['codigo'],
+            'precio': float(p['precio']),
+            'stock': p['stock']
+        }
+        for p in candidatos
+    ]
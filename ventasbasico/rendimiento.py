@@ -0,0 +1,256 @@
+"""
+Instrumentación de rendimiento por request (RendimientoMiddleware)
+Por cada request mide el tiempo total, el tiempo en la BD, cuántas consultas hizo, cuántas
+fueron duplicadas (mismo SQL y parámetros) o repetidas (mismo SQL con otros parámetros, el
+patrón típico de un N+1) y el tamaño de la respuesta.
+
+- Las consultas se registran con un execute_wrapper que se instala en cada conexión al
+  crearse; la medición del request se encuentra mediante un ContextVar, así también se
+  cuentan las consultas de las vistas async (sync_to_async copia el contexto al hilo)
+- La respuesta lleva el header Server-Timing (total y db), visible en las DevTools del navegador
+- Las consultas que superan RENDIMIENTO_CONSULTA_LENTA_MS y los grupos de más de
+  RENDIMIENTO_AVISO_REPETIDAS consultas repetidas quedan en el log con su origen (archivo:línea
+  del proyecto que la disparó)
+- La latencia por ruta también se exporta a Prometheus (ventasbasico/metricas.py, GET /metrics)
+- GET /api/rendimiento/ (solo staff) muestra el resumen por ruta de los últimos
+  RENDIMIENTO_VENTANA segundos. Es por proceso, como el resto de las métricas en memoria
+
+Los requests que no llegan a una vista (estáticos, 404) no entran en el resumen.
+"""
+import contextvars
+import logging
+import re
+import threading
+import time
+import traceback
+from collections import Counter, defaultdict, deque
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+from . import metricas
+
+logger = logging.getLogger(__name__)
+
+_medicion_actual = contextvars.ContextVar('medicion_rendimiento', default=None)
+
+# Listas de parámetros de largo variable (IN (%s, %s, ...)) cuentan como la misma consulta
+_LISTA_PARAMETROS = re.compile(r'%s(?:\s*,\s*%s)+')
+# Los savepoints de transaction.atomic() llevan un nombre distinto cada vez y LIMIT/OFFSET van
+# como literales (cambian con la página y con la cantidad de filas)
+_SAVEPOINT = re.compile(r'"s\d+_x\d+"')
+_LIMITE = re.compile(r'\b(LIMIT|OFFSET) \d+')
+# Anclas de las rutas regex del router de DRF (^productos/$); el ^ de [^/.] se conserva
+_ANCLAS = re.compile(r'(?:^|(?<=/))\^|\$$')
+_RAIZ = str(settings.BASE_DIR)
+
+
+def firma_sql(sql):
+    """SQL sin los valores: dos consultas con la misma firma solo difieren en parámetros"""
+    sql = _LISTA_PARAMETROS.sub('%s...', sql)
+    return _LIMITE.sub(r'\1 %s', _SAVEPOINT.sub('"s..."', sql))
+
+
+def origen_consulta():
+    """Primer frame del proyecto (fuera de Django y de este módulo) en la pila actual"""
+    for frame in reversed(traceback.extract_stack()):
+        archivo = frame.filename
+        if (
+            archivo.startswith(_RAIZ) and archivo != __file__
+            and 'site-packages' not in archivo and not archivo.endswith('middleware.py')
+        ):
+            return f"{archivo[len(_RAIZ) + 1:]}:{frame.lineno} en {frame.name}"
+    return 'desconocido'
+
+
+class Medicion:
+    """Consultas y tiempos de un request"""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.db_ms = 0.0
+        self.firmas = Counter()
+        self.exactas = Counter()
+        # firma -> origen de la primera repetición (se busca una sola vez por firma)
+        self.origenes = {}
+        self.lentas = []
+
+    def registrar(self, sql, params, duracion_ms):
+        self.consultas += 1
+        self.db_ms += duracion_ms
+        firma = firma_sql(sql)
+        self.firmas[firma] += 1
+        try:
+            self.exactas[(sql, repr(params))] += 1
+        except Exception:
+            pass
+        if self.firmas[firma] == 2:
+            self.origenes[firma] = origen_consulta()
+        if duracion_ms >= settings.RENDIMIENTO_CONSULTA_LENTA_MS:
+            self.lentas.append((duracion_ms, sql, origen_consulta()))
+
+    @property
+    def duplicadas(self):
+        return sum(veces - 1 for veces in self.exactas.values())
+
+    @property
+    def repetidas(self):
+        return sum(veces - 1 for veces in self.firmas.values())
+
+    def peor_repeticion(self):
+        """(firma, veces, origen) de la consulta más repetida, o None"""
+        if not self.firmas:
+            return None
+        firma, veces = self.firmas.most_common(1)[0]
+        if veces < 2:
+            return None
+        return firma, veces, self.origenes.get(firma, 'desconocido')
+
+
+def registrar_consulta(execute, sql, params, many, context):
+    """execute_wrapper: suma la consulta a la medición del request en curso (si hay)"""
+    medicion = _medicion_actual.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.registrar(sql, params, (time.perf_counter() - inicio) * 1000)
+
+
+def _instalar(sender, connection, **kwargs):
+    if registrar_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(registrar_consulta)
+
+
+connection_created.connect(_instalar, dispatch_uid='rendimiento_registrar_consulta')
+
+
+def iniciar_medicion():
+    """Empieza a medir el request actual; devuelve (medicion, token para terminar_medicion)"""
+    medicion = Medicion()
+    return medicion, _medicion_actual.set(medicion)
+
+
+def terminar_medicion(token):
+    _medicion_actual.reset(token)
+
+
+def _percentil(valores, q):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return round(ordenados[max(int(len(ordenados) * q + 0.5) - 1, 0)], 1)
+
+
+class RegistroRendimiento:
+    """Últimas mediciones por ruta del proceso (ventana móvil)"""
+
+    def __init__(self, ventana=None, muestras=None):
+        self.ventana = ventana or settings.RENDIMIENTO_VENTANA
+        self.muestras = muestras or settings.RENDIMIENTO_MUESTRAS_POR_RUTA
+        self._rutas = defaultdict(lambda: deque(maxlen=self.muestras))
+        self._lock = threading.Lock()
+
+    def agregar(self, ruta, codigo, total_ms, medicion, bytes_respuesta):
+        muestra = (
+            time.monotonic(), codigo, total_ms, medicion.db_ms, medicion.consultas,
+            medicion.duplicadas, medicion.repetidas, bytes_respuesta, medicion.peor_repeticion()
+        )
+        with self._lock:
+            self._rutas[ruta].append(muestra)
+
+    def resumen(self):
+        """
+        Métricas por ruta de la ventana, ordenadas por tiempo total consumido
+
+        Returns:
+            list: [{ruta, requests, errores, tiempo_total_ms, p50_ms, p95_ms, max_ms, db_media_ms, consultas_media,
+                   consultas_max, duplicadas_media, repetidas_media, bytes_media, repeticiones}]
+        """
+        desde = time.monotonic() - self.ventana
+        with self._lock:
+            rutas = {ruta: [m for m in muestras if m[0] >= desde] for ruta, muestras in self._rutas.items()}
+
+        resumen = []
+        for ruta, muestras in rutas.items():
+            if not muestras:
+                continue
+            n = len(muestras)
+            totales = [m[2] for m in muestras]
+            tamanos = [m[7] for m in muestras if m[7] is not None]
+            repeticiones = Counter()
+            origenes = {}
+            for *_, peor in muestras:
+                if peor:
+                    repeticiones[peor[0]] += peor[1]
+                    origenes[peor[0]] = peor[2]
+            resumen.append({
+                'ruta': ruta,
+                'requests': n,
+                'errores': sum(1 for m in muestras if m[1] >= 500),
+                'tiempo_total_ms': round(sum(totales), 1),
+                'p50_ms': _percentil(totales, 0.50),
+                'p95_ms': _percentil(totales, 0.95),
+                'max_ms': round(max(totales), 1),
+                'db_media_ms': round(sum(m[3] for m in muestras) / n, 1),
+                'consultas_media': round(sum(m[4] for m in muestras) / n, 1),
+                'consultas_max': max(m[4] for m in muestras),
+                'duplicadas_media': round(sum(m[5] for m in muestras) / n, 1),
+                'repetidas_media': round(sum(m[6] for m in muestras) / n, 1),
+                'bytes_media': round(sum(tamanos) / len(tamanos)) if tamanos else None,
+                # Consultas que más se repiten dentro de un mismo request (candidatas a N+1)
+                'repeticiones': [
+                    {'sql': firma[:300], 'veces': veces, 'origen': origenes[firma]}
+                    for firma, veces in repeticiones.most_common(3)
+                ],
+            })
+        resumen.sort(key=lambda r: -r['tiempo_total_ms'])
+        return resumen
+
+    def limpiar(self):
+        with self._lock:
+            self._rutas.clear()
+
+
+_registro = None
+_registro_lock = threading.Lock()
+
+
+def obtener_registro_rendimiento():
+    """Registro de rendimiento del proceso (se crea al primer uso)"""
+    global _registro
+    if _registro is None:
+        with _registro_lock:
+            if _registro is None:
+                _registro = RegistroRendimiento()
+    return _registro
+
+
+def finalizar_request(request, response, medicion):
+    """Agrega el header Server-Timing, registra la medición y deja en el log lo sospechoso"""
+    total_ms = (time.perf_counter() - medicion.inicio) * 1000
+    if settings.RENDIMIENTO_SERVER_TIMING:
+        response['Server-Timing'] = (
+            f'total;dur={total_ms:.1f}, '
+            f'db;dur={medicion.db_ms:.1f};desc="{medicion.consultas} consultas, {medicion.duplicadas} duplicadas"'
+        )
+
+    coincidencia = getattr(request, 'resolver_match', None)
+    # Las rutas del router de DRF son regex (^productos/$): se dejan sin anclas
+    patron = f"/{_ANCLAS.sub('', coincidencia.route)}" if coincidencia else 'sin_ruta'
+    metricas.observar_request(request.method, patron, response.status_code, total_ms / 1000)
+    metricas.actualizar_conexiones()
+    if coincidencia is None:
+        return
+    ruta = f"{request.method} {patron}"
+    bytes_respuesta = None if response.streaming else len(response.content)
+    obtener_registro_rendimiento().agregar(ruta, response.status_code, total_ms, medicion, bytes_respuesta)
+
+    for duracion_ms, sql, origen in sorted(medicion.lentas, key=lambda l: -l[0])[:5]:
+        logger.warning(f"Consulta lenta ({duracion_ms:.1f} ms) en {ruta} desde {origen}: {sql[:500]}")
+    peor = medicion.peor_repeticion()
+    if peor and peor[1] >= settings.RENDIMIENTO_AVISO_REPETIDAS:
+        logger.warning(f"Consulta repetida {peor[1]} veces en {ruta} desde {peor[2]} (posible N+1): {peor[0][:300]}")
@@ -3,6 +3,9 @@ from .models import *
 from clientes.models import Cliente
 from clientes.serializers import ClienteSerializer
 from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from .signals import stock_guardado
+from .metricas import registrar_checkout
 from datetime import datetime, date
 import base64
 from io import BytesIO
@@ -51,6 +54,20 @@ class ProductosSerializer(serializers.ModelSerializer):
                 return None
         return None
     
+    def validate_palabras_clave(self, value):
+        """Acepta lista de strings (o texto separado por comas por compatibilidad)"""
+        if isinstance(value, str):
+            value = value.split(',')
+        if not isinstance(value, list) or not all(isinstance(p, str) for p in value):
+            raise serializers.ValidationError("Debe ser una lista de palabras clave")
+        return Productos.normalizar_palabras_clave(value)
+    
+    def validate_beneficios(self, value):
+        """Los beneficios se guardan como lista de strings"""
+        if not isinstance(value, list) or not all(isinstance(b, str) for b in value):
+            raise serializers.ValidationError("Debe ser una lista de beneficios")
+        return value
+    
     def validate_foto(self, value):
         """Valida y convierte imagen base64 a bytes"""
         if not value:
@@ -125,6 +142,10 @@ class DetalleVentaSerializer(serializers.ModelSerializer):
         representation['producto'] = representation.pop('producto_detalle')
         return representation
 
+def detalles_con_producto():
+    """Prefetch de los detalles de las ventas con su producto (lo que muestra VentaSerializer)"""
+    return Prefetch('detalles', queryset=DetalleVenta.objects.select_related('producto').order_by('id'))
+
 class DetalleVentaItemSerializer(serializers.Serializer):
     """Serializador para items dentro de una venta (solo para escritura)"""
     producto_id = serializers.IntegerField()
@@ -155,6 +176,7 @@ class VentaSerializer(serializers.ModelSerializer):
         
         # Validar que hay detalles
         if not detalles_data:
+            registrar_checkout('api', 'sin_productos')
             raise serializers.ValidationError({
                 'detalles': 'Debe incluir al menos un producto en la venta.'
             })
@@ -163,6 +185,7 @@ class VentaSerializer(serializers.ModelSerializer):
         try:
             cliente = Cliente.objects.get(rut=rut_cliente)
         except Cliente.DoesNotExist:
+            registrar_checkout('api', 'cliente_inexistente')
             raise serializers.ValidationError({
                 'rut_cliente': f'Cliente con RUT {rut_cliente} no existe. Por favor regístrelo primero.'
             })
@@ -176,23 +199,29 @@ class VentaSerializer(serializers.ModelSerializer):
                 ventas_hoy = Venta.objects.filter(fecha=date.today()).count()
                 validated_data['numero'] = f"{prefijo}-{ventas_hoy + 1:04d}"
             
-            # Verificar stock y calcular total
+            # Verificar stock y calcular total (todos los productos en una consulta, bloqueados
+            # hasta el final de la transacción)
+            productos = Productos.objects.select_for_update().in_bulk(
+                [detalle['producto_id'] for detalle in detalles_data]
+            )
             total_calculado = 0
             productos_verificados = []
             
             for detalle in detalles_data:
-                try:
-                    producto = Productos.objects.select_for_update().get(id=detalle['producto_id'])
-                except Productos.DoesNotExist:
+                producto = productos.get(detalle['producto_id'])
+                if producto is None:
+                    registrar_checkout('api', 'producto_inexistente')
                     raise serializers.ValidationError({
                         'detalles': f'Producto con ID {detalle["producto_id"]} no existe.'
                     })
                 
-                # Verificar stock
+                # Verificar stock (si el producto se repite, cuenta lo ya descontado)
                 if producto.stock < detalle['cantidad']:
+                    registrar_checkout('api', 'stock_insuficiente')
                     raise serializers.ValidationError({
                         'detalles': f'Stock insuficiente para {producto.nombre}. Disponible: {producto.stock}, Solicitado: {detalle["cantidad"]}'
                     })
+                producto.stock -= detalle['cantidad']
                 
                 productos_verificados.append({
                     'producto': producto,
@@ -209,19 +238,23 @@ class VentaSerializer(serializers.ModelSerializer):
                 **validated_data
             )
             
-            # Crear los detalles de venta y reducir stock
-            for item in productos_verificados:
-                DetalleVenta.objects.create(
+            # Crear los detalles de venta y guardar el stock (una consulta cada uno)
+            DetalleVenta.objects.bulk_create([
+                DetalleVenta(
                     venta=venta,
                     producto=item['producto'],
                     cantidad=item['cantidad'],
                     precio_unitario=item['precio_unitario']
                 )
-                
-                # Reducir stock
-                item['producto'].stock -= item['cantidad']
-                item['producto'].save()
+                for item in productos_verificados
+            ])
+            stock_guardado(Productos.guardar_stock(productos.values()))
+            
+            # El perfil de compras del cliente se actualiza al confirmarse (signals.py)
+            transaction.on_commit(lambda: registrar_checkout('api'))
             
+            # La respuesta muestra los detalles con su producto: una consulta para todos
+            prefetch_related_objects([venta], detalles_con_producto())
             return venta
     
     def to_representation(self, instance):
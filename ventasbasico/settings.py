@@ -103,8 +103,9 @@ SIMPLE_JWT = {
 }
 
 MIDDLEWARE = [
+    'ventasbasico.middleware.RendimientoMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'ventasbasico.middleware.WhiteNoiseAsyncMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -146,10 +147,14 @@ if DATABASE_URL:
     DATABASES = {
         'default': dj_database_url.config(
             default=DATABASE_URL,
-            conn_max_age=600,
+            conn_max_age=int(os.getenv('DB_CONN_MAX_AGE', '600')),  # 0 bajo ASGI (ver asgi.py)
             conn_health_checks=True,
         )
     }
+    if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+        # SQLite local (desarrollo, benchmarks): con varios workers las transacciones toman el lock
+        # de escritura al empezar y esperan, en vez de fallar con "database is locked"
+        DATABASES['default'].setdefault('OPTIONS', {}).update({'transaction_mode': 'IMMEDIATE', 'timeout': 20})
 else:
     # Si no existe, usar configuración manual desde variables de entorno
     DATABASES = {
@@ -295,3 +300,116 @@ FILE_UPLOAD_MAX_MEMORY_SIZE = 5 * 1024 * 1024  # 5MB máximo por archivo
 # CONFIGURACIÓN DE IA - GROQ CLOUD
 # ============================================
 GROQ_API_KEY = os.getenv('GROQ_API_KEY', '')
+GROQ_BASE_URL = os.getenv('GROQ_BASE_URL') or None  # None = API oficial (https://api.groq.com)
+GROQ_TIMEOUT = float(os.getenv('GROQ_TIMEOUT', '30'))  # segundos por llamada
+GROQ_CONNECT_TIMEOUT = float(os.getenv('GROQ_CONNECT_TIMEOUT', '5'))  # segundos para abrir la conexión
+GROQ_MAX_CONEXIONES = int(os.getenv('GROQ_MAX_CONEXIONES', '20'))  # conexiones keep-alive por proceso
+GROQ_KEEPALIVE = float(os.getenv('GROQ_KEEPALIVE', '60'))  # segundos que una conexión ociosa sigue abierta
+GROQ_MAX_REINTENTOS = int(os.getenv('GROQ_MAX_REINTENTOS', '2'))  # reintentos con jitter (429/5xx/conexión), solo operaciones idempotentes
+GROQ_REINTENTO_BASE = float(os.getenv('GROQ_REINTENTO_BASE', '0.5'))  # segundos base del backoff exponencial
+
+# Circuit breaker: con GROQ_CIRCUITO_UMBRAL de fallos (y al menos GROQ_CIRCUITO_MINIMO llamadas)
+# en GROQ_CIRCUITO_VENTANA segundos se dejan de llamar a Groq durante GROQ_CIRCUITO_ESPERA segundos
+GROQ_CIRCUITO_VENTANA = float(os.getenv('GROQ_CIRCUITO_VENTANA', '60'))
+GROQ_CIRCUITO_MINIMO = int(os.getenv('GROQ_CIRCUITO_MINIMO', '5'))
+GROQ_CIRCUITO_UMBRAL = float(os.getenv('GROQ_CIRCUITO_UMBRAL', '0.5'))
+GROQ_CIRCUITO_ESPERA = float(os.getenv('GROQ_CIRCUITO_ESPERA', '30'))
+
+# Plazo total por operación (incluye reintentos), muy por debajo del timeout de gunicorn
+IA_DEADLINES = {
+    'chatbot': float(os.getenv('IA_DEADLINE_CHATBOT', '8')),
+    'chatbot_stream': float(os.getenv('IA_DEADLINE_CHATBOT_STREAM', '30')),
+    'recomendacion': float(os.getenv('IA_DEADLINE_RECOMENDACION', '10')),
+    'descripcion': float(os.getenv('IA_DEADLINE_DESCRIPCION', '20')),
+}
+
+# Telemetría de llamadas (tabla MetricaIA): cada cuántos segundos se vuelca y cuántos días se guarda
+GROQ_TELEMETRIA_INTERVALO = float(os.getenv('GROQ_TELEMETRIA_INTERVALO', '60'))
+GROQ_TELEMETRIA_RETENCION_DIAS = int(os.getenv('GROQ_TELEMETRIA_RETENCION_DIAS', '7'))
+
+# Cola de tareas de IA (tabla TareaIA, worker: python manage.py procesar_tareas_ia)
+TAREAS_IA_CONCURRENCIA = int(os.getenv('TAREAS_IA_CONCURRENCIA', '4'))
+TAREAS_IA_MAX_INTENTOS = int(os.getenv('TAREAS_IA_MAX_INTENTOS', '3'))
+TAREAS_IA_ESPERA_BASE = float(os.getenv('TAREAS_IA_ESPERA_BASE', '10'))
+# Segundos tras los que una tarea "en_proceso" se considera de un worker caído y vuelve a la cola
+TAREAS_IA_TIMEOUT = int(os.getenv('TAREAS_IA_TIMEOUT', '300'))
+
+# ============================================
+# EVENTOS DE STOCK (SSE)
+# ============================================
+# BrokerLocal sirve para un solo worker; con varios workers usar BrokerRedis
+STOCK_BROKER_BACKEND = os.getenv('STOCK_BROKER_BACKEND', 'ventasbasico.eventos_stock.BrokerLocal')
+STOCK_EVENTOS_VENTANA = float(os.getenv('STOCK_EVENTOS_VENTANA', '0.5'))  # segundos para agrupar cambios
+STOCK_EVENTOS_KEEPALIVE = float(os.getenv('STOCK_EVENTOS_KEEPALIVE', '15'))  # segundos entre pings
+REDIS_URL = os.getenv('REDIS_URL', '')
+
+# ============================================
+# CACHE
+# ============================================
+# Por defecto cache en memoria (por proceso). Con REDIS_URL se comparte entre workers,
+# necesario para que el autocompletado detecte cambios hechos en otros workers.
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# ============================================
+# COALESCENCIA DE REQUESTS (single-flight)
+# ============================================
+# Requests idénticos simultáneos a /api/ia/chat/ y /api/ia/productos/recomendar/ comparten un solo cálculo
+SINGLE_FLIGHT_ACTIVO = os.getenv('SINGLE_FLIGHT_ACTIVO', 'True') == 'True'
+# También entre workers mediante un lock en el cache (solo tiene sentido con REDIS_URL)
+SINGLE_FLIGHT_CACHE = os.getenv('SINGLE_FLIGHT_CACHE', 'False') == 'True'
+SINGLE_FLIGHT_ESPERA = float(os.getenv('SINGLE_FLIGHT_ESPERA', '15'))  # segundos máximos esperando a otro request
+SINGLE_FLIGHT_RESULTADO_TTL = float(os.getenv('SINGLE_FLIGHT_RESULTADO_TTL', '5'))  # segundos que se publica el resultado en el cache
+
+# ============================================
+# INSTRUMENTACIÓN DE RENDIMIENTO
+# ============================================
+# Tiempo, consultas SQL y tamaño de cada request; resumen por ruta en GET /api/rendimiento/ (staff)
+RENDIMIENTO_ACTIVO = os.getenv('RENDIMIENTO_ACTIVO', 'True') == 'True'
+RENDIMIENTO_SERVER_TIMING = os.getenv('RENDIMIENTO_SERVER_TIMING', 'True') == 'True'  # header Server-Timing en las respuestas
+RENDIMIENTO_CONSULTA_LENTA_MS = float(os.getenv('RENDIMIENTO_CONSULTA_LENTA_MS', '100'))  # consultas más lentas van al log
+RENDIMIENTO_AVISO_REPETIDAS = int(os.getenv('RENDIMIENTO_AVISO_REPETIDAS', '10'))  # misma consulta N veces en un request -> log
+RENDIMIENTO_VENTANA = float(os.getenv('RENDIMIENTO_VENTANA', '900'))  # segundos que abarca el resumen por ruta
+RENDIMIENTO_MUESTRAS_POR_RUTA = int(os.getenv('RENDIMIENTO_MUESTRAS_POR_RUTA', '500'))  # requests guardados por ruta
+# GET /metrics (Prometheus); si se define, el scrape debe enviar "Authorization: Bearer <token>"
+METRICAS_TOKEN = os.getenv('METRICAS_TOKEN', '')
+
+# ============================================
+# AUTOCOMPLETADO DE PRODUCTOS
+# ============================================
+AUTOCOMPLETADO_TTL = float(os.getenv('AUTOCOMPLETADO_TTL', '300'))  # segundos entre reconstrucciones (popularidad)
+AUTOCOMPLETADO_CHEQUEO_VERSION = float(os.getenv('AUTOCOMPLETADO_CHEQUEO_VERSION', '1'))  # segundos entre chequeos de versión
+
+# ============================================
+# RECOMENDADOR
+# ============================================
+IA_RECOMENDADOR_CANDIDATOS = int(os.getenv('IA_RECOMENDADOR_CANDIDATOS', '30'))  # productos enviados a la IA
+IA_RECOMENDADOR_HISTORIAL = int(os.getenv('IA_RECOMENDADOR_HISTORIAL', '20'))  # ítems del historial en el prompt
+# Perfil de compras del cliente (tabla PerfilCliente, tamaño acotado)
+PERFIL_ULTIMOS_PRODUCTOS = int(os.getenv('PERFIL_ULTIMOS_PRODUCTOS', '20'))  # productos distintos guardados
+PERFIL_MAX_PALABRAS = int(os.getenv('PERFIL_MAX_PALABRAS', '30'))  # keywords guardadas
+IA_VECINOS_TOP_N = int(os.getenv('IA_VECINOS_TOP_N', '20'))  # vecinos guardados por producto (modo local)
+
+# ============================================
+# PROMPTS DE IA
+# ============================================
+IA_PROMPT_PRESUPUESTO_TOKENS = int(os.getenv('IA_PROMPT_PRESUPUESTO_TOKENS', '1500'))  # tokens para tablas de contexto
+IA_CHATBOT_PRODUCTOS = int(os.getenv('IA_CHATBOT_PRODUCTOS', '100'))  # productos relevantes candidatos para el chatbot
+
+# ============================================
+# CACHE SEMÁNTICO DEL CHATBOT
+# ============================================
+CHATBOT_CACHE_MAX = int(os.getenv('CHATBOT_CACHE_MAX', '256'))  # respuestas guardadas por proceso (LRU)
+CHATBOT_CACHE_TTL = float(os.getenv('CHATBOT_CACHE_TTL', '600'))  # segundos que una respuesta es válida
+CHATBOT_CACHE_UMBRAL = float(os.getenv('CHATBOT_CACHE_UMBRAL', '0.8'))  # similitud coseno mínima (0-1)
@@ -0,0 +1,120 @@
+"""
+Señales de los modelos Productos y Venta
+- Publica los cambios de stock (checkout, admin, importaciones) al broker de eventos
+- Mantiene actualizado el índice de autocompletado del worker
+- Actualiza los vecinos del recomendador local con cada venta
+- Mantiene el perfil de compras del cliente (venta nueva, editada o eliminada)
+"""
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from . import autocompletado
+from .filtrado_colaborativo import registrar_venta
+from .perfiles import recalcular_perfiles, registrar_compra
+from .models import Productos, Venta
+from .eventos_stock import obtener_broker
+
+# Campos cuyo cambio obliga a los demás workers a refrescar el autocompletado
+CAMPOS_AUTOCOMPLETADO = ('nombre', 'codigo', 'precio')
+
+
+def _valores(instance, campos):
+    # Se lee desde __dict__ para no disparar una consulta si el campo está diferido
+    return tuple(instance.__dict__.get(campo) for campo in campos)
+
+
+@receiver(post_init, sender=Productos)
+def recordar_valores_originales(sender, instance, **kwargs):
+    """Guarda los valores cargados desde la BD para detectar cambios al guardar"""
+    instance._stock_original = instance.__dict__.get('stock')
+    instance._autocompletado_original = _valores(instance, CAMPOS_AUTOCOMPLETADO)
+
+
+@receiver(post_save, sender=Productos)
+def publicar_cambio_stock(sender, instance, created, **kwargs):
+    """Publica {id, stock} solo si el stock cambió, una vez confirmada la transacción"""
+    stock = instance.__dict__.get('stock')
+    if stock is None or (not created and stock == instance._stock_original):
+        return
+    instance._stock_original = stock
+    producto_id = instance.pk
+    transaction.on_commit(lambda: obtener_broker().publicar(producto_id, stock))
+
+
+def stock_guardado(productos):
+    """
+    Equivalente de las señales para el stock guardado con Productos.guardar_stock (bulk_update,
+    que no envía post_save): publica los productos cuyo stock cambió y actualiza el
+    autocompletado local, una vez confirmada la transacción
+    """
+    cambiados = []
+    for producto in productos:
+        if producto.stock != producto._stock_original:
+            producto._stock_original = producto.stock
+            cambiados.append(producto)
+    if not cambiados:
+        return
+    eventos = [(producto.pk, producto.stock) for producto in cambiados]
+
+    def publicar():
+        broker = obtener_broker()
+        for producto_id, stock in eventos:
+            broker.publicar(producto_id, stock)
+        for producto in cambiados:
+            autocompletado.producto_guardado(producto, compartir=False)
+
+    transaction.on_commit(publicar)
+
+
+@receiver(post_save, sender=Productos)
+def actualizar_autocompletado(sender, instance, created, **kwargs):
+    """Actualiza el índice local; solo versiona (avisa a otros workers) si cambió nombre/código/precio"""
+    valores = _valores(instance, CAMPOS_AUTOCOMPLETADO)
+    compartir = created or valores != instance._autocompletado_original
+    instance._autocompletado_original = valores
+    transaction.on_commit(lambda: autocompletado.producto_guardado(instance, compartir=compartir))
+
+
+@receiver(post_delete, sender=Productos)
+def publicar_producto_eliminado(sender, instance, **kwargs):
+    """Un producto eliminado se informa con stock 0 y se quita del autocompletado"""
+    producto_id = instance.pk
+    transaction.on_commit(lambda: obtener_broker().publicar(producto_id, 0))
+    transaction.on_commit(lambda: autocompletado.producto_eliminado(producto_id))
+
+
+@receiver(post_save, sender=Venta)
+def actualizar_vecinos(sender, instance, created, **kwargs):
+    """Al confirmarse la venta (y sus detalles) se actualizan los pares co-comprados"""
+    if created:
+        venta_id = instance.pk
+        transaction.on_commit(lambda: registrar_venta(venta_id))
+
+
+@receiver(post_init, sender=Venta)
+def recordar_cliente_original(sender, instance, **kwargs):
+    """Guarda el cliente cargado desde la BD: si la venta cambia de cliente se rehacen ambos perfiles"""
+    instance._rut_cliente_original = instance.__dict__.get('rut_cliente_id')
+
+
+@receiver(post_save, sender=Venta)
+def actualizar_perfil(sender, instance, created, **kwargs):
+    """
+    Venta nueva: se suma al perfil del cliente al confirmarse (con sus detalles)
+    Venta editada (admin, API): el perfil se reconstruye, sus cambios no se pueden restar
+    """
+    venta_id = instance.pk
+    if created:
+        transaction.on_commit(lambda: registrar_compra(venta_id))
+        return
+    ruts = sorted({instance.rut_cliente_id, instance._rut_cliente_original} - {None})
+    instance._rut_cliente_original = instance.rut_cliente_id
+    transaction.on_commit(lambda: recalcular_perfiles(ruts))
+
+
+@receiver(post_delete, sender=Venta)
+def descontar_venta_eliminada(sender, instance, **kwargs):
+    """Una venta eliminada sale del perfil de su cliente"""
+    ruts = [instance.rut_cliente_id]
+    transaction.on_commit(lambda: recalcular_perfiles(ruts))
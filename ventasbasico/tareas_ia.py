@@ -0,0 +1,168 @@
+"""
+Cola de tareas de IA sobre la BD (modelo TareaIA)
+POST /api/ia/productos/{id}/generar-descripcion/ con {"async": true} encola la tarea y
+responde 202 al instante; los workers (python manage.py procesar_tareas_ia) la ejecutan y
+guardan el resultado en Productos. El estado se consulta en GET /api/ia/tareas/{id}/.
+
+- Los workers toman tareas con SELECT ... FOR UPDATE SKIP LOCKED (PostgreSQL): varios
+  procesos pueden trabajar en paralelo sin tomar la misma tarea
+- Si Groq falla la tarea vuelve a la cola con espera exponencial (o hasta que el circuito
+  se cierre) hasta TAREAS_IA_MAX_INTENTOS
+- Las tareas "en_proceso" de un worker que murió se liberan después de TAREAS_IA_TIMEOUT.
+  Cada reclamo incrementa "intentos", que identifica al worker dueño de la tarea: si un
+  worker lento termina después de que su tarea se liberó, no guarda su resultado ni
+  cambia el estado que ya maneja el nuevo dueño
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .circuito import CircuitoAbiertoError
+from .descripciones import generar_descripcion
+from .groq_service import ErrorGroq
+from .models import TareaIA
+
+logger = logging.getLogger(__name__)
+
+
+class TareaReasignadaError(Exception):
+    """La tarea se liberó (TAREAS_IA_TIMEOUT) y la tomó otro worker mientras se ejecutaba"""
+
+
+def encolar_descripcion(producto, forzar=False):
+    """
+    Encola la generación de la descripción del producto
+    Si ya hay una tarea pendiente para el producto se reutiliza (con forzar=True pasa a ser
+    forzada); una en proceso solo se reutiliza si es forzada o si no se pide forzar, porque
+    una no forzada puede terminar sin regenerar.
+
+    Returns:
+        tuple: (tarea, creada)
+    """
+    with transaction.atomic():
+        existentes = list(
+            TareaIA.objects.select_for_update()
+            .filter(producto=producto, tipo=TareaIA.DESCRIPCION, estado__in=[TareaIA.PENDIENTE, TareaIA.EN_PROCESO])
+            .order_by('id')
+        )
+        for existente in existentes:
+            if existente.estado == TareaIA.PENDIENTE:
+                if forzar and not existente.parametros.get('forzar'):
+                    existente.parametros = {**existente.parametros, 'forzar': True}
+                    existente.save(update_fields=['parametros'])
+                return existente, False
+        for existente in existentes:
+            if not forzar or existente.parametros.get('forzar'):
+                return existente, False
+        tarea = TareaIA.objects.create(
+            producto=producto,
+            tipo=TareaIA.DESCRIPCION,
+            parametros={'forzar': bool(forzar)},
+            disponible_desde=timezone.now()
+        )
+    logger.info(f"Tarea IA {tarea.id} encolada: descripción del producto {producto.id}")
+    return tarea, True
+
+
+def liberar_colgadas():
+    """
+    Devuelve a la cola las tareas en proceso de workers que dejaron de responder
+    TAREAS_IA_TIMEOUT debe superar lo que puede durar una llamada a Groq con sus reintentos;
+    si un worker igual sigue vivo, su resultado se descarta (ver TareaReasignadaError).
+    """
+    limite = timezone.now() - timedelta(seconds=settings.TAREAS_IA_TIMEOUT)
+    liberadas = TareaIA.objects.filter(estado=TareaIA.EN_PROCESO, iniciada__lt=limite).update(
+        estado=TareaIA.PENDIENTE, disponible_desde=timezone.now()
+    )
+    if liberadas:
+        logger.warning(f"{liberadas} tareas IA colgadas devueltas a la cola")
+    return liberadas
+
+
+def reclamar_tareas(cantidad):
+    """
+    Toma hasta `cantidad` tareas pendientes y las marca en proceso
+
+    Returns:
+        list: Tareas reclamadas (con el producto cargado)
+    """
+    if cantidad <= 0:
+        return []
+    ahora = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            TareaIA.objects.select_for_update(skip_locked=True)
+            .filter(estado=TareaIA.PENDIENTE, disponible_desde__lte=ahora)
+            .order_by('disponible_desde', 'id')
+            .values_list('id', flat=True)[:cantidad]
+        )
+        if not ids:
+            return []
+        # El filtro por estado evita tomar dos veces la misma tarea en BDs sin SKIP LOCKED (SQLite)
+        TareaIA.objects.filter(id__in=ids, estado=TareaIA.PENDIENTE).update(
+            estado=TareaIA.EN_PROCESO, iniciada=ahora, intentos=F('intentos') + 1
+        )
+    return list(
+        TareaIA.objects.select_related('producto')
+        .filter(id__in=ids, estado=TareaIA.EN_PROCESO, iniciada=ahora)
+        .order_by('id')
+    )
+
+
+def _asignada(tarea):
+    """Tareas que siguen siendo de este worker (mismo reclamo, todavía en proceso)"""
+    return TareaIA.objects.filter(id=tarea.id, estado=TareaIA.EN_PROCESO, intentos=tarea.intentos)
+
+
+def _confirmar_asignada(tarea):
+    # Bloquea la fila hasta que se guarde el resultado: liberar_colgadas espera
+    if not _asignada(tarea).select_for_update().exists():
+        raise TareaReasignadaError(f"La tarea {tarea.id} fue liberada y la tomó otro worker")
+
+
+def ejecutar_tarea(tarea):
+    """Ejecuta una tarea reclamada y guarda su estado final (o la devuelve a la cola)"""
+    try:
+        if tarea.tipo == TareaIA.DESCRIPCION:
+            generar_descripcion(
+                tarea.producto,
+                forzar=tarea.parametros.get('forzar', False),
+                antes_de_guardar=lambda: _confirmar_asignada(tarea)
+            )
+        else:
+            raise ValueError(f"Tipo de tarea desconocido: {tarea.tipo}")
+    except TareaReasignadaError as e:
+        logger.warning(f"{str(e)}: se descarta el resultado del intento {tarea.intentos}")
+        return TareaIA.PENDIENTE
+    except ErrorGroq as e:
+        if tarea.intentos < settings.TAREAS_IA_MAX_INTENTOS:
+            if isinstance(e.__cause__, CircuitoAbiertoError):
+                espera = e.__cause__.reintentar_en
+            else:
+                espera = settings.TAREAS_IA_ESPERA_BASE * 2 ** (tarea.intentos - 1)
+            _asignada(tarea).update(
+                estado=TareaIA.PENDIENTE,
+                error=str(e),
+                disponible_desde=timezone.now() + timedelta(seconds=espera)
+            )
+            logger.warning(f"Tarea IA {tarea.id} reintentará en {espera:.0f}s: {str(e)}")
+            return TareaIA.PENDIENTE
+        return _terminar(tarea, TareaIA.ERROR, str(e))
+    except Exception as e:
+        return _terminar(tarea, TareaIA.ERROR, str(e))
+    return _terminar(tarea, TareaIA.COMPLETADA)
+
+
+def _terminar(tarea, estado, error=''):
+    if not _asignada(tarea).update(estado=estado, error=error, terminada=timezone.now()):
+        logger.warning(f"Tarea IA {tarea.id} fue liberada y la tomó otro worker: no se cambia su estado")
+        return TareaIA.PENDIENTE
+    if estado == TareaIA.ERROR:
+        logger.error(f"Tarea IA {tarea.id} falló después de {tarea.intentos} intentos: {error}")
+    else:
+        logger.info(f"Tarea IA {tarea.id} completada (producto {tarea.producto_id})")
+    return estado
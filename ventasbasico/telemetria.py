@@ -0,0 +1,220 @@
+"""
+Telemetría de las llamadas a Groq: latencia, tokens, reintentos y errores por operación
+Cada llamada se suma a un acumulador en memoria (sin tocar la BD en el request). Un hilo
+del proceso vuelca los acumulados cada GROQ_TELEMETRIA_INTERVALO segundos a la tabla
+MetricaIA: una fila por operación e intervalo, con la latencia como histograma de tramos
+fijos, así los percentiles de varios procesos e intervalos se obtienen sumando filas.
+
+GET /api/ia/stats/ muestra p50/p95/p99 por operación de la última hora y del último día.
+Si el volcado falla (ej: la tabla aún no existe porque faltan las migraciones) los
+acumulados se conservan para el siguiente intervalo.
+"""
+import atexit
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection
+from django.utils import timezone
+
+from .metricas import observar_groq
+
+logger = logging.getLogger(__name__)
+
+# Límite superior (ms) de cada tramo del histograma; el último tramo es "más de 30 s"
+TRAMOS_MS = (50, 100, 200, 300, 500, 750, 1000, 1500, 2000, 3000, 5000, 7500, 10000, 15000, 20000, 30000)
+
+CAMPOS = ('llamadas', 'errores', 'rechazadas', 'reintentos', 'tokens_prompt', 'tokens_respuesta', 'duracion_total_ms')
+
+
+def _acumulador():
+    return {**{campo: 0 for campo in CAMPOS}, 'histograma': [0] * (len(TRAMOS_MS) + 1)}
+
+
+def _sumar(total, datos):
+    for campo in CAMPOS:
+        total[campo] += datos[campo]
+    for i, cantidad in enumerate(datos['histograma'][:len(total['histograma'])]):
+        total['histograma'][i] += cantidad
+
+
+def _tramo(duracion_ms):
+    for i, limite in enumerate(TRAMOS_MS):
+        if duracion_ms <= limite:
+            return i
+    return len(TRAMOS_MS)
+
+
+def percentil(histograma, q):
+    """Percentil q (0-1) estimado desde el histograma, interpolando dentro del tramo"""
+    total = sum(histograma)
+    if not total:
+        return None
+    objetivo = q * total
+    acumulado = 0
+    for i, cantidad in enumerate(histograma):
+        if cantidad and acumulado + cantidad >= objetivo:
+            if i == len(TRAMOS_MS):
+                return float(TRAMOS_MS[-1])
+            desde = TRAMOS_MS[i - 1] if i else 0
+            return round(desde + (TRAMOS_MS[i] - desde) * (objetivo - acumulado) / cantidad, 1)
+        acumulado += cantidad
+    return float(TRAMOS_MS[-1])
+
+
+class TelemetriaIA:
+    """Acumula las métricas del proceso y las vuelca periódicamente a MetricaIA"""
+
+    def __init__(self, intervalo=None):
+        self.intervalo = intervalo or settings.GROQ_TELEMETRIA_INTERVALO
+        self._pendientes = {}
+        self._inicio = timezone.now()
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._ultima_limpieza = 0.0
+        self._sin_tabla = False
+
+    def registrar(self, operacion, inicio, uso=None, reintentos=0, error=False, rechazada=False):
+        """
+        Suma una llamada (con sus reintentos) a los acumulados del proceso
+
+        Args:
+            operacion: Nombre de la funcionalidad (recomendacion, descripcion, chatbot, ...)
+            inicio: time.perf_counter() al empezar el primer intento
+            uso: response.usage de Groq (prompt_tokens, completion_tokens) si lo hay
+            reintentos: Intentos adicionales al primero
+            error: La llamada terminó en ErrorGroq
+            rechazada: No se llamó porque el circuito estaba abierto (no cuenta en la latencia)
+        """
+        duracion_ms = (time.perf_counter() - inicio) * 1000
+        observar_groq(operacion, duracion_ms / 1000, error=error, rechazada=rechazada)
+        with self._lock:
+            datos = self._pendientes.setdefault(operacion, _acumulador())
+            if rechazada:
+                datos['rechazadas'] += 1
+            else:
+                datos['llamadas'] += 1
+                datos['errores'] += int(error)
+                datos['reintentos'] += reintentos
+                datos['duracion_total_ms'] += duracion_ms
+                datos['histograma'][_tramo(duracion_ms)] += 1
+                if uso is not None:
+                    datos['tokens_prompt'] += getattr(uso, 'prompt_tokens', 0) or 0
+                    datos['tokens_respuesta'] += getattr(uso, 'completion_tokens', 0) or 0
+            if self._hilo is None:
+                self._iniciar_hilo()
+
+    def _iniciar_hilo(self):
+        # Se inicia con la primera llamada: con gunicorn eso ocurre ya dentro de cada worker
+        self._hilo = threading.Thread(target=self._bucle, name='telemetria-ia', daemon=True)
+        self._hilo.start()
+        atexit.register(self._volcar_seguro)
+
+    def _bucle(self):
+        while True:
+            time.sleep(self.intervalo)
+            self._volcar_seguro()
+
+    def _volcar_seguro(self):
+        try:
+            self.volcar()
+            self._sin_tabla = False
+        except DatabaseError as e:
+            if not self._falta_tabla():
+                logger.error(f"Error guardando la telemetría de IA: {str(e)}")
+            elif not self._sin_tabla:
+                # Se avisa una vez: el hilo lo reintenta en cada intervalo
+                self._sin_tabla = True
+                logger.warning(
+                    "La tabla de MetricaIA no existe (falta python manage.py migrate): "
+                    "la telemetría de IA queda solo en memoria"
+                )
+        except Exception as e:
+            logger.error(f"Error guardando la telemetría de IA: {str(e)}")
+        finally:
+            close_old_connections()
+
+    def _falta_tabla(self):
+        from .models import MetricaIA
+
+        try:
+            return MetricaIA._meta.db_table not in connection.introspection.table_names()
+        except DatabaseError:
+            return False
+
+    def volcar(self):
+        """Guarda los acumulados en MetricaIA y reinicia el intervalo"""
+        from .models import MetricaIA
+
+        with self._lock:
+            pendientes, self._pendientes = self._pendientes, {}
+            inicio, self._inicio = self._inicio, timezone.now()
+        if pendientes:
+            try:
+                MetricaIA.objects.bulk_create([
+                    MetricaIA(operacion=operacion, inicio=inicio, **datos) for operacion, datos in pendientes.items()
+                ])
+            except DatabaseError:
+                # Los acumulados vuelven al intervalo en curso y se reintentan en el próximo volcado
+                with self._lock:
+                    for operacion, datos in pendientes.items():
+                        _sumar(self._pendientes.setdefault(operacion, _acumulador()), datos)
+                    self._inicio = inicio
+                raise
+
+        # Borrar las filas antiguas una vez por hora
+        if time.monotonic() - self._ultima_limpieza > 3600:
+            self._ultima_limpieza = time.monotonic()
+            limite = timezone.now() - timedelta(days=settings.GROQ_TELEMETRIA_RETENCION_DIAS)
+            MetricaIA.objects.filter(inicio__lt=limite).delete()
+
+    def resumen(self, desde):
+        """
+        Métricas por operación desde la fecha indicada (filas guardadas + pendientes de este proceso)
+
+        Returns:
+            dict: {operacion: {llamadas, errores, tasa_error, rechazadas, reintentos,
+                   tokens_prompt, tokens_respuesta, latencia_media_ms, p50_ms, p95_ms, p99_ms}}
+        """
+        from .models import MetricaIA
+
+        totales = {}
+        for fila in MetricaIA.objects.filter(inicio__gte=desde).values('operacion', 'histograma', *CAMPOS):
+            _sumar(totales.setdefault(fila['operacion'], _acumulador()), fila)
+        with self._lock:
+            for operacion, datos in self._pendientes.items():
+                _sumar(totales.setdefault(operacion, _acumulador()), datos)
+
+        resumen = {}
+        for operacion, total in sorted(totales.items()):
+            llamadas = total['llamadas']
+            resumen[operacion] = {
+                'llamadas': llamadas,
+                'errores': total['errores'],
+                'tasa_error': round(total['errores'] / llamadas, 3) if llamadas else 0.0,
+                'rechazadas': total['rechazadas'],
+                'reintentos': total['reintentos'],
+                'tokens_prompt': total['tokens_prompt'],
+                'tokens_respuesta': total['tokens_respuesta'],
+                'latencia_media_ms': round(total['duracion_total_ms'] / llamadas, 1) if llamadas else None,
+                'p50_ms': percentil(total['histograma'], 0.50),
+                'p95_ms': percentil(total['histograma'], 0.95),
+                'p99_ms': percentil(total['histograma'], 0.99),
+            }
+        return resumen
+
+
+_telemetria = None
+_telemetria_lock = threading.Lock()
+
+
+def obtener_telemetria():
+    """Telemetría de IA del proceso (se crea al primer uso)"""
+    global _telemetria
+    if _telemetria is None:
+        with _telemetria_lock:
+            if _telemetria is None:
+                _telemetria = TelemetriaIA()
+    return _telemetria
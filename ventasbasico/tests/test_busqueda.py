@@ -0,0 +1,133 @@
+"""
+Búsqueda de texto completo (busqueda.py) y sincronización del índice nativo
+(columna tsvector en PostgreSQL, tabla FTS5 con triggers en SQLite)
+"""
+from decimal import Decimal
+
+from django.contrib import admin
+from django.test import TestCase
+
+from ventasbasico.busqueda import buscar_productos
+from ventasbasico.models import Productos
+
+
+def crear_producto(nombre, **campos):
+    campos.setdefault('stock', 10)
+    campos.setdefault('precio', Decimal('1000'))
+    return Productos.objects.create(nombre=nombre, **campos)
+
+
+def buscar(texto, queryset=None):
+    queryset = Productos.objects.all() if queryset is None else queryset
+    return list(buscar_productos(queryset, texto).values_list('nombre', flat=True))
+
+
+class BusquedaTests(TestCase):
+
+    def test_ordena_por_relevancia(self):
+        crear_producto('Galletas de avena', descripcion_larga='Ideales para acompañar con leche')
+        crear_producto('Leche entera')
+        crear_producto('Pan amasado')
+
+        self.assertEqual(buscar('leche'), ['Leche entera', 'Galletas de avena'])
+
+    def test_busca_en_palabras_clave_y_descripciones(self):
+        crear_producto('Producto A', palabras_clave=['chocolate', 'postre'])
+        crear_producto('Producto B', descripcion_corta='Barra de chocolate amargo')
+        crear_producto('Producto C', descripcion_larga='Sin azúcar')
+
+        self.assertCountEqual(buscar('chocolate'), ['Producto A', 'Producto B'])
+
+    def test_texto_vacio_o_sin_terminos(self):
+        crear_producto('Leche entera')
+
+        self.assertEqual(buscar('   '), ['Leche entera'])
+        self.assertEqual(buscar('!!!'), [])
+
+    def test_filtros_se_aplican_sobre_todas_las_coincidencias(self):
+        # Más coincidencias sin stock (y mejor rankeadas) que cualquier top-N previo al filtro
+        Productos.objects.bulk_create([
+            Productos(nombre=f'Leche {i}', codigo=f'L{i}', stock=0, precio=Decimal('1000'))
+            for i in range(1100)
+        ])
+        crear_producto('Galletas', stock=5, descripcion_larga='Con leche')
+
+        self.assertEqual(buscar('leche', Productos.objects.filter(stock__gt=0)), ['Galletas'])
+
+    def test_api_combina_busqueda_y_filtros(self):
+        crear_producto('Leche entera', precio=Decimal('1200'))
+        crear_producto('Leche descremada', precio=Decimal('900'))
+        crear_producto('Pan', precio=Decimal('1200'))
+
+        respuesta = self.client.get('/api/productos/', {'q': 'leche', 'precio__gte': '1000'})
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual([p['nombre'] for p in respuesta.json()['results']], ['Leche entera'])
+
+
+class IndiceBusquedaSincronizadoTests(TestCase):
+    """El índice sigue a la tabla de productos al crear, editar y eliminar"""
+
+    def test_crear(self):
+        crear_producto('Mermelada de frutilla')
+
+        self.assertEqual(buscar('mermelada'), ['Mermelada de frutilla'])
+
+    def test_editar_campos_indexados(self):
+        producto = crear_producto('Mermelada de frutilla')
+
+        producto.nombre = 'Jalea de frutilla'
+        producto.palabras_clave = ['postre']
+        producto.save()
+
+        self.assertEqual(buscar('mermelada'), [])
+        self.assertEqual(buscar('jalea'), ['Jalea de frutilla'])
+        self.assertEqual(buscar('postre'), ['Jalea de frutilla'])
+
+    def test_editar_otros_campos_mantiene_el_producto(self):
+        producto = crear_producto('Mermelada de frutilla')
+
+        producto.stock = 3
+        producto.save()
+        Productos.objects.filter(pk=producto.pk).update(precio=Decimal('1500'))
+
+        self.assertEqual(buscar('mermelada'), ['Mermelada de frutilla'])
+
+    def test_actualizacion_masiva(self):
+        crear_producto('Mermelada de frutilla')
+
+        Productos.objects.update(descripcion_corta='Casera')
+
+        self.assertEqual(buscar('casera'), ['Mermelada de frutilla'])
+
+    def test_eliminar(self):
+        producto = crear_producto('Mermelada de frutilla')
+
+        producto.delete()
+
+        self.assertEqual(buscar('mermelada'), [])
+
+
+class BusquedaAdminTests(TestCase):
+
+    def setUp(self):
+        self.modelo_admin = admin.site._registry[Productos]
+
+    def test_codigo_exacto_y_texto_en_una_consulta(self):
+        codigo = crear_producto('Pan amasado').codigo
+        crear_producto(f'Leche {codigo}')
+
+        with self.assertNumQueries(1):
+            queryset, duplicados = self.modelo_admin.get_search_results(None, Productos.objects.all(), codigo)
+            nombres = [producto.nombre for producto in queryset]
+
+        self.assertFalse(duplicados)
+        self.assertEqual(nombres, ['Pan amasado', f'Leche {codigo}'])
+
+    def test_busqueda_por_texto(self):
+        crear_producto('Pan amasado')
+        crear_producto('Leche entera')
+
+        queryset, _ = self.modelo_admin.get_search_results(None, Productos.objects.all(), 'leche')
+
+        self.assertEqual([producto.nombre for producto in queryset], ['Leche entera'])
@@ -0,0 +1,64 @@
+"""
+Cache semántico del chatbot (cache_chatbot.py): preguntas parecidas con la misma firma de
+contexto reutilizan la respuesta
+"""
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from ventasbasico.cache_chatbot import CacheSemantico
+from ventasbasico.models import Productos
+
+RESPUESTA = {'respuesta': 'Atendemos de lunes a viernes de 9 a 18 hrs.', 'tipo': 'informacion'}
+
+
+def contexto_general(*productos):
+    """Contexto sin venta/producto/cliente: los productos varían según la redacción de la pregunta"""
+    return {
+        'productos_disponibles': [{'id': i, 'nombre': nombre, 'stock': 5} for i, nombre in enumerate(productos)],
+        'total_productos': len(productos),
+    }
+
+
+class CacheChatbotTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.cache = CacheSemantico(maximo=10, ttl=60, umbral=0.8)
+
+    def test_pregunta_parafraseada_con_otros_productos_relevantes(self):
+        self.cache.guardar('¿Cuál es el horario de atención?', contexto_general('Café', 'Té'), RESPUESTA)
+
+        encontrada = self.cache.buscar('Quisiera saber el horario de atención', contexto_general('Pan'))
+
+        self.assertEqual(encontrada, RESPUESTA)
+
+    def test_otra_venta_o_cliente_no_reutiliza(self):
+        venta = {'venta': {'numero': '20241128-0001', 'total': 1000.0}}
+        self.cache.guardar('¿Cuándo llega mi pedido?', venta, RESPUESTA)
+
+        self.assertIsNone(self.cache.buscar('¿Cuándo llega mi pedido?', {'venta': {'numero': '20241128-0002', 'total': 1000.0}}))
+        self.assertIsNone(self.cache.buscar('¿Cuándo llega mi pedido?', {**venta, 'cliente': {'nombre': 'Ana'}}))
+        self.assertEqual(self.cache.buscar('¿Cuándo llega mi pedido?', venta), RESPUESTA)
+
+    def test_cambio_de_stock_del_producto_consultado(self):
+        self.cache.guardar('¿Está disponible?', {'producto': {'nombre': 'Café', 'stock': 10}}, RESPUESTA)
+
+        self.assertEqual(self.cache.buscar('¿Está disponible?', {'producto': {'nombre': 'Café', 'stock': 3}}), RESPUESTA)
+        self.assertIsNone(self.cache.buscar('¿Está disponible?', {'producto': {'nombre': 'Café', 'stock': 0}}))
+
+    def test_cambio_en_el_catalogo_invalida(self):
+        producto = Productos.objects.create(nombre='Café', stock=10, precio=Decimal('1000'))
+        self.cache.guardar('¿Cuál es el horario de atención?', contexto_general('Café'), RESPUESTA)
+
+        # Vender (solo stock) no cambia la versión del catálogo
+        producto.stock = 9
+        with self.captureOnCommitCallbacks(execute=True):
+            producto.save()
+        self.assertEqual(self.cache.buscar('¿Cuál es el horario de atención?', contexto_general('Café')), RESPUESTA)
+
+        producto.precio = Decimal('1200')
+        with self.captureOnCommitCallbacks(execute=True):
+            producto.save()
+        self.assertIsNone(self.cache.buscar('¿Cuál es el horario de atención?', contexto_general('Café')))
@@ -0,0 +1,288 @@
+"""
+Circuit breaker (circuito.py) y reintentos de GroqService._call_groq / _acall_groq /
+chatbot_atencion_stream: transiciones del circuito, plazo total que incluye los reintentos
+y streaming sin reintentos. Reloj falso y cliente de Groq de prueba (sin red).
+"""
+from types import SimpleNamespace
+from unittest import mock
+
+import httpx
+from django.test import SimpleTestCase, override_settings
+from groq import APITimeoutError, BadRequestError, InternalServerError, RateLimitError
+
+from ventasbasico.circuito import ABIERTO, CERRADO, SEMIABIERTO, CircuitBreaker, CircuitoAbiertoError
+from ventasbasico.groq_service import ErrorGroq, GroqService
+
+PETICION = httpx.Request('POST', 'https://api.groq.com/openai/v1/chat/completions')
+MENSAJES = [{'role': 'user', 'content': 'Hola'}]
+
+
+class Reloj:
+    """Reemplaza time.monotonic / perf_counter / sleep: solo avanza cuando se le pide"""
+
+    def __init__(self):
+        self.ahora = 1000.0
+        self.esperas = []
+
+    def monotonic(self):
+        return self.ahora
+
+    def avanzar(self, segundos):
+        self.ahora += segundos
+
+    def dormir(self, segundos):
+        self.esperas.append(segundos)
+        self.avanzar(segundos)
+
+    async def adormir(self, segundos):
+        self.dormir(segundos)
+
+    def modulo(self):
+        return SimpleNamespace(monotonic=self.monotonic, perf_counter=self.monotonic, sleep=self.dormir)
+
+
+def timeout():
+    return APITimeoutError(request=PETICION)
+
+
+def error_http(clase, codigo, **headers):
+    return clase('error', response=httpx.Response(codigo, request=PETICION, headers=headers), body=None)
+
+
+def respuesta(texto='ok'):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=texto))], usage=None)
+
+
+class CircuitBreakerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.reloj = Reloj()
+        parche = mock.patch('ventasbasico.circuito.time', self.reloj.modulo())
+        parche.start()
+        self.addCleanup(parche.stop)
+        self.circuito = CircuitBreaker(ventana=60, minimo=4, umbral=0.5, espera=30)
+
+    def test_se_abre_con_la_tasa_de_fallos(self):
+        self.circuito.registrar_exito()
+        self.circuito.registrar_exito()
+        self.circuito.registrar_fallo()
+        self.assertEqual(self.circuito.estado, CERRADO)
+
+        self.circuito.registrar_fallo()
+
+        self.assertEqual(self.circuito.estado, ABIERTO)
+        with self.assertRaises(CircuitoAbiertoError) as error:
+            self.circuito.permitir()
+        self.assertEqual(error.exception.reintentar_en, 30)
+        self.assertEqual((self.circuito.aperturas, self.circuito.rechazadas), (1, 1))
+
+    def test_no_se_abre_sin_el_minimo_de_llamadas(self):
+        for _ in range(3):
+            self.circuito.registrar_fallo()
+
+        self.assertEqual(self.circuito.estado, CERRADO)
+        self.circuito.permitir()
+
+    def test_fallos_fuera_de_la_ventana_no_cuentan(self):
+        for _ in range(3):
+            self.circuito.registrar_fallo()
+        self.reloj.avanzar(61)
+
+        self.circuito.registrar_fallo()
+
+        self.assertEqual(self.circuito.estado, CERRADO)
+        self.assertEqual(self.circuito.metricas()['fallos_ventana'], 1)
+
+    def abrir(self):
+        for _ in range(4):
+            self.circuito.registrar_fallo()
+        self.assertEqual(self.circuito.estado, ABIERTO)
+
+    def test_semiabierto_deja_pasar_una_prueba_y_se_cierra(self):
+        self.abrir()
+        self.reloj.avanzar(29)
+        with self.assertRaises(CircuitoAbiertoError):
+            self.circuito.permitir()
+
+        self.reloj.avanzar(1)
+        self.circuito.permitir()
+        self.assertEqual(self.circuito.estado, SEMIABIERTO)
+        # Solo una llamada de prueba a la vez
+        with self.assertRaises(CircuitoAbiertoError):
+            self.circuito.permitir()
+
+        self.circuito.registrar_exito()
+        self.assertEqual(self.circuito.estado, CERRADO)
+        self.circuito.permitir()
+
+    def test_prueba_fallida_vuelve_a_abrir(self):
+        self.abrir()
+        self.reloj.avanzar(30)
+        self.circuito.permitir()
+
+        self.circuito.registrar_fallo()
+
+        self.assertEqual(self.circuito.estado, ABIERTO)
+        self.assertEqual(self.circuito.aperturas, 2)
+        with self.assertRaises(CircuitoAbiertoError):
+            self.circuito.permitir()
+
+    def test_prueba_sin_resultado_no_bloquea_el_circuito(self):
+        self.abrir()
+        self.reloj.avanzar(30)
+        self.circuito.permitir()
+
+        # El request de prueba se canceló y nunca registró su resultado
+        self.reloj.avanzar(31)
+        self.circuito.permitir()
+        self.assertEqual(self.circuito.estado, SEMIABIERTO)
+
+
+@override_settings(
+    GROQ_API_KEY='clave-de-prueba', GROQ_MAX_REINTENTOS=2, GROQ_REINTENTO_BASE=0.5, GROQ_TIMEOUT=30,
+    GROQ_CONNECT_TIMEOUT=5, IA_DEADLINES={'chatbot': 8, 'chatbot_stream': 30, 'descripcion': 20}
+)
+class ReintentosGroqTests(SimpleTestCase):
+
+    def setUp(self):
+        self.reloj = Reloj()
+        for objetivo, valor in (
+            ('ventasbasico.circuito.time', self.reloj.modulo()),
+            ('ventasbasico.groq_service.time', self.reloj.modulo()),
+            ('ventasbasico.groq_service.asyncio.sleep', self.reloj.adormir),
+            # Jitter sin azar: siempre la espera máxima del intento
+            ('ventasbasico.groq_service.random.uniform', lambda minimo, maximo: maximo),
+            ('ventasbasico.groq_service.obtener_telemetria', mock.Mock()),
+        ):
+            parche = mock.patch(objetivo, valor)
+            parche.start()
+            self.addCleanup(parche.stop)
+
+        self.servicio = GroqService()
+        self.servicio.circuito = CircuitBreaker(ventana=60, minimo=3, umbral=0.5, espera=30)
+        self.crear = mock.Mock()
+        self.servicio.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=self.crear)))
+
+    def usar_cliente_async(self, crear):
+        parche = mock.patch.object(
+            GroqService, 'async_client', new_callable=mock.PropertyMock,
+            return_value=SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=crear)))
+        )
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def test_reintenta_errores_transitorios(self):
+        self.crear.side_effect = [timeout(), error_http(InternalServerError, 503), respuesta()]
+
+        self.assertEqual(self.servicio._call_groq(MENSAJES, operacion='chatbot'), 'ok')
+
+        self.assertEqual(self.crear.call_count, 3)
+        # Backoff exponencial: 0.5 * 2^0 y 0.5 * 2^1
+        self.assertEqual(self.reloj.esperas, [0.5, 1.0])
+        self.assertEqual(self.servicio.circuito.estado, CERRADO)
+
+    def test_429_respeta_retry_after(self):
+        self.crear.side_effect = [error_http(RateLimitError, 429, **{'retry-after': '2'}), respuesta()]
+
+        self.servicio._call_groq(MENSAJES, operacion='chatbot')
+
+        self.assertEqual(self.reloj.esperas, [2.0])
+
+    def test_sin_reintentos_disponibles(self):
+        self.crear.side_effect = [timeout(), timeout(), timeout(), respuesta()]
+
+        with self.assertRaises(ErrorGroq) as error:
+            self.servicio._call_groq(MENSAJES, operacion='chatbot')
+
+        self.assertEqual(self.crear.call_count, 3)
+        self.assertIsInstance(error.exception.__cause__, APITimeoutError)
+
+    def test_plazo_total_incluye_los_reintentos(self):
+        def lento(**kwargs):
+            self.reloj.avanzar(6)
+            raise timeout()
+        self.crear.side_effect = lento
+
+        with self.assertRaises(ErrorGroq):
+            self.servicio._call_groq(MENSAJES, operacion='chatbot')
+
+        # Segundo intento con lo que quedaba del plazo de 8s (6s del primero + 0.5s de espera)
+        self.assertEqual(self.crear.call_count, 2)
+        self.assertEqual(self.crear.call_args_list[0].kwargs['timeout'].read, 8)
+        self.assertEqual(self.crear.call_args_list[1].kwargs['timeout'].read, 1.5)
+
+    def test_no_reintenta_si_la_espera_supera_el_plazo(self):
+        self.crear.side_effect = [error_http(RateLimitError, 429, **{'retry-after': '10'}), respuesta()]
+
+        with self.assertRaises(ErrorGroq):
+            self.servicio._call_groq(MENSAJES, operacion='chatbot')
+
+        self.assertEqual(self.crear.call_count, 1)
+        self.assertEqual(self.reloj.esperas, [])
+
+    def test_error_no_transitorio_no_reintenta_ni_abre_el_circuito(self):
+        self.crear.side_effect = error_http(BadRequestError, 400)
+
+        for _ in range(4):
+            with self.assertRaises(ErrorGroq):
+                self.servicio._call_groq(MENSAJES, operacion='chatbot')
+
+        self.assertEqual(self.crear.call_count, 4)
+        self.assertEqual(self.servicio.circuito.estado, CERRADO)
+
+    def test_operacion_no_idempotente_no_reintenta(self):
+        self.crear.side_effect = [timeout(), respuesta()]
+
+        with self.assertRaises(ErrorGroq):
+            self.servicio._call_groq(MENSAJES, operacion='general')
+
+        self.assertEqual(self.crear.call_count, 1)
+
+    def test_circuito_abierto_no_llama_a_groq(self):
+        self.crear.side_effect = timeout()
+        with self.assertRaises(ErrorGroq):
+            self.servicio._call_groq(MENSAJES, operacion='chatbot')
+        self.assertEqual(self.servicio.circuito.estado, ABIERTO)
+        llamadas = self.crear.call_count
+
+        with self.assertRaises(ErrorGroq) as error:
+            self.servicio._call_groq(MENSAJES, operacion='chatbot')
+
+        self.assertEqual(self.crear.call_count, llamadas)
+        self.assertIsInstance(error.exception.__cause__, CircuitoAbiertoError)
+
+    async def test_version_async_reintenta_dentro_del_plazo(self):
+        crear = mock.AsyncMock(side_effect=[error_http(InternalServerError, 500), respuesta('async')])
+        self.usar_cliente_async(crear)
+
+        self.assertEqual(await self.servicio._acall_groq(MENSAJES, operacion='chatbot'), 'async')
+
+        self.assertEqual(crear.await_count, 2)
+        self.assertEqual(self.reloj.esperas, [0.5])
+
+    async def test_stream_no_reintenta_despues_del_primer_token(self):
+        async def stream():
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content='Hola'), finish_reason=None)])
+            raise httpx.ReadError('conexión cortada')
+
+        crear = mock.AsyncMock(return_value=stream())
+        self.usar_cliente_async(crear)
+
+        recibidos = []
+        with self.assertRaises(ErrorGroq):
+            async for texto in self.servicio.chatbot_atencion_stream('Hola'):
+                recibidos.append(texto)
+
+        self.assertEqual(recibidos, ['Hola'])
+        self.assertEqual(crear.await_count, 1)
+        self.assertEqual(self.reloj.esperas, [])
+
+    async def test_stream_no_reintenta_antes_del_primer_token(self):
+        crear = mock.AsyncMock(side_effect=[error_http(InternalServerError, 503), None])
+        self.usar_cliente_async(crear)
+
+        with self.assertRaises(ErrorGroq):
+            async for _ in self.servicio.chatbot_atencion_stream('Hola'):
+                pass
+
+        self.assertEqual(crear.await_count, 1)
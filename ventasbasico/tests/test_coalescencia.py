@@ -0,0 +1,44 @@
+"""
+Single-flight entre workers (coalescencia.py): el lock en el cache es del cálculo que lo tomó
+"""
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from ventasbasico.coalescencia import SingleFlight
+
+CLAVE = 'chat:prueba'
+LOCK = f'single_flight:lock:{CLAVE}'
+
+
+class SingleFlightCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.single_flight = SingleFlight(espera=1, usar_cache=True, resultado_ttl=1, intervalo=0.01)
+
+    async def test_libera_su_lock_al_terminar(self):
+        async def calcular():
+            self.assertIsNotNone(await cache.aget(LOCK))
+            return 'respuesta'
+
+        self.assertEqual(await self.single_flight.ejecutar(CLAVE, calcular), ('respuesta', False))
+        self.assertIsNone(await cache.aget(LOCK))
+
+    async def test_no_borra_el_lock_que_tomo_otro_worker(self):
+        async def calcular():
+            # El lock venció durante el cálculo y otro worker lo tomó
+            await cache.adelete(LOCK)
+            await cache.aadd(LOCK, 'token-de-otro-worker')
+            return 'respuesta'
+
+        await self.single_flight.ejecutar(CLAVE, calcular)
+
+        self.assertEqual(await cache.aget(LOCK), 'token-de-otro-worker')
+
+    async def test_libera_el_lock_si_el_calculo_falla(self):
+        async def calcular():
+            raise ValueError('Groq no respondió')
+
+        with self.assertRaises(ValueError):
+            await self.single_flight.ejecutar(CLAVE, calcular)
+        self.assertIsNone(await cache.aget(LOCK))
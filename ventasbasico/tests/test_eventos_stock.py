@@ -0,0 +1,71 @@
+"""
+Broker de eventos de stock (eventos_stock.py): agrupación por producto dentro de la ventana,
+keepalive sin cambios y entrega de BrokerLocal a sus suscriptores
+"""
+import asyncio
+import threading
+
+from django.test import SimpleTestCase
+
+from ventasbasico.eventos_stock import BrokerLocal, BrokerStockBase
+
+
+class AgruparTests(SimpleTestCase):
+
+    def setUp(self):
+        self.broker = BrokerStockBase(ventana=0.02, keepalive=0.05)
+        self.cola = asyncio.Queue()
+
+    async def test_eventos_de_la_ventana_salen_en_un_lote(self):
+        lotes = self.broker._agrupar(self.cola)
+        for evento in ((1, 10), (2, 5), (1, 9)):
+            self.cola.put_nowait(evento)
+
+        async def durante_la_ventana():
+            await asyncio.sleep(0.005)
+            self.cola.put_nowait((1, 7))
+            self.cola.put_nowait((3, 0))
+        tarea = asyncio.create_task(durante_la_ventana())
+
+        lote = await lotes.__anext__()
+        await tarea
+
+        # Un delta por producto, con el último stock y en el orden del primer evento
+        self.assertEqual(lote, [{'id': 1, 'stock': 7}, {'id': 2, 'stock': 5}, {'id': 3, 'stock': 0}])
+        await lotes.aclose()
+
+    async def test_evento_posterior_a_la_ventana_va_en_el_lote_siguiente(self):
+        lotes = self.broker._agrupar(self.cola)
+        self.cola.put_nowait((1, 10))
+        self.assertEqual(await lotes.__anext__(), [{'id': 1, 'stock': 10}])
+
+        self.cola.put_nowait((1, 8))
+
+        self.assertEqual(await lotes.__anext__(), [{'id': 1, 'stock': 8}])
+        await lotes.aclose()
+
+    async def test_keepalive_sin_cambios(self):
+        lotes = self.broker._agrupar(self.cola)
+
+        self.assertEqual(await lotes.__anext__(), [])
+        await lotes.aclose()
+
+
+class BrokerLocalTests(SimpleTestCase):
+
+    async def test_publicar_desde_otro_hilo_llega_a_cada_suscriptor(self):
+        broker = BrokerLocal(ventana=0.01, keepalive=1)
+        suscripciones = [broker.suscribir(), broker.suscribir()]
+        lecturas = [asyncio.create_task(s.__anext__()) for s in suscripciones]
+        # Las suscripciones se registran al empezar a leer
+        while len(broker._suscriptores) < 2:
+            await asyncio.sleep(0)
+
+        hilo = threading.Thread(target=lambda: [broker.publicar(1, 4), broker.publicar(1, 3)])
+        hilo.start()
+        hilo.join()
+
+        self.assertEqual(await asyncio.gather(*lecturas), [[{'id': 1, 'stock': 3}]] * 2)
+        for suscripcion in suscripciones:
+            await suscripcion.aclose()
+        self.assertEqual(broker._suscriptores, set())
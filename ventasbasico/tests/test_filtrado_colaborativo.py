@@ -0,0 +1,124 @@
+"""
+Recomendador local (filtrado_colaborativo.py): actualización incremental por venta contra el
+recálculo completo, y validación del modo local del endpoint de recomendaciones
+"""
+from decimal import Decimal
+
+from django.test import TestCase, override_settings
+
+from clientes.models import Cliente
+from ventasbasico.filtrado_colaborativo import recalcular_vecinos, registrar_venta
+from ventasbasico.models import CoocurrenciaProducto, DetalleVenta, Productos, VecinoProducto, Venta
+
+
+class FiltradoColaborativoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = Cliente.objects.create(rut='11111111-1', nombre='Ana', apellido='Pérez', comuna='Santiago')
+        cls.productos = Productos.objects.bulk_create([
+            Productos(nombre=f'Producto {letra}', codigo=letra, stock=10, precio=Decimal('1000'))
+            for letra in 'ABCDE'
+        ])
+
+    def vender(self, *letras):
+        """Crea una venta con esos productos (una línea por letra) y la registra en el recomendador"""
+        venta = Venta.objects.create(numero=f'V-{Venta.objects.count()}', rut_cliente=self.cliente, total=0)
+        DetalleVenta.objects.bulk_create([
+            DetalleVenta(venta=venta, producto=self.producto(letra), cantidad=1, precio_unitario=Decimal('1000'))
+            for letra in letras
+        ])
+        registrar_venta(venta.id)
+        return venta
+
+    def producto(self, letra):
+        return self.productos['ABCDE'.index(letra)]
+
+    def matriz(self):
+        return set(CoocurrenciaProducto.objects.values_list('producto__codigo', 'otro__codigo', 'ventas'))
+
+    def vecinos(self, letra):
+        return [
+            (v.vecino.codigo, v.coocurrencias, round(v.puntaje, 5))
+            for v in VecinoProducto.objects.filter(producto=self.producto(letra)).order_by('-puntaje', 'vecino_id')
+        ]
+
+    def test_incremental_coincide_con_recalculo(self):
+        for letras in ('AB', 'ABC', 'CD', 'AD', 'ABE', 'BD', 'AB'):
+            self.vender(*letras)
+        incremental = self.matriz()
+        vecinos_incrementales = {letra: self.vecinos(letra) for letra in 'AB'}
+
+        recalcular_vecinos()
+
+        self.assertEqual(self.matriz(), incremental)
+        self.assertIn(('A', 'A', 5), incremental)
+        self.assertIn(('A', 'B', 4), incremental)
+        # Los vecinos de los productos de la última venta quedan igual que con el recálculo
+        self.assertEqual({letra: self.vecinos(letra) for letra in 'AB'}, vecinos_incrementales)
+
+    @override_settings(IA_VECINOS_TOP_N=1)
+    def test_par_fuera_del_top_n_conserva_su_cuenta(self):
+        self.vender('A', 'B')
+        self.vender('A', 'C')
+        self.vender('A', 'C')
+        self.assertEqual([vecino for vecino, _, _ in self.vecinos('A')], ['C'])
+
+        self.vender('A', 'B')
+        self.vender('A', 'B')
+
+        self.assertIn(('A', 'B', 3), self.matriz())
+        self.assertEqual(self.vecinos('A'), [('B', 3, round(3 / (5 * 3) ** 0.5, 5))])
+
+    @override_settings(IA_VECINOS_TOP_N=2)
+    def test_vecinos_no_superan_el_top_n(self):
+        self.vender('A', 'B', 'C', 'D', 'E')
+        self.vender('A', 'B', 'C')
+
+        for letra in 'ABCDE':
+            self.assertLessEqual(VecinoProducto.objects.filter(producto=self.producto(letra)).count(), 2)
+
+    def test_producto_repetido_en_la_venta_cuenta_una_vez(self):
+        self.vender('A', 'A', 'B')
+
+        self.assertEqual(self.matriz(), {
+            ('A', 'A', 1), ('A', 'B', 1), ('B', 'A', 1), ('B', 'B', 1),
+        })
+
+    def test_venta_de_un_producto_suma_su_frecuencia(self):
+        self.vender('A', 'B')
+        self.vender('A')
+
+        self.assertIn(('A', 'A', 2), self.matriz())
+        self.assertEqual(self.vecinos('A'), [('B', 1, round(1 / 2 ** 0.5, 5))])
+
+
+class RecomendacionLocalTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Cliente.objects.create(rut='11111111-1', nombre='Ana', apellido='Pérez', comuna='Santiago')
+
+    def recomendar(self, **datos):
+        return self.client.post(
+            '/api/ia/productos/recomendar/',
+            {'rut_cliente': '11111111-1', 'modo': 'local', **datos},
+            content_type='application/json'
+        )
+
+    def test_limite_invalido_responde_400(self):
+        for limite in ('abc', None, 0, -2, [3]):
+            with self.subTest(limite=limite):
+                respuesta = self.recomendar(limite=limite)
+                self.assertEqual(respuesta.status_code, 400)
+                self.assertIn('limite', respuesta.json()['error'])
+
+    def test_limite_numerico(self):
+        Productos.objects.bulk_create([
+            Productos(nombre=f'Producto {i}', codigo=str(i), stock=10, precio=Decimal('1000')) for i in range(5)
+        ])
+
+        respuesta = self.recomendar(limite='2')
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['modo'], 'local')
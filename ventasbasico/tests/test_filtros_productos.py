@@ -0,0 +1,176 @@
+"""
+Filtros del listado de productos (GET /api/productos/): resultados, errores 400 y plan de
+ejecución de cada filtro (el índice de Productos.Meta / migración 0007 que debe usar)
+"""
+import re
+import unittest
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase
+from django.test.client import RequestFactory
+from django.utils import timezone
+from rest_framework.request import Request
+
+from ventasbasico.models import Productos
+from ventasbasico.views import ProductosViewSet
+
+# Un nodo Sort completo (no el Incremental Sort que aprovecha el orden del índice)
+_SORT_POSTGRES = re.compile(r'^\s*(->\s+)?Sort\s', re.M)
+
+
+def listar(client, **params):
+    respuesta = client.get('/api/productos/', params)
+    return respuesta, respuesta.json()
+
+
+class FiltrosProductosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cafe = Productos.objects.create(
+            nombre='Café en grano', stock=5, precio=Decimal('4500'), palabras_clave=['Café', 'Orgánico'],
+            descripcion_generada_fecha=timezone.now()
+        )
+        cls.cafetera = Productos.objects.create(
+            nombre='Máquina de café', stock=0, precio=Decimal('15990'), palabras_clave=['cafetera']
+        )
+        cls.te = Productos.objects.create(
+            nombre='Té verde', stock=12, precio=Decimal('1990'), palabras_clave=['té', 'orgánico']
+        )
+
+    def nombres(self, **params):
+        respuesta, datos = listar(self.client, **params)
+        self.assertEqual(respuesta.status_code, 200, datos)
+        return [producto['nombre'] for producto in datos['results']]
+
+    def test_sin_filtros_ordena_por_nombre(self):
+        self.assertEqual(self.nombres(), ['Café en grano', 'Máquina de café', 'Té verde'])
+
+    def test_rango_de_precio(self):
+        self.assertEqual(self.nombres(precio__gte='2000', precio__lte='5000'), ['Café en grano'])
+        self.assertEqual(self.nombres(precio__gte='4500'), ['Café en grano', 'Máquina de café'])
+        self.assertEqual(self.nombres(precio__lte='1990'), ['Té verde'])
+
+    def test_stock(self):
+        self.assertEqual(self.nombres(stock__gt='0'), ['Café en grano', 'Té verde'])
+        self.assertEqual(self.nombres(stock__gt='10'), ['Té verde'])
+
+    def test_palabra_clave_exacta_y_normalizada(self):
+        self.assertEqual(self.nombres(palabras_clave='CAFÉ'), ['Café en grano'])
+        self.assertEqual(self.nombres(palabras_clave='caf'), [])
+        self.assertEqual(self.nombres(palabras_clave='orgánico'), ['Café en grano', 'Té verde'])
+
+    def test_varias_palabras_clave_exige_todas(self):
+        self.assertEqual(self.nombres(palabras_clave='orgánico, TÉ'), ['Té verde'])
+        self.assertEqual(self.nombres(palabras_clave='café,orgánico'), ['Café en grano'])
+        self.assertEqual(self.nombres(palabras_clave='café,té'), [])
+
+    def test_descripcion_ia(self):
+        self.assertEqual(self.nombres(has_ai_description='true'), ['Café en grano'])
+        self.assertEqual(self.nombres(has_ai_description='0'), ['Máquina de café', 'Té verde'])
+
+    def test_ordenamiento(self):
+        self.assertEqual(self.nombres(ordering='-precio'), ['Máquina de café', 'Café en grano', 'Té verde'])
+        self.assertEqual(self.nombres(ordering='-nombre'), ['Té verde', 'Máquina de café', 'Café en grano'])
+
+    def test_precio_desempata_por_nombre(self):
+        Productos.objects.create(nombre='Azúcar', stock=1, precio=Decimal('1990'))
+
+        self.assertEqual(self.nombres(ordering='precio')[:2], ['Azúcar', 'Té verde'])
+        self.assertEqual(self.nombres(ordering='-precio')[-2:], ['Té verde', 'Azúcar'])
+
+    def test_filtros_combinados(self):
+        self.assertEqual(
+            self.nombres(stock__gt='0', palabras_clave='orgánico', precio__lte='3000', has_ai_description='false'),
+            ['Té verde']
+        )
+
+    def test_parametros_invalidos_responden_400(self):
+        casos = {
+            'precio__gte': 'abc',
+            'precio__lte': 'NaN',
+            'stock__gt': '1.5',
+            'has_ai_description': 'quizas',
+            'ordering': 'stock',
+        }
+        for campo, valor in casos.items():
+            with self.subTest(campo=campo):
+                respuesta, datos = listar(self.client, **{campo: valor})
+                self.assertEqual(respuesta.status_code, 400)
+                self.assertEqual(list(datos), [campo])
+
+    def test_errores_de_varios_campos_juntos(self):
+        respuesta, datos = listar(self.client, precio__gte='x', stock__gt='y', ordering='z')
+
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(set(datos), {'precio__gte', 'stock__gt', 'ordering'})
+
+
+class PlanFiltrosProductosTests(TestCase):
+    """
+    Con datos parecidos a producción (pocos productos en stock, con IA o en un rango de
+    precio) y estadísticas actualizadas, cada filtro usa su índice
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        ahora = timezone.now()
+        Productos.objects.bulk_create([
+            Productos(
+                nombre=f'Producto {i:04d}', codigo=f'P{i:04d}', precio=Decimal(100 + i * 10),
+                stock=10 if i % 10 == 0 else 0,
+                descripcion_generada_fecha=ahora if i % 20 == 0 else None,
+                palabras_clave=['cafe'] if i % 50 == 0 else ['otro'],
+            )
+            for i in range(2000)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            # Con tablas de prueba chicas el planner igual podría preferir recorrerlas completas
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def plan(self, **params):
+        vista = ProductosViewSet(action='list', request=Request(RequestFactory().get('/api/productos/', params)))
+        return vista.get_queryset().explain()
+
+    def assertSinOrdenamiento(self, plan):
+        if connection.vendor == 'postgresql':
+            self.assertNotRegex(plan, _SORT_POSTGRES)
+        else:
+            self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_en_stock_ordenado_por_nombre(self):
+        plan = self.plan(stock__gt='0')
+
+        self.assertIn('productos_en_stock_idx', plan)
+        self.assertSinOrdenamiento(plan)
+
+    def test_rango_de_precio(self):
+        self.assertIn('productos_precio_nombre_idx', self.plan(precio__gte='1000', precio__lte='1500'))
+
+    def test_rango_de_precio_ordenado_por_precio(self):
+        plan = self.plan(precio__gte='1000', precio__lte='1500', ordering='precio')
+
+        self.assertIn('productos_precio_nombre_idx', plan)
+        self.assertSinOrdenamiento(plan)
+
+    def test_con_descripcion_ia(self):
+        plan = self.plan(has_ai_description='true')
+
+        self.assertIn('productos_con_ia_idx', plan)
+        self.assertSinOrdenamiento(plan)
+
+    def test_listado_por_nombre(self):
+        plan = self.plan()
+
+        self.assertIn('productos_nombre_idx', plan)
+        self.assertSinOrdenamiento(plan)
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'índice GIN de palabras_clave solo en PostgreSQL')
+    def test_palabra_clave_usa_indice_gin(self):
+        self.assertIn('productos_palabras_clave_gin', self.plan(palabras_clave='cafe'))
@@ -0,0 +1,98 @@
+"""
+Router local del chatbot (intenciones.py): qué preguntas se responden con la BD (precio,
+stock, estado de una compra de quien pregunta) y cuáles siguen hacia la IA
+"""
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from clientes.models import Cliente
+from ventasbasico import autocompletado
+from ventasbasico.intenciones import responder_localmente
+from ventasbasico.models import DetalleVenta, Productos, Venta
+from ventasbasico.views import _contexto_chatbot
+
+
+class IntencionesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana = Cliente.objects.create(rut='11111111-1', nombre='Ana', apellido='Pérez', comuna='Santiago')
+        cls.luis = Cliente.objects.create(rut='22222222-2', nombre='Luis', apellido='Soto', comuna='Maipú')
+        cls.cafe = Productos.objects.create(nombre='Café en grano', stock=5, precio=Decimal('4500'))
+        cls.leche = Productos.objects.create(nombre='Leche entera', stock=0, precio=Decimal('1190'))
+        cls.venta = Venta.objects.create(numero='20241128-0001', rut_cliente=cls.ana, total=Decimal('9000'))
+        DetalleVenta.objects.create(venta=cls.venta, producto=cls.cafe, cantidad=2, precio_unitario=Decimal('4500'))
+
+    def setUp(self):
+        cache.clear()
+        # Las señales que invalidan el índice corren en on_commit, que TestCase no ejecuta
+        autocompletado.productos_importados()
+
+    def test_precio(self):
+        respuesta = responder_localmente('¿Cuánto cuesta el café?')
+
+        self.assertEqual(respuesta['tipo'], 'consulta_producto')
+        self.assertIn('$4.500', respuesta['respuesta'])
+
+    def test_stock(self):
+        self.assertIn('5 unidades', responder_localmente('¿Hay stock de café en grano?')['respuesta'])
+        self.assertIn('sin stock', responder_localmente('¿Quedan leches?')['respuesta'])
+        # Con error de tipeo, si la intención es explícita
+        self.assertIn('Leche entera', responder_localmente('¿queda lehce entera?')['respuesta'])
+
+    def test_palabra_generica_con_producto(self):
+        self.assertIn('5 unidades', responder_localmente('¿Tienen café en grano?')['respuesta'])
+
+    def test_producto_del_contexto(self):
+        respuesta = responder_localmente('¿Cuánto vale?', {'producto_id': self.leche.id})
+
+        self.assertIn('$1.190', respuesta['respuesta'])
+
+    def test_preguntas_que_van_a_la_ia(self):
+        for mensaje in (
+            '¿tienen envío gratis?',
+            # Una palabra coincide con un producto, pero la frase no lo nombra
+            '¿Tienen mesas para tomar café?',
+            '¿Hay estacionamiento cerca de la tienda?',
+            '¿Tiene garantía?',
+            '¿Qué café me recomiendas para regalo?',
+            '¿Cuál es el horario de atención?',
+            '¿Qué productos hay?',
+            '',
+        ):
+            with self.subTest(mensaje=mensaje):
+                self.assertIsNone(responder_localmente(mensaje))
+
+    def test_estado_de_compra_de_quien_pregunta(self):
+        respuesta = responder_localmente('¿Cómo va mi compra 20241128-0001?', {'rut_cliente': self.ana.rut})
+
+        self.assertEqual(respuesta['tipo'], 'consulta_venta')
+        self.assertIn('$9.000', respuesta['respuesta'])
+        self.assertIn('2 x Café en grano', respuesta['respuesta'])
+
+        # Número en el contexto y pregunta por el pedido
+        respuesta = responder_localmente('¿Cuándo llega mi pedido?', {'venta_numero': '20241128-0001', 'rut_cliente': self.ana.rut})
+        self.assertIn('Café en grano', respuesta['respuesta'])
+
+    def test_compra_de_otro_cliente_no_se_informa(self):
+        sin_rut = responder_localmente('Estado de 20241128-0001')
+        otro_cliente = responder_localmente('Estado de 20241128-0001', {'rut_cliente': self.luis.rut})
+        inexistente = responder_localmente('Estado de 20241128-0099', {'rut_cliente': self.ana.rut})
+
+        for respuesta in (sin_rut, otro_cliente):
+            self.assertIn('identificarte', respuesta['respuesta'])
+            self.assertNotIn('Café', respuesta['respuesta'])
+            self.assertNotIn('9.000', respuesta['respuesta'])
+        # La compra de otro cliente responde igual que una que no existe
+        self.assertEqual(otro_cliente['respuesta'].replace('0001', '0099'), inexistente['respuesta'])
+
+    def test_contexto_de_la_ia_solo_con_compras_propias(self):
+        propia = _contexto_chatbot({'venta_numero': '20241128-0001', 'rut_cliente': self.ana.rut})
+        ajena = _contexto_chatbot({'venta_numero': '20241128-0001', 'rut_cliente': self.luis.rut})
+        sin_rut = _contexto_chatbot({'venta_numero': '20241128-0001'})
+
+        self.assertEqual(propia['venta']['productos'][0]['nombre'], 'Café en grano')
+        self.assertNotIn('venta', ajena)
+        self.assertNotIn('venta', sin_rut)
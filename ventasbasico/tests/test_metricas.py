@@ -0,0 +1,43 @@
+"""
+Métricas Prometheus (metricas.py, GET /metrics): token Bearer de METRICAS_TOKEN y
+contenido exportado
+"""
+from django.test import TestCase, override_settings
+
+from ventasbasico.metricas import registrar_checkout
+
+
+class MetricasTests(TestCase):
+
+    def test_sin_token_configurado_es_publico(self):
+        with override_settings(METRICAS_TOKEN=''):
+            respuesta = self.client.get('/metrics')
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta['Content-Type'].startswith('text/plain'))
+        self.assertIn(b'ventas_http_request_duracion_segundos', respuesta.content)
+
+    @override_settings(METRICAS_TOKEN='secreto-de-prueba')
+    def test_token_bearer(self):
+        for autorizacion in (None, '', 'secreto-de-prueba', 'Bearer otro', 'bearer secreto-de-prueba', 'Bearer secreto-de-prueba '):
+            with self.subTest(autorizacion=autorizacion):
+                headers = {} if autorizacion is None else {'HTTP_AUTHORIZATION': autorizacion}
+                respuesta = self.client.get('/metrics', **headers)
+
+                self.assertEqual(respuesta.status_code, 401)
+                self.assertNotIn(b'ventas_', respuesta.content)
+
+        respuesta = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secreto-de-prueba')
+        self.assertEqual(respuesta.status_code, 200)
+
+    def test_exporta_los_contadores(self):
+        registrar_checkout('api', 'stock_insuficiente')
+        self.client.get('/api/productos/')
+
+        contenido = self.client.get('/metrics').content.decode()
+
+        self.assertIn('ventas_checkout_total{canal="api",motivo="stock_insuficiente",resultado="fallido"}', contenido)
+        self.assertIn('ruta="/api/productos/"', contenido)
+
+    def test_solo_get(self):
+        self.assertEqual(self.client.post('/metrics').status_code, 405)
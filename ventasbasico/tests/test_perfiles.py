@@ -0,0 +1,158 @@
+"""
+Perfiles de compra (perfiles.py): aplicar_compra en memoria, reconstrucción desde las ventas
+y su actualización con las señales de Venta (nueva, editada o eliminada)
+"""
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase, override_settings
+
+from clientes.models import Cliente
+from ventasbasico.filtrado_colaborativo import recomendar_local
+from ventasbasico.models import DetalleVenta, PerfilCliente, Productos, VecinoProducto, Venta
+from ventasbasico.perfiles import CAMPOS_PERFIL, aplicar_compra, reconstruir_perfiles
+
+
+def item(producto_id, palabras, cantidad=1):
+    return {'id': producto_id, 'nombre': f'Producto {producto_id}', 'palabras_clave': palabras, 'cantidad': cantidad}
+
+
+class AplicarCompraTests(TestCase):
+
+    def perfil(self):
+        return PerfilCliente(total_gastado=Decimal(0), palabras_clave=[], ultimos_productos=[])
+
+    def test_rfm(self):
+        perfil = self.perfil()
+
+        aplicar_compra(perfil, date(2024, 3, 10), Decimal('1500'), [item(1, []), item(2, [], cantidad=3)])
+        aplicar_compra(perfil, date(2024, 1, 5), Decimal('500.50'), [item(1, [])])
+
+        self.assertEqual((perfil.primera_compra, perfil.ultima_compra), (date(2024, 1, 5), date(2024, 3, 10)))
+        self.assertEqual((perfil.compras, perfil.unidades), (2, 5))
+        self.assertEqual(perfil.total_gastado, Decimal('2000.50'))
+
+    @override_settings(PERFIL_MAX_PALABRAS=2)
+    def test_palabras_clave_acotadas_y_ordenadas(self):
+        perfil = self.perfil()
+
+        aplicar_compra(perfil, date(2024, 1, 1), 0, [item(1, ['café', 'grano']), item(2, ['café'])])
+        aplicar_compra(perfil, date(2024, 1, 2), 0, [item(3, ['leche'])])
+
+        # Empate entre grano y leche: se conserva la de la compra más reciente
+        self.assertEqual(perfil.palabras_clave, [['café', 2], ['leche', 1]])
+
+    @override_settings(PERFIL_ULTIMOS_PRODUCTOS=3)
+    def test_ultimos_productos_sin_repetidos(self):
+        perfil = self.perfil()
+
+        aplicar_compra(perfil, date(2024, 1, 1), 0, [item(1, []), item(2, [])])
+        aplicar_compra(perfil, date(2024, 1, 2), 0, [item(3, []), item(1, [], cantidad=2), item(3, [])])
+        aplicar_compra(perfil, date(2024, 1, 3), 0, [item(4, [])])
+
+        self.assertEqual(
+            [(p['id'], p['cantidad'], p['fecha']) for p in perfil.ultimos_productos],
+            [(4, 1, '2024-01-03'), (3, 2, '2024-01-02'), (1, 2, '2024-01-02')]
+        )
+
+
+class PerfilesVentasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana = Cliente.objects.create(rut='11111111-1', nombre='Ana', apellido='Pérez', comuna='Santiago')
+        cls.luis = Cliente.objects.create(rut='22222222-2', nombre='Luis', apellido='Soto', comuna='Maipú')
+        cls.cafe = Productos.objects.create(nombre='Café en grano', stock=50, precio=Decimal('4500'), palabras_clave=['café'])
+        cls.leche = Productos.objects.create(nombre='Leche entera', stock=50, precio=Decimal('1190'), palabras_clave=['leche'])
+        cls.taza = Productos.objects.create(nombre='Taza', stock=50, precio=Decimal('3000'), palabras_clave=['taza', 'café'])
+
+    def vender(self, cliente, *items):
+        """Crea la venta como el checkout y ejecuta los on_commit (TestCase no los corre)"""
+        with self.captureOnCommitCallbacks(execute=True):
+            venta = Venta.objects.create(
+                numero=f'V-{Venta.objects.count()}', rut_cliente=cliente,
+                total=sum(producto.precio * cantidad for producto, cantidad in items)
+            )
+            DetalleVenta.objects.bulk_create([
+                DetalleVenta(venta=venta, producto=producto, cantidad=cantidad, precio_unitario=producto.precio)
+                for producto, cantidad in items
+            ])
+        return venta
+
+    def perfil(self, cliente):
+        return PerfilCliente.objects.filter(cliente=cliente).values(*CAMPOS_PERFIL[:-1]).first()
+
+    def test_venta_nueva_actualiza_el_perfil(self):
+        self.vender(self.ana, (self.cafe, 2))
+        self.vender(self.ana, (self.leche, 1), (self.taza, 1))
+
+        perfil = self.perfil(self.ana)
+        self.assertEqual((perfil['compras'], perfil['unidades']), (2, 4))
+        self.assertEqual(perfil['total_gastado'], Decimal('13190'))
+        self.assertEqual([p['id'] for p in perfil['ultimos_productos']], [self.leche.id, self.taza.id, self.cafe.id])
+        self.assertEqual(perfil['palabras_clave'][0], ['café', 2])
+
+    def test_incremental_coincide_con_reconstruccion(self):
+        for cliente, items in (
+            (self.ana, [(self.cafe, 1)]),
+            (self.luis, [(self.leche, 2)]),
+            (self.ana, [(self.taza, 1), (self.cafe, 3)]),
+            (self.ana, [(self.leche, 1)]),
+        ):
+            self.vender(cliente, *items)
+        incrementales = {cliente: self.perfil(cliente) for cliente in (self.ana, self.luis)}
+
+        PerfilCliente.objects.all().delete()
+        self.assertEqual(reconstruir_perfiles(), 2)
+
+        self.assertEqual({cliente: self.perfil(cliente) for cliente in (self.ana, self.luis)}, incrementales)
+
+    def test_reconstruir_solo_los_rut_indicados(self):
+        self.vender(self.ana, (self.cafe, 1))
+        self.vender(self.luis, (self.leche, 1))
+        PerfilCliente.objects.all().delete()
+
+        self.assertEqual(reconstruir_perfiles([self.luis.rut]), 1)
+
+        self.assertEqual(list(PerfilCliente.objects.values_list('cliente_id', flat=True)), [self.luis.rut])
+
+    def test_venta_editada_reconstruye_el_perfil(self):
+        venta = self.vender(self.ana, (self.cafe, 1))
+        self.vender(self.ana, (self.leche, 1))
+
+        # Edición como en el admin: cambia el cliente y un detalle
+        venta = Venta.objects.get(id=venta.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            venta.rut_cliente = self.luis
+            venta.save()
+            DetalleVenta.objects.filter(venta=venta).update(cantidad=4)
+
+        ana, luis = self.perfil(self.ana), self.perfil(self.luis)
+        self.assertEqual((ana['compras'], ana['unidades']), (1, 1))
+        self.assertEqual([p['id'] for p in ana['ultimos_productos']], [self.leche.id])
+        self.assertEqual((luis['compras'], luis['unidades']), (1, 4))
+
+    def test_venta_eliminada_sale_del_perfil(self):
+        primera = self.vender(self.ana, (self.cafe, 1))
+        segunda = self.vender(self.ana, (self.leche, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            segunda.delete()
+        self.assertEqual(self.perfil(self.ana)['compras'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            primera.delete()
+        self.assertIsNone(self.perfil(self.ana))
+
+    def test_recomendar_local_usa_el_perfil(self):
+        PerfilCliente.objects.create(
+            cliente=self.ana, compras=1, total_gastado=Decimal('4500'),
+            ultimos_productos=[{'id': self.cafe.id, 'nombre': 'Café en grano', 'cantidad': 1, 'fecha': '2024-01-01'}]
+        )
+        VecinoProducto.objects.create(producto=self.cafe, vecino=self.taza, coocurrencias=3, puntaje=0.8)
+
+        # Sin recorrer las ventas: el cliente no tiene ninguna, los últimos productos vienen del perfil
+        with self.assertNumQueries(3):
+            resultado = recomendar_local(self.ana)
+
+        self.assertEqual([r['producto_id'] for r in resultado['recomendaciones']], [self.taza.id])
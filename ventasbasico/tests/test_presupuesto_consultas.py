@@ -0,0 +1,346 @@
+"""
+Presupuesto de consultas SQL por endpoint
+Recorre todas las rutas de ventasbasico/urls.py y clientes/urls.py (más las páginas del admin de
+los modelos del proyecto, los checkouts y los endpoints de IA por POST), hace cada request con datos
+de dos tamaños y verifica que:
+- responda 2xx o 3xx (un 4xx también termina sin consultas y no mediría nada)
+- la cantidad de consultas no cambie con la cantidad de filas: si crece, hay una consulta por
+  fila (N+1) y el mensaje muestra las firmas SQL que se repiten
+- no supere lo anotado en presupuesto_consultas.json (versionado junto al código)
+
+Ejecutar: python manage.py test ventasbasico
+Después de un cambio intencional, regenerar el presupuesto y revisar el diff:
+    PRESUPUESTO_ACTUALIZAR=1 python manage.py test ventasbasico
+"""
+import json
+import os
+import re
+from collections import Counter
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import Group, User
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase
+from django.urls import URLResolver, get_resolver
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from clientes.models import Cliente
+from ventasbasico import autocompletado
+from ventasbasico.models import DetalleVenta, Productos, TareaIA, Venta
+from ventasbasico.rendimiento import firma_sql
+
+PRESUPUESTO = Path(__file__).resolve().parent.parent / 'presupuesto_consultas.json'
+
+# Filas de cada tabla en las dos corridas (ventas con TAMANO detalles cada una)
+TAMANOS = (2, 6)
+
+# Rutas que no se pueden medir con un request (con el motivo)
+EXCLUIDAS = {
+    'GET /api/stock/stream/': 'stream SSE: la respuesta no termina',
+    'GET /api/ia/chat/': 'solo POST (se mide en PETICIONES)',
+    'GET /api/ia/chat/stream/': 'solo POST (se mide en PETICIONES)',
+    'GET /api/ia/productos/recomendar/': 'solo POST (se mide en PETICIONES)',
+    'GET /api/ia/productos/<int:producto_id>/generar-descripcion/': 'solo POST (se mide en PETICIONES)',
+    'GET /api/token/': 'solo POST (se mide en PETICIONES)',
+    'GET /api/token/refresh/': 'solo POST (se mide en PETICIONES)',
+    'GET /clientes/api/token/': 'solo POST (se mide en PETICIONES)',
+    'GET /clientes/api/token/refresh/': 'solo POST (se mide en PETICIONES)',
+    'GET /api-auth/logout/': 'solo POST y cierra la sesión de las rutas siguientes',
+    'GET /clientes/api-auth/logout/': 'solo POST y cierra la sesión de las rutas siguientes',
+    'GET /admin/ventasbasico/venta/add/': 'VentaAdmin no permite crear ventas (403)',
+    'GET /admin/ventasbasico/venta/<path:object_id>/delete/': 'VentaAdmin no permite eliminar ventas (403)',
+}
+
+# Del admin solo se recorren el índice y las páginas de los modelos del proyecto
+PREFIJOS_ADMIN = ('admin/ventasbasico/', 'admin/clientes/')
+
+_GRUPO = re.compile(r'\(\?P<(\w+)>[^)]*\)')
+_CONVERSOR = re.compile(r'<(?:\w+:)?(\w+)>')
+
+
+def recorrer_rutas(patrones=None, prefijo=''):
+    """(ruta, patrón) de cada URL, con la ruta como texto ('api/productos/<codigo>/')"""
+    for patron in get_resolver().url_patterns if patrones is None else patrones:
+        ruta = prefijo + str(patron.pattern).replace('^', '').replace('$', '').replace('\\', '')
+        ruta = _GRUPO.sub(r'<\1>', ruta)
+        if isinstance(patron, URLResolver):
+            yield from recorrer_rutas(patron.url_patterns, ruta)
+            continue
+        if 'format' in patron.pattern.regex.groupindex:
+            # Variantes con sufijo (.json, .api) de las rutas del router: mismas consultas
+            continue
+        if ruta.startswith('admin/') and ruta != 'admin/' and not ruta.startswith(PREFIJOS_ADMIN):
+            continue
+        if ruta.startswith('media/'):
+            continue
+        yield ruta, patron
+
+
+def crear_datos(tamano):
+    """
+    tamano productos, clientes y ventas (todas del primer cliente, con todos los productos)
+
+    Returns:
+        dict: Objetos que usan las rutas con parámetros
+    """
+    productos = Productos.objects.bulk_create([
+        Productos(
+            nombre=f'Producto {i}', codigo=str(i + 1).zfill(4), stock=1000, precio=Decimal(1000 + i),
+            palabras_clave=['prueba', f'categoria{i}']
+        )
+        for i in range(tamano)
+    ])
+    clientes = Cliente.objects.bulk_create([
+        Cliente(rut=f'{10_000_000 + i}-{i}', nombre=f'Cliente{i}', apellido='Prueba', comuna='Santiago')
+        for i in range(tamano)
+    ])
+    ventas = Venta.objects.bulk_create([
+        Venta(numero=f'PRUEBA-{i:04d}', rut_cliente=clientes[0], total=Decimal(1000) * tamano)
+        for i in range(tamano)
+    ])
+    DetalleVenta.objects.bulk_create([
+        DetalleVenta(venta=venta, producto=producto, cantidad=1, precio_unitario=producto.precio)
+        for venta in ventas
+        for producto in productos
+    ])
+    tarea = TareaIA.objects.create(producto=productos[0], disponible_desde=timezone.now())
+    return {
+        'producto': productos[0],
+        'productos': productos,
+        'cliente': clientes[0],
+        'venta': ventas[-1],
+        'tarea': tarea,
+        'grupo': Group.objects.create(name='prueba'),
+    }
+
+
+def _checkout_api(test, datos):
+    return test.client.post('/api/venta/', {
+        'numero': 'API-0001',
+        'rut_cliente': datos['cliente'].rut,
+        'detalles': [
+            {'producto_id': producto.id, 'cantidad': 1, 'precio_unitario': str(producto.precio)}
+            for producto in datos['productos']
+        ],
+    }, content_type='application/json')
+
+
+def _llenar_carrito(test, datos):
+    sesion = test.client.session
+    sesion['carrito'] = {
+        str(producto.id): {'nombre': producto.nombre, 'precio': float(producto.precio), 'cantidad': 1}
+        for producto in datos['productos']
+    }
+    sesion.save()
+
+
+def _confirmar_venta(test, datos):
+    _llenar_carrito(test, datos)
+    return test.client.get('/venta/')
+
+
+def _checkout_web(test, datos):
+    _llenar_carrito(test, datos)
+    return test.client.post('/venta/', {'rut_cliente': datos['cliente'].rut, 'es_cliente_habitual': 'on'})
+
+
+class GroqDePrueba:
+    """Respuestas fijas en vez de llamar a Groq: se miden solo las consultas a la BD"""
+
+    async def achatbot_atencion(self, mensaje_usuario, contexto=None):
+        return {'respuesta': 'Respuesta de prueba', 'tipo': 'otro'}
+
+    async def chatbot_atencion_stream(self, mensaje_usuario, contexto=None, timeout=None):
+        yield 'Respuesta de prueba'
+
+    async def arecomendar_productos(self, historial_cliente, productos_disponibles, limite=3):
+        return {
+            'recomendaciones': [{'producto_id': p['id'], 'razon': 'Prueba'} for p in productos_disponibles[:limite]],
+            'mensaje': 'Productos de prueba'
+        }
+
+    async def agenerar_descripcion_producto(self, nombre_producto, caracteristicas=None):
+        return {
+            'descripcion_corta': f'{nombre_producto} de prueba', 'descripcion_larga': 'Descripción de prueba',
+            'palabras_clave': ['prueba'], 'beneficios': ['Beneficio de prueba']
+        }
+
+
+def _chat(test, datos):
+    # Pregunta que va a la IA, con la venta (y sus productos) y el perfil del cliente como contexto
+    return test.client.post('/api/ia/chat/', {
+        'mensaje': '¿Tienen garantía estos productos?',
+        'contexto': {'venta_numero': datos['venta'].numero, 'rut_cliente': datos['cliente'].rut},
+    }, content_type='application/json')
+
+
+def _chat_stream(test, datos):
+    # Sin contexto: se envían los productos relevantes para la pregunta
+    return test.client.post(
+        '/api/ia/chat/stream/', {'mensaje': '¿Qué productos de prueba tienen garantía?'}, content_type='application/json'
+    )
+
+
+def _recomendar(test, datos):
+    return test.client.post(
+        '/api/ia/productos/recomendar/', {'rut_cliente': datos['cliente'].rut, 'limite': 3},
+        content_type='application/json'
+    )
+
+
+def _generar_descripcion(test, datos):
+    return test.client.post(
+        f"/api/ia/productos/{datos['producto'].pk}/generar-descripcion/", {}, content_type='application/json'
+    )
+
+
+def _token(prefijo):
+    def obtener(test, datos):
+        return test.client.post(
+            f'{prefijo}/api/token/', {'username': 'presupuesto', 'password': 'presupuesto'},
+            content_type='application/json'
+        )
+    return obtener
+
+
+def _refrescar_token(prefijo):
+    def refrescar(test, datos):
+        return test.client.post(
+            f'{prefijo}/api/token/refresh/', {'refresh': str(RefreshToken.for_user(test.usuario))},
+            content_type='application/json'
+        )
+    return refrescar
+
+
+# Requests que no son un GET con la sesión vacía (los checkouts recorren los productos del carrito)
+PETICIONES = {
+    'GET /venta/': _confirmar_venta,
+    'POST /api/venta/': _checkout_api,
+    'POST /venta/': _checkout_web,
+    'POST /api/ia/chat/': _chat,
+    'POST /api/ia/chat/stream/': _chat_stream,
+    'POST /api/ia/productos/recomendar/': _recomendar,
+    'POST /api/ia/productos/<int:producto_id>/generar-descripcion/': _generar_descripcion,
+    'POST /api/token/': _token(''),
+    'POST /api/token/refresh/': _refrescar_token(''),
+    'POST /clientes/api/token/': _token('/clientes'),
+    'POST /clientes/api/token/refresh/': _refrescar_token('/clientes'),
+}
+
+
+class PresupuestoConsultasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser('presupuesto', 'presupuesto@example.com', 'presupuesto')
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+        token = RefreshToken.for_user(self.usuario).access_token
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+        for modulo in ('ventasbasico.views', 'ventasbasico.descripciones'):
+            parche = mock.patch(f'{modulo}.obtener_groq_service', return_value=GroqDePrueba())
+            parche.start()
+            self.addCleanup(parche.stop)
+
+    def valor_parametro(self, nombre, patron, datos):
+        vista = getattr(patron.callback, 'cls', None)
+        modelo_admin = getattr(patron.callback, 'model_admin', None)
+        if nombre == 'object_id' and modelo_admin:
+            modelo = modelo_admin.model
+            return {Venta: datos['venta'], Cliente: datos['cliente'], Productos: datos['producto']}[modelo].pk
+        if nombre in ('pk', 'codigo') and vista is not None:
+            modelo = vista.queryset.model
+            objeto = {
+                Venta: datos['venta'], Cliente: datos['cliente'], User: self.usuario, Group: datos['grupo'],
+                DetalleVenta: DetalleVenta.objects.filter(venta=datos['venta']).first(),
+            }.get(modelo, datos['producto'])
+            return getattr(objeto, nombre)
+        return {
+            'pk': datos['producto'].pk,
+            'producto_id': datos['producto'].pk,
+            'venta_id': datos['venta'].pk,
+            'tarea_id': datos['tarea'].pk,
+            'rut': datos['cliente'].rut,
+        }[nombre]
+
+    def medir(self, hacer_request):
+        """Consultas del request: (cantidad, Counter de firmas, código de respuesta)"""
+        # Los caches (autocompletado, descripciones, chatbot) se vacían: se mide el request en frío
+        cache.clear()
+        ContentType.objects.clear_cache()
+        autocompletado.productos_importados()
+        consultas = []
+
+        def registrar(execute, sql, params, many, context):
+            consultas.append(firma_sql(sql))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(registrar):
+            respuesta = hacer_request()
+            if respuesta.streaming:
+                contenido = respuesta.streaming_content
+                if respuesta.is_async:
+                    async def leer():
+                        return [parte async for parte in contenido]
+                    contenido = async_to_sync(leer)()
+                b''.join(contenido)
+        return len(consultas), Counter(consultas), respuesta.status_code
+
+    def medir_ruta(self, clave, patron, tamano):
+        with transaction.atomic():
+            datos = crear_datos(tamano)
+            if clave in PETICIONES:
+                resultado = self.medir(lambda: PETICIONES[clave](self, datos))
+            else:
+                ruta = _CONVERSOR.sub(lambda m: str(self.valor_parametro(m.group(1), patron, datos)), clave[4:])
+                resultado = self.medir(lambda: self.client.get(ruta))
+            transaction.set_rollback(True)
+        return resultado
+
+    def test_consultas_constantes_y_dentro_del_presupuesto(self):
+        presupuesto = json.loads(PRESUPUESTO.read_text()) if PRESUPUESTO.exists() else {}
+        actualizar = os.getenv('PRESUPUESTO_ACTUALIZAR') == '1'
+        rutas = {f'GET /{ruta}': patron for ruta, patron in recorrer_rutas()}
+        rutas.update((clave, None) for clave in PETICIONES)
+        medidas = {}
+
+        for clave, patron in sorted(rutas.items()):
+            if clave in EXCLUIDAS:
+                continue
+            with self.subTest(ruta=clave):
+                (chico, firmas_chico, _), (grande, firmas_grande, codigo) = (
+                    self.medir_ruta(clave, patron, tamano) for tamano in TAMANOS
+                )
+                medidas[clave] = grande
+                self.assertLess(codigo, 400, f'{clave} respondió {codigo}')
+                if grande != chico:
+                    crecen = [
+                        f'  {firmas_chico[firma]} -> {firmas_grande[firma]}  {firma[:300]}'
+                        for firma in sorted(firmas_chico | firmas_grande, key=lambda f: firmas_chico[f] - firmas_grande[f])
+                        if firmas_grande[firma] != firmas_chico[firma]
+                    ]
+                    self.fail(
+                        f'{clave}: {chico} consultas con {TAMANOS[0]} filas y {grande} con {TAMANOS[1]} '
+                        f'(una consulta por fila). Firmas que cambian:\n' + '\n'.join(crecen)
+                    )
+                if actualizar:
+                    continue
+                self.assertIn(clave, presupuesto, f'{clave} no tiene presupuesto ({grande} consultas): agregarla')
+                if grande > presupuesto[clave]:
+                    todas = [f'  {veces}  {firma[:300]}' for firma, veces in firmas_grande.most_common()]
+                    self.fail(
+                        f'{clave}: {grande} consultas, el presupuesto es {presupuesto[clave]}:\n' + '\n'.join(todas)
+                    )
+
+        if actualizar:
+            PRESUPUESTO.write_text(json.dumps(dict(sorted(medidas.items())), indent=2, ensure_ascii=False) + '\n')
+        else:
+            sobrantes = sorted(set(presupuesto) - set(rutas))
+            self.assertFalse(sobrantes, f'Rutas del presupuesto que ya no existen: {sobrantes}')
@@ -0,0 +1,93 @@
+"""
+Contexto compacto de los prompts (prompts.py): estimación de tokens, tablas CSV recortadas
+por presupuesto y tamaño del prompt del recomendador con catálogos grandes
+"""
+from django.test import SimpleTestCase, override_settings
+
+from ventasbasico.groq_service import GroqService
+from ventasbasico.prompts import contar_tokens, pares_clave_valor, tabla_con_titulo, tabla_csv
+
+
+def productos(cantidad):
+    return [
+        {'id': i, 'nombre': f'Producto número {i}', 'codigo': f'P{i:04d}', 'precio': 1990.0, 'stock': i % 7}
+        for i in range(1, cantidad + 1)
+    ]
+
+
+class ContarTokensTests(SimpleTestCase):
+
+    def test_palabras_y_signos(self):
+        self.assertEqual(contar_tokens(''), 0)
+        self.assertEqual(contar_tokens(None), 0)
+        # "café" 1, "en" 1, "grano" 2, "," 1, "4500" 1
+        self.assertEqual(contar_tokens('café en grano, 4500'), 6)
+        self.assertEqual(contar_tokens('electrodomésticos'), 5)
+
+
+class TablaCSVTests(SimpleTestCase):
+
+    def test_formato(self):
+        texto, incluidas = tabla_csv(
+            [{'nombre': 'Café, molido', 'precio': 4500.0, 'stock': None}, {'nombre': 'Té', 'precio': 2.5, 'stock': 3}],
+            ['nombre', 'precio', 'stock'], presupuesto=1000
+        )
+
+        self.assertEqual(incluidas, 2)
+        self.assertEqual(texto, 'nombre,precio,stock\n"Café, molido",4500,\nTé,2.5,3')
+
+    def test_respeta_el_presupuesto_y_el_orden(self):
+        filas = productos(200)
+        columnas = ['id', 'nombre', 'codigo', 'precio', 'stock']
+
+        for presupuesto in (30, 100, 400):
+            with self.subTest(presupuesto=presupuesto):
+                texto, incluidas = tabla_csv(filas, columnas, presupuesto)
+
+                self.assertLessEqual(contar_tokens(texto), presupuesto)
+                self.assertGreater(incluidas, 0)
+                self.assertLess(incluidas, len(filas))
+                # Se conservan las primeras (más relevantes) y no cabe una más
+                self.assertEqual([int(linea.split(',')[0]) for linea in texto.splitlines()[1:]], list(range(1, incluidas + 1)))
+                siguiente, _ = tabla_csv(filas[:incluidas + 1], columnas, presupuesto=10 ** 6)
+                self.assertGreater(contar_tokens(siguiente), presupuesto)
+
+    @override_settings(IA_PROMPT_PRESUPUESTO_TOKENS=60)
+    def test_presupuesto_por_defecto(self):
+        texto, _ = tabla_csv(productos(50), ['id', 'nombre'])
+
+        self.assertLessEqual(contar_tokens(texto), 60)
+
+    def test_titulo_indica_el_recorte(self):
+        completo, _ = tabla_con_titulo('PRODUCTOS', productos(2), ['id'], presupuesto=1000)
+        recortado, incluidas = tabla_con_titulo('PRODUCTOS', productos(100), ['id', 'nombre'], presupuesto=50)
+
+        self.assertTrue(completo.startswith('PRODUCTOS (CSV):\n'))
+        self.assertTrue(recortado.startswith(f'PRODUCTOS ({incluidas} de 100, los más relevantes, CSV):\n'))
+
+    def test_pares_clave_valor(self):
+        self.assertEqual(
+            pares_clave_valor({'codigo': 'A1', 'precio': 990.0, 'stock': None, 'palabras': []}),
+            'codigo: A1 | precio: 990'
+        )
+
+
+@override_settings(GROQ_API_KEY='clave-de-prueba', IA_PROMPT_PRESUPUESTO_TOKENS=600)
+class PromptRecomendacionTests(SimpleTestCase):
+
+    def tokens_prompt(self, candidatos, compras):
+        historial = {
+            'cliente': 'Ana Pérez',
+            'compras': [{'producto': f'Producto número {i}', 'cantidad': 1, 'fecha': '2024-01-01'} for i in range(compras)]
+        }
+        mensajes = GroqService()._mensajes_recomendacion(historial, productos(candidatos), 3)
+        return sum(contar_tokens(m['content']) for m in mensajes)
+
+    def test_el_prompt_no_crece_con_el_catalogo(self):
+        fijo = self.tokens_prompt(0, 0)
+
+        grande = self.tokens_prompt(5000, 500)
+
+        # Instrucciones fijas + a lo más el presupuesto de las tablas
+        self.assertLessEqual(grande, fijo + 600)
+        self.assertEqual(grande, self.tokens_prompt(500, 100))
@@ -0,0 +1,136 @@
+"""
+Instrumentación de rendimiento (rendimiento.py, RendimientoMiddleware): firmas SQL, conteo
+de consultas duplicadas y repetidas, header Server-Timing y resumen por ruta de
+GET /api/rendimiento/
+"""
+import re
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from ventasbasico.models import Productos
+from ventasbasico.rendimiento import Medicion, RegistroRendimiento, firma_sql, obtener_registro_rendimiento
+
+SERVER_TIMING = re.compile(r'^total;dur=([\d.]+), db;dur=([\d.]+);desc="(\d+) consultas, (\d+) duplicadas"$')
+
+SQL_PRODUCTO = 'SELECT "id" FROM "ventasbasico_productos" WHERE "id" = %s'
+
+
+class MedicionTests(SimpleTestCase):
+
+    def test_firma_sin_valores(self):
+        self.assertEqual(
+            firma_sql('SELECT * FROM t WHERE id IN (%s, %s, %s) LIMIT 21 OFFSET 40'),
+            'SELECT * FROM t WHERE id IN (%s...) LIMIT %s OFFSET %s'
+        )
+        self.assertEqual(firma_sql('SAVEPOINT "s140_x3"'), firma_sql('SAVEPOINT "s99_x12"'))
+
+    def test_duplicadas_y_repetidas(self):
+        medicion = Medicion()
+        for producto_id in (1, 2, 3, 3):
+            medicion.registrar(SQL_PRODUCTO, (producto_id,), 1.0)
+        medicion.registrar('SELECT COUNT(*) FROM "ventasbasico_productos"', (), 2.5)
+
+        self.assertEqual((medicion.consultas, medicion.db_ms), (5, 6.5))
+        # Mismo SQL y parámetros: 1 duplicada; mismo SQL con otros parámetros: 3 repetidas
+        self.assertEqual((medicion.duplicadas, medicion.repetidas), (1, 3))
+        firma, veces, origen = medicion.peor_repeticion()
+        self.assertEqual((firma, veces), (SQL_PRODUCTO, 4))
+        self.assertIn('test_rendimiento.py', origen)
+
+
+class ResumenRutasTests(SimpleTestCase):
+
+    def medicion(self, consultas):
+        medicion = Medicion()
+        for producto_id in range(consultas):
+            medicion.registrar(SQL_PRODUCTO, (producto_id,), 0.5)
+        return medicion
+
+    def test_resumen_por_ruta(self):
+        registro = RegistroRendimiento(ventana=60, muestras=100)
+        for total_ms, consultas in ((10, 1), (20, 1), (30, 7), (40, 1)):
+            registro.agregar('GET /api/productos/', 200, total_ms, self.medicion(consultas), 1000)
+        registro.agregar('GET /api/productos/', 500, 100, self.medicion(1), None)
+        registro.agregar('POST /api/venta/', 201, 5, self.medicion(1), 50)
+
+        rutas = {r['ruta']: r for r in registro.resumen()}
+
+        self.assertEqual(list(rutas), ['GET /api/productos/', 'POST /api/venta/'])
+        productos = rutas['GET /api/productos/']
+        self.assertEqual((productos['requests'], productos['errores'], productos['tiempo_total_ms']), (5, 1, 200))
+        self.assertEqual((productos['p50_ms'], productos['p95_ms'], productos['max_ms']), (30, 100, 100))
+        self.assertEqual((productos['consultas_media'], productos['consultas_max']), (2.2, 7))
+        self.assertEqual(productos['bytes_media'], 1000)
+        self.assertEqual(productos['repeticiones'][0]['veces'], 7)
+
+    def test_ventana_movil(self):
+        registro = RegistroRendimiento(ventana=60, muestras=2)
+        with mock.patch('ventasbasico.rendimiento.time.monotonic', return_value=1000):
+            registro.agregar('GET /', 200, 10, self.medicion(0), 10)
+        with mock.patch('ventasbasico.rendimiento.time.monotonic', return_value=1050):
+            for total_ms in (20, 30):
+                registro.agregar('GET /', 200, total_ms, self.medicion(0), 10)
+        with mock.patch('ventasbasico.rendimiento.time.monotonic', return_value=1070):
+            resumen = registro.resumen()
+
+        # La primera salió por el límite de muestras y habría salido por la ventana
+        self.assertEqual((resumen[0]['requests'], resumen[0]['tiempo_total_ms']), (2, 50))
+
+
+class ServerTimingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'admin')
+        cls.vendedor = User.objects.create_user('vendedor', 'vendedor@example.com', 'vendedor')
+        Productos.objects.bulk_create([
+            Productos(nombre=f'Producto {i}', codigo=f'{i:04d}', stock=i, precio=Decimal('1000')) for i in range(3)
+        ])
+
+    def setUp(self):
+        obtener_registro_rendimiento().limpiar()
+
+    def autorizacion(self, usuario):
+        return {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(usuario).access_token}'}
+
+    def test_header_con_las_consultas_del_request(self):
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get('/api/productos/', **self.autorizacion(self.admin))
+
+        medida = SERVER_TIMING.match(respuesta['Server-Timing'])
+        self.assertIsNotNone(medida, respuesta['Server-Timing'])
+        total_ms, db_ms, cantidad, duplicadas = medida.groups()
+        self.assertEqual(int(cantidad), len(consultas))
+        self.assertEqual(int(duplicadas), 0)
+        self.assertLessEqual(float(db_ms), float(total_ms))
+
+    @override_settings(RENDIMIENTO_SERVER_TIMING=False)
+    def test_header_desactivado(self):
+        respuesta = self.client.get('/api/productos/', **self.autorizacion(self.admin))
+
+        self.assertNotIn('Server-Timing', respuesta)
+
+    def test_resumen_de_los_requests_medidos(self):
+        for _ in range(3):
+            self.client.get('/api/productos/', **self.autorizacion(self.admin))
+        self.client.get('/api/productos/999999/', **self.autorizacion(self.admin))
+
+        respuesta = self.client.get('/api/rendimiento/?orden=consultas_media', **self.autorizacion(self.admin))
+
+        self.assertEqual(respuesta.status_code, 200)
+        rutas = {r['ruta']: r for r in respuesta.json()['rutas']}
+        self.assertEqual(rutas['GET /api/productos/']['requests'], 3)
+        self.assertGreater(rutas['GET /api/productos/']['consultas_media'], 0)
+        # La ruta queda con su patrón (sin las anclas de la regex), no con el código pedido
+        self.assertIn('GET /api/productos/(?P<codigo>[^/.]+)/', rutas)
+        self.assertEqual(rutas['GET /api/productos/(?P<codigo>[^/.]+)/']['requests'], 1)
+
+    def test_resumen_solo_staff(self):
+        self.assertEqual(self.client.get('/api/rendimiento/').status_code, 401)
+        self.assertEqual(self.client.get('/api/rendimiento/', **self.autorizacion(self.vendedor)).status_code, 403)
@@ -0,0 +1,184 @@
+"""
+Cola de tareas de IA (tareas_ia.py): encolar, reclamar, reintentar y liberar tareas, y los
+endpoints de la generación en segundo plano (202 y GET /api/ia/tareas/{id}/)
+"""
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from ventasbasico.groq_service import ErrorGroq
+from ventasbasico.models import Productos, TareaIA
+from ventasbasico.tareas_ia import ejecutar_tarea, encolar_descripcion, liberar_colgadas, reclamar_tareas
+
+DESCRIPCION = {
+    'descripcion_corta': 'Café de especialidad',
+    'descripcion_larga': 'Tostado medio, notas a chocolate',
+    'palabras_clave': ['café'],
+    'beneficios': ['Aroma intenso'],
+}
+
+
+def groq_de_prueba(**metodo):
+    return mock.patch(
+        'ventasbasico.descripciones.obtener_groq_service',
+        return_value=mock.Mock(generar_descripcion_producto=mock.Mock(**metodo))
+    )
+
+
+class TareasIATests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.producto = Productos.objects.create(nombre='Café en grano', stock=5, precio=Decimal('4500'))
+
+    def reclamar(self):
+        tareas = reclamar_tareas(1)
+        self.assertEqual(len(tareas), 1)
+        return tareas[0]
+
+    def test_encolar_reutiliza_la_pendiente(self):
+        tarea, creada = encolar_descripcion(self.producto)
+        otra, creada_otra = encolar_descripcion(self.producto)
+
+        self.assertTrue(creada)
+        self.assertFalse(creada_otra)
+        self.assertEqual(otra.id, tarea.id)
+
+    def test_forzar_sobre_una_pendiente_la_vuelve_forzada(self):
+        tarea, _ = encolar_descripcion(self.producto, forzar=False)
+
+        otra, creada = encolar_descripcion(self.producto, forzar=True)
+
+        self.assertFalse(creada)
+        self.assertEqual(otra.id, tarea.id)
+        tarea.refresh_from_db()
+        self.assertTrue(tarea.parametros['forzar'])
+
+    def test_forzar_con_una_no_forzada_en_proceso_encola_otra(self):
+        encolar_descripcion(self.producto, forzar=False)
+        en_proceso = self.reclamar()
+
+        nueva, creada = encolar_descripcion(self.producto, forzar=True)
+        repetida, creada_repetida = encolar_descripcion(self.producto, forzar=True)
+
+        self.assertTrue(creada)
+        self.assertNotEqual(nueva.id, en_proceso.id)
+        self.assertTrue(nueva.parametros['forzar'])
+        self.assertEqual((repetida.id, creada_repetida), (nueva.id, False))
+        # Sin forzar, la que está en proceso sirve
+        self.assertEqual(encolar_descripcion(self.producto)[0].id, nueva.id)
+
+    def test_reclamar_respeta_disponible_desde(self):
+        tarea, _ = encolar_descripcion(self.producto)
+        TareaIA.objects.filter(id=tarea.id).update(disponible_desde=timezone.now() + timedelta(minutes=1))
+
+        self.assertEqual(reclamar_tareas(5), [])
+
+        TareaIA.objects.filter(id=tarea.id).update(disponible_desde=timezone.now())
+        reclamada = self.reclamar()
+        self.assertEqual((reclamada.estado, reclamada.intentos), (TareaIA.EN_PROCESO, 1))
+        self.assertEqual(reclamar_tareas(5), [])
+
+    def test_ejecutar_guarda_la_descripcion(self):
+        encolar_descripcion(self.producto)
+
+        with groq_de_prueba(return_value=DESCRIPCION):
+            estado = ejecutar_tarea(self.reclamar())
+
+        self.assertEqual(estado, TareaIA.COMPLETADA)
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.descripcion_corta, 'Café de especialidad')
+
+    @override_settings(TAREAS_IA_MAX_INTENTOS=2, TAREAS_IA_ESPERA_BASE=10)
+    def test_reintenta_con_espera_y_luego_falla(self):
+        tarea, _ = encolar_descripcion(self.producto)
+
+        with groq_de_prueba(side_effect=ErrorGroq('Groq no respondió')):
+            self.assertEqual(ejecutar_tarea(self.reclamar()), TareaIA.PENDIENTE)
+            tarea.refresh_from_db()
+            self.assertEqual(tarea.error, 'Groq no respondió')
+            self.assertGreater(tarea.disponible_desde, timezone.now() + timedelta(seconds=5))
+
+            TareaIA.objects.filter(id=tarea.id).update(disponible_desde=timezone.now())
+            self.assertEqual(ejecutar_tarea(self.reclamar()), TareaIA.ERROR)
+
+        tarea.refresh_from_db()
+        self.assertEqual((tarea.estado, tarea.intentos), (TareaIA.ERROR, 2))
+        self.assertIsNotNone(tarea.terminada)
+
+    @override_settings(TAREAS_IA_TIMEOUT=60)
+    def test_liberar_colgadas(self):
+        encolar_descripcion(self.producto)
+        tarea = self.reclamar()
+
+        self.assertEqual(liberar_colgadas(), 0)
+
+        TareaIA.objects.filter(id=tarea.id).update(iniciada=timezone.now() - timedelta(seconds=61))
+        self.assertEqual(liberar_colgadas(), 1)
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, TareaIA.PENDIENTE)
+
+    @override_settings(TAREAS_IA_TIMEOUT=60)
+    def test_worker_lento_no_guarda_si_la_tarea_se_reasigno(self):
+        encolar_descripcion(self.producto)
+        lenta = self.reclamar()
+
+        def groq_lento(**kwargs):
+            # Mientras espera a Groq la tarea vence y la toma otro worker
+            TareaIA.objects.filter(id=lenta.id).update(iniciada=timezone.now() - timedelta(seconds=61))
+            liberar_colgadas()
+            self.assertEqual(self.reclamar().intentos, 2)
+            return DESCRIPCION
+
+        with groq_de_prueba(side_effect=groq_lento):
+            estado = ejecutar_tarea(lenta)
+
+        self.assertEqual(estado, TareaIA.PENDIENTE)
+        self.producto.refresh_from_db()
+        self.assertIsNone(self.producto.descripcion_corta)
+        tarea = TareaIA.objects.get(id=lenta.id)
+        self.assertEqual((tarea.estado, tarea.intentos), (TareaIA.EN_PROCESO, 2))
+
+
+class TareasIAEndpointsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser('admin', 'admin@example.com', 'admin')
+        cls.producto = Productos.objects.create(nombre='Café en grano', stock=5, precio=Decimal('4500'))
+
+    def setUp(self):
+        self.autorizacion = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.usuario).access_token}'}
+
+    def test_generacion_en_segundo_plano_y_estado(self):
+        respuesta = self.client.post(
+            f'/api/ia/productos/{self.producto.id}/generar-descripcion/', {'async': True},
+            content_type='application/json', **self.autorizacion
+        )
+
+        self.assertEqual(respuesta.status_code, 202)
+        datos = respuesta.json()
+        self.assertEqual(datos['estado'], TareaIA.PENDIENTE)
+        self.assertEqual(datos['url'], f"/api/ia/tareas/{datos['tarea_id']}/")
+
+        estado = self.client.get(datos['url'], **self.autorizacion).json()
+        self.assertEqual((estado['estado'], estado['intentos']), (TareaIA.PENDIENTE, 0))
+        self.assertNotIn('resultado', estado)
+
+        with groq_de_prueba(return_value=DESCRIPCION):
+            ejecutar_tarea(reclamar_tareas(1)[0])
+
+        estado = self.client.get(datos['url'], **self.autorizacion).json()
+        self.assertEqual(estado['estado'], TareaIA.COMPLETADA)
+        self.assertEqual(estado['resultado']['descripcion_corta'], 'Café de especialidad')
+
+    def test_estado_requiere_autenticacion_y_tarea_existente(self):
+        tarea, _ = encolar_descripcion(self.producto)
+
+        self.assertEqual(self.client.get(f'/api/ia/tareas/{tarea.id}/').status_code, 401)
+        self.assertEqual(self.client.get('/api/ia/tareas/999999/', **self.autorizacion).status_code, 404)
@@ -0,0 +1,122 @@
+"""
+Telemetría de IA (telemetria.py): percentiles desde el histograma, volcado de los acumulados
+a MetricaIA y volcado sin la tabla (migraciones pendientes)
+"""
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from ventasbasico.models import MetricaIA
+from ventasbasico.telemetria import TRAMOS_MS, TelemetriaIA, _tramo, percentil
+
+
+def histograma(duraciones_ms):
+    tramos = [0] * (len(TRAMOS_MS) + 1)
+    for duracion in duraciones_ms:
+        tramos[_tramo(duracion)] += 1
+    return tramos
+
+
+class PercentilTests(SimpleTestCase):
+
+    def test_muestras_uniformes(self):
+        # 1..100 ms: la interpolación lineal dentro de cada tramo da el percentil exacto
+        tramos = histograma(range(1, 101))
+
+        self.assertEqual([percentil(tramos, q) for q in (0.50, 0.95, 0.99)], [50.0, 95.0, 99.0])
+
+    def test_cola_en_tramos_altos(self):
+        # 90 llamadas rápidas, 9 entre 1 y 1.5 s y una de 40 s
+        tramos = histograma([30] * 90 + [1200] * 9 + [40000])
+
+        self.assertEqual(percentil(tramos, 0.50), 27.8)
+        self.assertEqual(percentil(tramos, 0.95), 1277.8)
+        self.assertEqual(percentil(tramos, 0.99), 1500.0)
+        # Más allá del último tramo se informa su límite
+        self.assertEqual(percentil(tramos, 1.0), 30000.0)
+
+    def test_sin_llamadas(self):
+        self.assertIsNone(percentil(histograma([]), 0.5))
+
+
+class VolcadoTelemetriaTests(TestCase):
+
+    def setUp(self):
+        self.reloj = 100.0
+        parches = (
+            mock.patch('ventasbasico.telemetria.time', SimpleNamespace(
+                perf_counter=lambda: self.reloj, monotonic=lambda: self.reloj
+            )),
+            mock.patch('ventasbasico.telemetria.observar_groq'),
+        )
+        for parche in parches:
+            parche.start()
+            self.addCleanup(parche.stop)
+        self.telemetria = TelemetriaIA(intervalo=60)
+        # Sin hilo de volcado: el test llama a volcar()
+        self.telemetria._hilo = mock.Mock()
+
+    def llamada(self, operacion, duracion_ms, **kwargs):
+        self.telemetria.registrar(operacion, self.reloj - duracion_ms / 1000, **kwargs)
+
+    def test_volcar_guarda_una_fila_por_operacion(self):
+        self.llamada('chatbot', 120, uso=SimpleNamespace(prompt_tokens=300, completion_tokens=40))
+        self.llamada('chatbot', 180, reintentos=2)
+        self.llamada('chatbot', 40000, error=True)
+        self.llamada('chatbot', 0, rechazada=True)
+        self.llamada('descripcion', 45)
+
+        self.telemetria.volcar()
+
+        filas = {fila.operacion: fila for fila in MetricaIA.objects.all()}
+        self.assertEqual(set(filas), {'chatbot', 'descripcion'})
+        chatbot = filas['chatbot']
+        self.assertEqual(
+            (chatbot.llamadas, chatbot.errores, chatbot.rechazadas, chatbot.reintentos),
+            (3, 1, 1, 2)
+        )
+        self.assertEqual((chatbot.tokens_prompt, chatbot.tokens_respuesta), (300, 40))
+        self.assertAlmostEqual(chatbot.duracion_total_ms, 40300)
+        self.assertEqual(chatbot.histograma, histograma([120, 180, 40000]))
+        self.assertEqual(filas['descripcion'].histograma, histograma([45]))
+
+        # El intervalo se reinicia: el siguiente volcado sin llamadas no agrega filas
+        self.telemetria.volcar()
+        self.assertEqual(MetricaIA.objects.count(), 2)
+
+    def test_resumen_suma_filas_y_pendientes(self):
+        for duracion in range(1, 51):
+            self.llamada('chatbot', duracion)
+        self.telemetria.volcar()
+        for duracion in range(51, 101):
+            self.llamada('chatbot', duracion)
+
+        resumen = self.telemetria.resumen(timezone.now() - timedelta(hours=1))['chatbot']
+
+        self.assertEqual(resumen['llamadas'], 100)
+        self.assertEqual((resumen['p50_ms'], resumen['p95_ms'], resumen['p99_ms']), (50.0, 95.0, 99.0))
+        self.assertEqual(resumen['latencia_media_ms'], 50.5)
+
+    def test_sin_tabla_avisa_una_vez_y_conserva_los_acumulados(self):
+        self.llamada('chatbot', 120)
+        sin_tabla = (
+            mock.patch.object(MetricaIA.objects, 'bulk_create', side_effect=OperationalError('no such table: ventasbasico_metricaia')),
+            mock.patch('ventasbasico.telemetria.connection.introspection.table_names', return_value=[]),
+        )
+        with sin_tabla[0], sin_tabla[1], self.assertLogs('ventasbasico.telemetria', 'WARNING') as logs:
+            self.telemetria._volcar_seguro()
+            self.llamada('chatbot', 180)
+            self.telemetria._volcar_seguro()
+
+        self.assertEqual(len(logs.records), 1)
+        self.assertEqual(logs.records[0].levelname, 'WARNING')
+        self.assertIn('migrate', logs.output[0])
+
+        # Con la tabla creada se guardan las llamadas de ambos intervalos
+        self.telemetria._volcar_seguro()
+        fila = MetricaIA.objects.get()
+        self.assertEqual((fila.llamadas, fila.histograma), (2, histograma([120, 180])))
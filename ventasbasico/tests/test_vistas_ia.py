@@ -0,0 +1,122 @@
+"""
+Vistas async de IA (chat, recomendaciones y descripciones): autenticación, validación del
+body y respaldo cuando Groq no responde. Groq se reemplaza por un doble en cada prueba.
+"""
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from clientes.models import Cliente
+from ventasbasico.groq_service import ErrorGroq, GroqService
+from ventasbasico.models import DetalleVenta, Productos, Venta
+
+RUTAS_JSON = (
+    '/api/ia/chat/',
+    '/api/ia/chat/stream/',
+    '/api/ia/productos/recomendar/',
+)
+
+
+def groq_caido():
+    """Doble de GroqService cuyas llamadas fallan como si Groq no respondiera"""
+    error = ErrorGroq('Groq no respondió')
+    return mock.Mock(
+        achatbot_atencion=mock.AsyncMock(side_effect=error),
+        arecomendar_productos=mock.AsyncMock(side_effect=error),
+        agenerar_descripcion_producto=mock.AsyncMock(side_effect=error),
+    )
+
+
+class VistasIATests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser('admin', 'admin@example.com', 'admin')
+        cls.cliente = Cliente.objects.create(rut='11111111-1', nombre='Ana', apellido='Pérez', comuna='Santiago')
+        cls.cafe = Productos.objects.create(nombre='Café en grano', stock=5, precio=Decimal('4500'))
+        cls.te = Productos.objects.create(nombre='Té verde', stock=8, precio=Decimal('1990'))
+        venta = Venta.objects.create(numero='20241128-0001', rut_cliente=cls.cliente, total=Decimal('4500'))
+        DetalleVenta.objects.create(venta=venta, producto=cls.cafe, cantidad=1, precio_unitario=Decimal('4500'))
+
+    def setUp(self):
+        cache.clear()
+        self.autorizacion = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.usuario).access_token}'}
+
+    def post(self, ruta, cuerpo, **extra):
+        return self.client.post(ruta, cuerpo, content_type='application/json', **extra)
+
+    def test_json_invalido_responde_400(self):
+        descripcion = f'/api/ia/productos/{self.cafe.id}/generar-descripcion/'
+        for ruta, extra in [(ruta, {}) for ruta in RUTAS_JSON] + [(descripcion, self.autorizacion)]:
+            for cuerpo in ('{no es json', '["lista"]'):
+                with self.subTest(ruta=ruta, cuerpo=cuerpo):
+                    respuesta = self.post(ruta, cuerpo, **extra)
+                    self.assertEqual(respuesta.status_code, 400)
+                    self.assertIn('JSON', respuesta.json()['error'])
+
+    def test_campos_obligatorios(self):
+        for ruta in ('/api/ia/chat/', '/api/ia/chat/stream/'):
+            self.assertEqual(self.post(ruta, {'contexto': {}}).status_code, 400)
+        self.assertEqual(self.post('/api/ia/productos/recomendar/', {'limite': 2}).status_code, 400)
+        self.assertEqual(self.post('/api/ia/productos/recomendar/', {'rut_cliente': '1-9', 'modo': 'otro'}).status_code, 400)
+
+    def test_contexto_que_no_es_objeto_responde_400(self):
+        for ruta in ('/api/ia/chat/', '/api/ia/chat/stream/'):
+            for contexto in (['x'], 'venta', 5):
+                with self.subTest(ruta=ruta, contexto=contexto):
+                    respuesta = self.post(ruta, {'mensaje': '¿Tienen garantía?', 'contexto': contexto})
+                    self.assertEqual(respuesta.status_code, 400)
+                    self.assertIn('contexto', respuesta.json()['error'])
+
+    def test_descripcion_sin_autenticacion_responde_401(self):
+        for extra in ({}, {'HTTP_AUTHORIZATION': 'Bearer token-invalido'}):
+            with self.subTest(extra=extra):
+                respuesta = self.post(f'/api/ia/productos/{self.cafe.id}/generar-descripcion/', {}, **extra)
+                self.assertEqual(respuesta.status_code, 401)
+
+    def test_descripcion_de_producto_inexistente_responde_404(self):
+        respuesta = self.post('/api/ia/productos/999999/generar-descripcion/', {}, **self.autorizacion)
+
+        self.assertEqual(respuesta.status_code, 404)
+
+    def test_recomendacion_de_cliente_inexistente_responde_404(self):
+        respuesta = self.post('/api/ia/productos/recomendar/', {'rut_cliente': '99999999-9'})
+
+        self.assertEqual(respuesta.status_code, 404)
+
+    @mock.patch('ventasbasico.views.obtener_groq_service', side_effect=groq_caido)
+    def test_chat_sin_groq_responde_mensaje_de_respaldo(self, _):
+        respuesta = self.post('/api/ia/chat/', {'mensaje': '¿Hacen envíos a regiones y cuánto demoran?'})
+
+        self.assertEqual(respuesta.status_code, 200)
+        datos = respuesta.json()
+        self.assertTrue(datos['respaldo'])
+        self.assertEqual(datos['respuesta'], GroqService._respaldo_chatbot()['respuesta'])
+        self.assertTrue(datos['requiere_humano'])
+
+    @mock.patch('ventasbasico.views.obtener_groq_service', side_effect=groq_caido)
+    def test_recomendacion_sin_groq_usa_el_modo_local(self, _):
+        respuesta = self.post('/api/ia/productos/recomendar/', {'rut_cliente': self.cliente.rut, 'limite': 2})
+
+        self.assertEqual(respuesta.status_code, 200)
+        datos = respuesta.json()
+        self.assertTrue(datos['respaldo'])
+        self.assertEqual(datos['modo'], 'local')
+
+    @mock.patch('ventasbasico.descripciones.obtener_groq_service', side_effect=groq_caido)
+    def test_descripcion_sin_groq(self, _):
+        ruta = f'/api/ia/productos/{self.cafe.id}/generar-descripcion/'
+
+        # Sin descripción guardada no hay con qué responder
+        self.assertEqual(self.post(ruta, {}, **self.autorizacion).status_code, 503)
+
+        Productos.objects.filter(id=self.cafe.id).update(descripcion_corta='Café de especialidad')
+        respuesta = self.post(ruta, {'forzar': True}, **self.autorizacion)
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.json()['respaldo'])
+        self.assertEqual(respuesta.json()['descripcion_corta'], 'Café de especialidad')
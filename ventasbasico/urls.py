@@ -17,6 +17,13 @@ urlpatterns = [
     path("api/", include(router.urls)),
     path("api-auth/", include("rest_framework.urls", namespace="rest_framework")),
 
+    # Stream SSE de cambios de stock
+    path('api/stock/stream/', views.stock_stream, name='stock_stream'),
+
+    # Resumen de rendimiento por ruta (solo staff) y métricas Prometheus
+    path('api/rendimiento/', views.rendimiento, name='rendimiento'),
+    path('metrics', views.metricas_prometheus, name='metricas_prometheus'),
+
     # ============================================
     # ENDPOINTS CON IA - GROQ CLOUD
     # ============================================
@@ -28,9 +35,11 @@ urlpatterns = [
     
     # Generador de descripciones de productos
     path('api/ia/productos/<int:producto_id>/generar-descripcion/', views.generar_descripcion_ia, name='generar_descripcion_ia'),
+    path('api/ia/tareas/<int:tarea_id>/', views.estado_tarea_ia, name='estado_tarea_ia'),
     
     # Chatbot de atención al cliente
     path('api/ia/chat/', views.chatbot_atencion, name='chatbot_atencion'),
+    path('api/ia/chat/stream/', views.chatbot_atencion_stream, name='chatbot_atencion_stream'),
 
     #Vista admin y Home
     path('admin/', admin.site.urls),
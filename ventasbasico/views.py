@@ -1,43 +1,175 @@
 from django.shortcuts import redirect, render, get_object_or_404
+from django.conf import settings
 from django.contrib import messages
-from django.db import transaction
-from datetime import date, datetime
+from django.db import connection, transaction
+from django.utils import timezone
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation
 from ventasbasico import forms
-from .models import Productos, Venta, DetalleVenta
+from .models import Productos, Venta, DetalleVenta, TareaIA
 from clientes.models import Cliente
+import hmac
 import logging
+import os
 from rest_framework import permissions, viewsets, status
 from rest_framework.decorators import api_view, action, permission_classes
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from django.contrib.auth.decorators import login_required
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from asgiref.sync import sync_to_async
+import json
 # Importa los serializadores locales de ventas
-from .serializers import ProductosSerializer, VentaSerializer, DetalleVentaSerializer
+from .serializers import ProductosSerializer, VentaSerializer, DetalleVentaSerializer, detalles_con_producto
 
 # Importa los serializadores de usuarios y grupos desde la app 'clientes'
 from clientes.serializers import GroupSerializer, UserSerializer
 
 # Importar servicio de GroqCloud para IA
-from .groq_service import GroqService
+from .groq_service import ErrorGroq, GroqService, obtener_groq_service
+from .circuito import obtener_circuito_groq
+from .telemetria import obtener_telemetria
+from .cache_chatbot import obtener_cache_chatbot
+from .coalescencia import clave_coalescencia, obtener_single_flight
+from .intenciones import productos_relevantes, responder_localmente, metricas as metricas_intenciones
+
+# Broker de eventos de stock (SSE)
+from .eventos_stock import obtener_broker
+from .signals import stock_guardado
+
+# Búsqueda de texto completo y autocompletado
+from .busqueda import buscar_productos
+from .autocompletado import obtener_indice
+
+# Preselección local de candidatos para el recomendador
+from .recomendador import preseleccionar_candidatos
+
+# Perfiles de compra de los clientes (RFM, intereses y últimos productos)
+from .perfiles import historial_perfil, obtener_perfil, resumen_perfil
+from .filtrado_colaborativo import recomendar_local
+
+# Descripciones IA con cache por hash de contenido
+from .descripciones import agenerar_descripcion, descripcion_vigente
+
+# Cola de tareas de IA (generación de descripciones en segundo plano)
+from .tareas_ia import encolar_descripcion
+
+# Instrumentación de rendimiento por request y métricas Prometheus
+from .rendimiento import obtener_registro_rendimiento
+from .metricas import exportar as exportar_metricas, registrar_checkout
 
 class ProductosViewSet(viewsets.ModelViewSet):
     """
     ViewSet para productos:
     - Listar y ver: Público (clientes pueden ver productos sin login)
     - Crear/Editar/Eliminar: Solo admin autenticado
+    - Buscar: GET /api/productos/?q=texto (resultados ordenados por relevancia)
+    - Autocompletar: GET /api/productos/autocompletar/?q=caf&limite=8
+    - Filtrar: ?precio__gte=1000&precio__lte=5000&stock__gt=0&palabras_clave=cafe&has_ai_description=true
     """
     queryset = Productos.objects.all().order_by("nombre")
     serializer_class = ProductosSerializer
     lookup_field = 'codigo'  # Usar código en lugar de id para búsquedas
     
     def get_permissions(self):
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'autocompletar']:
             # Permitir ver productos sin autenticación
             permission_classes = [AllowAny]
         else:
             # Crear, actualizar, eliminar requiere autenticación
             permission_classes = [IsAuthenticated]
         return [permission() for permission in permission_classes]
+    
+    @action(detail=False, methods=['get'])
+    def autocompletar(self, request):
+        """Sugerencias por prefijo de nombre o código, ordenadas por popularidad en ventas"""
+        texto = request.query_params.get('q', '')
+        try:
+            limite = min(int(request.query_params.get('limite', 8)), 20)
+        except ValueError:
+            limite = 8
+        
+        sugerencias = obtener_indice().buscar(texto, limite=limite)
+        return Response({'sugerencias': sugerencias})
+    
+    def get_queryset(self):
+        """Aplicar filtros y búsqueda de texto completo (?q=) en el listado"""
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            queryset = self._aplicar_filtros(queryset, self.request.query_params)
+            texto = self.request.query_params.get('q', None)
+            if texto:
+                queryset = buscar_productos(queryset, texto)
+        return queryset
+    
+    def _aplicar_filtros(self, queryset, params):
+        """
+        Filtros soportados (respaldados por los índices de Productos.Meta):
+        - precio__gte / precio__lte: rango de precio
+        - stock__gt: stock mínimo (stock__gt=0 usa el índice parcial de productos en stock)
+        - palabras_clave: contiene las palabras clave (separadas por coma, todas)
+        - has_ai_description: true/false
+        - ordering: nombre, -nombre, precio, -precio (precio desempata por nombre)
+        """
+        errores = {}
+        
+        for campo in ('precio__gte', 'precio__lte'):
+            valor = params.get(campo)
+            if valor:
+                try:
+                    precio = Decimal(valor)
+                except InvalidOperation:
+                    precio = None
+                if precio is None or not precio.is_finite():
+                    errores[campo] = 'Debe ser un número'
+                else:
+                    queryset = queryset.filter(**{campo: precio})
+        
+        stock_minimo = params.get('stock__gt')
+        if stock_minimo:
+            try:
+                queryset = queryset.filter(stock__gt=int(stock_minimo))
+            except ValueError:
+                errores['stock__gt'] = 'Debe ser un número entero'
+        
+        palabra_clave = params.get('palabras_clave')
+        if palabra_clave:
+            # Separadas por coma: el producto debe tener todas
+            palabras = Productos.normalizar_palabras_clave(palabra_clave)
+            if connection.features.supports_json_field_contains:
+                # Contención JSON (@>), usa el índice GIN de palabras_clave
+                queryset = queryset.filter(palabras_clave__contains=palabras)
+            else:
+                # SQLite no soporta contains en JSON: cada palabra (con sus comillas) contra el texto
+                for palabra in palabras:
+                    queryset = queryset.filter(palabras_clave__icontains=json.dumps(palabra))
+        
+        con_ia = params.get('has_ai_description')
+        if con_ia:
+            if con_ia.lower() not in ('true', 'false', '1', '0'):
+                errores['has_ai_description'] = 'Debe ser true o false'
+            else:
+                queryset = queryset.filter(descripcion_generada_fecha__isnull=con_ia.lower() in ('false', '0'))
+        
+        orden = params.get('ordering')
+        if orden:
+            if orden not in ('nombre', '-nombre', 'precio', '-precio'):
+                errores['ordering'] = 'Valores permitidos: nombre, -nombre, precio, -precio'
+            else:
+                # Desempate en el mismo sentido: ordering=precio recorre productos_precio_nombre_idx
+                # ya ordenado (precio, nombre) sin un sort aparte
+                signo = '-' if orden.startswith('-') else ''
+                desempate = [f'{signo}nombre'] if orden.lstrip('-') == 'precio' else []
+                queryset = queryset.order_by(orden, *desempate, f'{signo}id')
+        
+        if errores:
+            raise ValidationError(errores)
+        return queryset
 
 class VentaViewsSet(viewsets.ModelViewSet):
     """
@@ -45,7 +177,8 @@ class VentaViewsSet(viewsets.ModelViewSet):
     - Crear: Público (clientes pueden comprar sin login)
     - Ver/Editar/Eliminar: Solo admin autenticado
     """
-    queryset = Venta.objects.all().order_by("numero")
+    # Cliente y detalles (con su producto) se cargan junto a la página, no venta por venta
+    queryset = Venta.objects.select_related('rut_cliente').prefetch_related(detalles_con_producto()).order_by("numero")
     serializer_class = VentaSerializer
     
     def get_permissions(self):
@@ -63,7 +196,7 @@ class DetalleVentaViewSet(viewsets.ModelViewSet):
     - Ver detalles: Público (para que clientes vean sus compras)
     - Crear/Editar/Eliminar: Solo admin autenticado
     """
-    queryset = DetalleVenta.objects.all().order_by("venta")
+    queryset = DetalleVenta.objects.select_related('producto').order_by("venta")
     serializer_class = DetalleVentaSerializer
     
     def get_permissions(self):
@@ -110,7 +243,7 @@ def generar_numero_venta():
 def historial_ventas(request):
     """Vista para mostrar el historial de ventas"""
     try:
-        ventas = Venta.objects.all().order_by('-fecha', '-id')
+        ventas = Venta.objects.select_related('rut_cliente').order_by('-fecha', '-id')
         
         # Filtro por fecha si se proporciona
         fecha_filtro = request.GET.get('fecha')
@@ -148,8 +281,8 @@ def historial_ventas(request):
 def detalle_venta(request, venta_id):
     """Vista para mostrar el detalle de una venta específica"""
     try:
-        venta = get_object_or_404(Venta, id=venta_id)
-        detalles = DetalleVenta.objects.filter(venta=venta)
+        venta = get_object_or_404(Venta.objects.select_related('rut_cliente'), id=venta_id)
+        detalles = DetalleVenta.objects.filter(venta=venta).select_related('producto')
         
         return render(request, 'venta/detalle_venta.html', {
             'venta': venta,
@@ -297,6 +430,7 @@ def venta(request):
         es_cliente_habitual = request.POST.get('es_cliente_habitual') == 'on'
         
         if not rut_cliente:
+            registrar_checkout('web', 'sin_rut')
             messages.error(request, "Debe ingresar el RUT del cliente")
             return render(request, 'venta/venta.html', {
                 'carrito': carrito, 
@@ -317,6 +451,7 @@ def venta(request):
                         cliente_obj = Cliente.objects.get(rut=rut_cliente)
                         messages.info(request, f"Cliente habitual: {cliente_obj.nombre} {cliente_obj.apellido}")
                     except Cliente.DoesNotExist:
+                        registrar_checkout('web', 'cliente_inexistente')
                         messages.error(request, f"El RUT {rut_cliente} no está registrado como cliente habitual")
                         return render(request, 'venta/venta.html', {
                             'carrito': carrito, 
@@ -334,10 +469,21 @@ def venta(request):
                         }
                     )
                 
-                # Verificar stock antes de procesar
+                # Verificar stock antes de procesar (todos los productos del carrito en una
+                # consulta, bloqueados hasta el final de la transacción)
+                productos = Productos.objects.select_for_update().in_bulk([int(producto_id) for producto_id in carrito])
                 for producto_id, item in carrito.items():
-                    producto = Productos.objects.get(id=producto_id)
+                    producto = productos.get(int(producto_id))
+                    if producto is None:
+                        registrar_checkout('web', 'producto_inexistente')
+                        messages.error(request, f"El producto {item['nombre']} ya no está disponible")
+                        return render(request, 'venta/venta.html', {
+                            'carrito': carrito, 
+                            'total': total, 
+                            'clientes': clientes
+                        })
                     if producto.stock < item['cantidad']:
+                        registrar_checkout('web', 'stock_insuficiente')
                         messages.error(request, f"Stock insuficiente para {producto.nombre}")
                         return render(request, 'venta/venta.html', {
                             'carrito': carrito, 
@@ -353,21 +499,24 @@ def venta(request):
                     total=total
                 )
                 
-                # Crear los detalles de venta y actualizar stock
+                # Crear los detalles de venta y actualizar stock (una consulta cada uno)
+                detalles = []
                 for producto_id, item in carrito.items():
-                    producto = Productos.objects.get(id=producto_id)
-                    
-                    # Crear detalle de venta
-                    DetalleVenta.objects.create(
+                    producto = productos[int(producto_id)]
+                    detalles.append(DetalleVenta(
                         venta=venta,
                         producto=producto,
                         cantidad=item['cantidad'],
                         precio_unitario=item['precio']
-                    )
+                    ))
                     
-                    # Reducir stock
+                    # Reducir stock (se guarda junto al final)
                     producto.stock -= item['cantidad']
-                    producto.save()
+                DetalleVenta.objects.bulk_create(detalles)
+                stock_guardado(Productos.guardar_stock(productos.values()))
+                
+                # El perfil de compras del cliente se actualiza al confirmarse (signals.py)
+                transaction.on_commit(lambda: registrar_checkout('web'))
                 
                 # Limpiar carrito
                 request.session['carrito'] = {}
@@ -381,6 +530,7 @@ def venta(request):
                 return redirect('home')
             
         except Exception as e:
+            registrar_checkout('web', 'error')
             messages.error(request, f"Error al procesar la venta: {str(e)}")
     
     return render(request, 'venta/venta.html', {
@@ -390,15 +540,180 @@ def venta(request):
     })
 
 
+# ============================================
+# STREAM DE STOCK (SERVER-SENT EVENTS)
+# ============================================
+
+async def stock_stream(request):
+    """
+    Endpoint: GET /api/stock/stream/
+    
+    Stream SSE con los cambios de stock de los productos (requiere servidor ASGI)
+    Cada evento "stock" trae una lista compacta de deltas agrupados por producto:
+    
+    event: stock
+    data: [{"id": 1, "stock": 49}, {"id": 7, "stock": 0}]
+    """
+    broker = obtener_broker()
+
+    async def eventos():
+        yield 'retry: 3000\n\n'
+        async for lote in broker.suscribir():
+            if not lote:
+                # Keepalive para que proxies no cierren la conexión
+                yield ': ping\n\n'
+                continue
+            yield f"event: stock\ndata: {json.dumps(lote, separators=(',', ':'))}\n\n"
+
+    response = StreamingHttpResponse(eventos(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 # ============================================
 # ENDPOINTS CON IA - GROQ CLOUD
 # ============================================
 
 
 
-@api_view(['POST'])
-@permission_classes([AllowAny])
-def recomendar_productos_ia(request):
+# Los endpoints que esperan a Groq son vistas async nativas: con el servidor ASGI
+# (uvicorn) un worker atiende muchas llamadas a la IA a la vez en vez de quedar bloqueado
+# durante cada una. El ORM es síncrono, así que las consultas pasan por sync_to_async.
+
+def _leer_json(request):
+    """Body JSON del request como dict (None si no es JSON válido)"""
+    try:
+        datos = json.loads(request.body or b'{}')
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+    return datos if isinstance(datos, dict) else None
+
+
+def _usuario_autenticado(request):
+    """Usuario del request con las autenticaciones de DRF (JWT) o None"""
+    drf_request = Request(request, authenticators=[clase() for clase in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    try:
+        usuario = drf_request.user
+    except APIException:
+        return None
+    return usuario if usuario and usuario.is_authenticated else None
+
+
+async def _respuesta_compartida(operacion, payload, calcular):
+    """
+    Ejecuta await calcular() una sola vez para los requests idénticos simultáneos
+    (single-flight) y entrega a todos la misma respuesta; el resultado no se guarda una
+    vez terminado. calcular devuelve (datos, codigo_http).
+    """
+    if settings.SINGLE_FLIGHT_ACTIVO:
+        (datos, codigo), compartida = await obtener_single_flight().ejecutar(
+            clave_coalescencia(operacion, payload), calcular
+        )
+        if compartida:
+            logger.info(f"Respuesta de {operacion} compartida con un request idéntico en curso")
+    else:
+        datos, codigo = await calcular()
+    return JsonResponse(datos, status=codigo)
+
+
+def _recomendacion_local(cliente, limite, respaldo=False, perfil=None):
+    """Respuesta del recomendador con vecinos precalculados (modo local o respaldo si falla Groq)"""
+    resultado = recomendar_local(cliente, limite=limite, perfil=perfil)
+    datos = {
+        'cliente': {
+            'rut': cliente.rut,
+            'nombre': f"{cliente.nombre} {cliente.apellido}"
+        },
+        'recomendaciones': resultado['recomendaciones'],
+        'mensaje': resultado['mensaje'],
+        'modo': 'local'
+    }
+    if respaldo:
+        datos['respaldo'] = True
+    return datos
+
+
+def _preparar_recomendacion(rut_cliente, modo):
+    """Consultas a la BD del recomendador (se ejecuta en un hilo desde la vista async)"""
+    cliente = Cliente.objects.get(rut=rut_cliente)
+    if modo == 'local':
+        return cliente, None, None, None
+    # Perfil precalculado: historial acotado a los últimos productos comprados, sin recorrer las ventas
+    perfil = obtener_perfil(cliente)
+    # Preseleccionar candidatos localmente: el prompt no crece con el catálogo
+    candidatos = preseleccionar_candidatos(cliente, perfil=perfil)
+    return cliente, perfil, historial_perfil(perfil), candidatos
+
+
+async def _recomendar(rut_cliente, limite, modo):
+    """Calcula la respuesta de /api/ia/productos/recomendar/ (body ya validado)"""
+    # Verificar que el cliente existe
+    try:
+        cliente, perfil, historial, candidatos = await sync_to_async(_preparar_recomendacion)(rut_cliente, modo)
+    except Cliente.DoesNotExist:
+        return {'error': f'Cliente con RUT {rut_cliente} no existe'}, status.HTTP_404_NOT_FOUND
+    
+    # Modo local: vecinos precalculados, sin llamar a la IA
+    if modo == 'local':
+        return await sync_to_async(_recomendacion_local)(cliente, limite), status.HTTP_200_OK
+    
+    if not candidatos:
+        return {'error': 'No hay productos disponibles en stock'}, status.HTTP_404_NOT_FOUND
+    
+    logger.info(f"Enviando {len(candidatos)} productos candidatos a la IA para recomendación")
+    
+    # Llamar a GroqCloud para obtener recomendaciones (sin ocupar un hilo mientras responde)
+    groq = obtener_groq_service()
+    try:
+        resultado = await groq.arecomendar_productos(
+            historial_cliente={
+                'cliente': f"{cliente.nombre} {cliente.apellido}",
+                'perfil': resumen_perfil(perfil),
+                'compras': historial
+            },
+            productos_disponibles=candidatos,
+            limite=limite
+        )
+    except ErrorGroq as e:
+        logger.warning(f"Recomendación IA no disponible, se usa el modo local: {str(e)}")
+        return await sync_to_async(_recomendacion_local)(cliente, limite, respaldo=True, perfil=perfil), status.HTTP_200_OK
+    
+    # Enriquecer recomendaciones con los datos de los candidatos (sin consultas extra)
+    candidatos_por_id = {p['id']: p for p in candidatos}
+    recomendaciones_enriquecidas = []
+    for rec in resultado.get('recomendaciones', []):
+        try:
+            producto = candidatos_por_id.get(int(rec.get('producto_id')))
+        except (TypeError, ValueError):
+            producto = None
+        if not producto:
+            # La IA devolvió un producto fuera de los candidatos
+            continue
+        recomendaciones_enriquecidas.append({
+            'producto_id': producto['id'],
+            'nombre': producto['nombre'],
+            'codigo': producto['codigo'],
+            'precio': producto['precio'],
+            'stock': producto['stock'],
+            'razon': rec.get('razon', ''),
+            'confianza': rec.get('confianza', 'media')
+        })
+    
+    return {
+        'cliente': {
+            'rut': cliente.rut,
+            'nombre': f"{cliente.nombre} {cliente.apellido}"
+        },
+        'recomendaciones': recomendaciones_enriquecidas,
+        'mensaje': resultado.get('mensaje', 'Productos recomendados para ti'),
+        'modo': 'ia'
+    }, status.HTTP_200_OK
+
+
+@csrf_exempt
+@require_POST
+async def recomendar_productos_ia(request):
     """
     Endpoint: POST /api/ia/productos/recomendar/
     
@@ -407,7 +722,8 @@ def recomendar_productos_ia(request):
     Body:
     {
         "rut_cliente": "12345678-9",
-        "limite": 3  // Opcional, default 3
+        "limite": 3,  // Opcional, default 3
+        "modo": "ia"  // Opcional: "ia" (Groq, default) o "local" (filtrado colaborativo, sin IA)
     }
     
     Response:
@@ -424,115 +740,79 @@ def recomendar_productos_ia(request):
         ],
         "mensaje": "Estos productos podrían interesarte basado en tus compras anteriores"
     }
+    
+    Si Groq falla o no responde dentro del plazo se usa el modo local ("respaldo": true)
+    Vista async: mientras espera a Groq no ocupa un hilo del worker (servidor ASGI)
     """
     try:
-        rut_cliente = request.data.get('rut_cliente')
-        limite = request.data.get('limite', 3)
+        datos = _leer_json(request)
+        if datos is None:
+            return JsonResponse({'error': 'El body debe ser JSON válido'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        rut_cliente = datos.get('rut_cliente')
+        limite = datos.get('limite', 3)
+        modo = datos.get('modo', 'ia')
         
         if not rut_cliente:
-            return Response(
+            return JsonResponse(
                 {'error': 'El campo rut_cliente es obligatorio'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Verificar que el cliente existe
-        try:
-            cliente = Cliente.objects.get(rut=rut_cliente)
-        except Cliente.DoesNotExist:
-            return Response(
-                {'error': f'Cliente con RUT {rut_cliente} no existe'},
-                status=status.HTTP_404_NOT_FOUND
+        if modo not in ('ia', 'local'):
+            return JsonResponse(
+                {'error': 'El campo modo debe ser "ia" o "local"'},
+                status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Obtener historial de compras del cliente
-        ventas = Venta.objects.filter(rut_cliente=cliente).prefetch_related('detalles__producto')
-        
-        historial = []
-        for venta in ventas:
-            for detalle in venta.detalles.all():
-                historial.append({
-                    'producto': detalle.producto.nombre,
-                    'cantidad': detalle.cantidad,
-                    'fecha': venta.fecha.strftime('%Y-%m-%d')
-                })
-        
-        # Obtener TODOS los productos disponibles (no solo una muestra)
-        productos_disponibles = []
-        todos_los_productos = Productos.objects.filter(stock__gt=0).order_by('-id')
-        
-        logger.info(f"Total de productos disponibles en BD: {todos_los_productos.count()}")
-        
-        for producto in todos_los_productos:
-            productos_disponibles.append({
-                'id': producto.id,
-                'nombre': producto.nombre,
-                'codigo': producto.codigo,
-                'precio': float(producto.precio),
-                'stock': producto.stock
-            })
-        
-        if not productos_disponibles:
-            return Response(
-                {'error': 'No hay productos disponibles en stock'},
-                status=status.HTTP_404_NOT_FOUND
+        try:
+            limite = int(limite)
+        except (TypeError, ValueError):
+            limite = 0
+        if limite < 1:
+            return JsonResponse(
+                {'error': 'El campo limite debe ser un número entero mayor que 0'},
+                status=status.HTTP_400_BAD_REQUEST
             )
         
-        logger.info(f"Enviando {len(productos_disponibles)} productos a la IA para recomendación")
-        
-        # Llamar a GroqCloud para obtener recomendaciones
-        groq = GroqService()
-        resultado = groq.recomendar_productos(
-            historial_cliente={
-                'cliente': f"{cliente.nombre} {cliente.apellido}",
-                'compras': historial
-            },
-            productos_disponibles=productos_disponibles,
-            limite=limite
+        # Requests idénticos simultáneos comparten la consulta a la BD y la llamada a Groq
+        return await _respuesta_compartida(
+            'recomendacion',
+            {'rut_cliente': rut_cliente, 'limite': limite, 'modo': modo},
+            lambda: _recomendar(rut_cliente, limite, modo)
         )
         
-        # Enriquecer recomendaciones con datos completos del producto
-        recomendaciones_enriquecidas = []
-        for rec in resultado.get('recomendaciones', []):
-            try:
-                producto = Productos.objects.get(id=rec['producto_id'])
-                recomendaciones_enriquecidas.append({
-                    'producto_id': producto.id,
-                    'nombre': producto.nombre,
-                    'codigo': producto.codigo,
-                    'precio': float(producto.precio),
-                    'stock': producto.stock,
-                    'razon': rec.get('razon', ''),
-                    'confianza': rec.get('confianza', 'media')
-                })
-            except Productos.DoesNotExist:
-                continue
-        
-        return Response({
-            'cliente': {
-                'rut': cliente.rut,
-                'nombre': f"{cliente.nombre} {cliente.apellido}"
-            },
-            'recomendaciones': recomendaciones_enriquecidas,
-            'mensaje': resultado.get('mensaje', 'Productos recomendados para ti')
-        }, status=status.HTTP_200_OK)
-        
     except Exception as e:
         logger.error(f"Error en recomendar_productos_ia: {str(e)}")
-        return Response(
+        return JsonResponse(
             {'error': f'Error al generar recomendaciones: {str(e)}'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
 
-@api_view(['POST'])
-@permission_classes([IsAuthenticated])
-def generar_descripcion_ia(request, producto_id):
+@csrf_exempt
+@require_POST
+async def generar_descripcion_ia(request, producto_id):
     """
     Endpoint: POST /api/ia/productos/{producto_id}/generar-descripcion/
     
     Genera una descripción atractiva para un producto usando IA
     Requiere autenticación (solo admin)
     
+    Si el nombre, código, precio y stock no cambiaron desde la última generación,
+    devuelve la descripción guardada sin llamar a la IA ("cache": true).
+    Body opcional: {"forzar": true} para regenerar igualmente.
+    
+    Con {"async": true} (o ?async=1) la generación se encola y se responde 202 al instante
+    (si la descripción guardada sigue vigente se responde 200 igual que en modo normal):
+    {
+        "tarea_id": 12,
+        "estado": "pendiente",
+        "url": "/api/ia/tareas/12/"
+    }
+    La tarea la ejecuta el worker (python manage.py procesar_tareas_ia) y su estado se
+    consulta en GET /api/ia/tareas/{tarea_id}/.
+    
     Response:
     {
         "producto": {
@@ -543,69 +823,159 @@ def generar_descripcion_ia(request, producto_id):
         "descripcion_corta": "Descripción breve y atractiva",
         "descripcion_larga": "Descripción detallada completa...",
         "palabras_clave": ["keyword1", "keyword2", ...],
-        "beneficios": ["Beneficio 1", "Beneficio 2", ...]
+        "beneficios": ["Beneficio 1", "Beneficio 2", ...],
+        "cache": false
     }
+    
+    Si Groq falla o no responde dentro del plazo se devuelve la descripción guardada
+    ("respaldo": true) o 503 si el producto nunca tuvo una.
+    Vista async: mientras espera a Groq no ocupa un hilo del worker (servidor ASGI)
     """
     try:
+        if await sync_to_async(_usuario_autenticado)(request) is None:
+            return JsonResponse(
+                {'detail': 'Las credenciales de autenticación no se proveyeron.'},
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+        
+        datos = _leer_json(request)
+        if datos is None:
+            return JsonResponse({'error': 'El body debe ser JSON válido'}, status=status.HTTP_400_BAD_REQUEST)
+        
         # Buscar el producto
         try:
-            producto = Productos.objects.get(id=producto_id)
+            producto = await Productos.objects.aget(id=producto_id)
         except Productos.DoesNotExist:
-            return Response(
+            return JsonResponse(
                 {'error': f'Producto con ID {producto_id} no existe'},
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Preparar características del producto
-        caracteristicas = {
-            'codigo': producto.codigo,
-            'precio': float(producto.precio),
-            'stock': producto.stock
-        }
-        
-        # Llamar a GroqCloud para generar descripción
-        groq = GroqService()
-        resultado = groq.generar_descripcion_producto(
-            nombre_producto=producto.nombre,
-            caracteristicas=caracteristicas
-        )
-        
-        # GUARDAR la descripción generada en la base de datos
-        import json
-        from django.utils import timezone
+        # Reutilizar la descripción guardada si nombre/precio/stock no cambiaron
+        forzar = str(datos.get('forzar', '')).lower() in ('true', '1')
+        en_segundo_plano = str(datos.get('async', request.GET.get('async', ''))).lower() in ('true', '1')
+        if en_segundo_plano and (forzar or not descripcion_vigente(producto)):
+            tarea, _ = await sync_to_async(encolar_descripcion)(producto, forzar=forzar)
+            return JsonResponse({
+                'tarea_id': tarea.id,
+                'estado': tarea.estado,
+                'url': f'/api/ia/tareas/{tarea.id}/'
+            }, status=status.HTTP_202_ACCEPTED)
         
-        producto.descripcion_corta = resultado.get('descripcion_corta', '')
-        producto.descripcion_larga = resultado.get('descripcion_larga', '')
-        producto.palabras_clave = ', '.join(resultado.get('palabras_clave', []))
-        producto.beneficios = json.dumps(resultado.get('beneficios', []), ensure_ascii=False)
-        producto.descripcion_generada_fecha = timezone.now()
-        producto.save()
-        
-        logger.info(f"Descripción IA guardada para producto {producto.id}: {producto.nombre}")
+        respaldo = False
+        try:
+            producto, desde_cache = await agenerar_descripcion(producto, forzar=forzar)
+        except ErrorGroq as e:
+            if not producto.descripcion_corta:
+                logger.warning(f"Descripción IA no disponible para producto {producto.id}: {str(e)}")
+                return JsonResponse(
+                    {'error': 'La IA no está disponible en este momento, intenta nuevamente en unos minutos'},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE
+                )
+            logger.warning(f"Descripción IA no disponible, se devuelve la guardada del producto {producto.id}: {str(e)}")
+            desde_cache, respaldo = True, True
         
-        return Response({
+        datos = {
             'producto': {
                 'id': producto.id,
                 'nombre': producto.nombre,
                 'codigo': producto.codigo,
                 'precio': float(producto.precio)
             },
-            'descripcion_corta': resultado.get('descripcion_corta', ''),
-            'descripcion_larga': resultado.get('descripcion_larga', ''),
-            'palabras_clave': resultado.get('palabras_clave', []),
-            'beneficios': resultado.get('beneficios', []),
+            'descripcion_corta': producto.descripcion_corta,
+            'descripcion_larga': producto.descripcion_larga,
+            'palabras_clave': producto.palabras_clave,
+            'beneficios': producto.beneficios,
             'guardado': True,
-            'fecha_generacion': producto.descripcion_generada_fecha.isoformat()
-        }, status=status.HTTP_200_OK)
+            'cache': desde_cache,
+            'fecha_generacion': (
+                producto.descripcion_generada_fecha.isoformat() if producto.descripcion_generada_fecha else None
+            )
+        }
+        if respaldo:
+            datos['respaldo'] = True
+        return JsonResponse(datos, status=status.HTTP_200_OK)
         
     except Exception as e:
         logger.error(f"Error en generar_descripcion_ia: {str(e)}")
-        return Response(
+        return JsonResponse(
             {'error': f'Error al generar descripción: {str(e)}'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def estado_tarea_ia(request, tarea_id):
+    """
+    Endpoint: GET /api/ia/tareas/{tarea_id}/
+    
+    Estado de una tarea de IA encolada con {"async": true}
+    Requiere autenticación
+    
+    Response:
+    {
+        "id": 12,
+        "tipo": "descripcion",
+        "estado": "completada",     // pendiente | en_proceso | completada | error
+        "intentos": 1,
+        "creada": "...",
+        "iniciada": "...",
+        "terminada": "...",
+        "error": "",
+        "resultado": {              // solo si está completada
+            "producto": {...},
+            "descripcion_corta": "...",
+            ...
+        }
+    }
+    """
+    try:
+        try:
+            tarea = TareaIA.objects.select_related('producto').get(id=tarea_id)
+        except TareaIA.DoesNotExist:
+            return Response(
+                {'error': f'Tarea con ID {tarea_id} no existe'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        datos = {
+            'id': tarea.id,
+            'tipo': tarea.tipo,
+            'estado': tarea.estado,
+            'intentos': tarea.intentos,
+            'creada': tarea.creada.isoformat(),
+            'iniciada': tarea.iniciada.isoformat() if tarea.iniciada else None,
+            'terminada': tarea.terminada.isoformat() if tarea.terminada else None,
+            'error': tarea.error
+        }
+        if tarea.estado == TareaIA.COMPLETADA:
+            producto = tarea.producto
+            datos['resultado'] = {
+                'producto': {
+                    'id': producto.id,
+                    'nombre': producto.nombre,
+                    'codigo': producto.codigo,
+                    'precio': float(producto.precio)
+                },
+                'descripcion_corta': producto.descripcion_corta,
+                'descripcion_larga': producto.descripcion_larga,
+                'palabras_clave': producto.palabras_clave,
+                'beneficios': producto.beneficios,
+                'fecha_generacion': (
+                    producto.descripcion_generada_fecha.isoformat() if producto.descripcion_generada_fecha else None
+                )
+            }
+        return Response(datos, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        logger.error(f"Error en estado_tarea_ia: {str(e)}")
+        return Response(
+            {'error': f'Error al consultar la tarea: {str(e)}'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def stats_ia(request):
@@ -614,6 +984,10 @@ def stats_ia(request):
     
     Muestra estadísticas de la IA y productos disponibles
     Útil para debugging y verificar que la IA tiene acceso a todos los productos
+    Incluye las métricas del cache semántico, del router local del chatbot y el estado del
+    circuit breaker de Groq (de este proceso), y la telemetría de las llamadas a Groq por
+    operación (llamadas, errores, reintentos, tokens y latencia p50/p95/p99) de la última
+    hora y del último día
     """
     try:
         total_productos = Productos.objects.count()
@@ -623,6 +997,9 @@ def stats_ia(request):
         total_clientes = Cliente.objects.count()
         total_ventas = Venta.objects.count()
         
+        telemetria = obtener_telemetria()
+        ahora = timezone.now()
+        
         # Muestra de productos disponibles
         productos_muestra = []
         for p in Productos.objects.filter(stock__gt=0).order_by('nombre')[:10]:
@@ -642,6 +1019,14 @@ def stats_ia(request):
             'clientes': total_clientes,
             'ventas': total_ventas,
             'muestra_productos': productos_muestra,
+            'cache_chatbot': obtener_cache_chatbot().metricas(),
+            'chatbot_respuestas_locales': metricas_intenciones(),
+            'circuito_groq': obtener_circuito_groq().metricas(),
+            'coalescencia': obtener_single_flight().metricas(),
+            'telemetria_ia': {
+                'ultima_hora': telemetria.resumen(ahora - timedelta(hours=1)),
+                'ultimo_dia': telemetria.resumen(ahora - timedelta(days=1))
+            },
             'mensaje': f'La IA tiene acceso a {productos_con_stock} productos con stock disponible'
         })
     except Exception as e:
@@ -652,21 +1037,207 @@ def stats_ia(request):
         )
 
 
-@api_view(['POST'])
-@permission_classes([AllowAny])
-def chatbot_atencion(request):
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def rendimiento(request):
+    """
+    Endpoint: GET /api/rendimiento/
+    
+    Resumen por ruta de los requests recientes de este proceso (RendimientoMiddleware):
+    latencia p50/p95, tiempo en BD, consultas por request, duplicadas y repetidas, tamaño
+    de la respuesta y las consultas más repetidas con su origen (candidatas a N+1)
+    Solo staff. ?orden=consultas_media (o cualquier métrica numérica) cambia el orden;
+    por defecto se ordena por tiempo total consumido
+    """
+    try:
+        registro = obtener_registro_rendimiento()
+        rutas = registro.resumen()
+        orden = request.query_params.get('orden')
+        if rutas and isinstance(rutas[0].get(orden), (int, float)):
+            rutas.sort(key=lambda r: -(r[orden] or 0))
+        return Response({
+            'ventana_segundos': registro.ventana,
+            'pid': os.getpid(),
+            'rutas': rutas
+        })
+    except Exception as e:
+        logger.error(f"Error en rendimiento: {str(e)}")
+        return Response(
+            {'error': f'Error al obtener el resumen de rendimiento: {str(e)}'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@require_GET
+def metricas_prometheus(request):
+    """
+    Endpoint: GET /metrics
+    
+    Métricas en formato de texto de Prometheus (latencia por ruta, checkouts, conexiones a
+    la BD, caches y Groq), sumadas entre todos los workers de gunicorn
+    Si METRICAS_TOKEN está configurado se exige el header "Authorization: Bearer <token>"
+    (en Prometheus: authorization.credentials del scrape_config)
+    """
+    if settings.METRICAS_TOKEN:
+        esperado = f'Bearer {settings.METRICAS_TOKEN}'
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), esperado):
+            return HttpResponse('No autorizado\n', status=401, content_type='text/plain')
+    try:
+        contenido, content_type = exportar_metricas()
+        return HttpResponse(contenido, content_type=content_type)
+    except Exception as e:
+        logger.error(f"Error exportando métricas: {str(e)}")
+        return HttpResponse(f'Error al exportar métricas: {str(e)}\n', status=500, content_type='text/plain')
+
+
+def _contexto_chatbot(contexto_extra, mensaje=''):
+    """
+    Arma el contexto que se envía al chatbot (compartido por /api/ia/chat/ y su versión stream)
+    
+    Args:
+        contexto_extra: Dict opcional del request con "venta_numero", "producto_id" y/o "rut_cliente"
+        mensaje: Pregunta del usuario (para elegir los productos relevantes)
+    """
+    contexto_extra = contexto_extra or {}
+    
+    # Preparar contexto adicional si se proporciona
+    contexto = {}
+    
+    # Si se consulta sobre una venta específica (solo si es del cliente que pregunta: el chat no
+    # requiere login y los números de venta son correlativos)
+    if 'venta_numero' in contexto_extra and contexto_extra.get('rut_cliente'):
+        try:
+            venta = Venta.objects.select_related('rut_cliente').get(
+                numero=contexto_extra['venta_numero'], rut_cliente_id=contexto_extra['rut_cliente']
+            )
+            detalles = DetalleVenta.objects.filter(venta=venta).select_related('producto')
+            
+            contexto['venta'] = {
+                'numero': venta.numero,
+                'fecha': venta.fecha.strftime('%Y-%m-%d'),
+                'total': float(venta.total),
+                'cliente': f"{venta.rut_cliente.nombre} {venta.rut_cliente.apellido}",
+                'productos': [
+                    {
+                        'nombre': d.producto.nombre,
+                        'cantidad': d.cantidad,
+                        'precio': float(d.precio_unitario)
+                    }
+                    for d in detalles
+                ]
+            }
+        except Venta.DoesNotExist:
+            pass
+    
+    # Si se consulta sobre un producto específico
+    if 'producto_id' in contexto_extra:
+        try:
+            producto = Productos.objects.get(id=contexto_extra['producto_id'])
+            contexto['producto'] = {
+                'nombre': producto.nombre,
+                'codigo': producto.codigo,
+                'precio': float(producto.precio),
+                'stock': producto.stock,
+                'disponible': producto.stock > 0
+            }
+        except Productos.DoesNotExist:
+            pass
+    
+    # Sin venta ni producto consultado: productos con stock más relevantes para la pregunta
+    # (el prompt los recorta según IA_PROMPT_PRESUPUESTO_TOKENS)
+    if not contexto:
+        ids = productos_relevantes(mensaje, limite=settings.IA_CHATBOT_PRODUCTOS)
+        productos = {
+            p['id']: p
+            for p in Productos.objects.filter(id__in=ids, stock__gt=0).values('id', 'nombre', 'codigo', 'precio', 'stock')
+        }
+        disponibles = [productos[pid] for pid in ids if pid in productos]
+        if len(disponibles) < settings.IA_CHATBOT_PRODUCTOS:
+            disponibles.extend(
+                Productos.objects.filter(stock__gt=0).exclude(id__in=list(productos))
+                .order_by('nombre')
+                .values('id', 'nombre', 'codigo', 'precio', 'stock')[:settings.IA_CHATBOT_PRODUCTOS - len(disponibles)]
+            )
+        
+        contexto['productos_disponibles'] = [{**p, 'precio': float(p['precio'])} for p in disponibles]
+        contexto['total_productos'] = Productos.objects.filter(stock__gt=0).count()
+        
+        logger.info(
+            f"Chatbot - {len(disponibles)} productos relevantes de {contexto['total_productos']} como contexto para la IA"
+        )
+    
+    # Cliente identificado: su perfil de compras (tamaño acotado) para personalizar la respuesta
+    if contexto_extra.get('rut_cliente'):
+        try:
+            cliente = Cliente.objects.get(rut=contexto_extra['rut_cliente'])
+            perfil = obtener_perfil(cliente)
+            contexto['cliente'] = {
+                'nombre': f"{cliente.nombre} {cliente.apellido}",
+                **resumen_perfil(perfil),
+                'ultimos_productos': historial_perfil(perfil, limite=5)
+            }
+        except Cliente.DoesNotExist:
+            pass
+    
+    return contexto
+
+
+async def _responder_chatbot(mensaje, contexto_extra):
+    """Calcula la respuesta de /api/ia/chat/ (body ya validado)"""
+    # Precio, stock o estado de una compra: se responde con la BD, sin IA
+    resultado = await sync_to_async(responder_localmente)(mensaje, contexto_extra)
+    desde_cache = False
+    
+    if resultado is None:
+        contexto = await sync_to_async(_contexto_chatbot)(contexto_extra, mensaje)
+        
+        # Preguntas frecuentes: reutilizar una respuesta a una pregunta parecida con el mismo contexto
+        cache = obtener_cache_chatbot()
+        resultado = cache.buscar(mensaje, contexto)
+        desde_cache = resultado is not None
+        
+        if not desde_cache:
+            # Llamar a GroqCloud para obtener respuesta del chatbot (sin ocupar un hilo mientras responde)
+            groq = obtener_groq_service()
+            try:
+                resultado = await groq.achatbot_atencion(
+                    mensaje_usuario=mensaje,
+                    contexto=contexto if contexto else None
+                )
+                cache.guardar(mensaje, contexto, resultado)
+            except ErrorGroq as e:
+                logger.warning(f"Chatbot IA no disponible, se responde con el mensaje de respaldo: {str(e)}")
+                resultado = {**GroqService._respaldo_chatbot(), 'respaldo': True}
+    
+    datos = {
+        'respuesta': resultado.get('respuesta', ''),
+        'tipo': resultado.get('tipo', 'otro'),
+        'requiere_humano': resultado.get('requiere_humano', False),
+        'sugerencias': resultado.get('sugerencias', []),
+        'cache': desde_cache
+    }
+    if resultado.get('respaldo'):
+        datos['respaldo'] = True
+    return datos, status.HTTP_200_OK
+
+
+@csrf_exempt
+@require_POST
+async def chatbot_atencion(request):
     """
     Endpoint: POST /api/ia/chat/
     
     Chatbot de atención al cliente usando IA
     Responde preguntas sobre productos, ventas, políticas, etc.
+    Las preguntas de precio, stock o estado de una compra se responden con la BD, sin IA.
     
     Body:
     {
         "mensaje": "¿Cuál es el horario de atención?",
         "contexto": {  // Opcional
-            "venta_numero": "20241128-0001",  // Para consultar sobre una venta específica
-            "producto_id": 5  // Para consultar sobre un producto específico
+            "venta_numero": "20241128-0001",  // Para consultar sobre una venta específica (junto con rut_cliente)
+            "producto_id": 5,  // Para consultar sobre un producto específico
+            "rut_cliente": "12345678-9"  // Perfil de compras del cliente; dueño de venta_numero
         }
     }
     
@@ -678,96 +1249,125 @@ def chatbot_atencion(request):
         "sugerencias": [
             "¿Cuáles son los métodos de pago?",
             "¿Cuánto demora el despacho?"
-        ]
+        ],
+        "cache": false  // true si se reutilizó la respuesta a una pregunta parecida
     }
+    
+    Si Groq falla o no responde dentro del plazo se responde con un mensaje fijo que deriva
+    a atención humana ("respaldo": true)
+    Vista async: mientras espera a Groq no ocupa un hilo del worker (servidor ASGI)
     """
     try:
-        mensaje = request.data.get('mensaje')
-        contexto_extra = request.data.get('contexto', {})
+        datos = _leer_json(request)
+        if datos is None:
+            return JsonResponse({'error': 'El body debe ser JSON válido'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        mensaje = datos.get('mensaje')
+        contexto_extra = datos.get('contexto') or {}
         
         if not mensaje:
-            return Response(
+            return JsonResponse(
                 {'error': 'El campo mensaje es obligatorio'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Preparar contexto adicional si se proporciona
-        contexto = {}
-        
-        # Si se consulta sobre una venta específica
-        if 'venta_numero' in contexto_extra:
-            try:
-                venta = Venta.objects.get(numero=contexto_extra['venta_numero'])
-                detalles = DetalleVenta.objects.filter(venta=venta)
-                
-                contexto['venta'] = {
-                    'numero': venta.numero,
-                    'fecha': venta.fecha.strftime('%Y-%m-%d'),
-                    'total': float(venta.total),
-                    'cliente': f"{venta.rut_cliente.nombre} {venta.rut_cliente.apellido}",
-                    'productos': [
-                        {
-                            'nombre': d.producto.nombre,
-                            'cantidad': d.cantidad,
-                            'precio': float(d.precio_unitario)
-                        }
-                        for d in detalles
-                    ]
-                }
-            except Venta.DoesNotExist:
-                pass
-        
-        # Si se consulta sobre un producto específico
-        if 'producto_id' in contexto_extra:
-            try:
-                producto = Productos.objects.get(id=contexto_extra['producto_id'])
-                contexto['producto'] = {
-                    'nombre': producto.nombre,
-                    'codigo': producto.codigo,
-                    'precio': float(producto.precio),
-                    'stock': producto.stock,
-                    'disponible': producto.stock > 0
-                }
-            except Productos.DoesNotExist:
-                pass
-        
-        # Agregar lista COMPLETA de productos disponibles si no hay contexto específico
-        if not contexto:
-            # Enviar TODOS los productos disponibles (no solo 5)
-            todos_los_productos = Productos.objects.filter(stock__gt=0).order_by('nombre')
-            
-            logger.info(f"Chatbot - Enviando {todos_los_productos.count()} productos a la IA")
-            
-            contexto['productos_disponibles'] = [
-                {
-                    'id': p.id,
-                    'nombre': p.nombre,
-                    'codigo': p.codigo,
-                    'precio': float(p.precio),
-                    'stock': p.stock
-                }
-                for p in todos_los_productos
-            ]
-            
-            contexto['total_productos'] = todos_los_productos.count()
+        if not isinstance(contexto_extra, dict):
+            return JsonResponse(
+                {'error': 'El campo contexto debe ser un objeto'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # Llamar a GroqCloud para obtener respuesta del chatbot
-        groq = GroqService()
-        resultado = groq.chatbot_atencion(
-            mensaje_usuario=mensaje,
-            contexto=contexto if contexto else None
+        # Requests idénticos simultáneos comparten la consulta a la BD y la llamada a Groq
+        return await _respuesta_compartida(
+            'chatbot',
+            {'mensaje': mensaje, 'contexto': contexto_extra},
+            lambda: _responder_chatbot(mensaje, contexto_extra)
         )
         
-        return Response({
-            'respuesta': resultado.get('respuesta', ''),
-            'tipo': resultado.get('tipo', 'otro'),
-            'requiere_humano': resultado.get('requiere_humano', False),
-            'sugerencias': resultado.get('sugerencias', [])
-        }, status=status.HTTP_200_OK)
-        
     except Exception as e:
         logger.error(f"Error en chatbot_atencion: {str(e)}")
-        return Response(
+        return JsonResponse(
             {'error': f'Error en el chatbot: {str(e)}'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
+
+
+@csrf_exempt
+@require_POST
+async def chatbot_atencion_stream(request):
+    """
+    Endpoint: POST /api/ia/chat/stream/
+    
+    Versión en streaming del chatbot (requiere servidor ASGI)
+    Recibe el mismo body que /api/ia/chat/ y envía la respuesta como server-sent events
+    a medida que la IA la genera, sin ocupar un worker durante toda la llamada:
+    
+    event: token
+    data: {"texto": "Nuestro horario"}
+    
+    event: fin
+    data: {"respuesta": "Nuestro horario de atención es..."}
+    
+    Si la IA falla antes del primer token se envía el mensaje de respaldo del chatbot
+    ("respaldo": true en el evento fin); si falla a mitad de camino se envía "event: error"
+    con {"error": "..."}
+    """
+    datos = _leer_json(request)
+    if datos is None:
+        return JsonResponse({'error': 'El body debe ser JSON válido'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    mensaje = datos.get('mensaje')
+    if not mensaje:
+        return JsonResponse({'error': 'El campo mensaje es obligatorio'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    contexto_extra = datos.get('contexto') or {}
+    if not isinstance(contexto_extra, dict):
+        return JsonResponse({'error': 'El campo contexto debe ser un objeto'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        # Las consultas al ORM son síncronas: se ejecutan en un hilo aparte
+        local = await sync_to_async(responder_localmente)(mensaje, contexto_extra)
+        en_cache = None
+        if local is None:
+            contexto = await sync_to_async(_contexto_chatbot)(contexto_extra, mensaje)
+            # Las respuestas del cache semántico (generadas por /api/ia/chat/) se envían de una vez
+            en_cache = obtener_cache_chatbot().buscar(mensaje, contexto)
+        groq = obtener_groq_service()
+    except Exception as e:
+        logger.error(f"Error en chatbot_atencion_stream: {str(e)}")
+        return JsonResponse({'error': f'Error en el chatbot: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    def evento(nombre, datos):
+        return f"event: {nombre}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+    
+    async def eventos():
+        # Respuestas sin IA (router local o cache semántico) se envían de una vez
+        if local is not None:
+            yield evento('token', {'texto': local['respuesta']})
+            yield evento('fin', {'respuesta': local['respuesta']})
+            return
+        if en_cache is not None:
+            yield evento('token', {'texto': en_cache.get('respuesta', '')})
+            yield evento('fin', {'respuesta': en_cache.get('respuesta', ''), 'cache': True})
+            return
+        
+        partes = []
+        try:
+            async for texto in groq.chatbot_atencion_stream(mensaje, contexto=contexto or None):
+                partes.append(texto)
+                yield evento('token', {'texto': texto})
+        except Exception as e:
+            logger.error(f"Error en chatbot_atencion_stream: {str(e)}")
+            if isinstance(e, ErrorGroq) and not partes:
+                respaldo = GroqService._respaldo_chatbot()['respuesta']
+                yield evento('token', {'texto': respaldo})
+                yield evento('fin', {'respuesta': respaldo, 'respaldo': True})
+                return
+            yield evento('error', {'error': f'Error en el chatbot: {str(e)}'})
+            return
+        yield evento('fin', {'respuesta': ''.join(partes)})
+    
+    response = StreamingHttpResponse(eventos(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response